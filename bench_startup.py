@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du temps de démarrage de DARY Score
+Mesure, dans des processus neufs, le temps jusqu'au premier rendu de la
+page et jusqu'au premier calcul, ainsi que le temps de démarrage d'un
+serveur lancé par dary_startup (santé Streamlit et disponibilité).
+
+Usage :
+    python bench_startup.py [--runs 5] [--script dary_score_app2.py] [--serveur] [--json resultats.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+# Exécuté dans un interpréteur neuf : temps mesurés depuis le début du processus
+MESURE_RENDU = r'''
+import json, sys, time
+debut = time.perf_counter()
+sys.path.insert(0, {dossier!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({script!r}, default_timeout=120)
+at.run()
+premier_rendu = time.perf_counter() - debut
+erreurs = [e.value for e in at.exception]
+premier_calcul = None
+if {calcul!r} and at.button:
+    t = time.perf_counter()
+    at.button[0].click()
+    at.run()
+    premier_calcul = time.perf_counter() - t
+    erreurs += [e.value for e in at.exception]
+print(json.dumps({{'premier_rendu': premier_rendu, 'premier_calcul': premier_calcul,
+                  'pandas_charge': 'pandas' in sys.modules, 'erreurs': erreurs}}))
+'''
+
+
+def free_port():
+    """Port TCP libre sur la machine locale"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_render(script, calcul=True):
+    """Premier rendu (et premier calcul) de la page dans un processus neuf"""
+    code = MESURE_RENDU.format(dossier=DOSSIER, script=os.path.join(DOSSIER, script), calcul=calcul)
+    sortie = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=DOSSIER, timeout=300)
+    if sortie.returncode != 0:
+        raise RuntimeError(sortie.stderr[-2000:])
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url, debut, timeout):
+    """Secondes écoulées depuis debut jusqu'à une réponse HTTP 200 (None si délai dépassé)"""
+    while time.perf_counter() - debut < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as reponse:
+                if reponse.status == 200:
+                    return time.perf_counter() - debut
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_server(script, timeout=60):
+    """Démarrage d'un serveur via dary_startup : santé Streamlit puis disponibilité"""
+    port, port_dispo = free_port(), free_port()
+    debut = time.perf_counter()
+    processus = subprocess.Popen(
+        [sys.executable, os.path.join(DOSSIER, 'dary_startup.py'), script,
+         '--readiness-port', str(port_dispo), '--',
+         '--server.port', str(port), '--server.headless', 'true'],
+        cwd=DOSSIER, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        sante = wait_for(f'http://127.0.0.1:{port}/_stcore/health', debut, timeout)
+        disponible = wait_for(f'http://127.0.0.1:{port_dispo}/ready', debut, timeout)
+    finally:
+        processus.terminate()
+        processus.wait(timeout=10)
+    return {'sante_streamlit': sante, 'disponibilite': disponible}
+
+
+def summarize(mesures, cle):
+    """Médiane et extrêmes d'une mesure sur plusieurs exécutions"""
+    valeurs = [m[cle] for m in mesures if m.get(cle) is not None]
+    if not valeurs:
+        return None
+    return {'mediane': round(statistics.median(valeurs), 3),
+            'min': round(min(valeurs), 3), 'max': round(max(valeurs), 3)}
+
+
+def main(argv=None):
+    """Exécution du benchmark et affichage des résultats"""
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage de DARY Score")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--script', default='dary_score_app2.py')
+    parser.add_argument('--serveur', action='store_true', help="mesurer aussi un serveur réel")
+    parser.add_argument('--json', help="fichier de sortie pour le suivi des mesures")
+    args = parser.parse_args(argv)
+
+    rendus = [measure_render(args.script) for _ in range(args.runs)]
+    rapport = {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'script': args.script,
+        'runs': args.runs,
+        'premier_rendu': summarize(rendus, 'premier_rendu'),
+        'premier_calcul': summarize(rendus, 'premier_calcul'),
+        'pandas_au_premier_rendu': any(r['pandas_charge'] for r in rendus),
+        'erreurs': sorted({e for r in rendus for e in r['erreurs']}),
+    }
+    if args.serveur:
+        serveurs = [measure_server(args.script) for _ in range(args.runs)]
+        rapport['sante_streamlit'] = summarize(serveurs, 'sante_streamlit')
+        rapport['disponibilite'] = summarize(serveurs, 'disponibilite')
+
+    print("=" * 60)
+    print(f"BENCHMARK DÉMARRAGE - {args.script} ({args.runs} exécutions)")
+    print("=" * 60)
+    for cle in ('premier_rendu', 'premier_calcul', 'sante_streamlit', 'disponibilite'):
+        if rapport.get(cle):
+            m = rapport[cle]
+            print(f"  • {cle:<16} médiane {m['mediane']:.3f}s  (min {m['min']:.3f}s, max {m['max']:.3f}s)")
+    if rapport['erreurs']:
+        print(f"  ❌ Erreurs: {rapport['erreurs']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+    return 1 if rapport['erreurs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
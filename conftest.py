@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Données de test partagées : portefeuilles synthétiques tirés de l'exemple du dépôt
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dary_scoring import fill_defaults
+
+# Portefeuille d'exemple livré avec le dépôt
+CHEMIN_REFERENCE = os.path.join(os.path.dirname(__file__), 'projets_immobiliers_maroc.csv')
+# Colonnes numériques bruitées d'un projet tiré à l'autre
+COLONNES_BRUITEES = ('surface', 'ticket_minimum', 'roi_projete', 'rendement_locatif', 'plus_value_estimee',
+                     'dist_ecoles', 'dist_commerces', 'dist_transport', 'dist_hopitaux')
+
+
+@pytest.fixture(scope='session')
+def reference():
+    """Portefeuille d'exemple du dépôt, colonnes absentes complétées"""
+    return fill_defaults(pd.read_csv(CHEMIN_REFERENCE))
+
+
+@pytest.fixture
+def portefeuille(reference):
+    """Fabrique de portefeuilles synthétiques : portefeuille(n, graine)
+
+    Projets tirés avec remise de l'exemple, valeurs numériques multipliées
+    par un bruit log-normal, noms numérotés.
+    """
+    def fabrique(n, graine):
+        rng = np.random.default_rng(graine)
+        tirage = reference.iloc[rng.integers(len(reference), size=n)].reset_index(drop=True)
+        for colonne in COLONNES_BRUITEES:
+            tirage[colonne] = pd.to_numeric(tirage[colonne], errors='coerce') * rng.lognormal(0, 0.25, n)
+        tirage['nom_projet'] = [f'Projet {i + 1}' for i in range(n)]
+        return fill_defaults(tirage)
+    return fabrique
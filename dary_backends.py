@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Moteurs de scoring interchangeables derrière une même interface par lots
+Chaque moteur déclare son schéma d'entrée (colonnes, nature, défaut) et
+score un lot de colonnes en tableaux : sous-scores par catégorie, score
+global et niveau. L'interface, les outils en ligne de commande et les
+benchmarks choisissent un moteur par son nom.
+
+Usage :
+    python dary_backends.py projets.csv [--moteur regles] [-o scores.csv] [--bench 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from dary_scoring import BAREMES, CATEGORIES, CRITERES, DEFAUTS_IMPORT, PALIERS, score_batch
+
+# Nature des colonnes d'un schéma
+NOMBRE, TEXTE, BOOLEEN = 'nombre', 'texte', 'booleen'
+
+MOTEUR_DEFAUT = os.environ.get('DARY_SCORER', 'regles')
+
+# Niveaux du simulateur du cahier des charges (score sur 10)
+NIVEAUX_CAHIER = (
+    (8, 'Excellent'),
+    (6, 'Bon'),
+    (0, 'À risque'),
+)
+
+_MOTEURS = {}
+
+
+def register(nom):
+    """Décorateur d'enregistrement d'une fabrique de moteur sous un nom"""
+    def enregistrer(fabrique):
+        _MOTEURS[nom] = fabrique
+        return fabrique
+    return enregistrer
+
+
+class ScorerBackend:
+    """Interface commune : schéma d'entrée et scoring d'un lot de colonnes
+
+    score() reçoit un DataFrame ou un dict colonne -> tableau et retourne un
+    dict de tableaux : un par catégorie, 'score_global' et 'niveau'.
+    """
+
+    nom = None
+    libelle = None
+    echelle = 100
+    # colonne -> (nature, valeur par défaut)
+    schema = {}
+    categories = ()
+
+    @property
+    def colonnes(self):
+        return tuple(self.schema)
+
+    def prepare(self, df):
+        """Colonnes du schéma absentes complétées par leur défaut, valeurs numériques converties"""
+        import pandas as pd
+        df = df.copy()
+        for colonne, (nature, defaut) in self.schema.items():
+            if colonne not in df.columns:
+                df[colonne] = defaut
+            elif nature == NOMBRE:
+                df[colonne] = pd.to_numeric(df[colonne], errors='coerce')
+        return df
+
+    def score(self, colonnes):
+        raise NotImplementedError
+
+
+@register('regles')
+class RulesBackend(ScorerBackend):
+    """Règles DARY (paliers et barèmes par catégorie), score sur 100"""
+
+    nom = 'regles'
+    libelle = "Règles DARY (4 catégories)"
+    schema = {
+        c: (NOMBRE if c in PALIERS else
+            BOOLEEN if all(isinstance(k, bool) for k in BAREMES[c][0]) else TEXTE,
+            DEFAUTS_IMPORT[c])
+        for c in CRITERES
+    }
+    categories = tuple(CATEGORIES)
+
+    def score(self, colonnes):
+        return score_batch(colonnes)
+
+
+@register('cahier')
+class CahierBackend(ScorerBackend):
+    """Moyenne pondérée des critères du cahier des charges (notes sur 10)"""
+
+    nom = 'cahier'
+    libelle = "Cahier des charges (critères pondérés)"
+    echelle = 10
+
+    def __init__(self, cahier=None):
+        if cahier is None:
+            from dary_startup import load_cahier
+            cahier = load_cahier()
+        self.criteres = tuple(cahier['Critère'])
+        # Comme dary_score_app : poids normalisés sur la somme totale, critère absent = 0
+        self.poids = cahier['Pondération (%)'].to_numpy(dtype=float) / cahier['Pondération (%)'].sum()
+        groupes = cahier['Catégorie'] if 'Catégorie' in cahier.columns else ['Global'] * len(cahier)
+        self.groupes = {}
+        for i, groupe in enumerate(groupes):
+            self.groupes.setdefault(str(groupe), []).append(i)
+        self.categories = tuple(self.groupes)
+        self.schema = {c: (NOMBRE, np.nan) for c in self.criteres}
+
+    def score(self, colonnes):
+        notes = np.stack(np.broadcast_arrays(*[np.asarray(colonnes[c], dtype=float) if c in colonnes
+                                               else np.asarray(np.nan) for c in self.criteres]), axis=-1)
+        presentes = np.nan_to_num(notes)
+        resultat = {}
+        for groupe, indices in self.groupes.items():
+            poids = self.poids[indices]
+            resultat[groupe] = np.round(presentes[..., indices] @ (poids / poids.sum()), 2)
+        resultat['score_global'] = np.round(presentes @ self.poids, 2)
+        seuils = np.array([s for s, _ in NIVEAUX_CAHIER])
+        codes = np.sum(resultat['score_global'][..., None] < seuils, axis=-1)
+        resultat['niveau'] = np.array([n for _, n in NIVEAUX_CAHIER], dtype=object)[codes]
+        return resultat
+
+
+def available_backends():
+    """Noms des moteurs utilisables ici (le cahier exige son fichier, CSV ou Excel)"""
+    from dary_startup import cahier_path
+    return [nom for nom in _MOTEURS if nom != 'cahier' or cahier_path()]
+
+
+def get_backend(nom=None, **options):
+    """Moteur enregistré sous ce nom (par défaut DARY_SCORER, sinon 'regles')"""
+    nom = nom or MOTEUR_DEFAUT
+    if nom not in _MOTEURS:
+        raise KeyError(f"Moteur de scoring inconnu : {nom} (disponibles : {', '.join(_MOTEURS)})")
+    return _MOTEURS[nom](**options)
+
+
+def main(argv=None):
+    """Scoring d'un fichier CSV avec le moteur choisi, ou mesure de son débit"""
+    from dary_ingestion import read_projects
+    parser = argparse.ArgumentParser(description="Scoring par lots avec un moteur au choix")
+    parser.add_argument('fichier')
+    parser.add_argument('--moteur', default=MOTEUR_DEFAUT, choices=sorted(_MOTEURS))
+    parser.add_argument('-o', '--sortie', help="fichier CSV des scores")
+    parser.add_argument('--bench', type=int, default=0, help="répétitions pour mesurer le débit")
+    args = parser.parse_args(argv)
+
+    moteur = get_backend(args.moteur)
+    debut = time.perf_counter()
+    projets = read_projects(args.fichier, moteur)
+    lecture = time.perf_counter() - debut
+    resultat = moteur.score(projets)
+    scores = projets.assign(score_global=resultat['score_global'], niveau=resultat['niveau'])
+    print(f"✅ {len(projets)} projet(s) scorés avec « {moteur.libelle} » "
+          f"({len(projets.columns)} colonnes lues en {lecture:.3f}s)")
+    if args.sortie:
+        scores.to_csv(args.sortie, index=False)
+    else:
+        print(scores[['nom_projet', 'score_global', 'niveau']].head(20).to_string(index=False))
+
+    if args.bench:
+        durees = []
+        for _ in range(args.bench):
+            t = time.perf_counter()
+            moteur.score(projets)
+            durees.append(time.perf_counter() - t)
+        mediane = float(np.median(durees))
+        print(f"⏱️  {args.moteur} : médiane {mediane * 1000:.2f} ms, {len(projets) / mediane:,.0f} projets/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
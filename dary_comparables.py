@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projets comparables : plus proches voisins dans le portefeuille
+Chaque projet est codé en vecteur normalisé (surface, ticket, ROI,
+rendement, plus-value, distances, zone / type / état en one-hot). La
+recherche est exacte et vectorisée pour les petits portefeuilles ; au-delà
+de SEUIL_APPROCHE projets, un index à listes inversées (k-moyennes)
+ne parcourt que les groupes les plus proches de la requête.
+
+Usage :
+    python dary_comparables.py portefeuille.csv [--projet "Villa Souissi"] [-k 5] [--bench 1000000]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from dary_scoring import BAREMES, DEFAUTS_IMPORT
+
+# Colonnes numériques et colonnes passées au logarithme (distributions très étalées)
+COLONNES_NUMERIQUES = ('surface', 'ticket_minimum', 'roi_projete', 'rendement_locatif', 'plus_value_estimee',
+                       'dist_ecoles', 'dist_commerces', 'dist_transport', 'dist_hopitaux')
+COLONNES_LOG = ('surface', 'ticket_minimum')
+# Modalités codées en one-hot : celles des barèmes de scoring
+COLONNES_CATEGORIELLES = {c: tuple(BAREMES[c][0]) for c in ('zone', 'type_bien', 'etat')}
+# Une modalité différente coûte autant qu'un écart-type sur une colonne numérique
+POIDS_CATEGORIEL = np.sqrt(0.5)
+
+# Taille du portefeuille à partir de laquelle l'index approché est utilisé
+SEUIL_APPROCHE = 200_000
+# Groupes sondés par requête dans l'index approché
+GROUPES_SONDES = 8
+ITERATIONS_KMOYENNES = 8
+TAILLE_BLOC = 65_536
+
+
+def _column(projets, colonne, n):
+    if colonne in projets:
+        return np.broadcast_to(np.asarray(projets[colonne]), (n,))
+    return np.full(n, DEFAUTS_IMPORT.get(colonne))
+
+
+class FeatureEncoder:
+    """Codage des projets en vecteurs float32, normalisation apprise sur le portefeuille"""
+
+    def __init__(self):
+        self.moyennes = None
+        self.ecarts = None
+
+    @property
+    def dimension(self):
+        return len(COLONNES_NUMERIQUES) + sum(len(m) for m in COLONNES_CATEGORIELLES.values())
+
+    def _numeric(self, projets, n):
+        import pandas as pd
+        valeurs = np.empty((n, len(COLONNES_NUMERIQUES)))
+        for j, colonne in enumerate(COLONNES_NUMERIQUES):
+            valeurs[:, j] = pd.to_numeric(pd.Series(_column(projets, colonne, n)), errors='coerce')
+            if colonne in COLONNES_LOG:
+                valeurs[:, j] = np.log1p(np.maximum(valeurs[:, j], 0))
+        return valeurs
+
+    def fit(self, projets):
+        valeurs = self._numeric(projets, _length(projets))
+        self.moyennes = np.nanmean(valeurs, axis=0)
+        self.ecarts = np.nanstd(valeurs, axis=0)
+        self.moyennes = np.where(np.isnan(self.moyennes), 0, self.moyennes)
+        self.ecarts = np.where(np.isnan(self.ecarts) | (self.ecarts == 0), 1, self.ecarts)
+        return self
+
+    def transform(self, projets):
+        n = _length(projets)
+        vecteurs = np.zeros((n, self.dimension), dtype=np.float32)
+        numeriques = (self._numeric(projets, n) - self.moyennes) / self.ecarts
+        # Valeur manquante : moyenne du portefeuille
+        vecteurs[:, :len(COLONNES_NUMERIQUES)] = np.nan_to_num(numeriques)
+        debut = len(COLONNES_NUMERIQUES)
+        for colonne, modalites in COLONNES_CATEGORIELLES.items():
+            valeurs = _column(projets, colonne, n).astype(str)
+            for j, modalite in enumerate(modalites):
+                vecteurs[valeurs == modalite, debut + j] = POIDS_CATEGORIEL
+            debut += len(modalites)
+        return vecteurs
+
+
+def _length(projets):
+    if hasattr(projets, 'shape'):
+        return len(projets)
+    tailles = [np.size(v) for v in projets.values() if np.ndim(v) > 0]
+    return max(tailles) if tailles else 1
+
+
+def _squared_distances(vecteurs, normes, requete):
+    """Distances euclidiennes au carré d'une requête à un bloc de vecteurs"""
+    return normes - 2 * (vecteurs @ requete) + requete @ requete
+
+
+def _best(distances, indices, k):
+    """k plus petites distances, triées"""
+    if len(distances) > k:
+        partiel = np.argpartition(distances, k)[:k]
+        distances, indices = distances[partiel], indices[partiel]
+    ordre = np.argsort(distances, kind='stable')
+    return distances[ordre], indices[ordre]
+
+
+class ComparablesIndex:
+    """Index des projets du portefeuille pour la recherche de comparables
+
+    Recherche exacte sous SEUIL_APPROCHE projets, sinon index à listes
+    inversées : les projets sont rangés par groupe (k-moyennes) et seuls
+    les groupes les plus proches de la requête sont parcourus.
+    """
+
+    def __init__(self, projets, scores=None, noms=None, seuil_approche=SEUIL_APPROCHE, seed=0):
+        debut = time.perf_counter()
+        self.encodeur = FeatureEncoder().fit(projets)
+        self.vecteurs = np.concatenate([self.encodeur.transform(_slice(projets, i, i + TAILLE_BLOC))
+                                        for i in range(0, _length(projets), TAILLE_BLOC)])
+        n = len(self.vecteurs)
+        self.scores = (np.asarray(scores if scores is not None else projets['score_global'], dtype=float)
+                       if scores is not None or 'score_global' in projets else np.full(n, np.nan))
+        self.noms = np.asarray(noms if noms is not None else
+                               (projets['nom_projet'] if 'nom_projet' in projets else np.arange(n)), dtype=object)
+        self.approche = n >= seuil_approche
+        if self.approche:
+            self._build_lists(np.random.default_rng(seed))
+        self.normes = np.einsum('ij,ij->i', self.vecteurs, self.vecteurs)
+        self.duree_construction = time.perf_counter() - debut
+
+    def __len__(self):
+        return len(self.vecteurs)
+
+    def _build_lists(self, rng):
+        """Groupes k-moyennes appris sur un échantillon puis projets rangés par groupe"""
+        n = len(self.vecteurs)
+        n_groupes = int(np.sqrt(n))
+        echantillon = self.vecteurs[rng.choice(n, min(n, 40 * n_groupes), replace=False)]
+        centres = echantillon[rng.choice(len(echantillon), n_groupes, replace=False)].copy()
+        for _ in range(ITERATIONS_KMOYENNES):
+            groupes = self._assign(echantillon, centres)
+            sommes = np.zeros_like(centres)
+            np.add.at(sommes, groupes, echantillon)
+            comptes = np.bincount(groupes, minlength=n_groupes)
+            non_vides = comptes > 0
+            centres[non_vides] = sommes[non_vides] / comptes[non_vides, None]
+        groupes = np.concatenate([self._assign(self.vecteurs[i:i + TAILLE_BLOC], centres)
+                                  for i in range(0, n, TAILLE_BLOC)])
+        # Projets contigus par groupe : chaque liste est une tranche
+        ordre = np.argsort(groupes, kind='stable')
+        self.vecteurs, self.scores, self.noms = self.vecteurs[ordre], self.scores[ordre], self.noms[ordre]
+        self.ordre = ordre
+        self.centres = centres
+        self.bornes = np.concatenate([[0], np.cumsum(np.bincount(groupes, minlength=n_groupes))])
+
+    @staticmethod
+    def _assign(vecteurs, centres):
+        normes = np.einsum('ij,ij->i', centres, centres)
+        return np.argmin(normes[None, :] - 2 * (vecteurs @ centres.T), axis=1)
+
+    def query(self, projet, k=5, score_min=None, groupes_sondes=GROUPES_SONDES):
+        """Les k projets les plus proches, avec leur score et leur distance
+
+        score_min : ne retenir que les projets de score strictement supérieur
+        ("quels projets similaires scorent mieux ?").
+        """
+        requete = self.encodeur.transform(projet)[0]
+        if not self.approche:
+            return self._result(*self._search(np.arange(len(self)), requete, k, score_min))
+        # Groupes parcourus du plus proche au plus lointain jusqu'à k résultats
+        ordre_groupes = np.argsort(((self.centres - requete) ** 2).sum(axis=1))
+        sondes = groupes_sondes
+        while True:
+            choisis = ordre_groupes[:sondes]
+            candidats = np.concatenate([np.arange(self.bornes[g], self.bornes[g + 1]) for g in choisis])
+            distances, indices = self._search(candidats, requete, k, score_min)
+            if len(indices) >= k or sondes >= len(ordre_groupes):
+                return self._result(distances, indices)
+            sondes *= 4
+
+    def _search(self, candidats, requete, k, score_min):
+        if score_min is not None:
+            candidats = candidats[self.scores[candidats] > score_min]
+        distances = _squared_distances(self.vecteurs[candidats], self.normes[candidats], requete)
+        return _best(distances, candidats, k)
+
+    def _result(self, distances, indices):
+        return [{'nom': self.noms[i], 'score': float(self.scores[i]),
+                 'distance': round(float(np.sqrt(max(d, 0))), 3),
+                 'ligne': int(self.ordre[i] if self.approche else i)}
+                for d, i in zip(distances, indices)]
+
+
+def _slice(projets, debut, fin):
+    if hasattr(projets, 'iloc'):
+        return projets.iloc[debut:fin]
+    return {c: (v[debut:fin] if np.ndim(v) > 0 else v) for c, v in projets.items()}
+
+
+def _synthetic_portfolio(projets, n, rng):
+    """Portefeuille de n projets tirés du portefeuille donné, valeurs numériques bruitées"""
+    import pandas as pd
+    tirage = projets.iloc[rng.integers(len(projets), size=n)].reset_index(drop=True)
+    for colonne in COLONNES_NUMERIQUES:
+        if colonne in tirage:
+            bruit = rng.lognormal(0, 0.25, n)
+            tirage[colonne] = pd.to_numeric(tirage[colonne], errors='coerce') * bruit
+    tirage['nom_projet'] = [f'Projet {i + 1}' for i in range(n)]
+    return tirage
+
+
+def main(argv=None):
+    """Comparables d'un projet du portefeuille, ou mesure des temps de requête"""
+    import pandas as pd
+    from dary_scoring import fill_defaults, score_batch
+    parser = argparse.ArgumentParser(description="Projets comparables d'un portefeuille")
+    parser.add_argument('fichier')
+    parser.add_argument('--projet', help="nom du projet de référence (défaut : le premier)")
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--bench', type=int, default=0, help="taille d'un portefeuille synthétique à mesurer")
+    args = parser.parse_args(argv)
+
+    projets = fill_defaults(pd.read_csv(args.fichier))
+    if args.bench:
+        projets = fill_defaults(_synthetic_portfolio(projets, args.bench, np.random.default_rng(0)))
+    projets['score_global'] = score_batch(projets)['score_global']
+    index = ComparablesIndex(projets)
+    mode = "approché" if index.approche else "exact"
+    print(f"✅ Index {mode} de {len(index)} projets construit en {index.duree_construction:.2f}s")
+
+    if args.bench:
+        rng = np.random.default_rng(1)
+        requetes = projets.iloc[rng.integers(len(projets), size=200)]
+        exact = ComparablesIndex(projets, seuil_approche=len(projets) + 1) if index.approche else index
+        durees, rappels = [], []
+        for _, ligne in requetes.iterrows():
+            projet = ligne.to_dict()
+            t = time.perf_counter()
+            trouves = index.query(projet, args.k)
+            durees.append(time.perf_counter() - t)
+            attendus = {r['ligne'] for r in exact.query(projet, args.k)}
+            rappels.append(len(attendus & {r['ligne'] for r in trouves}) / args.k)
+        print(f"⏱️  requête : médiane {np.median(durees) * 1000:.2f} ms, "
+              f"p95 {np.percentile(durees, 95) * 1000:.2f} ms, rappel@{args.k} {np.mean(rappels):.3f}")
+        return 0
+
+    reference = projets[projets['nom_projet'] == args.projet] if args.projet else projets.iloc[:1]
+    if reference.empty:
+        print(f"❌ Projet introuvable : {args.projet}")
+        return 1
+    projet = reference.iloc[0].to_dict()
+    print(f"Projet : {projet['nom_projet']} (score {projet['score_global']})")
+    for titre, score_min in (("Plus proches", None), ("Plus proches et mieux notés", projet['score_global'])):
+        print(f"\n{titre} :")
+        for r in index.query(projet, args.k + (score_min is None), score_min):
+            if r['nom'] != projet['nom_projet']:
+                print(f"  • {r['nom']:<35} score {r['score']:>5}  distance {r['distance']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cube d'agrégation des scores d'un portefeuille
+Pour chaque cellule zone × type de bien × état × niveau : histogrammes à
+pas fixe du score global et de chaque sous-score, plus leurs sommes. Le
+cube s'alimente lot par lot pendant le scoring ; effectifs, moyennes et
+quantiles de n'importe quelle sélection se lisent ensuite sans repasser
+sur les projets, quelle que soit la taille du portefeuille.
+
+Usage :
+    python dary_cube.py resultats/projets_cube.npz [--par zone type_bien] [--filtre etat=off-plan] [--mesure Financier]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from dary_scoring import BAREMES, CATEGORIES, NIVEAUX
+
+DIMENSIONS = ('zone', 'type_bien', 'etat', 'niveau')
+# Modalités hors barème regroupées
+AUTRE = 'autre'
+# Cases des histogrammes : pas de échelle/1000 pour le score global, échelle/100 pour les sous-scores
+CASES_SCORE = 1001
+CASES_SOUS_SCORE = 101
+QUANTILES = {'p10': 0.10, 'p25': 0.25, 'mediane': 0.50, 'p75': 0.75, 'p90': 0.90}
+SCORE_GLOBAL = 'score_global'
+
+
+class ScoreCube:
+    """Histogrammes et sommes des scores par cellule zone × type_bien × etat × niveau"""
+
+    def __init__(self, categories=tuple(CATEGORIES), niveaux=tuple(n for _, n, *_ in NIVEAUX), echelle=100,
+                 modalites=None):
+        self.categories = tuple(categories)
+        self.echelle = echelle
+        self.modalites = modalites or {
+            'zone': tuple(BAREMES['zone'][0]) + (AUTRE,),
+            'type_bien': tuple(BAREMES['type_bien'][0]) + (AUTRE,),
+            'etat': tuple(BAREMES['etat'][0]) + (AUTRE,),
+            'niveau': tuple(niveaux),
+        }
+        self.forme = tuple(len(self.modalites[d]) for d in DIMENSIONS)
+        self.scores = np.zeros(self.forme + (CASES_SCORE,), dtype=np.int32)
+        self.sous_scores = np.zeros(self.forme + (len(self.categories), CASES_SOUS_SCORE), dtype=np.int32)
+        # Sommes exactes (moyennes sans erreur d'arrondi des cases) : score global puis catégories
+        self.sommes = np.zeros(self.forme + (1 + len(self.categories),))
+
+    @classmethod
+    def for_backend(cls, moteur):
+        """Cube adapté aux catégories, niveaux et échelle d'un moteur de dary_backends"""
+        if moteur.nom == 'cahier':
+            from dary_backends import NIVEAUX_CAHIER
+            niveaux = tuple(n for _, n in NIVEAUX_CAHIER)
+        else:
+            niveaux = tuple(n for _, n, *_ in NIVEAUX)
+        return cls(moteur.categories, niveaux, moteur.echelle)
+
+    @property
+    def n(self):
+        return int(self.scores.sum())
+
+    @property
+    def mesures(self):
+        return (SCORE_GLOBAL,) + self.categories
+
+    def _codes(self, dimension, valeurs, n):
+        """Indice de modalité de chaque projet (AUTRE si hors barème)"""
+        modalites = self.modalites[dimension]
+        valeurs = np.broadcast_to(np.asarray(valeurs, dtype=str), (n,))
+        uniques, inverse = np.unique(valeurs, return_inverse=True)
+        repli = modalites.index(AUTRE) if AUTRE in modalites else 0
+        indices = np.array([modalites.index(u) if u in modalites else repli for u in uniques], dtype=np.int64)
+        return indices[inverse]
+
+    def _cases(self, valeurs, cases):
+        pas = self.echelle / (cases - 1)
+        return np.clip(np.rint(np.asarray(valeurs, dtype=float) / pas), 0, cases - 1).astype(np.int64)
+
+    def add(self, resultat, projets):
+        """Ajout d'un lot scoré : resultat de moteur.score(), projets avec zone, type_bien et etat
+
+        Une dimension absente des projets (moteur 'cahier') est comptée en AUTRE.
+        """
+        score_global = np.atleast_1d(np.asarray(resultat[SCORE_GLOBAL], dtype=float))
+        n = len(score_global)
+        valides = ~np.isnan(score_global)
+        codes = [self._codes(d, projets[d] if d in projets else AUTRE, n) for d in DIMENSIONS[:-1]]
+        codes.append(self._codes('niveau', resultat['niveau'], n))
+        cellules = np.ravel_multi_index(codes, self.forme)[valides]
+        n_cellules = int(np.prod(self.forme))
+
+        # Une seule passe par mesure : case = cellule × nombre de cases + case du score
+        cases = cellules * CASES_SCORE + self._cases(score_global[valides], CASES_SCORE)
+        self.scores += np.bincount(cases, minlength=n_cellules * CASES_SCORE).reshape(self.scores.shape)
+        sommes = [np.bincount(cellules, score_global[valides], minlength=n_cellules)]
+        for i, categorie in enumerate(self.categories):
+            valeurs = np.nan_to_num(np.atleast_1d(np.asarray(resultat[categorie], dtype=float)))[valides]
+            cases = cellules * CASES_SOUS_SCORE + self._cases(valeurs, CASES_SOUS_SCORE)
+            self.sous_scores[..., i, :] += np.bincount(
+                cases, minlength=n_cellules * CASES_SOUS_SCORE).reshape(self.forme + (CASES_SOUS_SCORE,))
+            sommes.append(np.bincount(cellules, valeurs, minlength=n_cellules))
+        self.sommes += np.stack(sommes, axis=-1).reshape(self.sommes.shape)
+        return self
+
+    def merge(self, autre):
+        """Ajout d'un cube de même structure (autre fichier, autre lot)"""
+        if autre.modalites != self.modalites or autre.categories != self.categories:
+            raise ValueError("Cubes de structures différentes")
+        self.scores += autre.scores
+        self.sous_scores += autre.sous_scores
+        self.sommes += autre.sommes
+        return self
+
+    def _selection(self, filtres):
+        """Indices retenus sur chaque dimension"""
+        selection = []
+        for dimension in DIMENSIONS:
+            voulues = (filtres or {}).get(dimension)
+            if voulues is None:
+                selection.append(np.arange(len(self.modalites[dimension])))
+                continue
+            voulues = [voulues] if isinstance(voulues, str) else list(voulues)
+            inconnues = set(voulues) - set(self.modalites[dimension])
+            if inconnues:
+                raise KeyError(f"{dimension} : modalité(s) inconnue(s) {', '.join(sorted(inconnues))}")
+            selection.append(np.array([self.modalites[dimension].index(v) for v in voulues], dtype=np.int64))
+        return selection
+
+    def _mesure(self, mesure):
+        if mesure == SCORE_GLOBAL:
+            return self.scores, 0
+        i = self.categories.index(mesure)
+        return self.sous_scores[..., i, :], i + 1
+
+    def stats(self, mesure=SCORE_GLOBAL, filtres=None, par=()):
+        """Effectif, moyenne et quantiles d'une mesure, regroupés selon les dimensions par
+
+        filtres : dimension -> modalité ou liste de modalités retenues.
+        Retourne une liste de dicts (une ligne par combinaison de modalités non vide).
+        """
+        par = tuple(par)
+        comptes, j = self._mesure(mesure)
+        selection = self._selection(filtres)
+        grille = np.ix_(*selection)
+        comptes = comptes[grille]
+        sommes = self.sommes[grille + (j,)]
+        # Agrégation des dimensions non regroupées
+        autres = tuple(i for i, d in enumerate(DIMENSIONS) if d not in par)
+        comptes = comptes.sum(axis=autres)
+        sommes = sommes.sum(axis=autres)
+        # Axes restants remis dans l'ordre demandé
+        rang = sorted(DIMENSIONS.index(d) for d in par)
+        axes = [rang.index(DIMENSIONS.index(d)) for d in par]
+        comptes = comptes.transpose(axes + [len(par)])
+        sommes = sommes.transpose(axes)
+
+        cumuls = np.cumsum(comptes, axis=-1)
+        effectifs = cumuls[..., -1]
+        pas = self.echelle / (comptes.shape[-1] - 1)
+        quantiles = {nom: np.argmax(cumuls >= np.maximum(q * effectifs, 1)[..., None], axis=-1) * pas
+                     for nom, q in QUANTILES.items()}
+        lignes = []
+        for position in np.ndindex(effectifs.shape):
+            n = int(effectifs[position])
+            if n == 0:
+                continue
+            ligne = {d: self.modalites[d][selection[DIMENSIONS.index(d)][k]] for d, k in zip(par, position)}
+            ligne.update({'n': n, 'moyenne': round(float(sommes[position]) / n, 2)})
+            ligne.update({nom: round(float(v[position]), 2) for nom, v in quantiles.items()})
+            lignes.append(ligne)
+        return lignes
+
+    def save(self, chemin):
+        """Sauvegarde atomique au format npz"""
+        entete = {'categories': self.categories, 'echelle': self.echelle, 'modalites': self.modalites}
+        temporaire = f'{chemin}.{os.getpid()}.tmp'
+        with open(temporaire, 'wb') as f:
+            np.savez_compressed(f, entete=np.array(json.dumps(entete, ensure_ascii=False)), scores=self.scores,
+                                sous_scores=self.sous_scores, sommes=self.sommes)
+        os.replace(temporaire, chemin)
+
+    @classmethod
+    def load(cls, chemin):
+        with np.load(chemin) as donnees:
+            entete = json.loads(str(donnees['entete']))
+            cube = cls(entete['categories'], echelle=entete['echelle'],
+                       modalites={d: tuple(v) for d, v in entete['modalites'].items()})
+            cube.scores[:] = donnees['scores']
+            cube.sous_scores[:] = donnees['sous_scores']
+            cube.sommes[:] = donnees['sommes']
+        return cube
+
+
+def main(argv=None):
+    """Statistiques d'un ou plusieurs cubes sauvegardés"""
+    parser = argparse.ArgumentParser(description="Interrogation d'un cube d'agrégation des scores")
+    parser.add_argument('cubes', nargs='+', help="fichiers _cube.npz (fusionnés)")
+    parser.add_argument('--par', nargs='*', default=[], choices=DIMENSIONS)
+    parser.add_argument('--filtre', action='append', default=[], help="dimension=modalité[,modalité]")
+    parser.add_argument('--mesure', default=SCORE_GLOBAL)
+    args = parser.parse_args(argv)
+
+    cube = ScoreCube.load(args.cubes[0])
+    for chemin in args.cubes[1:]:
+        cube.merge(ScoreCube.load(chemin))
+    filtres = {}
+    for filtre in args.filtre:
+        dimension, _, valeurs = filtre.partition('=')
+        filtres[dimension] = valeurs.split(',')
+    if args.mesure not in cube.mesures:
+        print(f"❌ Mesure inconnue : {args.mesure} (disponibles : {', '.join(cube.mesures)})")
+        return 1
+    lignes = cube.stats(args.mesure, filtres, args.par)
+    print(f"{args.mesure} — {cube.n} projet(s) dans le cube")
+    colonnes = list(args.par) + ['n', 'moyenne'] + list(QUANTILES)
+    print('  '.join(f'{c:>12}' for c in colonnes))
+    for ligne in lignes:
+        print('  '.join(f'{ligne[c]!s:>12}' for c in colonnes))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regroupement des projets en double avant le scoring
+Un même programme revient d'un import à l'autre sous des noms voisins
+(« Résidence Anfa Place », « Residence Anfa-Place »). Les projets sont
+répartis en blocs (zone, type de bien, surface et ticket arrondis) et les
+noms normalisés ne sont comparés qu'entre voisins dans l'ordre
+alphabétique à l'intérieur d'un bloc : le coût reste proportionnel au
+nombre de projets. Les numéros et lettres isolées d'un nom (« Tranche 2 »,
+« Villa Souissi B ») désignent une autre phase du programme : deux noms
+qui en diffèrent ne sont jamais regroupés. Chaque groupe garde un projet
+canonique, le plus complet.
+
+Usage :
+    python dary_dedup.py import_mars.csv import_avril.csv [-o projets_uniques.csv] [--groupes doublons.csv]
+"""
+
+import argparse
+import difflib
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dary_gazetteer import letter_counts
+
+# Colonnes de blocage : égalité exacte, puis surface et ticket à un écart relatif près
+COLONNES_BLOC = ('zone', 'type_bien')
+ECART_SURFACE = 0.15
+ECART_TICKET = 0.25
+# Voisins comparés dans l'ordre alphabétique des noms (à l'endroit et à l'envers)
+FENETRE = 4
+SIMILARITE_MIN = 0.85
+# Mots sans valeur distinctive retirés des noms
+MOTS_GENERIQUES = frozenset({
+    'residence', 'residences', 'projet', 'programme', 'immeuble', 'complexe', 'domaine',
+    'le', 'la', 'les', 'l', 'de', 'des', 'du', 'd',
+})
+# Marqueurs de phase : nombres (zéros de tête ignorés) et lettres isolées
+MARQUEURS = re.compile(r'\d+|\b[a-z]\b')
+# Paires comparées par opération vectorisée
+TAILLE_BLOC = 1_000_000
+
+
+def normalize_project_names(noms):
+    """Noms sans accents ni ponctuation, en minuscules, sans mots génériques
+
+    Le nom normalisé entier est gardé s'il ne reste rien ; '' pour un nom manquant.
+    """
+    noms = (pd.Series(noms, dtype=object).fillna('').astype(str).str.normalize('NFKD')
+            .str.encode('ascii', 'ignore').str.decode('ascii').str.lower()
+            .str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip())
+    generiques = r'\b(?:' + '|'.join(sorted(MOTS_GENERIQUES)) + r')\b'
+    courts = noms.str.replace(generiques, ' ', regex=True).str.replace(r'\s+', ' ', regex=True).str.strip()
+    return courts.where(courts != '', noms).to_numpy(dtype=object)
+
+
+def _phase_markers(noms):
+    """Code des marqueurs de phase de chaque nom normalisé (ensemble trié)"""
+    marqueurs = [' '.join(sorted({(m.lstrip('0') or '0') if m.isdigit() else m for m in MARQUEURS.findall(nom)}))
+                 for nom in noms]
+    return pd.factorize(np.array(marqueurs, dtype=object))[0]
+
+
+def _buckets(valeurs, ecart, decalage):
+    """Classe logarithmique d'une valeur (-1 si manquante ou non positive)"""
+    valeurs = pd.to_numeric(valeurs, errors='coerce').to_numpy(dtype=float)
+    valides = valeurs > 0
+    classes = np.full(len(valeurs), -1, dtype=np.int64)
+    classes[valides] = np.floor(np.log(valeurs[valides]) / np.log1p(ecart) + decalage)
+    return classes
+
+
+def _blocks(projets, decalage):
+    """Numéro de bloc de chaque projet pour une grille décalée de surface et de ticket"""
+    cles = [pd.factorize(projets[c].astype(str))[0] for c in COLONNES_BLOC if c in projets.columns]
+    for colonne, ecart in (('surface', ECART_SURFACE), ('ticket_minimum', ECART_TICKET)):
+        if colonne in projets.columns:
+            cles.append(_buckets(projets[colonne], ecart, decalage))
+    blocs = np.zeros(len(projets), dtype=np.int64)
+    # Combinaison des clés renumérotée à chaque étape pour rester dans les entiers 64 bits
+    for codes in cles:
+        blocs = pd.factorize(blocs * (codes.max() + 2) + codes + 1)[0]
+    return blocs
+
+
+def _similar(noms, comptes, marqueurs, a, b):
+    """Paires de noms (codes a, b) assez proches ; bornes vectorisées puis difflib"""
+    longueurs = np.array([len(n) for n in noms])
+    # Mêmes marqueurs de phase, borne par les longueurs (2 × min / somme), puis par les caractères communs
+    indices = np.flatnonzero((marqueurs[a] == marqueurs[b])
+                             & (2 * np.minimum(longueurs[a], longueurs[b])
+                                >= SIMILARITE_MIN * (longueurs[a] + longueurs[b])))
+    garder = np.zeros(len(indices), dtype=bool)
+    for debut in range(0, len(indices), TAILLE_BLOC):
+        i, j = a[indices[debut:debut + TAILLE_BLOC]], b[indices[debut:debut + TAILLE_BLOC]]
+        communs = np.minimum(comptes[i], comptes[j]).sum(axis=1)
+        garder[debut:debut + TAILLE_BLOC] = 2 * communs >= SIMILARITE_MIN * (longueurs[i] + longueurs[j])
+    proches = np.zeros(len(a), dtype=bool)
+    indices = indices[garder]
+    proches[indices] = [difflib.SequenceMatcher(None, noms[i], noms[j]).ratio() >= SIMILARITE_MIN
+                        for i, j in zip(a[indices].tolist(), b[indices].tolist())]
+    return proches
+
+
+def _components(n, a, b):
+    """Composantes connexes des liens (a, b) : plus petit indice de chaque groupe"""
+    groupes = np.arange(n)
+    while True:
+        lien = np.minimum(groupes[a], groupes[b])
+        avant = groupes.copy()
+        np.minimum.at(groupes, a, lien)
+        np.minimum.at(groupes, b, lien)
+        groupes = groupes[groupes]
+        if np.array_equal(groupes, avant):
+            return groupes
+
+
+def find_duplicates(projets, cle='nom_projet'):
+    """Groupe de chaque projet : position de son projet canonique
+
+    Deux projets sont en double s'ils partagent zone et type de bien, ont
+    une surface et un ticket voisins et des noms normalisés proches, aux
+    mêmes numéros et lettres isolées. Le projet canonique d'un groupe est
+    le plus renseigné, le plus récent (le dernier du tableau) en cas
+    d'égalité.
+    """
+    n = len(projets)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    noms_projets = projets[cle] if cle in projets.columns else pd.Series([None] * n)
+    # Normalisation une fois par nom distinct ; un nom manquant (code -1) prend le dernier, vide
+    codes_bruts, bruts = pd.factorize(noms_projets, use_na_sentinel=True)
+    codes, noms = pd.factorize(np.append(normalize_project_names(bruts), ''))
+    codes = codes[codes_bruts]
+    noms = list(noms)
+    sans_nom = noms.index('')
+    comptes = letter_counts(noms)
+    marqueurs = _phase_markers(noms)
+    # Rangs alphabétiques des noms, à l'endroit puis à l'envers (fautes en début de nom)
+    ordres = [np.argsort(np.argsort(np.array(noms, dtype=object))),
+              np.argsort(np.argsort(np.array([nom[::-1] for nom in noms], dtype=object)))]
+
+    liens_a, liens_b = [], []
+    for decalage in (0.0, 0.5):
+        blocs = _blocks(projets, decalage)
+        for rangs in ordres:
+            ordre = np.lexsort((rangs[codes], blocs))
+            for pas in range(1, min(FENETRE, n - 1) + 1):
+                i, j = ordre[:-pas], ordre[pas:]
+                voisins = (blocs[i] == blocs[j]) & (codes[i] != sans_nom) & (codes[j] != sans_nom)
+                liens_a.append(i[voisins])
+                liens_b.append(j[voisins])
+    a = np.concatenate(liens_a) if liens_a else np.zeros(0, dtype=np.int64)
+    b = np.concatenate(liens_b) if liens_b else np.zeros(0, dtype=np.int64)
+
+    # Une comparaison par paire de noms distincts (paire codée min × nombre de noms + max)
+    cles = np.minimum(codes[a], codes[b]) * len(noms) + np.maximum(codes[a], codes[b])
+    egaux = codes[a] == codes[b]
+    paires, inverse = np.unique(cles[~egaux], return_inverse=True)
+    proches = _similar(noms, comptes, marqueurs, paires // len(noms), paires % len(noms))
+    retenus = egaux.copy()
+    retenus[~egaux] = proches[inverse.ravel()]
+    groupes = _components(n, a[retenus], b[retenus])
+
+    # Projet canonique : le plus renseigné, puis le plus récent
+    renseignes = projets.notna().sum(axis=1).to_numpy()
+    ordre = np.lexsort((-np.arange(n), -renseignes, groupes))
+    premiers = np.r_[True, groupes[ordre][1:] != groupes[ordre][:-1]]
+    canoniques = np.empty(n, dtype=np.int64)
+    canoniques[groupes[ordre][premiers]] = ordre[premiers]
+    return canoniques[groupes]
+
+
+def deduplicate(projets, cle='nom_projet'):
+    """Projets uniques et groupes de doublons
+
+    Retourne un dict : 'projets' (projets canoniques, colonne doublons =
+    nombre de projets regroupés), 'groupes' (projets des groupes d'au
+    moins deux, colonnes groupe et canonique), 'regroupes' (projets écartés).
+    """
+    groupes = find_duplicates(projets, cle)
+    tailles = np.bincount(groupes, minlength=len(projets))
+    canonique = groupes == np.arange(len(projets))
+    uniques = projets.iloc[np.flatnonzero(canonique)].assign(doublons=tailles[canonique] - 1)
+    multiples = np.flatnonzero(tailles[groupes] > 1)
+    multiples = multiples[np.lexsort((~canonique[multiples], groupes[multiples]))]
+    detail = projets.iloc[multiples].assign(groupe=groupes[multiples], canonique=canonique[multiples])
+    return {'projets': uniques, 'groupes': detail, 'regroupes': int(len(projets) - canonique.sum())}
+
+
+def main(argv=None):
+    """Regroupement des doublons d'un ou plusieurs imports"""
+    parser = argparse.ArgumentParser(description="Projets en double entre imports")
+    parser.add_argument('fichiers', nargs='+')
+    parser.add_argument('--cle', default='nom_projet', help="colonne du nom des projets")
+    parser.add_argument('-o', '--sortie', help="CSV des projets uniques")
+    parser.add_argument('--groupes', help="CSV des groupes de doublons")
+    args = parser.parse_args(argv)
+
+    # Fichiers dans l'ordre donné : à égalité, le projet du dernier import est gardé
+    projets = pd.concat([pd.read_csv(f, low_memory=False).assign(fichier=os.path.basename(f))
+                         for f in args.fichiers], ignore_index=True)
+    debut = time.perf_counter()
+    resultat = deduplicate(projets, args.cle)
+    duree = time.perf_counter() - debut
+    print(f"✅ {len(projets)} projet(s) lus, {len(resultat['projets'])} unique(s), "
+          f"{resultat['regroupes']} doublon(s) regroupé(s) en {duree:.2f}s")
+    if len(resultat['groupes']):
+        colonnes = [c for c in ('groupe', 'canonique', args.cle, 'fichier', 'zone', 'surface', 'ticket_minimum')
+                    if c in resultat['groupes'].columns]
+        print(resultat['groupes'][colonnes].head(30).to_string(index=False))
+    if args.sortie:
+        resultat['projets'].to_csv(args.sortie, index=False)
+    if args.groupes:
+        resultat['groupes'].to_csv(args.groupes, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
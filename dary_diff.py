@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparaison de deux scorings d'un même portefeuille
+Les deux instantanés (fichiers *_scores.csv de dary_watch, ou tout CSV
+avec score_global, niveau et les colonnes score_<catégorie>) sont joints
+sur la clé projet par un index de hachage, puis toutes les colonnes
+d'entrée et tous les sous-scores sont comparés en une passe vectorisée :
+changements de niveau, plus fortes variations et catégorie motrice.
+
+Usage :
+    python dary_diff.py mars_scores.csv avril_scores.csv [--cle nom_projet] [--top 20] [-o diff.csv]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dary_scoring import NIVEAUX, PONDERATIONS
+
+CLE_DEFAUT = 'nom_projet'
+PREFIXE_SOUS_SCORE = 'score_'
+# Écart de score en dessous duquel un projet est considéré inchangé (arrondis)
+TOLERANCE = 1e-6
+NIVEAUX_ORDONNES = tuple(n for _, n, *_ in NIVEAUX)
+
+
+def load_snapshot(chemin):
+    """Instantané de scoring (CSV ou Parquet)"""
+    if str(chemin).endswith('.parquet'):
+        return pd.read_parquet(chemin)
+    return pd.read_csv(chemin, low_memory=False)
+
+
+def _keys(instantane, cle):
+    """Clés de jointure ; un nom répété est numéroté dans l'ordre d'apparition"""
+    if cle not in instantane.columns:
+        raise KeyError(f"Colonne clé absente de l'instantané : {cle}")
+    cles = instantane[cle]
+    cles = pd.Index(cles if cles.dtype == object else cles.astype(str))
+    if cles.is_unique:
+        return cles
+    serie = cles.to_series()
+    rang = serie.groupby(serie, sort=False).cumcount()
+    return pd.Index(serie.where(rang == 0, serie + '#' + rang.astype(str)))
+
+
+def _sub_score_columns(avant, apres):
+    return [c for c in avant.columns
+            if c.startswith(PREFIXE_SOUS_SCORE) and c != 'score_global' and c in apres.columns]
+
+
+def _changed(a, b):
+    """Masque des valeurs différentes, deux valeurs manquantes étant égales"""
+    if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+        a, b = a.to_numpy(dtype=float), b.to_numpy(dtype=float)
+        return ~(np.isclose(a, b, rtol=0, atol=TOLERANCE) | (np.isnan(a) & np.isnan(b)))
+    a, b = a.astype(str).to_numpy(), b.astype(str).to_numpy()
+    return a != b
+
+
+def diff_snapshots(avant, apres, cle=CLE_DEFAUT, top=20):
+    """Comparaison de deux instantanés scorés
+
+    Retourne un dict : 'detail' (un projet commun par ligne : niveaux, écart
+    de score, écart de chaque sous-score, catégorie motrice, colonnes
+    d'entrée modifiées), 'transitions' (avant × après), 'hausses' et
+    'baisses' (top plus fortes variations), 'ajoutes', 'retires'.
+    """
+    index_avant = _keys(avant, cle)
+    cles_apres = _keys(apres, cle)
+    # Position de chaque projet de « après » dans « avant » (-1 si nouveau)
+    positions = index_avant.get_indexer(cles_apres)
+    communs = positions >= 0
+    # Lignes alignées (les index pandas ne sont pas utilisés, seulement les positions)
+    gauche = avant.iloc[positions[communs]]
+    droite = apres.iloc[np.flatnonzero(communs)]
+    presents = np.zeros(len(avant), dtype=bool)
+    presents[positions[communs]] = True
+
+    detail = pd.DataFrame({
+        cle: cles_apres[communs],
+        'niveau_avant': gauche['niveau'].to_numpy(),
+        'niveau_apres': droite['niveau'].to_numpy(),
+        'score_avant': gauche['score_global'].to_numpy(dtype=float),
+        'score_apres': droite['score_global'].to_numpy(dtype=float),
+    })
+    detail['ecart'] = np.round(detail['score_apres'] - detail['score_avant'], 2)
+
+    # Catégorie motrice : plus forte contribution pondérée à l'écart du score global
+    sous_scores = _sub_score_columns(avant, apres)
+    if sous_scores:
+        ecarts = np.column_stack([droite[c].to_numpy(dtype=float) - gauche[c].to_numpy(dtype=float)
+                                  for c in sous_scores])
+        poids = np.array([PONDERATIONS.get(_category(c), 1.0) for c in sous_scores])
+        contributions = np.nan_to_num(ecarts * poids)
+        for j, colonne in enumerate(sous_scores):
+            detail[f'ecart_{colonne[len(PREFIXE_SOUS_SCORE):]}'] = np.round(ecarts[:, j], 2)
+        motrices = np.array([_category(c) for c in sous_scores], dtype=object)
+        detail['categorie_motrice'] = np.where(np.abs(contributions).max(axis=1) > TOLERANCE,
+                                               motrices[np.abs(contributions).argmax(axis=1)], '')
+
+    # Colonnes d'entrée modifiées : masque par colonne, compacté en octets (autant de colonnes
+    # que nécessaire), libellé construit une fois par combinaison
+    entrees = np.array([c for c in avant.columns if c in apres.columns and c != cle and c != 'score_global'
+                        and c != 'niveau' and c not in sous_scores], dtype=object)
+    if len(entrees) and len(detail):
+        modifiees = np.column_stack([_changed(gauche[c], droite[c]) for c in entrees])
+        octets = np.ascontiguousarray(np.packbits(modifiees, axis=1))
+        combinaisons = octets.view(np.dtype((np.void, octets.shape[1]))).ravel()
+        _, premieres, inverse = np.unique(combinaisons, return_index=True, return_inverse=True)
+        libelles = np.array([', '.join(entrees[modifiees[i]]) for i in premieres], dtype=object)
+        detail['colonnes_modifiees'] = libelles[inverse.ravel()]
+    else:
+        detail['colonnes_modifiees'] = ''
+
+    change = detail['niveau_avant'] != detail['niveau_apres']
+    transitions = pd.crosstab(detail['niveau_avant'], detail['niveau_apres'])
+    ordre = [n for n in NIVEAUX_ORDONNES if n in transitions.index] + \
+        [n for n in transitions.index if n not in NIVEAUX_ORDONNES]
+    colonnes = [n for n in NIVEAUX_ORDONNES if n in transitions.columns] + \
+        [n for n in transitions.columns if n not in NIVEAUX_ORDONNES]
+    return {
+        'detail': detail,
+        'transitions': transitions.loc[ordre, colonnes],
+        'changements_niveau': int(change.sum()),
+        'hausses': detail[detail['ecart'] > TOLERANCE].nlargest(top, 'ecart'),
+        'baisses': detail[detail['ecart'] < -TOLERANCE].nsmallest(top, 'ecart'),
+        'ajoutes': apres.loc[~communs, cle].tolist(),
+        'retires': avant.loc[~presents, cle].tolist(),
+    }
+
+
+def _category(colonne):
+    """Catégorie DARY d'une colonne score_<catégorie> (nom d'origine si inconnue)"""
+    nom = colonne[len(PREFIXE_SOUS_SCORE):]
+    return next((c for c in PONDERATIONS if c.lower() == nom), nom)
+
+
+def main(argv=None):
+    """Comparaison de deux fichiers de scores"""
+    parser = argparse.ArgumentParser(description="Différences entre deux scorings d'un portefeuille")
+    parser.add_argument('avant')
+    parser.add_argument('apres')
+    parser.add_argument('--cle', default=CLE_DEFAUT, help="colonne identifiant un projet")
+    parser.add_argument('--top', type=int, default=20, help="plus fortes hausses et baisses affichées")
+    parser.add_argument('-o', '--sortie', help="CSV du détail des projets modifiés")
+    args = parser.parse_args(argv)
+
+    debut = time.perf_counter()
+    avant, apres = load_snapshot(args.avant), load_snapshot(args.apres)
+    lecture = time.perf_counter() - debut
+    debut = time.perf_counter()
+    diff = diff_snapshots(avant, apres, args.cle, args.top)
+    comparaison = time.perf_counter() - debut
+    detail = diff['detail']
+
+    print(f"✅ {len(detail)} projet(s) communs, {len(diff['ajoutes'])} ajouté(s), {len(diff['retires'])} retiré(s) "
+          f"(lecture {lecture:.2f}s, comparaison {comparaison:.2f}s)")
+    print(f"\n🔀 {diff['changements_niveau']} changement(s) de niveau :")
+    print(diff['transitions'].to_string())
+    colonnes = [args.cle, 'score_avant', 'score_apres', 'ecart', 'niveau_apres', 'categorie_motrice',
+                'colonnes_modifiees']
+    colonnes = [c for c in colonnes if c in detail.columns]
+    for titre, table in (("📈 Plus fortes hausses", diff['hausses']), ("📉 Plus fortes baisses", diff['baisses'])):
+        if len(table):
+            print(f"\n{titre} :")
+            print(table[colonnes].to_string(index=False))
+    if args.sortie:
+        modifies = detail[(detail['ecart'].abs() > TOLERANCE) | (detail['colonnes_modifiees'] != '')
+                          | (detail['niveau_avant'] != detail['niveau_apres'])]
+        modifies.to_csv(args.sortie, index=False)
+        print(f"\n💾 {len(modifies)} projet(s) modifiés écrits dans {args.sortie}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exports d'un résultat DARY (JSON, rapport HTML, CSV)
+Les contenus sont produits à la demande, au moment du téléchargement
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+# Format -> (libellé, type MIME, préfixe du nom de fichier, extension)
+FORMATS = {
+    'json': ("📄 Télécharger JSON", 'application/json', 'dary_score', 'json'),
+    'html': ("📊 Télécharger Rapport", 'text/html', 'rapport_dary', 'html'),
+    'csv': ("📑 Télécharger CSV", 'text/csv', 'export_dary', 'csv'),
+}
+
+
+def generate_pdf_report(data, scores):
+    """Génération d'un rapport PDF (simulé avec HTML)"""
+    html_content = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial; padding: 20px; }}
+            h1 {{ color: #0B2239; }}
+            h2 {{ color: #3CE58E; }}
+            .score {{ font-size: 48px; font-weight: bold; color: {scores['couleur']}; }}
+            table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
+            th, td {{ padding: 10px; border: 1px solid #ddd; text-align: left; }}
+            th {{ background: #0B2239; color: white; }}
+        </style>
+    </head>
+    <body>
+        <h1>Rapport DARY Score</h1>
+        <p>Date: {scores['timestamp']}</p>
+        <h2>Score Global: <span class="score">{scores['score_global']}/100</span></h2>
+        <p>Niveau: {scores['niveau']}</p>
+        <p>Recommandation: {scores['recommendation']}</p>
+        
+        <h2>Analyse Détaillée</h2>
+        <table>
+            <tr>
+                <th>Critère</th>
+                <th>Score</th>
+                <th>Poids</th>
+                <th>Détails</th>
+            </tr>
+    """
+    
+    for categorie, info in scores['scores'].items():
+        details_str = ', '.join([f"{k}: {v}" for k, v in info['details'].items()])
+        html_content += f"""
+            <tr>
+                <td>{categorie}</td>
+                <td>{info['score']}/100</td>
+                <td>{info['poids']}</td>
+                <td>{details_str}</td>
+            </tr>
+        """
+    
+    html_content += """
+        </table>
+        <p style="margin-top: 50px; font-size: 12px; color: #666;">
+            © 2024 DARY Score - Simulateur d'Investissement Immobilier Intelligent
+        </p>
+    </body>
+    </html>
+    """
+    
+    return html_content
+
+
+def export_csv(nom_projet, scores):
+    """Ligne CSV du résultat d'un projet"""
+    ligne = {
+        'Projet': nom_projet,
+        'Date': scores['timestamp'],
+        'Score Global': scores['score_global'],
+        'Niveau': scores['niveau'],
+    }
+    for categorie, info in scores['scores'].items():
+        ligne[f'Score {categorie}'] = info['score']
+    sortie = io.StringIO()
+    writer = csv.DictWriter(sortie, fieldnames=list(ligne), lineterminator='\n')
+    writer.writeheader()
+    writer.writerow(ligne)
+    return sortie.getvalue()
+
+
+def build_export(format, data, scores):
+    """Contenu (octets) d'un export du résultat"""
+    if format == 'json':
+        contenu = json.dumps(scores.to_dict() if hasattr(scores, 'to_dict') else scores, indent=2)
+    elif format == 'html':
+        contenu = generate_pdf_report(data, scores)
+    elif format == 'csv':
+        contenu = export_csv(data.get('nom_projet', ''), scores)
+    else:
+        raise ValueError(f"Format d'export inconnu: {format}")
+    return contenu.encode('utf-8')
+
+
+def export_filename(format, horodatage=None):
+    """Nom du fichier téléchargé"""
+    _, _, prefixe, extension = FORMATS[format]
+    date = datetime.now() if horodatage is None else datetime.fromtimestamp(horodatage)
+    return f"{prefixe}_{date.strftime('%Y%m%d_%H%M%S')}.{extension}"
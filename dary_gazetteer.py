@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zone DARY déduite de l'adresse, du quartier ou de la ville
+Le référentiel local des quartiers (nom, ville, zone) est indexé sur des
+noms normalisés (sans accents, en minuscules) : recherche exacte des
+groupes de mots de l'adresse, puis par préfixe dans les noms triés, puis
+approchée (difflib) sur les noms de même initiale, présélectionnés en
+une opération vectorisée. La source de la classification est conservée
+pour chaque projet.
+
+Usage :
+    python dary_gazetteer.py projets.csv [--referentiel quartiers_maroc.csv] [-o projets_zones.csv]
+"""
+
+import argparse
+import bisect
+import difflib
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from dary_scoring import BAREMES
+
+FICHIER_REFERENTIEL = os.environ.get('DARY_GAZETTEER_FILE', 'quartiers_maroc.csv')
+# Colonnes décrivant la localisation d'un projet, de la plus précise à la moins précise
+COLONNES_ADRESSE = ('quartier', 'adresse', 'ville')
+# Mots au plus dans un nom de quartier cherché dans une adresse
+MOTS_MAX = 4
+# Longueur minimale d'un préfixe et similarité minimale de la recherche approchée
+PREFIXE_MIN = 4
+SIMILARITE_MIN = 0.85
+# Adresses mémorisées au plus (le cache est vidé au-delà, pour les processus de longue durée)
+TAILLE_CACHE = 500_000
+
+# Source de la zone de chaque projet
+SAISIE, EXACTE, PREFIXE, APPROCHEE, AMBIGUE, INCONNUE = 'saisie', 'exacte', 'prefixe', 'approchee', 'ambigue', 'inconnue'
+
+
+def normalize_name(texte):
+    """Nom sans accents, en minuscules, ponctuation remplacée par des espaces"""
+    texte = unicodedata.normalize('NFKD', str(texte)).encode('ascii', 'ignore').decode().lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', texte))
+
+
+def letter_counts(noms):
+    """Nombre d'occurrences de chaque lettre, chiffre et espace, un nom normalisé par ligne"""
+    octets = [nom.encode() for nom in noms]
+    rangs = _RANGS[np.frombuffer(b''.join(octets), dtype=np.uint8)]
+    lignes = np.repeat(np.arange(len(octets)), [len(o) for o in octets])
+    return np.bincount(lignes * 37 + rangs, minlength=len(octets) * 37).reshape(len(octets), 37).astype(np.int16)
+
+
+# Rang de chaque octet dans les comptes de caractères (36 : espace ou autre)
+_RANGS = np.full(256, 36)
+_RANGS[np.frombuffer(b'abcdefghijklmnopqrstuvwxyz0123456789', dtype=np.uint8)] = np.arange(36)
+
+
+class Gazetteer:
+    """Index des quartiers : noms normalisés -> zones possibles par ville"""
+
+    def __init__(self, quartiers):
+        manquantes = {'nom', 'zone'} - set(quartiers.columns)
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans le référentiel : {', '.join(sorted(manquantes))}")
+        zones = set(BAREMES['zone'][0])
+        invalides = set(quartiers['zone']) - zones
+        if invalides:
+            raise ValueError(f"Zones inconnues dans le référentiel : {', '.join(sorted(map(str, invalides)))}")
+        villes = quartiers['ville'] if 'ville' in quartiers.columns else [''] * len(quartiers)
+        # nom normalisé -> {ville normalisée: zone}
+        self.noms = {}
+        for nom, ville, zone in zip(quartiers['nom'], villes, quartiers['zone']):
+            cle = normalize_name(nom)
+            if cle:
+                self.noms.setdefault(cle, {})[normalize_name(ville) if pd.notna(ville) else ''] = zone
+        self.villes = {v for par_ville in self.noms.values() for v in par_ville if v}
+        self.tries = sorted(self.noms)
+        # Recherche approchée : par initiale, longueurs et nombre de chaque caractère des noms
+        self.par_initiale = {}
+        for initiale in {c[0] for c in self.tries}:
+            cles = [c for c in self.tries if c[0] == initiale]
+            self.par_initiale[initiale] = (cles, np.array([len(c) for c in cles]),
+                                           letter_counts(cles))
+        self._cache = {}
+        self._proches = {}
+
+    def __len__(self):
+        return len(self.noms)
+
+    def _zone(self, cle, villes):
+        """Zone d'un nom, départagée par la ville citée ; None si ambiguë"""
+        par_ville = self.noms[cle]
+        for ville in villes:
+            if ville in par_ville:
+                return par_ville[ville]
+        zones = set(par_ville.values())
+        return zones.pop() if len(zones) == 1 else None
+
+    def _prefix(self, fragment):
+        """Noms commençant par le fragment (tous les noms triés entre deux bornes)"""
+        debut = bisect.bisect_left(self.tries, fragment)
+        fin = bisect.bisect_left(self.tries, fragment + '\x7f')
+        return self.tries[debut:fin]
+
+    def _close(self, groupe):
+        """Nom le plus proche d'un groupe de mots (None si aucun assez proche), mémorisé"""
+        if groupe not in self._proches:
+            # Borne de difflib calculée pour tous les noms à la fois : caractères communs
+            # (sans tenir compte de l'ordre), puis similarité exacte sur les noms restants
+            cles, longueurs, lettres = self.par_initiale.get(groupe[0], ((), None, None))
+            possibles = []
+            if cles:
+                communs = np.minimum(lettres, letter_counts([groupe])[0]).sum(axis=1)
+                possibles = [cles[i] for i in np.flatnonzero(2 * communs >= SIMILARITE_MIN * (longueurs + len(groupe)))]
+            proches = difflib.get_close_matches(groupe, possibles, n=1, cutoff=SIMILARITE_MIN)
+            self._proches[groupe] = proches[0] if proches else None
+        return self._proches[groupe]
+
+    def resolve(self, texte):
+        """(zone, source) d'un texte d'adresse ; zone None si non résolue"""
+        texte = normalize_name(texte)
+        if texte in self._cache:
+            return self._cache[texte]
+        mots = texte.split()
+        villes = [v for v in self.villes if f' {v} ' in f' {texte} ']
+        groupes = [' '.join(mots[i:i + n]) for n in range(min(MOTS_MAX, len(mots)), 0, -1)
+                   for i in range(len(mots) - n + 1)]
+        resultat = (None, INCONNUE)
+        # 1. Groupe de mots identique à un nom (le plus long d'abord)
+        for groupe in groupes:
+            if groupe in self.noms and groupe not in villes:
+                zone = self._zone(groupe, villes)
+                resultat = (zone, EXACTE if zone else AMBIGUE)
+                break
+        # 2. Groupe de mots début d'un seul nom (nom abrégé ou tronqué)
+        if resultat[0] is None:
+            for groupe in groupes:
+                if len(groupe) < PREFIXE_MIN or groupe in villes:
+                    continue
+                candidats = {self._zone(c, villes) for c in self._prefix(groupe)}
+                if len(candidats) == 1 and None not in candidats:
+                    resultat = (candidats.pop(), PREFIXE)
+                    break
+        # 3. Nom proche (faute de frappe), parmi les noms de même initiale
+        if resultat[0] is None:
+            for groupe in groupes:
+                if len(groupe) < PREFIXE_MIN or groupe in villes or not groupe[0].isalpha():
+                    continue
+                proche = self._close(groupe)
+                if proche:
+                    zone = self._zone(proche, villes)
+                    if zone:
+                        resultat = (zone, APPROCHEE)
+                        break
+        if len(self._cache) >= TAILLE_CACHE:
+            self._cache.clear()
+        self._cache[texte] = resultat
+        return resultat
+
+
+def load_gazetteer(path):
+    """Référentiel des quartiers à partir d'un fichier CSV (nom, ville, zone)"""
+    return Gazetteer(pd.read_csv(path, dtype=str))
+
+
+def fill_zones(projets, gazetteer, ecraser=False):
+    """Zones des projets déduites de leur quartier, adresse ou ville
+
+    Seules les zones absentes sont déduites, sauf si ecraser=True ; la
+    colonne zone_source indique l'origine de chaque zone.
+    """
+    colonnes = [c for c in COLONNES_ADRESSE if c in projets.columns]
+    if not colonnes:
+        return projets
+    projets = projets.copy()
+    if 'zone' not in projets.columns:
+        projets['zone'] = None
+    zones = projets['zone'].to_numpy(dtype=object).copy()
+    saisies = projets['zone'].notna().to_numpy()
+    source = np.where(saisies, SAISIE, INCONNUE).astype(object)
+    cibles = np.flatnonzero(~saisies | ecraser)
+    if len(cibles):
+        textes = projets.iloc[cibles][colonnes].fillna('').astype(str).agg(' '.join, axis=1)
+        # Une adresse répétée n'est résolue qu'une fois
+        codes, uniques = pd.factorize(textes)
+        resolus = [gazetteer.resolve(t) for t in uniques]
+        zones_trouvees = np.array([z for z, _ in resolus], dtype=object)[codes]
+        sources = np.array([s for _, s in resolus], dtype=object)[codes]
+        trouvees = pd.notna(zones_trouvees)
+        zones[cibles[trouvees]] = zones_trouvees[trouvees]
+        # Zone saisie conservée si l'adresse ne donne rien
+        source[cibles] = np.where(trouvees | ~saisies[cibles], sources, SAISIE)
+        projets['zone'] = zones
+    projets['zone_source'] = source
+    return projets
+
+
+def main(argv=None):
+    """Classification des zones d'un fichier de projets"""
+    parser = argparse.ArgumentParser(description="Zones DARY déduites des adresses")
+    parser.add_argument('fichier')
+    parser.add_argument('--referentiel', default=FICHIER_REFERENTIEL)
+    parser.add_argument('--ecraser', action='store_true', help="reclasser aussi les zones déjà saisies")
+    parser.add_argument('-o', '--sortie')
+    args = parser.parse_args(argv)
+
+    gazetteer = load_gazetteer(args.referentiel)
+    projets = pd.read_csv(args.fichier)
+    debut = time.perf_counter()
+    projets = fill_zones(projets, gazetteer, args.ecraser)
+    duree = time.perf_counter() - debut
+    if 'zone_source' not in projets.columns:
+        print(f"❌ Aucune colonne d'adresse ({', '.join(COLONNES_ADRESSE)}) dans {args.fichier}")
+        return 1
+    print(f"✅ {len(projets)} projet(s) classés en {duree:.2f}s avec {len(gazetteer)} quartier(s)")
+    print(projets['zone_source'].value_counts().to_string())
+    if args.sortie:
+        projets.to_csv(args.sortie, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calcul des distances aux commodités à partir des coordonnées
+Index spatial en arbre k-d sur coordonnées projetées, interrogé par lots
+vectorisés pour trouver le point d'intérêt le plus proche de chaque projet
+"""
+
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+RAYON_TERRE_KM = 6371.0088
+
+# Type de point d'intérêt -> colonne de distance du scoring
+TYPES_POI = {
+    'ecole': 'dist_ecoles',
+    'commerce': 'dist_commerces',
+    'transport': 'dist_transport',
+    'hopital': 'dist_hopitaux',
+}
+
+# Distance au-delà de laquelle la recherche s'arrête (km)
+DISTANCE_MAX_KM = 50.0
+# Nombre maximal de points d'intérêt par feuille de l'arbre
+POINTS_PAR_FEUILLE = 8
+# Nombre de projets traités par bloc vectorisé
+TAILLE_BLOC = 50000
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en km (tableaux numpy)"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def normalize_poi_type(valeur):
+    """Type de point d'intérêt sans accents, en minuscules et au singulier"""
+    texte = unicodedata.normalize('NFKD', str(valeur)).encode('ascii', 'ignore').decode()
+    texte = texte.strip().lower()
+    return texte[:-1] if texte.endswith('s') else texte
+
+
+class PoiIndex:
+    """Arbre k-d équilibré sur coordonnées projetées (équirectangulaire)
+
+    Chaque nœud coupe ses points à la médiane selon l'axe le plus étendu ;
+    les nœuds d'un niveau sont des tranches contiguës du tableau trié, leurs
+    boîtes englobantes sont gardées par niveau. Les feuilles restent petites
+    quelle que soit la répartition des points (grappes autour des villes).
+    """
+
+    def __init__(self, latitudes, longitudes):
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        if len(lat) == 0:
+            raise ValueError("Aucun point d'intérêt à indexer")
+        self.lat0 = float(np.mean(lat))
+        x, y = self._project(lat, lon)
+        n = len(lat)
+        self.profondeur = max(0, int(np.ceil(np.log2(n / POINTS_PAR_FEUILLE))))
+
+        # Tri niveau par niveau : à l'intérieur de chaque nœud, selon son axe le plus étendu
+        ordre = np.arange(n)
+        for niveau in range(self.profondeur):
+            debuts = self._starts(niveau, n)
+            noeuds = np.repeat(np.arange(len(debuts)), np.diff(np.r_[debuts, n]))
+            xs, ys = x[ordre], y[ordre]
+            selon_x = (np.maximum.reduceat(xs, debuts) - np.minimum.reduceat(xs, debuts)
+                       >= np.maximum.reduceat(ys, debuts) - np.minimum.reduceat(ys, debuts))
+            ordre = ordre[np.lexsort((np.where(selon_x[noeuds], xs, ys), noeuds))]
+        self.ordre = ordre
+        self.lat, self.lon = lat[ordre], lon[ordre]
+        xs, ys = x[ordre], y[ordre]
+        # Boîtes englobantes (x min, x max, y min, y max) des nœuds de chaque niveau
+        self.boites = []
+        for niveau in range(self.profondeur + 1):
+            debuts = self._starts(niveau, n)
+            self.boites.append(np.column_stack([np.minimum.reduceat(xs, debuts), np.maximum.reduceat(xs, debuts),
+                                                np.minimum.reduceat(ys, debuts), np.maximum.reduceat(ys, debuts)]))
+        self.debuts = self._starts(self.profondeur, n)
+        self.comptes = np.diff(np.r_[self.debuts, n])
+        # Rapport minimal distance réelle / distance projetée sur la bande de latitude
+        lat_max = np.radians(np.max(np.abs(lat)) + 1.0)
+        self.facteur = min(1.0, np.cos(lat_max) / np.cos(np.radians(self.lat0)))
+
+    def __len__(self):
+        return len(self.lat)
+
+    @staticmethod
+    def _starts(niveau, n):
+        """Début des 2^niveau tranches du tableau trié (jamais vides)"""
+        return (np.arange(2 ** niveau, dtype=np.int64) * n) >> niveau
+
+    def _project(self, lat, lon):
+        """Projection équirectangulaire en km autour de la latitude moyenne"""
+        x = np.radians(lon) * RAYON_TERRE_KM * np.cos(np.radians(self.lat0))
+        y = np.radians(lat) * RAYON_TERRE_KM
+        return x, y
+
+    def _box_distance(self, niveau, noeuds, x, y):
+        """Distance projetée de chaque requête à la boîte de son nœud (0 à l'intérieur)"""
+        boites = self.boites[niveau][noeuds]
+        dx = np.maximum(np.maximum(boites[:, 0] - x, x - boites[:, 1]), 0)
+        dy = np.maximum(np.maximum(boites[:, 2] - y, y - boites[:, 3]), 0)
+        return np.hypot(dx, dy)
+
+    def _visit(self, requetes, feuilles, qlat, qlon, meilleur, meilleur_idx):
+        """Mise à jour des plus proches voisins avec le contenu d'une feuille par requête"""
+        if len(requetes) == 0:
+            return
+        comptes = self.comptes[feuilles]
+        # Déploiement des paires (requête, point) de toutes les feuilles visitées
+        rep = np.repeat(requetes, comptes)
+        decalage = np.arange(comptes.sum()) - np.repeat(np.cumsum(comptes) - comptes, comptes)
+        points = np.repeat(self.debuts[feuilles], comptes) + decalage
+        d = haversine_km(qlat[rep], qlon[rep], self.lat[points], self.lon[points])
+        # Plus proche point par requête parmi ses feuilles
+        tri = np.lexsort((d, rep))
+        rep, d, points = rep[tri], d[tri], points[tri]
+        premier = np.r_[True, rep[1:] != rep[:-1]]
+        rep, d, points = rep[premier], d[premier], points[premier]
+        mieux = d < meilleur[rep]
+        meilleur[rep[mieux]] = d[mieux]
+        meilleur_idx[rep[mieux]] = self.ordre[points[mieux]]
+
+    def nearest(self, latitudes, longitudes, distance_max_km=DISTANCE_MAX_KM):
+        """Distance (km) et indice du point d'intérêt le plus proche de chaque requête
+
+        Les requêtes sans point à moins de distance_max_km obtiennent NaN et -1.
+        """
+        qlat = np.asarray(latitudes, dtype=float)
+        qlon = np.asarray(longitudes, dtype=float)
+        distances = np.full(len(qlat), np.nan)
+        indices = np.full(len(qlat), -1, dtype=np.int64)
+        for debut in range(0, len(qlat), TAILLE_BLOC):
+            fin = min(debut + TAILLE_BLOC, len(qlat))
+            d, idx = self._nearest_block(qlat[debut:fin], qlon[debut:fin], distance_max_km)
+            distances[debut:fin] = d
+            indices[debut:fin] = idx
+        return distances, indices
+
+    def _nearest_block(self, qlat, qlon, distance_max_km):
+        """Descente vers la feuille la plus proche, puis parcours des nœuds non écartés"""
+        meilleur = np.full(len(qlat), np.inf)
+        meilleur_idx = np.full(len(qlat), -1, dtype=np.int64)
+        x, y = self._project(qlat, qlon)
+        actives = np.flatnonzero(np.isfinite(qlat) & np.isfinite(qlon))
+        qx, qy = x[actives], y[actives]
+
+        # Première borne : feuille atteinte en suivant la boîte la plus proche à chaque niveau
+        feuilles = np.zeros(len(actives), dtype=np.int64)
+        for niveau in range(1, self.profondeur + 1):
+            gauche = 2 * feuilles
+            feuilles = gauche + (self._box_distance(niveau, gauche + 1, qx, qy)
+                                 < self._box_distance(niveau, gauche, qx, qy))
+        self._visit(actives, feuilles, qlat, qlon, meilleur, meilleur_idx)
+
+        # Parcours en largeur des paires (requête, nœud) dont la boîte peut contenir mieux
+        requetes, noeuds, premieres = actives, np.zeros(len(actives), dtype=np.int64), feuilles
+        for niveau in range(1, self.profondeur + 1):
+            requetes, premieres = np.repeat(requetes, 2), np.repeat(premieres, 2)
+            noeuds = (2 * noeuds[:, None] + np.array([0, 1])).ravel()
+            borne = self.facteur * self._box_distance(niveau, noeuds, x[requetes], y[requetes])
+            garder = (borne < meilleur[requetes]) & (borne <= distance_max_km)
+            requetes, noeuds, premieres = requetes[garder], noeuds[garder], premieres[garder]
+        # La feuille de la descente est déjà visitée
+        autres = noeuds != premieres if self.profondeur else np.zeros(len(noeuds), dtype=bool)
+        self._visit(requetes[autres], noeuds[autres], qlat, qlon, meilleur, meilleur_idx)
+
+        trop_loin = meilleur > distance_max_km
+        meilleur[trop_loin] = np.nan
+        meilleur_idx[trop_loin] = -1
+        return meilleur, meilleur_idx
+
+
+def load_poi(path):
+    """Index par type à partir d'un fichier CSV (type, latitude, longitude)"""
+    poi = pd.read_csv(path)
+    manquantes = {'type', 'latitude', 'longitude'} - set(poi.columns)
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes dans {path}: {', '.join(sorted(manquantes))}")
+    poi = poi.dropna(subset=['latitude', 'longitude'])
+    types = poi['type'].map(normalize_poi_type)
+    return {
+        type_poi: PoiIndex(poi.loc[types == type_poi, 'latitude'], poi.loc[types == type_poi, 'longitude'])
+        for type_poi in TYPES_POI if (types == type_poi).any()
+    }
+
+
+def fill_distances(projets, index_poi, ecraser=False):
+    """Distances aux commodités des projets géolocalisés
+
+    Seules les distances absentes sont complétées, sauf si ecraser=True.
+    Les projets sans coordonnées sont laissés tels quels.
+    """
+    projets = projets.copy()
+    if not {'latitude', 'longitude'} <= set(projets.columns):
+        return projets
+    geolocalises = projets['latitude'].notna() & projets['longitude'].notna()
+    for type_poi, colonne in TYPES_POI.items():
+        if type_poi not in index_poi:
+            continue
+        if colonne not in projets.columns:
+            projets[colonne] = np.nan
+        cibles = geolocalises if ecraser else geolocalises & projets[colonne].isna()
+        if cibles.any():
+            distances, _ = index_poi[type_poi].nearest(projets.loc[cibles, 'latitude'],
+                                                       projets.loc[cibles, 'longitude'])
+            projets.loc[cibles, colonne] = np.round(distances, 2)
+    return projets
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Impact d'un changement de règles de scoring sur un portefeuille stocké
+Chaque projet est réduit à sa signature : palier atteint sur chaque
+critère numérique et modalité de chaque critère catégoriel. Les projets
+de même signature ont le même score sous n'importe quel barème ; une
+règle proposée est donc évaluée une fois par signature distincte. Les
+projets dont un palier change (seuil déplacé) sont retrouvés dans les
+valeurs triées et regroupés par nouvelle signature. Le résultat est
+rapporté aux effectifs par zone et par type.
+
+Usage :
+    python dary_impact.py projets.csv --seuils roi_projete=5,10,14 [--bareme zone:emergente=25] [--ponderation Financier=0.35]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from dary_scoring import NIVEAUX, REGLES, niveau_codes
+
+NOMS_NIVEAUX = tuple(n for _, n, *_ in NIVEAUX)
+# Dimensions du rapport d'impact
+DIMENSIONS_RAPPORT = ('zone', 'type_bien')
+
+
+def edit_rules(seuils=None, points=None, baremes=None, ponderations=None, points_depart=None, regles=REGLES):
+    """Copie des règles avec les modifications proposées
+
+    seuils / points : colonne -> nouveaux seuils / points d'un palier ;
+    baremes : colonne -> {modalité: points} (fusionné avec le barème actuel) ;
+    ponderations / points_depart : catégorie -> valeur.
+    """
+    paliers = dict(regles['paliers'])
+    for colonne, valeurs in (seuils or {}).items():
+        _, pts, cote = paliers[colonne]
+        paliers[colonne] = (tuple(valeurs), pts, cote)
+    for colonne, valeurs in (points or {}).items():
+        s, _, cote = paliers[colonne]
+        paliers[colonne] = (s, tuple(valeurs), cote)
+    for colonne, (s, pts, _) in paliers.items():
+        if len(pts) != len(s) + 1:
+            raise ValueError(f"{colonne} : {len(s)} seuil(s) demandent {len(s) + 1} valeurs de points")
+    nouveaux_baremes = dict(regles['baremes'])
+    for colonne, modifications in (baremes or {}).items():
+        bareme, inconnu = nouveaux_baremes[colonne]
+        nouveaux_baremes[colonne] = ({**bareme, **modifications}, inconnu)
+    return {
+        'paliers': paliers,
+        'baremes': nouveaux_baremes,
+        'categories': regles['categories'],
+        'points_depart': {**regles['points_depart'], **(points_depart or {})},
+        'ponderations': {**regles['ponderations'], **(ponderations or {})},
+    }
+
+
+def _palier_codes(valeurs, seuils, cote):
+    """Indice du palier atteint (comme points_palier, valeur manquante comprise)"""
+    codes = np.searchsorted(seuils, valeurs, side=cote)
+    manquantes = np.isnan(valeurs)
+    if manquantes.any():
+        codes = np.where(manquantes, 0 if cote == 'right' else len(seuils), codes)
+    return codes
+
+
+class SignatureStore:
+    """Projets stockés regroupés par signature de paliers et de modalités"""
+
+    def __init__(self, projets, regles=REGLES):
+        import pandas as pd
+        debut = time.perf_counter()
+        self.regles = regles
+        self.criteres = [c for criteres in regles['categories'].values() for c in criteres]
+        n = len(projets)
+        codes = np.empty((n, len(self.criteres)), dtype=np.int64)
+        # Critères numériques : valeurs triées pour retrouver vite les projets entre deux seuils
+        self.tries, self.ordres = {}, {}
+        # Critères catégoriels : modalités observées (y compris hors barème)
+        self.modalites = {}
+        for j, critere in enumerate(self.criteres):
+            valeurs = projets[critere]
+            valeurs = valeurs.to_numpy() if hasattr(valeurs, 'to_numpy') else np.asarray(valeurs)
+            if critere in regles['paliers']:
+                valeurs = valeurs.astype(float)
+                seuils, _, cote = regles['paliers'][critere]
+                codes[:, j] = _palier_codes(valeurs, seuils, cote)
+                self.ordres[critere] = np.argsort(valeurs, kind='stable').astype(np.int32)
+                self.tries[critere] = valeurs[self.ordres[critere]]
+            else:
+                bareme = regles['baremes'][critere][0]
+                if all(isinstance(k, bool) for k in bareme):
+                    valeurs = valeurs.astype(bool)
+                codes[:, j], self.modalites[critere] = pd.factorize(valeurs, sort=True, use_na_sentinel=False)
+
+        # Signature = code combiné en base mixte, puis regroupement
+        cardinalites = codes.max(axis=0) + 1
+        if np.sum(np.log2(cardinalites)) < 62:
+            cles = np.zeros(n, dtype=np.int64)
+            for j in range(codes.shape[1]):
+                cles = cles * cardinalites[j] + codes[:, j]
+            _, premiers, inverse, effectifs = np.unique(cles, return_index=True, return_inverse=True,
+                                                        return_counts=True)
+            self.signatures = codes[premiers]
+        else:
+            self.signatures, inverse, effectifs = np.unique(codes, axis=0, return_inverse=True,
+                                                            return_counts=True)
+        self.signature_projet = inverse.astype(np.int32).ravel()
+        self.effectifs = effectifs
+        self.niveaux = self._evaluate(self.signatures, regles)
+        self.duree_construction = time.perf_counter() - debut
+
+    def __len__(self):
+        return len(self.signature_projet)
+
+    def _points(self, critere, regles):
+        """Points de chaque code d'un critère sous des règles données"""
+        if critere in regles['paliers']:
+            return np.asarray(regles['paliers'][critere][1], dtype=float)
+        bareme, inconnu = regles['baremes'][critere]
+        return np.array([bareme.get(bool(m) if isinstance(m, np.bool_) else m, inconnu)
+                         for m in self.modalites[critere]], dtype=float)
+
+    def _evaluate(self, codes, regles):
+        """Code de niveau de chaque ligne de codes (même calcul que score_batch)"""
+        totaux = {}
+        j = 0
+        for categorie, criteres in regles['categories'].items():
+            total = regles['points_depart'][categorie]
+            for critere in criteres:
+                total = total + self._points(critere, regles)[codes[:, j]]
+                j += 1
+            totaux[categorie] = np.clip(total, 0, 100)
+        brut = sum(totaux[categorie] * poids for categorie, poids in regles['ponderations'].items())
+        return niveau_codes(brut)
+
+    def _moved(self, critere, regles):
+        """Projets dont le palier change sous les nouveaux seuils, avec leur nouveau code"""
+        anciens, _, cote = self.regles['paliers'][critere]
+        nouveaux, _, nouveau_cote = regles['paliers'][critere]
+        if tuple(anciens) == tuple(nouveaux) and cote == nouveau_cote:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        tries, ordre = self.tries[critere], self.ordres[critere]
+        if len(anciens) != len(nouveaux) or cote != nouveau_cote:
+            # Les paliers ne se correspondent plus : tous les projets sont réévalués
+            positions = np.arange(len(tries))
+        else:
+            # Seuls les projets entre un seuil actuel et sa nouvelle valeur peuvent changer de palier
+            plages = [np.arange(np.searchsorted(tries, min(a, b), side='left'),
+                                np.searchsorted(tries, max(a, b), side='right'))
+                      for a, b in zip(anciens, nouveaux) if a != b]
+            positions = np.unique(np.concatenate(plages))
+        valeurs = tries[positions]
+        ancien_code = _palier_codes(valeurs, anciens, cote)
+        nouveau_code = _palier_codes(valeurs, nouveaux, nouveau_cote)
+        change = ancien_code != nouveau_code
+        return ordre[positions[change]].astype(np.int64), nouveau_code[change]
+
+    def impact(self, regles):
+        """Changements de niveau qu'entraîneraient les règles proposées
+
+        Retourne un dict : 'transitions' (matrice niveaux actuels ×
+        proposés), 'changements', 'hausses', 'baisses', 'par_zone',
+        'par_type_bien' et 'duree_ms'.
+        """
+        debut = time.perf_counter()
+        # Projets dont un palier change : regroupés par (signature, nouveaux paliers)
+        deplaces = {critere: self._moved(critere, regles) for critere in regles['paliers']}
+        deplaces = {critere: v for critere, v in deplaces.items() if len(v[0])}
+        effectifs = self.effectifs
+        groupes = np.empty(0, dtype=np.int64)
+        lignes_deplacees = self.signatures[:0]
+        poids_deplaces = np.empty(0, dtype=np.int64)
+        n_deplaces = 0
+        if deplaces:
+            marques = np.zeros(len(self), dtype=bool)
+            for projets, _ in deplaces.values():
+                marques[projets] = True
+            individuels = np.flatnonzero(marques)
+            n_deplaces = len(individuels)
+            rang = np.empty(len(self), dtype=np.int64)
+            rang[individuels] = np.arange(n_deplaces)
+            signatures = self.signature_projet[individuels].astype(np.int64)
+            effectifs = effectifs - np.bincount(signatures, minlength=len(effectifs))
+            # Clé en base mixte : signature d'origine puis nouveau palier de chaque critère modifié
+            cles, bases = signatures, []
+            for critere, (projets, nouveaux) in deplaces.items():
+                j = self.criteres.index(critere)
+                base = len(regles['paliers'][critere][0]) + 1
+                palier = self.signatures[signatures, j].copy()
+                palier[rang[projets]] = nouveaux
+                cles = cles * base + palier
+                bases.append((j, base))
+            etendue = len(self.signatures) * int(np.prod([base for _, base in bases]))
+            if etendue <= 16 * len(self):
+                comptes = np.bincount(cles, minlength=etendue)
+                cles = np.flatnonzero(comptes)
+                poids_deplaces = comptes[cles]
+            else:
+                cles, poids_deplaces = np.unique(cles, return_counts=True)
+            groupes = cles.copy()
+            colonnes = {}
+            for j, base in reversed(bases):
+                colonnes[j] = groupes % base
+                groupes //= base
+            lignes_deplacees = self.signatures[groupes]
+            for j, palier in colonnes.items():
+                lignes_deplacees[:, j] = palier
+
+        # Signatures encore représentées, puis groupes déplacés, en un seul calcul
+        restantes = effectifs > 0
+        lignes = np.concatenate([self.signatures[restantes], lignes_deplacees])
+        poids = np.concatenate([effectifs[restantes], poids_deplaces])
+        avant = np.concatenate([self.niveaux[restantes], self.niveaux[groupes]])
+        apres = self._evaluate(lignes, regles)
+
+        n_niveaux = len(NIVEAUX)
+        transitions = np.bincount(avant * n_niveaux + apres, weights=poids,
+                                  minlength=n_niveaux ** 2).reshape(n_niveaux, n_niveaux).astype(np.int64)
+        rapport = {
+            'transitions': transitions,
+            'changements': int(transitions.sum() - np.trace(transitions)),
+            # Code de niveau plus petit = meilleur niveau
+            'hausses': int(np.triu(transitions, 1).sum()),
+            'baisses': int(np.tril(transitions, -1).sum()),
+        }
+        for dimension in DIMENSIONS_RAPPORT:
+            j = self.criteres.index(dimension)
+            modalites = self.modalites[dimension]
+            groupes = lignes[:, j]
+            total = np.bincount(groupes, weights=poids, minlength=len(modalites))
+            hausses = np.bincount(groupes, weights=poids * (apres < avant), minlength=len(modalites))
+            baisses = np.bincount(groupes, weights=poids * (apres > avant), minlength=len(modalites))
+            rapport[f'par_{dimension}'] = [
+                {dimension: str(m), 'projets': int(t), 'hausses': int(h), 'baisses': int(b),
+                 'part_modifiee': round(float(h + b) / t, 4) if t else 0.0}
+                for m, t, h, b in zip(modalites, total, hausses, baisses) if t
+            ]
+        rapport['projets_deplaces'] = n_deplaces
+        rapport['duree_ms'] = round((time.perf_counter() - debut) * 1000, 2)
+        return rapport
+
+
+def _parse(valeurs, conversion=float):
+    return tuple(conversion(v) for v in valeurs.split(','))
+
+
+def main(argv=None):
+    """Rapport d'impact d'une modification de règles sur un fichier de projets"""
+    from dary_ingestion import read_projects
+    parser = argparse.ArgumentParser(description="Impact d'un changement de règles sans rescorer le portefeuille")
+    parser.add_argument('fichier')
+    parser.add_argument('--seuils', action='append', default=[], help="colonne=s1,s2,... (palier numérique)")
+    parser.add_argument('--points', action='append', default=[], help="colonne=p0,p1,... (palier numérique)")
+    parser.add_argument('--bareme', action='append', default=[], help="colonne:modalité=points")
+    parser.add_argument('--ponderation', action='append', default=[], help="Catégorie=poids")
+    args = parser.parse_args(argv)
+
+    seuils = {c: _parse(v) for c, _, v in (s.partition('=') for s in args.seuils)}
+    points = {c: _parse(v) for c, _, v in (s.partition('=') for s in args.points)}
+    baremes = {}
+    for modification in args.bareme:
+        cible, _, valeur = modification.partition('=')
+        colonne, _, modalite = cible.partition(':')
+        baremes.setdefault(colonne, {})[modalite] = float(valeur)
+    ponderations = {c: float(v) for c, _, v in (s.partition('=') for s in args.ponderation)}
+    regles = edit_rules(seuils, points, baremes, ponderations)
+
+    store = SignatureStore(read_projects(args.fichier, 'regles'))
+    print(f"✅ {len(store)} projet(s), {len(store.signatures)} signature(s) distinctes "
+          f"(regroupement en {store.duree_construction:.2f}s)")
+    rapport = store.impact(regles)
+    print(f"⏱️  Impact évalué en {rapport['duree_ms']} ms ({rapport['projets_deplaces']} projet(s) "
+          f"changent de palier)")
+    print(f"\n🔀 {rapport['changements']} changement(s) de niveau : {rapport['hausses']} hausse(s), "
+          f"{rapport['baisses']} baisse(s)")
+    largeur = max(len(n) for n in NOMS_NIVEAUX) + 2
+    print(' ' * largeur + ''.join(f'{n:>{largeur}}' for n in NOMS_NIVEAUX))
+    for nom, ligne in zip(NOMS_NIVEAUX, rapport['transitions']):
+        print(f'{nom:<{largeur}}' + ''.join(f'{v:>{largeur}}' for v in ligne))
+    for dimension in DIMENSIONS_RAPPORT:
+        print(f"\nPar {dimension} :")
+        for ligne in rapport[f'par_{dimension}']:
+            print(f"  {ligne[dimension]:<15} {ligne['projets']:>9} projet(s)  +{ligne['hausses']:<7} "
+                  f"-{ligne['baisses']:<7} ({ligne['part_modifiee']:.1%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture des fichiers CSV de projets pour un moteur de scoring
+Seules les colonnes du schéma du moteur (plus le nom et les coordonnées
+si besoin) sont lues ; les valeurs numériques sont contrôlées, les
+distances complétées depuis les coordonnées, les zones absentes déduites
+de l'adresse, les données de marché du quartier jointes et les colonnes
+absentes remplies par leur défaut.
+Plusieurs fichiers (ou archives ZIP de CSV) peuvent être lus en parallèle
+et réunis en un seul portefeuille.
+"""
+
+import io
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dary_backends import NOMBRE, TEXTE, get_backend
+from dary_gazetteer import COLONNES_ADRESSE, fill_zones
+from dary_market import join_market
+
+COLONNES_IDENTITE = ('nom_projet',)
+COLONNES_GEO = ('latitude', 'longitude')
+# Colonne indiquant le fichier d'origine de chaque projet d'un import multiple
+COLONNE_SOURCE = 'fichier_source'
+# Fichiers lus en parallèle
+MAX_LECTEURS = min(8, os.cpu_count() or 1)
+
+
+class InvalidFile(ValueError):
+    """Fichier de projets inexploitable (illisible, sans colonne utile, valeur invalide)"""
+
+
+def needed_columns(moteur, geo=False, adresse=False):
+    """Colonnes à lire pour un moteur"""
+    return (COLONNES_IDENTITE + moteur.colonnes + (COLONNES_GEO if geo else ())
+            + (COLONNES_ADRESSE if adresse else ()))
+
+
+def check_columns(lot, moteur, nom='fichier', debut=0):
+    """Contrôle d'un lot : au moins une colonne du moteur et valeurs numériques valides
+
+    Sur un portefeuille réuni par read_many, une valeur invalide est
+    signalée avec son fichier d'origine (colonne fichier_source) et sa
+    ligne dans ce fichier.
+    """
+    if not set(moteur.colonnes) & set(lot.columns):
+        raise InvalidFile(f"{nom} : aucune colonne attendue par le moteur « {moteur.nom} »")
+    for colonne in lot.columns:
+        if moteur.schema.get(colonne, (None,))[0] != NOMBRE and colonne not in COLONNES_GEO:
+            continue
+        valeurs = pd.to_numeric(lot[colonne], errors='coerce')
+        invalides = (valeurs.isna() & lot[colonne].notna()).to_numpy()
+        if invalides.any():
+            ligne = int(np.argmax(invalides))
+            if COLONNE_SOURCE in lot.columns:
+                sources = lot[COLONNE_SOURCE].to_numpy()
+                nom, debut = sources[ligne], -int(np.argmax(sources == sources[ligne]))
+            raise InvalidFile(f"{nom} : valeur non numérique {lot[colonne].iloc[ligne]!r} "
+                              f"dans la colonne {colonne} (ligne {debut + ligne + 2})")
+        lot[colonne] = valeurs
+    return lot
+
+
+def prepare_projects(lot, moteur, debut=0):
+    """Colonnes du moteur complétées et projets sans nom numérotés"""
+    projets = moteur.prepare(lot)
+    if 'nom_projet' not in projets.columns:
+        projets.insert(0, 'nom_projet', [f'Projet {debut + i + 1}' for i in range(len(projets))])
+    return projets
+
+
+def _prepare(lot, moteur, nom, debut, index_poi, gazetteer, marche):
+    lot = check_columns(lot, moteur, nom, debut)
+    if index_poi:
+        from dary_geo import fill_distances
+        lot = fill_distances(lot, index_poi)
+    if gazetteer:
+        lot = fill_zones(lot, gazetteer)
+    if marche:
+        lot = join_market(lot, *marche)
+    return prepare_projects(lot, moteur, debut)
+
+
+def read_projects(source, moteur=None, taille_lot=None, index_poi=None, gazetteer=None, marche=None):
+    """Projets d'un fichier CSV prêts pour moteur.score()
+
+    marche : (MarketIndex, règles) de dary_market. Retourne un DataFrame, ou
+    un itérateur de DataFrames si taille_lot est donné. Lève InvalidFile si
+    le fichier est inexploitable.
+    """
+    moteur = moteur if moteur is not None and not isinstance(moteur, str) else get_backend(moteur)
+    nom = os.path.basename(source) if isinstance(source, str) else getattr(source, 'name', 'fichier')
+    voulues = set(needed_columns(moteur, geo=bool(index_poi), adresse=bool(gazetteer or marche)))
+    types = {c: str for c, (nature, _) in moteur.schema.items() if nature == TEXTE}
+    types.update({c: str for c in COLONNES_IDENTITE + COLONNES_ADRESSE})
+    try:
+        lecture = pd.read_csv(source, usecols=lambda c: c in voulues, dtype=types, chunksize=taille_lot)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise InvalidFile(f"{nom} : CSV illisible ({e})") from e
+    if taille_lot is None:
+        projets = _prepare(lecture, moteur, nom, 0, index_poi, gazetteer, marche)
+        if projets.empty:
+            raise InvalidFile(f"{nom} : aucun projet")
+        return projets
+    return _iter_chunks(lecture, moteur, nom, index_poi, gazetteer, marche)
+
+
+def _iter_chunks(lecture, moteur, nom, index_poi, gazetteer, marche):
+    debut = 0
+    try:
+        for lot in lecture:
+            yield _prepare(lot, moteur, nom, debut, index_poi, gazetteer, marche)
+            debut += len(lot)
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise InvalidFile(f"{nom} : CSV illisible ({e})") from e
+    if debut == 0:
+        raise InvalidFile(f"{nom} : aucun projet")
+
+
+
+def normalize_header(colonne):
+    """Nom de colonne harmonisé entre fichiers : minuscules, espaces et tirets en _"""
+    return re.sub(r'[\s\-]+', '_', str(colonne).strip().lower())
+
+
+def _content(fichier):
+    """(nom, octets) d'un chemin, d'un fichier importé dans Streamlit ou d'un objet fichier"""
+    if isinstance(fichier, (str, os.PathLike)):
+        with open(fichier, 'rb') as f:
+            return os.path.basename(fichier), f.read()
+    nom = os.path.basename(getattr(fichier, 'name', 'fichier'))
+    contenu = fichier.getvalue() if hasattr(fichier, 'getvalue') else fichier.read()
+    return nom, contenu.encode() if isinstance(contenu, str) else contenu
+
+
+def _entries(fichiers):
+    """(nom, octets, membre, erreur) de chaque CSV ; membre désigne un CSV d'archive ZIP,
+    erreur une archive illisible, signalée puis ignorée comme un CSV illisible"""
+    entrees = []
+    for fichier in fichiers:
+        nom, contenu = _content(fichier)
+        if not nom.lower().endswith('.zip'):
+            entrees.append((nom, contenu, None, None))
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+                membres = [m.filename for m in archive.infolist() if not m.is_dir()
+                           and m.filename.lower().endswith('.csv') and not m.filename.startswith('__MACOSX/')]
+        except zipfile.BadZipFile as e:
+            entrees.append((nom, contenu, None, f"{nom} : archive ZIP illisible ({e})"))
+            continue
+        entrees.extend((f'{nom}/{membre}', contenu, membre, None) for membre in membres)
+    return entrees
+
+
+def _parse(nom, contenu, membre, erreur=None):
+    """Lecture d'un CSV (décompressé ici si besoin) et mesure de son débit"""
+    debut = time.perf_counter()
+    rapport = {'fichier': nom, 'lignes': 0, 'colonnes': 0, 'octets': len(contenu), 'erreur': erreur}
+    projets = None
+    try:
+        if erreur is None:
+            if membre is not None:
+                # Une archive ouverte par lecteur : les décompressions se font en parallèle
+                with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+                    contenu = archive.read(membre)
+                rapport['octets'] = len(contenu)
+            projets = pd.read_csv(io.BytesIO(contenu), low_memory=False)
+            projets.columns = [normalize_header(c) for c in projets.columns]
+            rapport.update(lignes=len(projets), colonnes=len(projets.columns))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        rapport['erreur'] = f"{nom} : CSV illisible ({e})"
+    rapport['duree_s'] = time.perf_counter() - debut
+    rapport['lignes_par_s'] = rapport['lignes'] / max(rapport['duree_s'], 1e-9)
+    rapport['mo_par_s'] = rapport['octets'] / 1e6 / max(rapport['duree_s'], 1e-9)
+    return projets, rapport
+
+
+def _reconcile(lots):
+    """Colonnes réunies ; une colonne numérique dans certains fichiers et texte dans
+    d'autres est convertie en nombres si toutes ses valeurs le permettent"""
+    projets = pd.concat(lots, ignore_index=True, sort=False)
+    types = {}
+    for lot in lots:
+        for colonne in lot.columns:
+            types.setdefault(colonne, set()).add(pd.api.types.is_numeric_dtype(lot[colonne]))
+    for colonne, numeriques in types.items():
+        if numeriques == {True, False}:
+            valeurs = pd.to_numeric(projets[colonne], errors='coerce')
+            if not (valeurs.isna() & projets[colonne].notna()).any():
+                projets[colonne] = valeurs
+    return projets
+
+
+def read_many(fichiers, travaux=MAX_LECTEURS):
+    """Lecture en parallèle de plusieurs CSV ou archives ZIP de CSV, réunis en un portefeuille
+
+    Les en-têtes sont harmonisés et chaque projet garde son fichier d'origine
+    (colonne fichier_source). Retourne un dict : 'projets', 'fichiers' (un
+    rapport par CSV : lignes, octets, durée, débit, erreur éventuelle) et
+    'colonnes_partielles' (colonne -> nombre de fichiers qui ne l'ont pas).
+    Lève InvalidFile si aucun fichier n'est exploitable.
+    """
+    entrees = _entries(fichiers)
+    if not entrees:
+        raise InvalidFile("Aucun fichier CSV à lire")
+    with ThreadPoolExecutor(max_workers=max(1, min(travaux, len(entrees))),
+                            thread_name_prefix='dary-lecture') as executeur:
+        resultats = list(executeur.map(lambda entree: _parse(*entree), entrees))
+
+    # Ordre des fichiers conservé : le dernier import passe en dernier
+    lots = [projets.assign(**{COLONNE_SOURCE: rapport['fichier']})
+            for projets, rapport in resultats if projets is not None and len(projets)]
+    rapports = [rapport for _, rapport in resultats]
+    if not lots:
+        erreurs = [r['erreur'] for r in rapports if r['erreur']]
+        raise InvalidFile('; '.join(erreurs) if erreurs else "Aucun projet dans les fichiers importés")
+    colonnes = {}
+    for lot in lots:
+        for colonne in lot.columns:
+            colonnes[colonne] = colonnes.get(colonne, 0) + 1
+    return {
+        'projets': _reconcile(lots),
+        'fichiers': rapports,
+        'colonnes_partielles': {c: len(lots) - n for c, n in colonnes.items() if n < len(lots)},
+    }
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de charge local de DARY Score
+Simule N analystes concurrents contre un serveur Streamlit lancé en local,
+en parlant le protocole websocket de Streamlit comme un navigateur : saisie
+du formulaire "Nouveau Calcul", import de fichiers CSV dans l'onglet batch,
+consultation de l'historique. Rejoue aussi les traces enregistrées par
+l'application (DARY_TRACE_FILE). Rapporte le débit, les latences
+p50/p95/p99 par action et la mémoire du serveur au cours du temps.
+
+Usage :
+    python dary_loadtest.py --analystes 20 --duree 60 [--json charge.json]
+    python dary_loadtest.py --trace traces.jsonl --vitesse 2
+    python dary_loadtest.py --url http://127.0.0.1:8501 --pid 1234
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.NumberInput_pb2 import NumberInput
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.httpclient import AsyncHTTPClient
+from tornado.websocket import websocket_connect
+
+from bench_startup import DOSSIER, free_port, wait_for
+from dary_sessions import process_rss
+
+FICHIER_REFERENCE = os.path.join(DOSSIER, 'projets_immobiliers_maroc.csv')
+
+# Répartition des actions d'un analyste simulé
+MELANGE = {'calcul': 0.6, 'historique': 0.25, 'import': 0.15}
+
+# Onglets de l'application, repérés par un extrait de leur libellé
+ONGLETS = {'calcul': 'Nouveau Calcul', 'historique': 'Historique', 'import': 'Import CSV'}
+
+# Widgets de saisie pilotés par les analystes simulés
+SAISIES = ('selectbox', 'radio', 'slider', 'number_input', 'checkbox', 'text_input')
+
+FIN_OK = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+PERCENTILES = (50, 95, 99)
+
+
+def make_csv(lignes, rng):
+    """Fichier CSV au format de projets_immobiliers_maroc.csv (lignes tirées avec remise)"""
+    reference = pd.read_csv(FICHIER_REFERENCE)
+    df = reference.sample(n=lignes, replace=True, random_state=int(rng.integers(2**31)))
+    df['nom_projet'] = [f"{nom} #{i + 1}" for i, nom in enumerate(df['nom_projet'])]
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def multipart(nom, contenu, type_mime='text/csv'):
+    """Corps multipart/form-data d'un fichier unique"""
+    frontiere = uuid.uuid4().hex
+    corps = (f'--{frontiere}\r\nContent-Disposition: form-data; name="file"; filename="{nom}"\r\n'
+             f'Content-Type: {type_mime}\r\n\r\n').encode() + contenu + f'\r\n--{frontiere}--\r\n'.encode()
+    return corps, f'multipart/form-data; boundary={frontiere}'
+
+
+class Mesures:
+    """Latences des actions de tous les analystes"""
+
+    def __init__(self):
+        self.lignes = []
+        self.erreurs = defaultdict(list)
+
+    def add(self, action, debut, duree, ok=True, message=None):
+        self.lignes.append((action, debut, duree, ok))
+        if not ok and message:
+            self.erreurs[action].append(message)
+
+    def report(self, duree_totale):
+        """Débit, latences (ms) et erreurs par action"""
+        par_action = defaultdict(list)
+        echecs = defaultdict(int)
+        for action, _, duree, ok in self.lignes:
+            par_action[action].append(duree)
+            echecs[action] += not ok
+        rapport = {}
+        for action, durees in sorted(par_action.items()):
+            latences = np.percentile(np.asarray(durees) * 1000, PERCENTILES)
+            rapport[action] = {
+                'n': len(durees),
+                'debit': round(len(durees) / duree_totale, 3) if duree_totale else None,
+                **{f'p{p}': round(float(v), 1) for p, v in zip(PERCENTILES, latences)},
+                'erreurs': echecs[action],
+            }
+        return rapport
+
+
+class AnalystSession:
+    """Session navigateur simulée : websocket Streamlit et état des widgets"""
+
+    def __init__(self, base_url, mesures, rng):
+        self.base_url = base_url.rstrip('/')
+        self.mesures = mesures
+        self.rng = rng
+        self.ws = None
+        self.xsrf = None
+        self.session_id = None
+        self.page_hash = ''
+        # clé (ou libellé) -> (type, proto, fragment_id) des widgets affichés
+        self.widgets = {}
+        # id -> WidgetState des valeurs saisies, renvoyées à chaque rerun comme le navigateur
+        self.etats = {}
+        self._vus = set()
+        self._erreurs = []
+
+    async def connect(self):
+        url = self.base_url.replace('http', 'ws', 1) + '/_stcore/stream'
+        debut = time.perf_counter()
+        self.ws = await websocket_connect(url, max_message_size=200 * 1024 * 1024)
+        for cle, valeur in self.ws.headers.get_all():
+            if cle.lower() == 'set-cookie' and valeur.startswith('_streamlit_xsrf='):
+                self.xsrf = valeur.split(';', 1)[0].split('=', 1)[1]
+        await self._rerun('connexion', debut=debut)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def _read(self):
+        brut = await self.ws.read_message()
+        if brut is None:
+            raise ConnectionError("Connexion fermée par le serveur")
+        msg = ForwardMsg()
+        msg.ParseFromString(brut)
+        type_msg = msg.WhichOneof('type')
+        if type_msg == 'new_session':
+            if msg.new_session.initialize.session_id:
+                self.session_id = msg.new_session.initialize.session_id
+            self.page_hash = msg.new_session.page_script_hash
+        elif type_msg == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+            self._register(msg.delta)
+        return msg, type_msg
+
+    def _register(self, delta):
+        """Widgets et exceptions d'un élément affiché"""
+        type_element = delta.new_element.WhichOneof('type')
+        element = getattr(delta.new_element, type_element)
+        if type_element == 'exception':
+            self._erreurs.append(element.message)
+            return
+        identifiant = getattr(element, 'id', '')
+        if identifiant.startswith('$$WIDGET_ID'):
+            cle = identifiant.split('-', 2)[2]
+            if cle == 'None':
+                cle = getattr(element, 'label', '') or identifiant
+            self.widgets[cle] = (type_element, element, delta.fragment_id)
+            self._vus.add(identifiant)
+
+    async def _rerun(self, action, declencheurs=(), fragment_id='', debut=None):
+        """Rerun du script (ou d'un fragment) et attente de sa fin ; mesure la latence"""
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.query_string = ''
+        client.page_script_hash = self.page_hash
+        if fragment_id:
+            client.fragment_id = fragment_id
+        client.widget_states.widgets.extend(self.etats.values())
+        for identifiant in declencheurs:
+            client.widget_states.widgets.add(id=identifiant, trigger_value=True)
+        self._vus, self._erreurs = set(), []
+        debut = time.perf_counter() if debut is None else debut
+        try:
+            await self.ws.write_message(msg.SerializeToString(), binary=True)
+            while True:
+                reponse, type_msg = await self._read()
+                if type_msg == 'script_finished' and reponse.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        except Exception as e:
+            self.mesures.add(action, debut, time.perf_counter() - debut, False, repr(e))
+            raise
+        ok = reponse.script_finished in FIN_OK and not self._erreurs
+        self.mesures.add(action, debut, time.perf_counter() - debut, ok,
+                         '; '.join(self._erreurs) or None)
+        if not fragment_id:
+            # Comme le navigateur : les widgets qui ne sont plus affichés sont oubliés
+            self.etats = {i: e for i, e in self.etats.items() if i in self._vus}
+
+    def current_value(self, cle):
+        """Valeur courante d'un widget (saisie ou défaut)"""
+        type_widget, element, _ = self.widgets[cle]
+        etat = self.etats.get(element.id)
+        if type_widget in ('radio', 'selectbox'):
+            index = etat.int_value if etat else element.default
+            return element.options[index]
+        if type_widget == 'slider':
+            return etat.double_array_value.data[0] if etat else element.default[0]
+        if type_widget == 'number_input':
+            if etat:
+                return etat.int_value if element.data_type == NumberInput.INT else etat.double_value
+            return element.default
+        if type_widget == 'checkbox':
+            return etat.bool_value if etat else element.default
+        return etat.string_value if etat else element.default
+
+    def set_value(self, cle, valeur):
+        """Nouvelle valeur d'un widget, encodée comme par le navigateur"""
+        type_widget, element, fragment_id = self.widgets[cle]
+        etat = WidgetState(id=element.id)
+        if type_widget in ('radio', 'selectbox'):
+            etat.int_value = list(element.options).index(str(valeur))
+        elif type_widget == 'slider':
+            etat.double_array_value.data.append(float(valeur))
+        elif type_widget == 'number_input':
+            if element.data_type == NumberInput.INT:
+                etat.int_value = int(valeur)
+            else:
+                etat.double_value = float(valeur)
+        elif type_widget == 'checkbox':
+            etat.bool_value = bool(valeur)
+        else:
+            etat.string_value = str(valeur)
+        self.etats[element.id] = etat
+        return fragment_id
+
+    def random_value(self, cle):
+        """Valeur plausible pour un champ du formulaire"""
+        type_widget, element, _ = self.widgets[cle]
+        if type_widget in ('radio', 'selectbox'):
+            return element.options[int(self.rng.integers(len(element.options)))]
+        if type_widget == 'slider':
+            pas = element.step or 1
+            return round(self.rng.uniform(element.min, element.max) / pas) * pas
+        if type_widget == 'number_input':
+            valeur = element.default * self.rng.uniform(0.25, 2.5)
+            if element.has_min:
+                valeur = max(valeur, element.min)
+            if element.has_max:
+                valeur = min(valeur, element.max)
+            return int(valeur) if element.data_type == NumberInput.INT else round(valeur, 1)
+        if type_widget == 'checkbox':
+            return bool(self.rng.integers(2))
+        return f"Projet {int(self.rng.integers(10000))}"
+
+    async def goto(self, onglet):
+        """Passage à un onglet (rerun complet, comme un clic sur le sélecteur)"""
+        libelle = next(o for o in self.widgets['onglet'][1].options if ONGLETS[onglet] in o)
+        if self.current_value('onglet') != libelle:
+            self.set_value('onglet', libelle)
+            await self._rerun('historique' if onglet == 'historique' else 'onglet')
+
+    async def calcul(self, params=None, champs=3):
+        """Saisie du formulaire (score recalculé en direct) puis enregistrement"""
+        await self.goto('calcul')
+        _, element, fragment_id = self.widgets['enregistrer']
+        if params is None:
+            # Champs de saisie du fragment du formulaire
+            formulaire = self.widgets['nom'][2]
+            saisissables = [c for c, (t, _, f) in self.widgets.items()
+                            if f == formulaire and t in SAISIES]
+            choisis = self.rng.choice(saisissables, size=min(champs, len(saisissables)), replace=False)
+            params = {cle: self.random_value(cle) for cle in choisis}
+        for cle, valeur in params.items():
+            if cle in self.widgets and self.current_value(cle) != valeur:
+                self.set_value(cle, valeur)
+                await self._rerun('saisie', fragment_id=self.widgets[cle][2])
+        await self._rerun('calcul', [element.id], fragment_id)
+
+    async def historique(self):
+        await self.goto('historique')
+
+    async def import_csv(self, lignes=200, analyser=True):
+        """Envoi d'un fichier CSV dans l'onglet Import puis analyse batch"""
+        await self.goto('import')
+        contenu = make_csv(lignes, self.rng)
+        nom = f'projets_{lignes}.csv'
+        debut = time.perf_counter()
+        requete = BackMsg()
+        requete.file_urls_request.request_id = uuid.uuid4().hex
+        requete.file_urls_request.file_names.append(nom)
+        requete.file_urls_request.session_id = self.session_id
+        await self.ws.write_message(requete.SerializeToString(), binary=True)
+        while True:
+            reponse, type_msg = await self._read()
+            if (type_msg == 'file_urls_response'
+                    and reponse.file_urls_response.response_id == requete.file_urls_request.request_id):
+                break
+        urls = reponse.file_urls_response.file_urls[0]
+        corps, type_contenu = multipart(nom, contenu)
+        entetes = {'Content-Type': type_contenu}
+        if self.xsrf:
+            entetes.update({'Cookie': f'_streamlit_xsrf={self.xsrf}', 'X-Xsrftoken': self.xsrf})
+        await AsyncHTTPClient().fetch(self.base_url + urls.upload_url, method='PUT', body=corps,
+                                      headers=entetes, request_timeout=120)
+
+        uploader = next(c for c, (t, *_) in self.widgets.items() if t == 'file_uploader')
+        _, element, fragment_id = self.widgets[uploader]
+        etat = WidgetState(id=element.id)
+        info = etat.file_uploader_state_value.uploaded_file_info.add(
+            file_id=urls.file_id, name=nom, size=len(contenu))
+        info.file_urls.CopyFrom(urls)
+        self.etats[element.id] = etat
+        await self._rerun('import', fragment_id=fragment_id, debut=debut)
+
+        if analyser:
+            bouton = next((c for c in self.widgets if 'Analyser' in c), None)
+            if bouton is not None:
+                _, element, fragment_id = self.widgets[bouton]
+                await self._rerun('analyse_batch', [element.id], fragment_id)
+
+
+async def sample_memory(pid, intervalle, echantillons, arret):
+    """Mémoire résidente du serveur à intervalle régulier"""
+    debut = time.perf_counter()
+    while not arret.is_set():
+        rss = process_rss(pid)
+        if rss is not None:
+            echantillons.append((round(time.perf_counter() - debut, 2), rss))
+        try:
+            await asyncio.wait_for(arret.wait(), intervalle)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_analyst(numero, base_url, mesures, args, fin):
+    """Analyste simulé : actions tirées selon MELANGE, entrecoupées de temps de réflexion"""
+    rng = np.random.default_rng([args.seed, numero])
+    await asyncio.sleep(args.montee * numero / max(args.analystes, 1))
+    session = AnalystSession(base_url, mesures, rng)
+    try:
+        await session.connect()
+        actions, poids = list(MELANGE), np.array(list(MELANGE.values()))
+        while time.perf_counter() < fin:
+            action = rng.choice(actions, p=poids / poids.sum())
+            if action == 'calcul':
+                await session.calcul(champs=args.champs)
+            elif action == 'historique':
+                await session.historique()
+            else:
+                await session.import_csv(args.lignes)
+            await asyncio.sleep(rng.exponential(args.reflexion))
+    except Exception as e:
+        mesures.erreurs['session'].append(repr(e))
+    finally:
+        session.close()
+
+
+def load_trace(path):
+    """Trace JSONL enregistrée par l'application, regroupée par session"""
+    evenements = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for ligne in f:
+            if ligne.strip():
+                evenement = json.loads(ligne)
+                evenements[evenement['session']].append(evenement)
+    for liste in evenements.values():
+        liste.sort(key=lambda e: e['t'])
+    return dict(evenements)
+
+
+async def replay_session(numero, evenements, t0, base_url, mesures, args):
+    """Rejeu des actions d'une session enregistrée, au rythme d'origine divisé par vitesse"""
+    rng = np.random.default_rng([args.seed, numero])
+    session = AnalystSession(base_url, mesures, rng)
+    depart = time.perf_counter()
+    try:
+        await asyncio.sleep((evenements[0]['t'] - t0) / args.vitesse)
+        await session.connect()
+        for evenement in evenements:
+            attente = depart + (evenement['t'] - t0) / args.vitesse - time.perf_counter()
+            if attente > 0:
+                await asyncio.sleep(attente)
+            action, params = evenement['action'], evenement.get('params', {})
+            if action == 'calcul':
+                await session.calcul(params)
+            elif action == 'onglet':
+                onglet = next((o for o, extrait in ONGLETS.items() if extrait in params.get('onglet', '')), None)
+                if onglet:
+                    await session.goto(onglet)
+            elif action == 'import':
+                await session.import_csv(params.get('lignes', args.lignes), analyser=False)
+            elif action == 'analyse_batch':
+                bouton = next((c for c in session.widgets if 'Analyser' in c), None)
+                if bouton is not None:
+                    _, element, fragment_id = session.widgets[bouton]
+                    await session._rerun('analyse_batch', [element.id], fragment_id)
+    except Exception as e:
+        mesures.erreurs['session'].append(repr(e))
+    finally:
+        session.close()
+
+
+async def run_load(base_url, pid, args):
+    """Exécution de la charge et collecte des mesures"""
+    mesures, memoire, arret = Mesures(), [], asyncio.Event()
+    echantillonneur = asyncio.create_task(sample_memory(pid, args.intervalle_memoire, memoire, arret)) if pid else None
+    debut = time.perf_counter()
+    if args.trace:
+        sessions = load_trace(args.trace)
+        t0 = min(e[0]['t'] for e in sessions.values())
+        taches = [replay_session(i, evenements, t0, base_url, mesures, args)
+                  for i, evenements in enumerate(sessions.values())]
+    else:
+        fin = debut + args.duree
+        taches = [run_analyst(i, base_url, mesures, args, fin) for i in range(args.analystes)]
+    await asyncio.gather(*taches)
+    duree = time.perf_counter() - debut
+    arret.set()
+    if echantillonneur:
+        await echantillonneur
+    return {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'mode': 'trace' if args.trace else 'synthetique',
+        'analystes': len(taches),
+        'duree': round(duree, 2),
+        'actions': mesures.report(duree),
+        'debit_total': round(len(mesures.lignes) / duree, 3),
+        'erreurs': {action: messages[:5] for action, messages in mesures.erreurs.items()},
+        'memoire': memoire,
+    }
+
+
+def start_server(script, options=()):
+    """Serveur local lancé via dary_startup (préchauffage compris)"""
+    port = free_port()
+    processus = subprocess.Popen(
+        [sys.executable, os.path.join(DOSSIER, 'dary_startup.py'), script,
+         '--readiness-port', str(free_port()), '--',
+         '--server.port', str(port), '--server.headless', 'true',
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false', *options],
+        cwd=DOSSIER, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    if wait_for(base_url + '/_stcore/health', time.perf_counter(), 60) is None:
+        processus.terminate()
+        raise RuntimeError("Le serveur Streamlit n'a pas démarré")
+    return processus, base_url
+
+
+def print_report(rapport):
+    """Affichage du rapport de charge"""
+    print("=" * 72)
+    print(f"TEST DE CHARGE - {rapport['analystes']} analystes, {rapport['duree']}s "
+          f"({rapport['mode']}), {rapport['debit_total']} actions/s")
+    print("=" * 72)
+    print(f"  {'action':<15}{'n':>6}{'débit/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erreurs':>9}")
+    for action, m in rapport['actions'].items():
+        print(f"  {action:<15}{m['n']:>6}{m['debit']:>10}{m['p50']:>10}{m['p95']:>10}{m['p99']:>10}{m['erreurs']:>9}")
+    if rapport['memoire']:
+        rss = [octets / 1024**2 for _, octets in rapport['memoire']]
+        print(f"\n  Mémoire serveur : début {rss[0]:.0f} Mo, pic {max(rss):.0f} Mo, fin {rss[-1]:.0f} Mo "
+              f"({len(rss)} mesures)")
+    for action, messages in rapport['erreurs'].items():
+        print(f"  ❌ {action}: {messages[0]}")
+
+
+def main(argv=None):
+    """Lancement du test de charge"""
+    parser = argparse.ArgumentParser(description="Test de charge local de DARY Score")
+    parser.add_argument('--analystes', type=int, default=10, help="analystes simulés en parallèle")
+    parser.add_argument('--duree', type=float, default=60, help="durée de la charge synthétique (s)")
+    parser.add_argument('--montee', type=float, default=5, help="étalement des connexions (s)")
+    parser.add_argument('--reflexion', type=float, default=2.0, help="temps de réflexion moyen (s)")
+    parser.add_argument('--champs', type=int, default=3, help="champs modifiés avant chaque calcul")
+    parser.add_argument('--lignes', type=int, default=200, help="lignes par fichier importé")
+    parser.add_argument('--trace', help="trace JSONL à rejouer (DARY_TRACE_FILE de l'application)")
+    parser.add_argument('--vitesse', type=float, default=1.0, help="accélération du rejeu")
+    parser.add_argument('--url', help="serveur déjà démarré (sinon lancé en local)")
+    parser.add_argument('--pid', type=int, help="processus du serveur déjà démarré, pour la mémoire")
+    parser.add_argument('--script', default='dary_score_app2.py')
+    parser.add_argument('--intervalle-memoire', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="fichier de sortie du rapport (latences et mémoire)")
+    args = parser.parse_args(argv)
+
+    processus = None
+    if args.url:
+        base_url, pid = args.url, args.pid
+    else:
+        processus, base_url = start_server(args.script)
+        pid = processus.pid
+    try:
+        rapport = asyncio.run(run_load(base_url, pid, args))
+    finally:
+        if processus is not None:
+            processus.terminate()
+            processus.wait(timeout=10)
+
+    print_report(rapport)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+    return 1 if rapport['erreurs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
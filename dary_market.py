@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Données de marché par quartier jointes aux projets avant le scoring
+Le référentiel local (prix au m², évolution annuelle des prix, volume de
+transactions par quartier et ville) est indexé une fois par table de
+hachage sur les noms normalisés, puis rechargé seulement si le fichier
+change. La jointure se fait en une passe vectorisée par lot ; des règles
+configurables en déduisent plus_value_estimee, liquidite et
+developpement_futur, en complétant les valeurs absentes ou en les remplaçant.
+
+Usage :
+    python dary_market.py projets.csv [--marche marche_maroc.csv] [--regles regles.json] [--remplacer] [-o projets_marche.csv]
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dary_gazetteer import normalize_name
+from dary_scoring import DEFAUTS_IMPORT
+
+FICHIER_MARCHE = os.environ.get('DARY_MARKET_FILE', 'marche_maroc.csv')
+# Règles JSON facultatives surchargeant REGLES_MARCHE
+FICHIER_REGLES = os.environ.get('DARY_MARKET_RULES')
+COLONNES_MARCHE = ('prix_m2', 'evolution_prix', 'transactions')
+# Modes d'application d'une règle
+COMPLETER, REMPLACER = 'completer', 'remplacer'
+
+# Champ du scoring -> règle : colonne de marché source, puis facteur (valeur numérique)
+# ou seuils croissants et modalités de chaque intervalle
+REGLES_MARCHE = {
+    # Plus-value sur l'horizon d'investissement : évolution annuelle des prix (%) × 3 ans
+    'plus_value_estimee': {'source': 'evolution_prix', 'facteur': 3.0, 'mode': COMPLETER},
+    # Transactions annuelles du quartier
+    'liquidite': {'source': 'transactions', 'seuils': (50, 200), 'valeurs': ('faible', 'moyenne', 'elevee'),
+                  'mode': COMPLETER},
+    'developpement_futur': {'source': 'evolution_prix', 'seuils': (3, 8), 'valeurs': ('faible', 'moyen', 'fort'),
+                            'mode': COMPLETER},
+}
+
+# Références chargées : chemin -> (signature du fichier, index)
+_CACHE = {}
+_VERROU = threading.Lock()
+
+
+class MarketIndex:
+    """Référentiel de marché indexé par quartier et ville normalisés
+
+    Une ligne sans quartier donne la référence de toute sa ville, utilisée
+    pour les quartiers absents du référentiel.
+    """
+
+    def __init__(self, marche):
+        if 'quartier' not in marche.columns and 'ville' not in marche.columns:
+            raise ValueError("Colonne quartier ou ville requise dans le référentiel de marché")
+        colonnes = [c for c in COLONNES_MARCHE if c in marche.columns]
+        if not colonnes:
+            raise ValueError(f"Aucune donnée de marché ({', '.join(COLONNES_MARCHE)}) dans le référentiel")
+        self.colonnes = tuple(colonnes)
+        quartiers = _normalized(marche['quartier'] if 'quartier' in marche.columns else [''] * len(marche))
+        villes = _normalized(marche['ville'] if 'ville' in marche.columns else [''] * len(marche))
+        self.valeurs = np.column_stack([pd.to_numeric(marche[c], errors='coerce').to_numpy(dtype=float)
+                                        for c in self.colonnes])
+        # Tables de hachage : (quartier, ville), quartier seul s'il n'existe que dans une ville, ville seule
+        self._paires = pd.Index(quartiers + '|' + villes)
+        nommes = quartiers != ''
+        par_quartier = pd.Series(np.flatnonzero(nommes), index=quartiers[nommes])
+        uniques = ~par_quartier.index.duplicated(keep=False)
+        self._quartiers = pd.Index(par_quartier.index[uniques])
+        self._lignes_quartiers = par_quartier.to_numpy()[uniques]
+        villes_seules = np.flatnonzero(~nommes)
+        self._villes = pd.Index(villes[villes_seules])
+        self._lignes_villes = villes_seules
+        if not (self._paires.is_unique and self._villes.is_unique):
+            raise ValueError("Quartiers en double dans le référentiel de marché")
+
+    def __len__(self):
+        return len(self.valeurs)
+
+    def lookup(self, quartiers, villes=None):
+        """Ligne du référentiel de chaque projet (-1 si aucune) et niveau de la correspondance"""
+        quartiers = _normalized(quartiers)
+        villes = _normalized(villes if villes is not None else [''] * len(quartiers))
+        lignes = self._paires.get_indexer(quartiers + '|' + villes)
+        niveau = np.where(lignes >= 0, 'quartier', '').astype(object)
+        # Quartier connu dans une seule ville, seulement si la ville n'est pas renseignée
+        manquants = (lignes < 0) & (villes == '')
+        positions = self._quartiers.get_indexer(quartiers[manquants])
+        lignes[np.flatnonzero(manquants)[positions >= 0]] = self._lignes_quartiers[positions[positions >= 0]]
+        niveau[np.flatnonzero(manquants)[positions >= 0]] = 'quartier'
+        # Référence de la ville
+        manquants = lignes < 0
+        positions = self._villes.get_indexer(villes[manquants])
+        lignes[np.flatnonzero(manquants)[positions >= 0]] = self._lignes_villes[positions[positions >= 0]]
+        niveau[np.flatnonzero(manquants)[positions >= 0]] = 'ville'
+        return lignes, niveau
+
+
+def _normalized(valeurs):
+    """Noms normalisés (une fois par valeur distincte), '' si manquants"""
+    codes, uniques = pd.factorize(pd.Series(valeurs, dtype=object), use_na_sentinel=True)
+    noms = np.array([normalize_name(v) for v in uniques] + [''], dtype=object)
+    return noms[codes]
+
+
+def load_market(chemin=FICHIER_MARCHE):
+    """Référentiel indexé, partagé par les appels ; rechargé si le fichier a changé
+
+    Retourne None si le fichier n'existe pas.
+    """
+    try:
+        etat = os.stat(chemin)
+    except FileNotFoundError:
+        return None
+    signature = (etat.st_mtime_ns, etat.st_size)
+    cle = os.path.abspath(chemin)
+    with _VERROU:
+        if cle in _CACHE and _CACHE[cle][0] == signature:
+            return _CACHE[cle][1]
+        index = MarketIndex(pd.read_csv(chemin, dtype={'quartier': str, 'ville': str}))
+        _CACHE[cle] = (signature, index)
+        return index
+
+
+def load_rules(chemin=FICHIER_REGLES, mode=None):
+    """Règles par défaut, surchargées par un fichier JSON (champ -> règle partielle)
+
+    mode force le mode de toutes les règles (completer ou remplacer).
+    """
+    regles = copy.deepcopy(REGLES_MARCHE)
+    if chemin:
+        with open(chemin, encoding='utf-8') as f:
+            for champ, regle in json.load(f).items():
+                if regle is None:
+                    regles.pop(champ, None)
+                else:
+                    regles[champ] = {**regles.get(champ, {}), **regle}
+    for champ, regle in regles.items():
+        if regle.get('mode', COMPLETER) not in (COMPLETER, REMPLACER):
+            raise ValueError(f"{champ} : mode inconnu {regle['mode']!r}")
+        if mode:
+            regle['mode'] = mode
+    return regles
+
+
+def join_market(projets, index, regles=REGLES_MARCHE):
+    """Données de marché jointes aux projets et champs déduits selon les règles
+
+    Ajoute les colonnes du référentiel (marche_prix_m2, ...) et
+    marche_niveau (quartier, ville ou vide). Les projets sans quartier ni
+    ville, ou absents du référentiel, gardent leurs valeurs.
+    """
+    if index is None or ('quartier' not in projets.columns and 'ville' not in projets.columns):
+        return projets
+    n = len(projets)
+    lignes, niveau = index.lookup(projets['quartier'] if 'quartier' in projets.columns else [None] * n,
+                                  projets['ville'] if 'ville' in projets.columns else None)
+    trouves = lignes >= 0
+    valeurs = np.full((n, len(index.colonnes)), np.nan)
+    valeurs[trouves] = index.valeurs[lignes[trouves]]
+    projets = projets.assign(**{f'marche_{c}': valeurs[:, j] for j, c in enumerate(index.colonnes)},
+                             marche_niveau=niveau)
+
+    for champ, regle in regles.items():
+        if regle['source'] not in index.colonnes:
+            continue
+        source = valeurs[:, index.colonnes.index(regle['source'])]
+        if 'seuils' in regle:
+            modalites = np.array(regle['valeurs'], dtype=object)
+            deduites = modalites[np.searchsorted(regle['seuils'], source, side='right')]
+        else:
+            deduites = np.round(source * regle.get('facteur', 1.0), 2)
+        disponibles = ~np.isnan(source)
+        if champ in projets.columns:
+            actuelles = projets[champ]
+            manquantes = actuelles.isna().to_numpy()
+        else:
+            # Colonne absente du fichier : valeur d'import par défaut sans donnée de marché
+            actuelles = pd.Series([DEFAUTS_IMPORT.get(champ)] * n, index=projets.index, dtype=object)
+            manquantes = np.ones(n, dtype=bool)
+        cibles = disponibles if regle.get('mode', COMPLETER) == REMPLACER else disponibles & manquantes
+        if cibles.any():
+            colonne = actuelles.to_numpy(dtype=object, copy=True)
+            colonne[cibles] = deduites[cibles]
+            projets[champ] = pd.Series(colonne, index=projets.index).infer_objects()
+    return projets
+
+
+def main(argv=None):
+    """Jointure des données de marché à un fichier de projets"""
+    parser = argparse.ArgumentParser(description="Champs du scoring déduits des données de marché")
+    parser.add_argument('fichier')
+    parser.add_argument('--marche', default=FICHIER_MARCHE)
+    parser.add_argument('--regles', default=FICHIER_REGLES, help="JSON : champ -> {source, facteur | seuils, valeurs, mode}")
+    parser.add_argument('--remplacer', action='store_true', help="remplacer aussi les valeurs saisies")
+    parser.add_argument('-o', '--sortie')
+    args = parser.parse_args(argv)
+
+    debut = time.perf_counter()
+    index = load_market(args.marche)
+    if index is None:
+        print(f"❌ Référentiel de marché introuvable : {args.marche}")
+        return 1
+    chargement = time.perf_counter() - debut
+    regles = load_rules(args.regles, REMPLACER if args.remplacer else None)
+    projets = pd.read_csv(args.fichier, low_memory=False)
+    debut = time.perf_counter()
+    resultat = join_market(projets, index, regles)
+    duree = time.perf_counter() - debut
+    if 'marche_niveau' not in resultat.columns:
+        print(f"❌ Aucune colonne quartier ou ville dans {args.fichier}")
+        return 1
+    print(f"✅ {len(resultat)} projet(s), référentiel de {len(index)} ligne(s) "
+          f"(chargement {chargement:.2f}s, jointure {duree:.2f}s)")
+    print(resultat['marche_niveau'].replace('', 'non trouvé').value_counts().to_string())
+    if args.sortie:
+        resultat.to_csv(args.sortie, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
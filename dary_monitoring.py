@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Surveillance de la distribution des scores DARY
+Histogrammes à pas fixe du score global (pas de 0,1) et des sous-scores
+(entiers), par période et par segment (zone, type de bien) : mémoire
+constante, quantiles exacts à l'arrondi près, fusion par simple addition
+entre processus (à la granularité la plus grossière). Sauvegarde périodique
+en arrière-plan, écrite aussi à l'arrêt du processus, et alertes de dérive.
+
+Usage :
+    python dary_monitoring.py fusion monitoring/ -o fusion.npz
+    python dary_monitoring.py alertes monitoring/ [--periode 2024-05-01]
+"""
+
+import argparse
+import atexit
+import glob
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from dary_scoring import CATEGORIES, NIVEAUX
+
+# Score global arrondi à 0,1 : 1001 cases ; sous-scores entiers : 101 cases
+CASES_SCORE = 1001
+CASES_SOUS_SCORE = 101
+
+# Format d'une période selon la granularité
+GRANULARITES = {'jour': '%Y-%m-%d', 'heure': '%Y-%m-%d %H:00', 'mois': '%Y-%m'}
+# Granularités de la plus fine à la plus grossière
+ORDRE_GRANULARITES = ('heure', 'jour', 'mois')
+# Périodes conservées en mémoire (les plus anciennes sont oubliées)
+MAX_PERIODES = 90
+# Modalités suivies par dimension ; les suivantes sont regroupées dans AUTRE
+MAX_VALEURS_SEGMENT = 50
+AUTRE = 'autre'
+
+DOSSIER_SUIVI = os.environ.get('DARY_MONITOR_DIR', 'monitoring')
+# Intervalle minimal entre deux sauvegardes automatiques (s)
+INTERVALLE_SAUVEGARDE = 60
+
+
+class ScoreSketch:
+    """Histogrammes d'un segment sur une période"""
+
+    __slots__ = ('scores', 'sous_scores', 'niveaux')
+
+    def __init__(self):
+        self.scores = np.zeros(CASES_SCORE, dtype=np.int64)
+        self.sous_scores = np.zeros((len(CATEGORIES), CASES_SOUS_SCORE), dtype=np.int64)
+        self.niveaux = np.zeros(len(NIVEAUX), dtype=np.int64)
+
+    @property
+    def n(self):
+        return int(self.niveaux.sum())
+
+    def add(self, score_global, sous_scores, niveau_codes):
+        """Ajout d'un lot : score global, tableau (catégories × projets), codes de niveau"""
+        cases = np.clip(np.rint(np.asarray(score_global, dtype=float) * 10), 0, CASES_SCORE - 1)
+        self.scores += np.bincount(cases.astype(np.int64), minlength=CASES_SCORE)
+        for i, valeurs in enumerate(sous_scores):
+            cases = np.clip(np.rint(np.asarray(valeurs, dtype=float)), 0, CASES_SOUS_SCORE - 1)
+            self.sous_scores[i] += np.bincount(cases.astype(np.int64), minlength=CASES_SOUS_SCORE)
+        self.niveaux += np.bincount(np.asarray(niveau_codes, dtype=np.int64), minlength=len(NIVEAUX))
+
+    def merge(self, autre):
+        self.scores += autre.scores
+        self.sous_scores += autre.sous_scores
+        self.niveaux += autre.niveaux
+        return self
+
+    def quantile(self, q, categorie=None):
+        """Quantile q (0-1) du score global ou d'un sous-score (inverse de la fonction de répartition)"""
+        comptes = self.scores if categorie is None else self.sous_scores[list(CATEGORIES).index(categorie)]
+        total = comptes.sum()
+        if total == 0:
+            return None
+        case = int(np.searchsorted(np.cumsum(comptes), max(q * total, 1), side='left'))
+        return case / 10 if categorie is None else float(case)
+
+    def mean(self, categorie=None):
+        comptes = self.scores if categorie is None else self.sous_scores[list(CATEGORIES).index(categorie)]
+        total = comptes.sum()
+        if total == 0:
+            return None
+        valeurs = np.arange(len(comptes)) / (10 if categorie is None else 1)
+        return float((comptes * valeurs).sum() / total)
+
+    def niveau_mix(self):
+        """Part de chaque niveau"""
+        total = self.n
+        return {niveau: (float(c) / total if total else 0.0) for (_, niveau, *_), c in zip(NIVEAUX, self.niveaux)}
+
+
+def ks_distance(comptes_a, comptes_b):
+    """Distance de Kolmogorov-Smirnov entre deux histogrammes sur les mêmes cases"""
+    if comptes_a.sum() == 0 or comptes_b.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(comptes_a) / comptes_a.sum() - np.cumsum(comptes_b) / comptes_b.sum())))
+
+
+class ScoreMonitor:
+    """Histogrammes par (période, segment), segments : tous, zone, type_bien"""
+
+    def __init__(self, granularite='jour', max_periodes=MAX_PERIODES):
+        self.granularite = granularite
+        self.max_periodes = max_periodes
+        self._sketches = {}
+        self._valeurs = {'zone': set(), 'type_bien': set()}
+        self._verrou = threading.Lock()
+        self._verrou_sauvegarde = threading.Lock()
+        self._derniere_sauvegarde = 0.0
+        # Observations comptées depuis la création et à la dernière sauvegarde
+        self._version = 0
+        self._version_sauvee = 0
+        # Fichier de sauvegarde automatique et sauvegarde programmée (minuterie)
+        self._chemin = None
+        self._programmee = None
+
+    def period_of(self, horodatage=None):
+        date = datetime.fromtimestamp(time.time() if horodatage is None else horodatage)
+        return date.strftime(GRANULARITES[self.granularite])
+
+    def _segment_value(self, dimension, valeur):
+        """Modalité suivie, regroupée dans AUTRE au-delà de MAX_VALEURS_SEGMENT"""
+        valeur = str(valeur)
+        connues = self._valeurs[dimension]
+        if valeur not in connues:
+            if len(connues) >= MAX_VALEURS_SEGMENT:
+                return AUTRE
+            connues.add(valeur)
+        return valeur
+
+    def _sketch(self, periode, dimension, valeur):
+        cle = (periode, dimension, valeur)
+        if cle not in self._sketches:
+            self._sketches[cle] = ScoreSketch()
+        return self._sketches[cle]
+
+    def observe(self, resultat, zones=None, types_bien=None, horodatage=None):
+        """Ajout d'un lot de résultats de score_batch (dict de tableaux)"""
+        score_global = np.atleast_1d(resultat['score_global'])
+        sous_scores = np.stack([np.atleast_1d(resultat[c]) for c in CATEGORIES])
+        codes = np.atleast_1d(resultat['niveau_code'])
+        periode = self.period_of(horodatage)
+        with self._verrou:
+            self._sketch(periode, 'tous', None).add(score_global, sous_scores, codes)
+            for dimension, valeurs in (('zone', zones), ('type_bien', types_bien)):
+                if valeurs is None:
+                    continue
+                modalites, inverse = np.unique(np.asarray(valeurs, dtype=str), return_inverse=True)
+                for i, modalite in enumerate(modalites):
+                    masque = inverse == i
+                    self._sketch(periode, dimension, self._segment_value(dimension, modalite)).add(
+                        score_global[masque], sous_scores[:, masque], codes[masque])
+            self._forget_old_periods()
+            self._version += 1
+
+    def observe_result(self, resultat, zone=None, type_bien=None):
+        """Ajout d'un résultat projet (ScoreResult)"""
+        lot = {'score_global': resultat.score_global, 'niveau_code': resultat.niveau_code}
+        lot.update(zip(CATEGORIES, resultat.sous_scores))
+        self.observe(lot, None if zone is None else [zone], None if type_bien is None else [type_bien],
+                     horodatage=resultat.horodatage)
+
+    def _forget_old_periods(self):
+        periodes = sorted({p for p, _, _ in self._sketches})
+        for periode in periodes[:-self.max_periodes]:
+            for cle in [c for c in self._sketches if c[0] == periode]:
+                del self._sketches[cle]
+
+    def periods(self):
+        with self._verrou:
+            return sorted({p for p, _, _ in self._sketches})
+
+    def segments(self, periode=None):
+        with self._verrou:
+            return sorted({(d, v) for p, d, v in self._sketches if periode is None or p == periode},
+                          key=lambda s: (s[0] != 'tous', s[0], str(s[1])))
+
+    def get(self, periode, dimension='tous', valeur=None):
+        """Histogrammes d'un segment (vides si absent)"""
+        with self._verrou:
+            sketch = self._sketches.get((periode, dimension, valeur))
+            return ScoreSketch().merge(sketch) if sketch is not None else ScoreSketch()
+
+    def _coarsen(self, granularite):
+        """Regroupement des périodes à une granularité plus grossière (verrou tenu)"""
+        anciens, self._sketches = self._sketches, {}
+        for (periode, dimension, valeur), sketch in anciens.items():
+            periode = coarsen_period(periode, self.granularite, granularite)
+            self._sketch(periode, dimension, valeur).merge(sketch)
+        self.granularite = granularite
+
+    def merge(self, autre):
+        """Fusion des histogrammes d'un autre moniteur (autre processus ou fichier)
+
+        Les deux moniteurs sont ramenés à la plus grossière de leurs
+        granularités : jours et heures fusionnés donnent des jours.
+        """
+        with autre._verrou:
+            granularite = autre.granularite
+            elements = [(cle, ScoreSketch().merge(sketch)) for cle, sketch in autre._sketches.items()]
+        with self._verrou:
+            if ORDRE_GRANULARITES.index(granularite) > ORDRE_GRANULARITES.index(self.granularite):
+                self._coarsen(granularite)
+            for (periode, dimension, valeur), sketch in elements:
+                periode = coarsen_period(periode, granularite, self.granularite)
+                if dimension != 'tous':
+                    valeur = self._segment_value(dimension, valeur)
+                self._sketch(periode, dimension, valeur).merge(sketch)
+            self._forget_old_periods()
+            self._version += 1
+        return self
+
+    def save(self, chemin):
+        """Sauvegarde atomique au format npz (attend la fin d'une sauvegarde en arrière-plan)"""
+        with self._verrou_sauvegarde:
+            self._write(chemin)
+
+    def _write(self, chemin):
+        with self._verrou:
+            version = self._version
+            cles = list(self._sketches)
+            tableaux = {
+                'cles': np.array(json.dumps({'granularite': self.granularite, 'cles': cles})),
+                'scores': np.array([self._sketches[c].scores for c in cles]).reshape(len(cles), CASES_SCORE),
+                'sous_scores': np.array([self._sketches[c].sous_scores for c in cles]).reshape(
+                    len(cles), len(CATEGORIES), CASES_SOUS_SCORE),
+                'niveaux': np.array([self._sketches[c].niveaux for c in cles]).reshape(len(cles), len(NIVEAUX)),
+            }
+        os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+        temporaire = f'{chemin}.{os.getpid()}.tmp'
+        with open(temporaire, 'wb') as f:
+            np.savez_compressed(f, **tableaux)
+        os.replace(temporaire, chemin)
+        self._derniere_sauvegarde = time.time()
+        self._version_sauvee = version
+
+    @classmethod
+    def load(cls, chemin):
+        with np.load(chemin) as donnees:
+            entete = json.loads(str(donnees['cles']))
+            moniteur = cls(entete['granularite'])
+            for i, (periode, dimension, valeur) in enumerate(entete['cles']):
+                sketch = moniteur._sketch(periode, dimension, valeur)
+                sketch.scores[:] = donnees['scores'][i]
+                sketch.sous_scores[:] = donnees['sous_scores'][i]
+                sketch.niveaux[:] = donnees['niveaux'][i]
+                if dimension != 'tous':
+                    moniteur._segment_value(dimension, valeur)
+        return moniteur
+
+    def maybe_save(self, chemin, intervalle=INTERVALLE_SAUVEGARDE):
+        """Sauvegarde dans un thread, au plus une fois par intervalle secondes
+
+        Si la précédente est trop récente, la sauvegarde est programmée à la
+        fin de l'intervalle : les dernières observations sont écrites même
+        sans observation suivante. L'appelant (clic dans l'application,
+        boucle du watcher) n'attend pas la compression ; flush() écrit ce
+        qui reste à l'arrêt du processus. Retourne True si la sauvegarde
+        part immédiatement.
+        """
+        with self._verrou:
+            if self._chemin is None:
+                atexit.register(self.flush)
+            self._chemin = chemin
+            if self._programmee is not None and self._programmee.is_alive():
+                return False
+            delai = max(intervalle - (time.time() - self._derniere_sauvegarde), 0.0)
+            self._programmee = threading.Timer(delai, self.flush)
+            self._programmee.name = 'dary-moniteur'
+            self._programmee.daemon = True
+        self._programmee.start()
+        return delai == 0
+
+    def flush(self):
+        """Sauvegarde des observations non encore écrites dans le fichier automatique"""
+        with self._verrou_sauvegarde:
+            if self._chemin is not None and self._version != self._version_sauvee:
+                self._write(self._chemin)
+
+
+def worker_file(dossier=DOSSIER_SUIVI):
+    """Fichier de sauvegarde propre à ce processus (un par worker)"""
+    return os.path.join(dossier, f'scores-{socket.gethostname()}-{os.getpid()}.npz')
+
+
+def coarsen_period(periode, granularite, vers):
+    """Période d'une granularité exprimée dans une granularité au moins aussi grossière"""
+    if granularite == vers:
+        return periode
+    if ORDRE_GRANULARITES.index(vers) < ORDRE_GRANULARITES.index(granularite):
+        raise ValueError(f"Période « {granularite} » non convertible en « {vers} »")
+    return datetime.strptime(periode, GRANULARITES[granularite]).strftime(GRANULARITES[vers])
+
+
+def merge_files(chemins, granularite=ORDRE_GRANULARITES[0]):
+    """Moniteur fusionnant les sauvegardes de plusieurs workers
+
+    La granularité du résultat est la plus grossière entre granularite et
+    celles des sauvegardes (chacune garde celle avec laquelle elle a été écrite).
+    """
+    moniteur = ScoreMonitor(granularite)
+    for chemin in chemins:
+        moniteur.merge(ScoreMonitor.load(chemin))
+    return moniteur
+
+
+def load_directory(dossier=DOSSIER_SUIVI, exclure=None):
+    """Fusion de toutes les sauvegardes d'un dossier"""
+    chemins = sorted(glob.glob(os.path.join(dossier, '*.npz')))
+    return merge_files([c for c in chemins if exclure is None or os.path.abspath(c) != os.path.abspath(exclure)])
+
+
+def segment_label(dimension, valeur):
+    return "Tous les projets" if dimension == 'tous' else f"{dimension} = {valeur}"
+
+
+def drift_alerts(moniteur, periode=None, n_reference=7, n_min=30, seuil_part=0.10, z_min=3.0,
+                 seuil_ks=0.2):
+    """Alertes de dérive d'une période par rapport aux n_reference périodes précédentes
+
+    Par segment : variation de la part de chaque niveau (écart absolu et
+    test z de deux proportions) et distance de Kolmogorov-Smirnov du score
+    global et de chaque sous-score.
+    """
+    periodes = moniteur.periods()
+    if not periodes:
+        return []
+    periode = periode or periodes[-1]
+    references = [p for p in periodes if p < periode][-n_reference:]
+    alertes = []
+    for dimension, valeur in moniteur.segments(periode):
+        actuel = moniteur.get(periode, dimension, valeur)
+        reference = ScoreSketch()
+        for p in references:
+            reference.merge(moniteur.get(p, dimension, valeur))
+        n1, n0 = actuel.n, reference.n
+        if n1 < n_min or n0 < n_min:
+            continue
+        segment = segment_label(dimension, valeur)
+
+        for code, (_, niveau, *_) in enumerate(NIVEAUX):
+            p1, p0 = actuel.niveaux[code] / n1, reference.niveaux[code] / n0
+            commune = (actuel.niveaux[code] + reference.niveaux[code]) / (n1 + n0)
+            ecart_type = np.sqrt(commune * (1 - commune) * (1 / n1 + 1 / n0))
+            z = (p1 - p0) / ecart_type if ecart_type > 0 else 0.0
+            if abs(p1 - p0) >= seuil_part and abs(z) >= z_min:
+                alertes.append({
+                    'periode': periode, 'segment': segment, 'indicateur': f'part {niveau}',
+                    'actuel': round(float(p1), 3), 'reference': round(float(p0), 3), 'z': round(float(z), 1),
+                    'message': f"{segment} : part « {niveau} » {p1:.0%} contre {p0:.0%} "
+                               f"sur les {len(references)} périodes précédentes",
+                })
+
+        distributions = [('score global', actuel.scores, reference.scores)]
+        distributions += [(c, actuel.sous_scores[i], reference.sous_scores[i]) for i, c in enumerate(CATEGORIES)]
+        for indicateur, comptes, comptes_reference in distributions:
+            distance = ks_distance(comptes, comptes_reference)
+            if distance >= seuil_ks:
+                categorie = None if indicateur == 'score global' else indicateur
+                m1, m0 = actuel.quantile(0.5, categorie), reference.quantile(0.5, categorie)
+                alertes.append({
+                    'periode': periode, 'segment': segment, 'indicateur': indicateur,
+                    'actuel': m1, 'reference': m0, 'ks': round(distance, 3),
+                    'message': f"{segment} : distribution du {indicateur} déplacée "
+                               f"(KS {distance:.2f}, médiane {m1} contre {m0})",
+                })
+    return alertes
+
+
+# Moniteur du processus, alimenté par l'application
+MONITEUR = ScoreMonitor(os.environ.get('DARY_MONITOR_GRANULARITY', 'jour'))
+
+
+def main(argv=None):
+    """Fusion de sauvegardes et affichage des alertes"""
+    parser = argparse.ArgumentParser(description="Surveillance des scores DARY")
+    sous = parser.add_subparsers(dest='commande', required=True)
+    fusion = sous.add_parser('fusion', help="fusionner les sauvegardes des workers")
+    fusion.add_argument('sources', nargs='+', help="fichiers .npz ou dossiers")
+    fusion.add_argument('-o', '--sortie', required=True)
+    alertes = sous.add_parser('alertes', help="alertes de dérive de la dernière période")
+    alertes.add_argument('sources', nargs='+')
+    alertes.add_argument('--periode')
+    alertes.add_argument('--references', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    chemins = []
+    for source in args.sources:
+        chemins += sorted(glob.glob(os.path.join(source, '*.npz'))) if os.path.isdir(source) else [source]
+    moniteur = merge_files(chemins)
+
+    if args.commande == 'fusion':
+        moniteur.save(args.sortie)
+        print(f"✅ {len(chemins)} sauvegarde(s) fusionnée(s) dans {args.sortie}")
+        return 0
+    resultat = drift_alerts(moniteur, args.periode, n_reference=args.references)
+    for alerte in resultat:
+        print(f"⚠️  [{alerte['periode']}] {alerte['message']}")
+    if not resultat:
+        print("✅ Aucune dérive détectée")
+    return 1 if resultat else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optimisation de portefeuille sous contrainte de budget
+Sélection des projets maximisant le score DARY total (ou pondéré)
+pour un budget donné, avec limites optionnelles par zone et type de bien
+"""
+
+from math import gcd
+
+import numpy as np
+import pandas as pd
+
+# Nombre maximal de cases de budget pour la programmation dynamique
+MAX_CASES_DP = 5000
+# Nombre maximal de nœuds explorés par le branch-and-bound
+MAX_NOEUDS_BNB = 100000
+# Au-delà de ce nombre de candidats, le mode auto passe en glouton
+SEUIL_GLOUTON = 20000
+
+
+def _limites_par_projet(segments, limite):
+    """Codes de segment et nombre maximal de projets par segment"""
+    codes, uniques = pd.factorize(pd.Series(segments).astype(str))
+    if isinstance(limite, dict):
+        max_par_code = np.array([limite.get(u, len(codes)) for u in uniques])
+    else:
+        max_par_code = np.full(len(uniques), int(limite))
+    return codes, max_par_code
+
+
+def _grille_budget(couts, budget, max_cases):
+    """Unité de budget de la grille DP et indicateur d'exactitude"""
+    entiers = np.all(couts == np.round(couts)) and float(budget) == round(budget)
+    if entiers:
+        unite = int(round(budget))
+        for c in couts.astype(np.int64):
+            unite = gcd(unite, int(c))
+        if unite > 0 and budget / unite <= max_cases:
+            return float(unite), True
+    return budget / max_cases, False
+
+
+def _solve_dp(valeurs, couts, budget, max_cases=MAX_CASES_DP):
+    """Sac à dos 0/1 par programmation dynamique vectorisée sur le budget"""
+    unite, exact = _grille_budget(couts, budget, max_cases)
+    capacite = int(np.floor(budget / unite + 1e-9))
+    # Arrondi supérieur des coûts : la solution reste toujours dans le budget
+    poids = np.ceil(couts / unite - 1e-9).astype(np.int64)
+
+    dp = np.zeros(capacite + 1)
+    pris = np.zeros((len(valeurs), capacite + 1), dtype=bool)
+    for i in range(len(valeurs)):
+        w = poids[i]
+        if w > capacite:
+            continue
+        candidat = dp[:capacite + 1 - w] + valeurs[i]
+        mieux = candidat > dp[w:]
+        pris[i, w:] = mieux
+        dp[w:] = np.where(mieux, candidat, dp[w:])
+
+    # Reconstruction de la sélection
+    selection = []
+    c = int(np.argmax(dp))
+    for i in range(len(valeurs) - 1, -1, -1):
+        if pris[i, c]:
+            selection.append(i)
+            c -= poids[i]
+    return sorted(selection), exact
+
+
+def _solve_greedy(valeurs, couts, budget, zones=None, types=None):
+    """Approximation gloutonne par ratio score / coût"""
+    ordre = np.lexsort((-valeurs, -valeurs / np.maximum(couts, 1e-9)))
+    reste = budget
+    comptes_zone = None if zones is None else np.zeros(len(zones[1]), dtype=int)
+    comptes_type = None if types is None else np.zeros(len(types[1]), dtype=int)
+    selection = []
+    for i in ordre:
+        if couts[i] > reste:
+            continue
+        if zones is not None and comptes_zone[zones[0][i]] >= zones[1][zones[0][i]]:
+            continue
+        if types is not None and comptes_type[types[0][i]] >= types[1][types[0][i]]:
+            continue
+        selection.append(int(i))
+        reste -= couts[i]
+        if zones is not None:
+            comptes_zone[zones[0][i]] += 1
+        if types is not None:
+            comptes_type[types[0][i]] += 1
+    return sorted(selection)
+
+
+def _solve_bnb(valeurs, couts, budget, zones=None, types=None, max_noeuds=MAX_NOEUDS_BNB):
+    """Branch-and-bound avec borne du sac à dos fractionnaire
+
+    La borne ignore les limites par segment, elle reste donc valide.
+    Retourne la meilleure sélection trouvée et un indicateur d'optimalité
+    (faux si la limite de nœuds a été atteinte).
+    """
+    n = len(valeurs)
+    ordre = np.lexsort((-valeurs, -valeurs / np.maximum(couts, 1e-9)))
+    v = valeurs[ordre]
+    c = couts[ordre]
+    cumul_c = np.concatenate(([0.0], np.cumsum(c)))
+    cumul_v = np.concatenate(([0.0], np.cumsum(v)))
+    code_zone = None if zones is None else zones[0][ordre]
+    code_type = None if types is None else types[0][ordre]
+    comptes_zone = None if zones is None else np.zeros(len(zones[1]), dtype=int)
+    comptes_type = None if types is None else np.zeros(len(types[1]), dtype=int)
+
+    def borne(i, reste):
+        """Valeur maximale atteignable avec les projets i..n-1"""
+        j = int(np.searchsorted(cumul_c, cumul_c[i] + reste, side='right')) - 1
+        valeur = cumul_v[j] - cumul_v[i]
+        if j < n:
+            valeur += (cumul_c[i] + reste - cumul_c[j]) / max(c[j], 1e-9) * v[j]
+        return valeur
+
+    # Solution initiale gloutonne pour élaguer dès le départ
+    rang = np.empty(n, dtype=int)
+    rang[ordre] = np.arange(n)
+    initiale = _solve_greedy(valeurs, couts, budget, zones, types)
+    meilleure_valeur = float(valeurs[initiale].sum()) if initiale else 0.0
+    meilleure = sorted(rang[initiale].tolist())
+
+    courante = []
+    noeuds = 0
+    # Pile de (position, reste, valeur, action) ; 'retour' annule une inclusion
+    pile = [(0, budget, 0.0, None)]
+    while pile:
+        i, reste, valeur, action = pile.pop()
+        if action == 'retour':
+            # Annulation de l'inclusion du projet i
+            courante.pop()
+            if code_zone is not None:
+                comptes_zone[code_zone[i]] -= 1
+            if code_type is not None:
+                comptes_type[code_type[i]] -= 1
+            continue
+        noeuds += 1
+        if noeuds > max_noeuds:
+            break
+        if valeur > meilleure_valeur:
+            meilleure_valeur = valeur
+            meilleure = list(courante)
+        if i >= n or valeur + borne(i, reste) <= meilleure_valeur + 1e-9:
+            continue
+        # Branche « exclure » explorée après la branche « inclure »
+        pile.append((i + 1, reste, valeur, None))
+        admissible = c[i] <= reste
+        if admissible and code_zone is not None:
+            admissible = comptes_zone[code_zone[i]] < zones[1][code_zone[i]]
+        if admissible and code_type is not None:
+            admissible = comptes_type[code_type[i]] < types[1][code_type[i]]
+        if admissible:
+            courante.append(i)
+            if code_zone is not None:
+                comptes_zone[code_zone[i]] += 1
+            if code_type is not None:
+                comptes_type[code_type[i]] += 1
+            pile.append((i, reste, valeur, 'retour'))
+            pile.append((i + 1, reste - c[i], valeur + v[i], None))
+
+    return sorted(ordre[meilleure].tolist()), noeuds <= max_noeuds
+
+
+def optimize_portfolio(projets, budget, score_col='score_global', cout_col='ticket_minimum',
+                       poids=None, max_par_zone=None, max_par_type=None, methode='auto'):
+    """Sélection des projets maximisant le score total sous un budget
+
+    projets      : DataFrame contenant au moins les colonnes score et coût
+    poids        : nom de colonne ou tableau de pondérations du score (optionnel)
+    max_par_zone : nombre maximal de projets par zone (entier ou dict zone -> entier)
+    max_par_type : nombre maximal de projets par type de bien
+    methode      : 'auto', 'dp' (exact), 'bnb' (exact avec limites) ou 'greedy'
+    """
+    if budget <= 0:
+        raise ValueError("Le budget doit être strictement positif")
+    valeurs = projets[score_col].to_numpy(dtype=float)
+    if poids is not None:
+        valeurs = valeurs * (projets[poids].to_numpy(dtype=float)
+                             if isinstance(poids, str) else np.asarray(poids, dtype=float))
+    couts = projets[cout_col].to_numpy(dtype=float)
+
+    # Seuls les projets finançables et à valeur positive sont candidats
+    candidats = np.flatnonzero((couts <= budget) & (valeurs > 0)
+                               & np.isfinite(valeurs) & np.isfinite(couts) & (couts >= 0))
+    valeurs_c = valeurs[candidats]
+    couts_c = couts[candidats]
+    zones = types = None
+    if max_par_zone is not None:
+        codes, maxi = _limites_par_projet(projets['zone'].to_numpy()[candidats], max_par_zone)
+        zones = (codes, maxi)
+    if max_par_type is not None:
+        codes, maxi = _limites_par_projet(projets['type_bien'].to_numpy()[candidats], max_par_type)
+        types = (codes, maxi)
+
+    auto = methode == 'auto'
+    if auto:
+        if len(candidats) > SEUIL_GLOUTON:
+            methode = 'greedy'
+        elif zones is not None or types is not None:
+            methode = 'bnb'
+        else:
+            methode = 'dp'
+
+    if len(candidats) == 0:
+        selection, optimal = [], True
+    elif methode == 'dp':
+        if zones is not None or types is not None:
+            raise ValueError("La programmation dynamique ne gère pas les limites par segment")
+        selection, optimal = _solve_dp(valeurs_c, couts_c, budget)
+        if auto and not optimal:
+            # Coûts arrondis sur une grille grossière : le glouton peut faire mieux
+            glouton = _solve_greedy(valeurs_c, couts_c, budget)
+            if valeurs_c[glouton].sum() > valeurs_c[selection].sum():
+                selection, methode = glouton, 'greedy'
+    elif methode == 'bnb':
+        selection, optimal = _solve_bnb(valeurs_c, couts_c, budget, zones, types)
+    elif methode == 'greedy':
+        selection, optimal = _solve_greedy(valeurs_c, couts_c, budget, zones, types), False
+    else:
+        raise ValueError(f"Méthode inconnue: {methode}")
+
+    lignes = candidats[selection]
+    return {
+        'index': projets.index[lignes].tolist(),
+        'valeur': round(float(valeurs[lignes].sum()), 2),
+        'cout': float(couts[lignes].sum()),
+        'budget': float(budget),
+        'methode': methode,
+        'optimal': bool(optimal)
+    }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index de classement des scores DARY
+Tableaux numpy de scores triés par segment (zone, type de bien) permettant
+de répondre au top-k et au percentile en temps logarithmique. Un lot
+(import, analyse enregistrée) ajouté une seconde fois remplace le premier.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Segment regroupant tous les projets
+SEGMENT_GLOBAL = ('tous', None)
+
+
+class RankingIndex:
+    """Index de classement incrémental des scores par segment"""
+
+    # Dimensions indexées en plus du segment global
+    DIMENSIONS = ('zone', 'type_bien')
+
+    def __init__(self):
+        # segment -> (scores triés croissants, noms et lots alignés sur les scores)
+        self._segments = {}
+        # lot -> code entier ; -1 pour les scores ajoutés sans lot
+        self._lots = {}
+
+    def __len__(self):
+        return len(self._get()[0])
+
+    def add(self, score, nom=None, zone=None, type_bien=None, lot=None):
+        """Insertion d'un score dans tous ses segments"""
+        self.add_many([score], noms=[nom], zones=[zone], types_bien=[type_bien], lot=lot)
+
+    def add_many(self, scores, noms=None, zones=None, types_bien=None, lot=None):
+        """Insertion d'un lot de scores (ex: résultats d'un import CSV)
+
+        Les scores déjà ajoutés avec le même lot sont retirés d'abord :
+        réanalyser un import remplace ses projets au lieu de les doubler.
+        """
+        scores = np.asarray(scores, dtype=float).ravel()
+        n = len(scores)
+        noms_lot = np.empty(n, dtype=object)
+        if noms is not None:
+            noms_lot[:] = list(noms)
+        code = -1
+        if lot is not None:
+            if lot in self._lots:
+                self._remove(self._lots[lot])
+            code = self._lots.setdefault(lot, len(self._lots))
+        # Tri stable du lot : ordre d'arrivée conservé entre scores égaux
+        ordre = np.argsort(scores, kind='stable')
+        scores, noms_lot = scores[ordre], noms_lot[ordre]
+        self._merge(SEGMENT_GLOBAL, scores, noms_lot, code)
+        for dimension, valeurs in zip(self.DIMENSIONS, (zones, types_bien)):
+            if valeurs is None:
+                continue
+            valeurs = pd.Series(list(valeurs), dtype=object).to_numpy()[ordre]
+            codes, modalites = pd.factorize(valeurs)
+            for i, modalite in enumerate(modalites):
+                choisis = codes == i
+                self._merge((dimension, modalite), scores[choisis], noms_lot[choisis], code)
+
+    def _merge(self, key, scores, noms, code):
+        """Fusion d'un lot trié dans un segment, après les scores égaux déjà présents"""
+        if key not in self._segments:
+            self._segments[key] = (np.zeros(0), np.zeros(0, dtype=object), np.zeros(0, dtype=np.int64))
+        anciens, anciens_noms, anciens_lots = self._segments[key]
+        pos = np.searchsorted(anciens, scores, side='right')
+        self._segments[key] = (np.insert(anciens, pos, scores), np.insert(anciens_noms, pos, noms),
+                               np.insert(anciens_lots, pos, code))
+
+    def _remove(self, code):
+        """Retrait des scores d'un lot dans tous les segments"""
+        for key, (scores, noms, lots) in list(self._segments.items()):
+            garder = lots != code
+            if garder.all():
+                continue
+            if garder.any():
+                self._segments[key] = (scores[garder], noms[garder], lots[garder])
+            else:
+                del self._segments[key]
+
+    def _get(self, zone=None, type_bien=None):
+        """Tableaux triés du segment demandé"""
+        if zone is not None and type_bien is not None:
+            raise ValueError("Un seul segment à la fois : zone ou type_bien")
+        if zone is not None:
+            key = ('zone', zone)
+        elif type_bien is not None:
+            key = ('type_bien', type_bien)
+        else:
+            key = SEGMENT_GLOBAL
+        return self._segments.get(key, (np.zeros(0), np.zeros(0, dtype=object), np.zeros(0, dtype=np.int64)))
+
+    def count(self, zone=None, type_bien=None):
+        """Nombre de projets dans un segment"""
+        scores, _, _ = self._get(zone, type_bien)
+        return len(scores)
+
+    def top_k(self, k, zone=None, type_bien=None):
+        """Les k meilleurs projets du segment, du meilleur au moins bon"""
+        scores, noms, _ = self._get(zone, type_bien)
+        if k <= 0:
+            return []
+        start = max(len(scores) - k, 0)
+        return list(zip(noms[start:][::-1].tolist(), scores[start:][::-1].tolist()))
+
+    def percentile(self, score, zone=None, type_bien=None):
+        """Percentile d'un score dans un segment (None si segment vide)
+
+        Les ex-aequo comptent pour moitié, de sorte qu'un score égal à
+        tous les autres se situe au 50e percentile.
+        """
+        scores, _, _ = self._get(zone, type_bien)
+        if not len(scores):
+            return None
+        score = float(score)
+        inferieurs = int(np.searchsorted(scores, score, side='left'))
+        egaux = int(np.searchsorted(scores, score, side='right')) - inferieurs
+        return round(100.0 * (inferieurs + 0.5 * egaux) / len(scores), 1)
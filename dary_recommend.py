@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chemin vers le niveau supérieur
+Pour chaque projet, plus petit ensemble de changements d'entrées (ROI,
+garanties, état...) qui fait passer le score au-dessus du seuil du niveau
+visé (80/60/40). Chaque levier est une échelle de points (paliers et
+barèmes du moteur) ; une programmation dynamique sur (nombre de leviers
+modifiés, échelons gagnés) garde le gain maximal de chaque état et
+retient, par lot de projets vectorisé, le premier état qui franchit le
+seuil : le moins de leviers, puis le moins d'échelons, puis la plus
+grande marge.
+
+Usage :
+    python dary_recommend.py projets.csv [--cible Bon] [--leviers roi_projete,garanties] [-o recommandations.csv]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from dary_scoring import NIVEAUX, REGLES, VALEURS_DEFAUT, flatten_project, points_bareme, points_palier, score_batch
+
+# Entrées modifiables par le promoteur : colonne -> libellé
+LEVIERS = {
+    'roi_projete': "ROI projeté",
+    'ticket_minimum': "Ticket minimum",
+    'rendement_locatif': "Rendement locatif",
+    'plus_value_estimee': "Plus-value estimée",
+    'etat': "État",
+    'qualite_construction': "Qualité de construction",
+    'garanties': "Garanties",
+}
+UNITES = {'roi_projete': '%', 'rendement_locatif': '%', 'plus_value_estimee': '%', 'ticket_minimum': ' MAD'}
+# Projets traités par lot (tables de la programmation dynamique en mémoire)
+TAILLE_LOT = 20000
+HORS_ATTEINTE = "Hors d'atteinte avec ces leviers"
+
+
+def ladder(critere, regles=None):
+    """Échelle d'un levier : points possibles triés et valeur d'entrée donnant chacun (None si aucune)"""
+    regles = REGLES if regles is None else regles
+    if critere in regles['paliers']:
+        seuils, points, cote = regles['paliers'][critere]
+        echelle = np.unique(points)
+        valeurs = []
+        for p in echelle:
+            j = list(points).index(p)
+            # 'right' : atteint dès valeur >= seuils[j-1] ; 'left' : dès valeur <= seuils[j]
+            if cote == 'right':
+                valeurs.append(seuils[j - 1] if j > 0 else None)
+            else:
+                valeurs.append(seuils[j] if j < len(seuils) else None)
+    else:
+        bareme, inconnu = regles['baremes'][critere]
+        echelle = np.unique(list(bareme.values()) + [inconnu])
+        valeurs = [next((m for m, q in bareme.items() if q == p), None) for p in echelle]
+    return echelle.astype(float), valeurs
+
+
+def _label(critere, valeur, regles):
+    """Texte d'un changement : « ROI projeté ≥ 15% », « Garanties : oui »"""
+    libelle = LEVIERS.get(critere, critere)
+    if critere in regles['paliers']:
+        signe = '≥' if regles['paliers'][critere][2] == 'right' else '≤'
+        nombre = f"{valeur:,.0f}".replace(',', ' ') if abs(valeur) >= 1000 else f"{valeur:g}"
+        return f"{libelle} {signe} {nombre}{UNITES.get(critere, '')}"
+    if isinstance(valeur, bool):
+        valeur = 'oui' if valeur else 'non'
+    return f"{libelle} : {valeur}"
+
+
+def _search(ecarts, gains):
+    """Leviers à monter (échelons gagnés, 0 = inchangé) pour franchir chaque écart
+
+    gains : par levier, tableau (échelons × projets) du gain de score en
+    montant de e + 1 échelons (-inf si impossible). Retourne les échelons
+    de chaque levier (leviers × projets) et un masque des projets atteints.
+    """
+    n, nb_leviers = len(ecarts), len(gains)
+    max_echelons = sum(len(g) for g in gains)
+    # Gain maximal pour exactement c leviers modifiés et t échelons gagnés (projets en dernier axe)
+    table = np.full((nb_leviers + 1, max_echelons + 1, n), -np.inf, dtype=np.float32)
+    table[0, 0] = 0
+    choix = np.zeros((nb_leviers, nb_leviers + 1, max_echelons + 1, n), dtype=np.int8)
+    echelons_vus = 0
+    for k, gain in enumerate(gains):
+        # États atteignables avec les k leviers déjà vus : c <= k, t <= échelons vus
+        avant = table[:k + 1, :echelons_vus + 1].copy()
+        for e in range(1, len(gain) + 1):
+            candidat = avant + gain[e - 1]
+            cible = table[1:k + 2, e:echelons_vus + e + 1]
+            meilleur = candidat > cible
+            np.copyto(cible, candidat, where=meilleur)
+            np.copyto(choix[k, 1:k + 2, e:echelons_vus + e + 1], np.int8(e), where=meilleur)
+        echelons_vus += len(gain)
+
+    # États parcourus dans l'ordre (leviers, échelons) : le premier qui franchit l'écart
+    franchis = (table >= ecarts - 1e-4).reshape(-1, n)
+    atteints = franchis.any(axis=0)
+    c, t = np.divmod(np.argmax(franchis, axis=0), max_echelons + 1)
+    lignes = np.arange(n)
+    echelons = np.zeros((nb_leviers, n), dtype=np.int64)
+    for k in range(nb_leviers - 1, -1, -1):
+        e = np.where(atteints, choix[k, c, t, lignes], 0)
+        echelons[k] = e
+        c, t = c - (e > 0), t - e
+    return echelons, atteints
+
+
+def recommend(colonnes, cible=None, leviers=tuple(LEVIERS), regles=None, actuel=None):
+    """Changements minimaux pour atteindre le niveau visé, pour tout un portefeuille
+
+    colonnes : DataFrame ou dict colonne -> tableau (format CSV plat) ;
+    cible : nom d'un niveau, par défaut le niveau au-dessus de celui de
+    chaque projet. Les gains sont additifs par levier ; le score obtenu est
+    recalculé par score_batch, un projet n'est dit atteint que s'il franchit
+    réellement le seuil. Retourne un dict : 'cible', 'atteint',
+    'nb_changements', 'echelons', 'score_vise', 'changements' (texte) et
+    'valeurs' (levier -> nouvelle valeur, None si inchangée). actuel :
+    résultat de score_batch des mêmes colonnes, s'il est déjà calculé.
+    """
+    regles = REGLES if regles is None else regles
+    if actuel is None:
+        actuel = score_batch(colonnes, regles)
+    brut = np.atleast_1d(actuel['score_brut'])
+    n = len(brut)
+    codes = np.atleast_1d(actuel['niveau_code'])
+    if cible is None:
+        codes_vises = codes - 1
+    else:
+        noms = [nom for _, nom, *_ in NIVEAUX]
+        if cible not in noms:
+            raise ValueError(f"Niveau inconnu : {cible!r} (attendu : {', '.join(noms)})")
+        codes_vises = np.full(n, noms.index(cible))
+    # Projets déjà au niveau visé (ou au plus haut) : rien à changer
+    vises = codes_vises >= 0
+    seuils = np.array([seuil for seuil, *_ in NIVEAUX], dtype=float)
+    ecarts = np.where(vises, seuils[np.maximum(codes_vises, 0)] - brut, 0)
+    vises &= ecarts > 0
+
+    categorie = {c: cat for cat, criteres in regles['categories'].items() for c in criteres}
+    leviers = [c for c in leviers if c in categorie]
+    echelles, courantes, rangs, gains = [], [], [], []
+    for critere in leviers:
+        echelle, valeurs = ladder(critere, regles)
+        valeur = colonnes[critere] if critere in colonnes else VALEURS_DEFAUT[critere]
+        if hasattr(valeur, 'to_numpy'):
+            valeur = valeur.to_numpy()
+        valeur = np.broadcast_to(np.asarray(valeur, dtype=float if critere in regles['paliers'] else object), (n,))
+        if critere in regles['paliers']:
+            points = points_palier(valeur, *regles['paliers'][critere])
+        else:
+            points = points_bareme(valeur, *regles['baremes'][critere])
+        rang = np.searchsorted(echelle, points)
+        # Gain de chaque montée de e échelons, impossible au-delà de l'échelle ou sans valeur d'entrée
+        e = np.arange(1, len(echelle))
+        haut = rang[:, None] + e
+        possibles = np.array([v is not None for v in valeurs] + [False])[np.minimum(haut, len(echelle))]
+        gain = regles['ponderations'][categorie[critere]] * (echelle[np.minimum(haut, len(echelle) - 1)] -
+                                                             np.asarray(points, dtype=float)[:, None])
+        echelles.append(valeurs)
+        courantes.append(valeur)
+        rangs.append(rang)
+        gains.append(np.where(possibles, gain, -np.inf).T.astype(np.float32))
+
+    echelons = np.zeros((len(leviers), n), dtype=np.int64)
+    atteints = ~vises
+    a_traiter = np.flatnonzero(vises)
+    for debut in range(0, len(a_traiter), TAILLE_LOT):
+        lot = a_traiter[debut:debut + TAILLE_LOT]
+        echelons[:, lot], atteints[lot] = _search(ecarts[lot], [g[:, lot] for g in gains])
+
+    # Entrées modifiées et score recalculé
+    modifiees = {c: colonnes[c] for c in colonnes} if isinstance(colonnes, dict) else \
+        {c: colonnes[c].to_numpy() for c in colonnes.columns}
+    valeurs_leviers, textes = {}, np.full(n, '', dtype=object)
+    for k, critere in enumerate(leviers):
+        changes = echelons[k] > 0
+        rang_vise = np.where(changes, rangs[k] + echelons[k], 0)
+        cibles = np.array(echelles[k] + [None], dtype=object)[np.where(changes, rang_vise, len(echelles[k]))]
+        valeurs_leviers[critere] = cibles
+        if changes.any():
+            nouvelle = courantes[k].astype(object)
+            nouvelle[changes] = cibles[changes]
+            modifiees[critere] = nouvelle.astype(float) if critere in regles['paliers'] else nouvelle
+            etiquettes = np.array([_label(critere, v, regles) if v is not None else '' for v in echelles[k]] + [''],
+                                  dtype=object)[np.where(changes, rang_vise, len(echelles[k]))]
+            textes = textes + np.where(changes & (textes != ''), ' ; ', '') + etiquettes
+    vise = score_batch(modifiees, regles)
+    score_vise = np.broadcast_to(vise['score_global'], (n,))
+    atteints &= ~vises | (np.broadcast_to(vise['niveau_code'], (n,)) <= codes_vises)
+    textes[vises & ~atteints] = HORS_ATTEINTE
+
+    noms_niveaux = np.array([nom for _, nom, *_ in NIVEAUX] + [''], dtype=object)
+    return {
+        'cible': noms_niveaux[np.where(codes_vises >= 0, codes_vises, len(NIVEAUX))],
+        'atteint': atteints,
+        'nb_changements': np.where(atteints, (echelons > 0).sum(axis=0), 0),
+        'echelons': np.where(atteints, echelons.sum(axis=0), 0),
+        'score_vise': np.where(atteints & vises, score_vise, np.round(brut, 1)),
+        'changements': textes,
+        'valeurs': valeurs_leviers,
+    }
+
+
+def recommend_project(data, leviers=tuple(LEVIERS)):
+    """Chemin d'un projet vers chaque niveau supérieur : niveau -> (changements, score obtenu)
+
+    Un niveau hors d'atteinte avec ces leviers donne (None, None).
+    """
+    colonnes = {c: np.atleast_1d(v) for c, v in flatten_project(data).items()}
+    code = int(score_batch(colonnes)['niveau_code'][0])
+    chemins = {}
+    for _, niveau, *_ in NIVEAUX[:code][::-1]:
+        resultat = recommend(colonnes, cible=niveau, leviers=leviers)
+        if resultat['atteint'][0]:
+            chemins[niveau] = (resultat['changements'][0].split(' ; '), float(resultat['score_vise'][0]))
+        else:
+            chemins[niveau] = (None, None)
+    return chemins
+
+
+def main(argv=None):
+    """Recommandations pour un fichier de projets"""
+    from dary_backends import get_backend
+    from dary_ingestion import read_projects
+
+    parser = argparse.ArgumentParser(description="Changements minimaux pour atteindre le niveau supérieur")
+    parser.add_argument('fichier')
+    parser.add_argument('--cible', help="niveau visé pour tous les projets (par défaut le niveau au-dessus)")
+    parser.add_argument('--leviers', default=','.join(LEVIERS), help="colonnes modifiables, séparées par des virgules")
+    parser.add_argument('-o', '--sortie')
+    args = parser.parse_args(argv)
+
+    projets = read_projects(args.fichier, get_backend('regles'))
+    debut = time.perf_counter()
+    resultat = recommend(projets, cible=args.cible, leviers=tuple(args.leviers.split(',')))
+    duree = time.perf_counter() - debut
+    vises = resultat['cible'] != ''
+    print(f"✅ {len(projets)} projet(s) en {duree:.2f}s : {int((vises & resultat['atteint']).sum())} "
+          f"chemin(s) trouvé(s), {int((vises & ~resultat['atteint']).sum())} hors d'atteinte")
+    nombres = resultat['nb_changements'][vises & resultat['atteint']]
+    for nombre, effectif in zip(*np.unique(nombres, return_counts=True)):
+        print(f"   {nombre} changement(s) : {effectif} projet(s)")
+    if args.sortie:
+        projets.assign(niveau_vise=resultat['cible'], changements=resultat['changements'],
+                       nb_changements=resultat['nb_changements'],
+                       score_vise=resultat['score_vise']).to_csv(args.sortie, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,41 +1,42 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
+
+from dary_backends import get_backend
+from dary_startup import boot, cahier_signature, load_cahier
 
 # --- CONFIGURATION DE BASE ---
 st.set_page_config(page_title="DARY Score App", page_icon="💎", layout="wide")
+boot()
 
 # --- CHARGEMENT DES DONNÉES ---
+# Signature (chemin, date, taille) : le cahier et son moteur sont relus quand le fichier change
 @st.cache_data
-def load_cahier_des_charges():
+def load_cahier_des_charges(signature):
     try:
-        return pd.read_csv("DARY_Scoring_Cahier_des_Charges.csv")
+        return load_cahier(signature[0] if signature else None)
     except Exception as e:
         st.warning("Impossible de charger le cahier des charges : " + str(e))
         return None
 
-def calculate_score(input_data, cahier):
+@st.cache_resource
+def load_backend(signature, _cahier):
+    return get_backend("cahier", cahier=_cahier)
+
+def calculate_score(input_data, cahier, signature):
     # Vérifie que les colonnes existent
     if cahier is None or input_data is None:
         return None, "Erreur de chargement des données."
 
-    # On applique les pondérations proportionnellement
-    total_weight = cahier["Pondération (%)"].sum()
-    weighted_sum = 0
-    for i, row in cahier.iterrows():
-        critere = row["Critère"]
-        poids = row["Pondération (%)"] / total_weight
-        valeur = input_data.get(critere, np.nan)
-        if pd.notnull(valeur):
-            weighted_sum += valeur * poids
-    score_final = round(weighted_sum, 2)
+    # On applique les pondérations proportionnellement (moteur 'cahier', aussi utilisable par lots)
+    resultat = load_backend(signature, cahier).score(input_data)
+    score_final = float(resultat["score_global"])
     return score_final, "Calcul terminé avec succès."
 
 # --- INTERFACE UTILISATEUR ---
 st.title("💎 Simulateur DARY Score")
 st.markdown("Une solution complète pour évaluer vos projets immobiliers selon des critères de confiance, transparence et performance.")
 
-cahier = load_cahier_des_charges()
+signature = cahier_signature()
+cahier = load_cahier_des_charges(signature)
 if cahier is None:
     st.stop()
 
@@ -48,7 +49,7 @@ with st.sidebar:
 
 # --- CALCUL ---
 if st.button("Calculer le Score DARY"):
-    score, msg = calculate_score(user_inputs, cahier)
+    score, msg = calculate_score(user_inputs, cahier, signature)
     st.session_state["score"] = score
     st.session_state["msg"] = msg
 
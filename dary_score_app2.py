@@ -1,13 +1,24 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
 import json
-import base64
-from io import BytesIO
 import os
+import time
+import uuid
+
+# pandas, plotly et les modules d'analyse sont importés dans les fonctions
+# qui les utilisent : le premier affichage n'attend pas leur chargement,
+# qui est préchauffé en arrière-plan par dary_startup
+from dary_backends import MOTEUR_DEFAUT, available_backends, get_backend
+from dary_exports import FORMATS, build_export, export_filename
+from dary_monitoring import MONITEUR, drift_alerts, load_directory, segment_label, worker_file
+from dary_ranking import RankingIndex
+from dary_scoring import NIVEAUX, flatten_project, score_project
+from dary_sessions import (BUDGET_SESSION_MO, REGISTRE, get_frame, load_history, loaded_usage, process_rss,
+                           restore_frame)
+from dary_startup import boot, wait_warmup
+from dary_timeline import HISTORIQUE, POINTS_SERIE
+from dary_timeline import load_directory as load_timelines, worker_file as timeline_file
 
 # Configuration de la page
 st.set_page_config(
@@ -16,6 +27,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed"
 )
+boot()
 
 # CSS personnalisé avec les couleurs DARY
 st.markdown("""
@@ -81,7 +93,7 @@ st.markdown("""
     .score-faible { background: #FF5722; color: white; }
     
     /* Boutons personnalisés */
-    .stButton > button {
+    .stButton > button, .stDownloadButton > button {
         background: #3CE58E;
         color: #0B2239;
         border: none;
@@ -93,7 +105,7 @@ st.markdown("""
         box-shadow: 0 4px 15px rgba(60, 229, 142, 0.3);
     }
     
-    .stButton > button:hover {
+    .stButton > button:hover, .stDownloadButton > button:hover {
         background: #2BC97A;
         transform: translateY(-2px);
         box-shadow: 0 6px 20px rgba(60, 229, 142, 0.4);
@@ -156,263 +168,83 @@ if 'projects' not in st.session_state:
     st.session_state.projects = []
 if 'current_scores' not in st.session_state:
     st.session_state.current_scores = None
+if 'current_data' not in st.session_state:
+    st.session_state.current_data = None
+if 'ranking' not in st.session_state:
+    st.session_state.ranking = RankingIndex()
 
-# Fonctions de calcul du score
-class DARYScoring:
-    """Système de scoring immobilier DARY"""
-    
-    @staticmethod
-    def calculate_financial_score(data):
-        """Calcul du score financier (40% du score total)"""
-        score = 0
-        details = {}
-        
-        # ROI projeté (30 points max)
-        roi = data.get('roi_projete', 0)
-        if roi >= 15:
-            score += 30
-            details['ROI'] = "Excellent (≥15%)"
-        elif roi >= 10:
-            score += 20
-            details['ROI'] = f"Bon ({roi}%)"
-        elif roi >= 5:
-            score += 10
-            details['ROI'] = f"Moyen ({roi}%)"
-        else:
-            score += 5
-            details['ROI'] = f"Faible ({roi}%)"
-        
-        # Ticket d'entrée (20 points max)
-        ticket = data.get('ticket_minimum', 0)
-        if ticket <= 10000:
-            score += 20
-            details['Accessibilité'] = "Très accessible"
-        elif ticket <= 50000:
-            score += 15
-            details['Accessibilité'] = "Accessible"
-        elif ticket <= 100000:
-            score += 10
-            details['Accessibilité'] = "Moyen"
-        else:
-            score += 5
-            details['Accessibilité'] = "Premium"
-        
-        # Rendement locatif (30 points max)
-        rendement = data.get('rendement_locatif', 0)
-        if rendement >= 7:
-            score += 30
-            details['Rendement locatif'] = f"Excellent ({rendement}%)"
-        elif rendement >= 5:
-            score += 20
-            details['Rendement locatif'] = f"Bon ({rendement}%)"
-        elif rendement >= 3:
-            score += 10
-            details['Rendement locatif'] = f"Moyen ({rendement}%)"
-        else:
-            score += 5
-            details['Rendement locatif'] = f"Faible ({rendement}%)"
-        
-        # Plus-value potentielle (20 points max)
-        plus_value = data.get('plus_value_estimee', 0)
-        if plus_value >= 30:
-            score += 20
-            details['Plus-value'] = f"Très élevée ({plus_value}%)"
-        elif plus_value >= 20:
-            score += 15
-            details['Plus-value'] = f"Élevée ({plus_value}%)"
-        elif plus_value >= 10:
-            score += 10
-            details['Plus-value'] = f"Modérée ({plus_value}%)"
-        else:
-            score += 5
-            details['Plus-value'] = f"Faible ({plus_value}%)"
-        
-        return min(score, 100), details
-    
-    @staticmethod
-    def calculate_location_score(data):
-        """Calcul du score de localisation (30% du score total)"""
-        score = 0
-        details = {}
-        
-        # Zone géographique
-        zone = data.get('zone', 'standard')
-        zones_scores = {
-            'premium': 40,
-            'prime': 30,
-            'emergente': 20,
-            'standard': 10
-        }
-        score += zones_scores.get(zone, 10)
-        details['Zone'] = zone.capitalize()
-        
-        # Proximité commodités
-        commodites = data.get('commodites', {})
-        score_commodites = 0
-        if commodites.get('ecoles', 0) <= 2:
-            score_commodites += 10
-        if commodites.get('commerces', 0) <= 1:
-            score_commodites += 10
-        if commodites.get('transport', 0) <= 0.5:
-            score_commodites += 10
-        if commodites.get('hopitaux', 0) <= 5:
-            score_commodites += 10
-        
-        score += score_commodites
-        details['Commodités'] = f"{score_commodites}/40 points"
-        
-        # Développement futur
-        developpement = data.get('developpement_futur', 'moyen')
-        dev_scores = {'fort': 20, 'moyen': 10, 'faible': 5}
-        score += dev_scores.get(developpement, 10)
-        details['Potentiel développement'] = developpement.capitalize()
-        
-        return min(score, 100), details
-    
-    @staticmethod
-    def calculate_property_score(data):
-        """Calcul du score du bien (20% du score total)"""
-        score = 0
-        details = {}
-        
-        # Type de bien
-        type_bien = data.get('type_bien', 'appartement')
-        type_scores = {
-            'villa': 30,
-            'riad': 25,
-            'appartement': 20,
-            'studio': 15,
-            'terrain': 10
-        }
-        score += type_scores.get(type_bien, 20)
-        details['Type'] = type_bien.capitalize()
-        
-        # État du bien
-        etat = data.get('etat', 'ready')
-        etat_scores = {
-            'neuf': 30,
-            'ready': 25,
-            'off-plan': 20,
-            'renovation': 15
-        }
-        score += etat_scores.get(etat, 20)
-        details['État'] = etat.capitalize()
-        
-        # Surface
-        surface = data.get('surface', 0)
-        if surface >= 150:
-            score += 20
-            details['Surface'] = f"Grande ({surface}m²)"
-        elif surface >= 80:
-            score += 15
-            details['Surface'] = f"Moyenne ({surface}m²)"
-        else:
-            score += 10
-            details['Surface'] = f"Petite ({surface}m²)"
-        
-        # Qualité de construction
-        qualite = data.get('qualite_construction', 'standard')
-        qualite_scores = {'luxe': 20, 'premium': 15, 'standard': 10}
-        score += qualite_scores.get(qualite, 10)
-        details['Qualité'] = qualite.capitalize()
-        
-        return min(score, 100), details
-    
-    @staticmethod
-    def calculate_risk_score(data):
-        """Calcul du score de risque (10% du score total)"""
-        score = 100  # On part de 100 et on déduit
-        details = {}
-        
-        # Risque promoteur
-        promoteur = data.get('reputation_promoteur', 'moyenne')
-        if promoteur == 'excellente':
-            score -= 0
-            details['Promoteur'] = "Très fiable"
-        elif promoteur == 'bonne':
-            score -= 10
-            details['Promoteur'] = "Fiable"
-        elif promoteur == 'moyenne':
-            score -= 25
-            details['Promoteur'] = "Standard"
-        else:
-            score -= 50
-            details['Promoteur'] = "Risqué"
-        
-        # Liquidité
-        liquidite = data.get('liquidite', 'moyenne')
-        if liquidite == 'elevee':
-            score -= 0
-            details['Liquidité'] = "Très liquide"
-        elif liquidite == 'moyenne':
-            score -= 15
-            details['Liquidité'] = "Moyenne"
-        else:
-            score -= 30
-            details['Liquidité'] = "Faible"
-        
-        # Garanties
-        garanties = data.get('garanties', False)
-        if garanties:
-            score -= 0
-            details['Garanties'] = "Présentes"
-        else:
-            score -= 20
-            details['Garanties'] = "Absentes"
-        
-        return max(score, 0), details
-    
-    @staticmethod
-    def calculate_global_score(data):
-        """Calcul du score global DARY"""
-        # Calcul des sous-scores
-        financial, financial_details = DARYScoring.calculate_financial_score(data)
-        location, location_details = DARYScoring.calculate_location_score(data)
-        property_score, property_details = DARYScoring.calculate_property_score(data)
-        risk, risk_details = DARYScoring.calculate_risk_score(data)
-        
-        # Pondération
-        global_score = (
-            financial * 0.40 +
-            location * 0.30 +
-            property_score * 0.20 +
-            risk * 0.10
-        )
-        
-        # Détermination du niveau
-        if global_score >= 80:
-            niveau = "Excellent"
-            couleur = "#3CE58E"
-            recommendation = "Investissement hautement recommandé"
-        elif global_score >= 60:
-            niveau = "Bon"
-            couleur = "#4CAF50"
-            recommendation = "Investissement recommandé"
-        elif global_score >= 40:
-            niveau = "Moyen"
-            couleur = "#FFC107"
-            recommendation = "Investissement à étudier avec précaution"
-        else:
-            niveau = "Faible"
-            couleur = "#FF5722"
-            recommendation = "Investissement déconseillé"
-        
-        return {
-            'score_global': round(global_score, 1),
-            'niveau': niveau,
-            'couleur': couleur,
-            'recommendation': recommendation,
-            'scores': {
-                'Financier': {'score': financial, 'details': financial_details, 'poids': '40%'},
-                'Localisation': {'score': location, 'details': location_details, 'poids': '30%'},
-                'Propriété': {'score': property_score, 'details': property_details, 'poids': '20%'},
-                'Risque': {'score': risk, 'details': risk_details, 'poids': '10%'}
-            },
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+def current_session_id():
+    """Identifiant de la session Streamlit en cours"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else 'local'
+
+def session_is_open(session_id):
+    """Session encore ouverte selon l'exécution Streamlit (False sans serveur)"""
+    from streamlit.runtime import Runtime
+    return Runtime.exists() and Runtime.instance().is_active_session(session_id)
+
+def track_session():
+    """Budget mémoire de la session et suivi pour la vue d'administration"""
+    for action in REGISTRE.track(st.session_state, current_session_id()):
+        st.toast(f"💾 Mémoire de session : {action}")
+
+# Champs du formulaire "Nouveau Calcul", enregistrés dans les traces d'activité
+CHAMPS_FORMULAIRE = ('nom', 'type', 'etat', 'surface', 'qualite', 'zone', 'ecoles', 'commerces',
+                     'transport', 'hopitaux', 'dev', 'ticket', 'roi', 'rendement', 'plus_value',
+                     'promoteur', 'liquidite', 'garanties')
+# Valeurs initiales du formulaire (les widgets n'ont pas de valeur par défaut propre)
+VALEURS_FORMULAIRE = {
+    'calcul_direct': True, 'nom': "Résidence Les Jardins", 'type': 'appartement', 'etat': 'neuf',
+    'surface': 80, 'qualite': 'standard', 'zone': 'standard', 'ecoles': 2.0, 'commerces': 1.0,
+    'transport': 0.5, 'hopitaux': 3.0, 'dev': 'faible', 'ticket': 50000, 'roi': 10.0, 'rendement': 5.0,
+    'plus_value': 15.0, 'promoteur': 'faible', 'liquidite': 'faible', 'garanties': False,
+}
+
+# Streamlit efface l'état des widgets non affichés : réécrites à chaque exécution
+# complète, les valeurs du formulaire survivent au passage par un autre onglet
+for champ, valeur in VALEURS_FORMULAIRE.items():
+    st.session_state[champ] = st.session_state.get(champ, valeur)
+
+def record_trace(action, params=None):
+    """Action de l'analyste ajoutée à la trace rejouable par dary_loadtest (DARY_TRACE_FILE)"""
+    chemin = os.environ.get('DARY_TRACE_FILE')
+    if chemin:
+        ligne = json.dumps({'t': time.time(), 'session': current_session_id(),
+                            'action': action, 'params': params or {}}, ensure_ascii=False)
+        with open(chemin, 'a', encoding='utf-8') as f:
+            f.write(ligne + '\n')
+
+def record_tab():
+    """Changement d'onglet enregistré dans la trace d'activité"""
+    record_trace('onglet', {'onglet': st.session_state.onglet})
+
+@st.cache_resource
+def load_poi_index(path):
+    """Index spatial des points d'intérêt, construit une fois par processus"""
+    from dary_geo import load_poi
+    if not os.path.exists(path):
+        return None
+    try:
+        return load_poi(path)
+    except Exception as e:
+        st.warning(f"Impossible de charger les points d'intérêt : {str(e)}")
+        return None
+
+@st.cache_resource
+def load_gazetteer_index(path):
+    """Référentiel des quartiers, indexé une fois par processus"""
+    from dary_gazetteer import load_gazetteer
+    if not os.path.exists(path):
+        return None
+    try:
+        return load_gazetteer(path)
+    except Exception as e:
+        st.warning(f"Impossible de charger le référentiel des quartiers : {str(e)}")
+        return None
 
 def create_gauge_chart(score, title="Score DARY"):
     """Création d'un graphique gauge pour le score"""
+    import plotly.graph_objects as go
     if score >= 80:
         color = "#3CE58E"
     elif score >= 60:
@@ -460,6 +292,7 @@ def create_gauge_chart(score, title="Score DARY"):
 
 def create_spider_chart(scores_dict):
     """Création d'un graphique radar pour les sous-scores"""
+    import plotly.graph_objects as go
     categories = list(scores_dict.keys())
     values = [scores_dict[cat]['score'] for cat in categories]
     
@@ -501,277 +334,706 @@ def create_spider_chart(scores_dict):
     
     return fig
 
-def generate_pdf_report(data, scores):
-    """Génération d'un rapport PDF (simulé avec HTML)"""
-    html_content = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial; padding: 20px; }}
-            h1 {{ color: #0B2239; }}
-            h2 {{ color: #3CE58E; }}
-            .score {{ font-size: 48px; font-weight: bold; color: {scores['couleur']}; }}
-            table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-            th, td {{ padding: 10px; border: 1px solid #ddd; text-align: left; }}
-            th {{ background: #0B2239; color: white; }}
-        </style>
-    </head>
-    <body>
-        <h1>Rapport DARY Score</h1>
-        <p>Date: {scores['timestamp']}</p>
-        <h2>Score Global: <span class="score">{scores['score_global']}/100</span></h2>
-        <p>Niveau: {scores['niveau']}</p>
-        <p>Recommandation: {scores['recommendation']}</p>
+def format_percentile(percentile_global, percentile_zone, zone):
+    """Ligne HTML du positionnement d'un projet dans le portefeuille"""
+    if percentile_global is None:
+        ligne = "Premier projet du portefeuille"
+    else:
+        ligne = f"Percentile {percentile_global:.0f} du portefeuille"
+        if percentile_zone is not None:
+            ligne += f" · {percentile_zone:.0f} en zone {zone}"
+    return f'<p style="margin-top: 0.5rem; color: #0B2239; font-weight: bold;">📈 {ligne}</p>'
+
+@st.cache_data(max_entries=500, show_spinner=False)
+def export_bytes(result_id, format, _data, _scores):
+    """Export d'un résultat, produit à la première demande puis réutilisé"""
+    return build_export(format, _data, _scores)
+
+def render_exports(result_id, data, scores):
+    """Exports du résultat : préparés à la demande puis téléchargés comme fichiers"""
+    st.markdown('<div class="section-header">💾 Export des Résultats</div>', unsafe_allow_html=True)
+    prets = st.session_state.setdefault('exports_prets', set())
+    
+    for col, (format, (label, mime, *_)) in zip(st.columns(len(FORMATS)), FORMATS.items()):
+        with col:
+            if (result_id, format) in prets:
+                st.download_button(label, export_bytes(result_id, format, data, scores),
+                                   file_name=export_filename(format, getattr(scores, 'horodatage', None)),
+                                   mime=mime, key=f"telecharger_{format}")
+            else:
+                st.button(label.replace("Télécharger", "Préparer"), key=f"preparer_{format}",
+                          on_click=prets.add, args=((result_id, format),))
+
+def render_cube(cube):
+    """Statistiques du portefeuille par zone, type, état et niveau, lues dans le cube d'agrégation"""
+    from dary_cube import DIMENSIONS
+    st.markdown('<div class="section-header">🧊 Analyse du Portefeuille</div>', unsafe_allow_html=True)
+    col_cube1, col_cube2 = st.columns(2)
+    with col_cube1:
+        mesure = st.selectbox("Mesure", cube.mesures, key="cube_mesure",
+                              format_func=lambda m: "Score global" if m == 'score_global' else f"Score {m}")
+        par = st.multiselect("Regrouper par", DIMENSIONS, default=['zone'], key="cube_par")
+    with col_cube2:
+        filtres = {}
+        for dimension in DIMENSIONS:
+            retenues = st.multiselect(f"Filtre {dimension}", cube.modalites[dimension], key=f"cube_{dimension}")
+            if retenues:
+                filtres[dimension] = retenues
+    lignes = cube.stats(mesure, filtres, par)
+    if lignes:
+        st.dataframe(lignes, use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucun projet pour cette sélection")
+
+def render_portfolio_optimizer(batch_results):
+    """Sélection des projets à retenir pour un budget investisseur"""
+    from dary_optimizer import optimize_portfolio
+    st.markdown('<div class="section-header">💼 Optimisation du Portefeuille</div>', unsafe_allow_html=True)
+    
+    col_opt1, col_opt2, col_opt3 = st.columns(3)
+    with col_opt1:
+        budget = st.number_input("Budget disponible (MAD)", 1000, 1000000000, 1000000, 10000, key="budget")
+        objectif = st.radio("Objectif", ["Score total", "Score pondéré par le montant investi"], key="objectif")
+    with col_opt2:
+        max_zone = st.number_input("Max projets par zone (0 = illimité)", 0, 1000, 0, key="max_zone")
+        max_type = st.number_input("Max projets par type (0 = illimité)", 0, 1000, 0, key="max_type")
+    with col_opt3:
+        approximation = st.checkbox("Approximation gloutonne (très grands portefeuilles)", key="glouton")
+    
+    if st.button("💼 Optimiser la sélection", key="optimiser"):
+        selection = optimize_portfolio(
+            batch_results,
+            budget,
+            poids='ticket_minimum' if objectif != "Score total" else None,
+            max_par_zone=max_zone or None,
+            max_par_type=max_type or None,
+            methode='greedy' if approximation else 'auto'
+        )
+        df_selection = batch_results.loc[selection['index']]
         
-        <h2>Analyse Détaillée</h2>
-        <table>
-            <tr>
-                <th>Critère</th>
-                <th>Score</th>
-                <th>Poids</th>
-                <th>Détails</th>
-            </tr>
-    """
+        col_res1, col_res2, col_res3 = st.columns(3)
+        col_res1.metric("Projets retenus", len(df_selection))
+        col_res2.metric("Montant investi", f"{selection['cout']:,.0f} MAD")
+        col_res3.metric("Score moyen", f"{df_selection['score_global'].mean():.1f}" if len(df_selection) else "-")
+        if not selection['optimal']:
+            st.caption("Solution approchée : meilleure sélection trouvée dans le temps imparti")
+        st.dataframe(df_selection, use_container_width=True, hide_index=True)
+
+def create_distribution_chart(scores):
+    """Histogramme des scores simulés avec les seuils de niveau"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Histogram(
+        x=scores,
+        xbins=dict(start=0, end=100, size=1),
+        marker=dict(color='#3CE58E', line=dict(color='#0B2239', width=1))
+    ))
+    for seuil, niveau, couleur, _ in NIVEAUX[:-1]:
+        fig.add_vline(x=seuil, line=dict(color=couleur, width=3, dash='dash'),
+                      annotation_text=niveau, annotation_font_color='white')
     
-    for categorie, info in scores['scores'].items():
-        details_str = ', '.join([f"{k}: {v}" for k, v in info['details'].items()])
-        html_content += f"""
-            <tr>
-                <td>{categorie}</td>
-                <td>{info['score']}/100</td>
-                <td>{info['poids']}</td>
-                <td>{details_str}</td>
-            </tr>
-        """
+    fig.update_layout(
+        height=350,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font={'color': "white"},
+        xaxis=dict(title='Score DARY', range=[0, 100]),
+        yaxis=dict(title='Tirages'),
+        bargap=0.05,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
     
-    html_content += """
-        </table>
-        <p style="margin-top: 50px; font-size: 12px; color: #666;">
-            © 2024 DARY Score - Simulateur d'Investissement Immobilier Intelligent
-        </p>
-    </body>
-    </html>
-    """
+    return fig
+
+def render_simulation(data):
+    """Distribution du score sous incertitude des entrées financières"""
+    from dary_simulation import simulate_project
+    with st.expander("🎲 Simulation Monte Carlo des entrées incertaines"):
+        st.caption(f"Projet : {data['nom_projet']} — fourchette basse / probable / haute autour des valeurs saisies")
+        col_sim1, col_sim2, col_sim3, col_sim4 = st.columns(4)
+        with col_sim1:
+            marge_roi = st.number_input("ROI ± (points)", 0.0, 15.0, 2.0, 0.5, key="sim_roi")
+        with col_sim2:
+            marge_rendement = st.number_input("Rendement ± (points)", 0.0, 10.0, 1.0, 0.5, key="sim_rendement")
+        with col_sim3:
+            marge_plus_value = st.number_input("Plus-value ± (points)", 0.0, 30.0, 5.0, 1.0, key="sim_plus_value")
+        with col_sim4:
+            n_samples = st.selectbox("Tirages", [1000, 10000, 100000], index=1, key="sim_tirages")
+        
+        incertitudes = {}
+        for colonne, marge in (('roi_projete', marge_roi),
+                               ('rendement_locatif', marge_rendement),
+                               ('plus_value_estimee', marge_plus_value)):
+            if marge > 0:
+                valeur = data[colonne]
+                incertitudes[colonne] = ('triangulaire', max(valeur - marge, 0), valeur, valeur + marge)
+        
+        if st.button("🎲 Lancer la simulation", key="simuler"):
+            simulation = simulate_project(data, incertitudes, n_samples)
+            colonnes = st.columns(len(NIVEAUX))
+            for col, (niveau, proba) in zip(colonnes, simulation['probabilites'].items()):
+                col.metric(f"Probabilité {niveau}", f"{proba:.0%}")
+            st.plotly_chart(create_distribution_chart(simulation['scores']), use_container_width=True)
+            quantiles = simulation['quantiles']
+            st.caption(f"Score médian {quantiles[50]} · intervalle 90 % [{quantiles[5]} ; {quantiles[95]}] "
+                       f"· écart-type {simulation['ecart_type']}")
+
+def render_portfolio_simulation(batch_results):
+    """Probabilité de chaque niveau pour tous les projets du portefeuille"""
+    import pandas as pd
+    from dary_simulation import simulate_portfolio
+    st.markdown('<div class="section-header">🎲 Incertitude du Portefeuille</div>', unsafe_allow_html=True)
+    
+    col_inc1, col_inc2, col_inc3 = st.columns(3)
+    with col_inc1:
+        marge = st.slider("Incertitude ROI / rendement / plus-value (± %)", 0, 50, 10, 5, key="marge_portefeuille")
+    with col_inc2:
+        n_samples = st.selectbox("Tirages par projet", [500, 2000, 10000], index=1, key="tirages_portefeuille")
+    with col_inc3:
+        n_jobs = st.number_input("Processus", 1, os.cpu_count() or 1, 1, key="processus")
     
-    return html_content
+    if st.button("🎲 Simuler le portefeuille", key="simuler_portefeuille") and marge > 0:
+        loi = ('relative', marge / 100)
+        incertitudes = {'roi_projete': loi, 'rendement_locatif': loi, 'plus_value_estimee': loi}
+        with st.spinner('Simulation en cours...'):
+            simulation = simulate_portfolio(batch_results, incertitudes, n_samples, n_jobs=n_jobs)
+        st.dataframe(
+            pd.concat([batch_results[['nom_projet', 'score_global', 'niveau']], simulation], axis=1),
+            use_container_width=True, hide_index=True
+        )
 
-def download_button(data, filename, label):
-    """Créer un bouton de téléchargement"""
-    b64 = base64.b64encode(data.encode()).decode()
-    href = f'<a href="data:text/html;base64,{b64}" download="{filename}" style="display: inline-block; padding: 0.75rem 2rem; background: #3CE58E; color: #0B2239; text-decoration: none; border-radius: 25px; font-weight: bold; margin-top: 1rem;">{label}</a>'
-    return href
+def create_surface_chart(surface, titre_x, titre_y):
+    """Carte de chaleur du score avec les frontières de niveau"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Heatmap(
+        x=surface['x'],
+        y=surface['y'],
+        z=surface['score'],
+        zmin=0,
+        zmax=100,
+        colorscale=[[0, '#FF5722'], [0.4, '#FFC107'], [0.6, '#4CAF50'], [0.8, '#3CE58E'], [1, '#3CE58E']],
+        colorbar=dict(title='Score', tickfont=dict(color='white')),
+        hovertemplate=f'{titre_x}: %{{x:.2f}}<br>{titre_y}: %{{y:.2f}}<br>Score: %{{z}}<extra></extra>'
+    ))
+    # Frontières Moyen / Bon / Excellent
+    fig.add_trace(go.Contour(
+        x=surface['x'],
+        y=surface['y'],
+        z=surface['score'],
+        contours=dict(start=40, end=80, size=20, coloring='none', showlabels=True,
+                      labelfont=dict(color='white', size=12)),
+        line=dict(color='white', width=2),
+        showscale=False,
+        hoverinfo='skip'
+    ))
+    
+    fig.update_layout(
+        height=450,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font={'color': "white"},
+        xaxis_title=titre_x,
+        yaxis_title=titre_y,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    
+    return fig
 
-# Interface principale
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Nouveau Calcul", "📈 Historique", "📁 Import CSV", "📖 Documentation"])
+def render_sweep(data):
+    """Analyse de sensibilité : score en fonction d'une ou deux entrées"""
+    from dary_sweep import AXES, grid, required_values, score_surface
+    with st.expander("🔬 Analyse de sensibilité (what-if)"):
+        colonnes = list(AXES)
+        col_axe1, col_axe2, col_axe3 = st.columns(3)
+        with col_axe1:
+            axe_x = st.selectbox("Axe horizontal", colonnes, format_func=lambda c: AXES[c][0], key="axe_x")
+        with col_axe2:
+            axe_y = st.selectbox("Axe vertical", [c for c in colonnes if c != axe_x], index=0,
+                                 format_func=lambda c: AXES[c][0], key="axe_y")
+        with col_axe3:
+            resolution = st.select_slider("Points par axe", [50, 100, 200, 400], value=200, key="resolution")
+        
+        valeurs_x = grid(axe_x, resolution)
+        surface = score_surface(data, axe_x, valeurs_x, axe_y, grid(axe_y, resolution))
+        st.plotly_chart(create_surface_chart(surface, AXES[axe_x][0], AXES[axe_y][0]), use_container_width=True)
+        
+        # Valeur à atteindre pour chaque niveau, les autres entrées restant fixes
+        besoins = required_values(data, axe_x, valeurs_x)
+        actuelle = flatten_project(data).get(axe_x)
+        colonnes_niveaux = st.columns(len(besoins))
+        for col, (niveau, valeur) in zip(colonnes_niveaux, besoins.items()):
+            if valeur is None:
+                affichage = "Hors d'atteinte"
+            elif valeur == actuelle:
+                affichage = "✓ Atteint"
+            else:
+                affichage = f"{valeur:,.2f}"
+            col.metric(f"{AXES[axe_x][0]} pour {niveau}", affichage)
 
-with tab1:
-    st.markdown('<div class="section-header">📊 Calcul du Score DARY</div>', unsafe_allow_html=True)
+def load_uploaded_csv(uploaded_files):
+    """Lecture des fichiers importés (CSV ou ZIP de CSV), une seule fois par upload"""
+    from dary_geo import fill_distances
+    from dary_gazetteer import APPROCHEE, EXACTE, FICHIER_REFERENTIEL, PREFIXE, fill_zones
+    from dary_ingestion import check_columns, read_many
+    from dary_market import FICHIER_MARCHE, join_market, load_market, load_rules
+    upload_id = tuple(f.file_id for f in uploaded_files)
+    if st.session_state.get('upload_id') != upload_id:
+        # Fichiers lus en parallèle et réunis en un seul portefeuille
+        lecture = read_many(uploaded_files)
+        df = lecture['projets']
+        # Valeurs numériques contrôlées pour chaque moteur concerné : une valeur
+        # comme « nc » est refusée avec son fichier et sa ligne, pas convertie en défaut
+        for nom_moteur in available_backends():
+            moteur = load_backend(nom_moteur)
+            if set(moteur.colonnes) & set(df.columns):
+                df = check_columns(df, moteur)
+        
+        # Distances aux commodités calculées depuis les coordonnées
+        geolocalises = 0
+        index_poi = load_poi_index(os.environ.get('DARY_POI_FILE', 'points_interet.csv'))
+        if index_poi and {'latitude', 'longitude'} <= set(df.columns):
+            df = fill_distances(df, index_poi)
+            geolocalises = int(df['latitude'].notna().sum())
+        
+        # Zones absentes déduites du quartier, de l'adresse ou de la ville
+        zones_deduites = 0
+        gazetteer = load_gazetteer_index(FICHIER_REFERENTIEL)
+        if gazetteer:
+            df = fill_zones(df, gazetteer)
+            if 'zone_source' in df.columns:
+                zones_deduites = int(df['zone_source'].isin([EXACTE, PREFIXE, APPROCHEE]).sum())
+        
+        # Données de marché du quartier (référentiel relu seulement s'il a changé)
+        lecture['projets_marche'] = 0
+        marche = load_market(FICHIER_MARCHE)
+        if marche is not None:
+            df = join_market(df, marche, load_rules())
+            if 'marche_niveau' in df.columns:
+                lecture['projets_marche'] = int((df['marche_niveau'] != '').sum())
+        
+        st.session_state.upload_id = upload_id
+        st.session_state.upload_df = df
+        st.session_state.upload_lecture = {k: v for k, v in lecture.items() if k != 'projets'}
+        st.session_state.upload_geolocalises = geolocalises
+        st.session_state.upload_zones_deduites = zones_deduites
+        # Les résultats d'un fichier précédent ne s'appliquent plus
+        st.session_state.batch_results = None
+        st.session_state.batch_cube = None
+        st.session_state.comparables_index = None
+        record_trace('import', {'lignes': len(df), 'fichiers': len(lecture['fichiers'])})
+        track_session()
+    return (get_frame(st.session_state, 'upload_df'), st.session_state.upload_geolocalises,
+            st.session_state.upload_zones_deduites, st.session_state.upload_lecture)
+
+@st.cache_resource
+def load_backend(nom):
+    """Moteur de scoring partagé par toutes les sessions"""
+    return get_backend(nom)
+
+def load_comparables(batch_results):
+    """Index des comparables du dernier portefeuille analysé, construit une fois par analyse batch
+
+    Gardé dans l'état de la session (compté dans son budget mémoire et
+    déversé au-delà) : les autres sessions ne peuvent pas l'évincer.
+    """
+    batch_id = st.session_state.batch_id
+    if st.session_state.get('comparables_index') is None or st.session_state.get('comparables_batch') != batch_id:
+        from dary_comparables import ComparablesIndex
+        st.session_state.comparables_index = ComparablesIndex(batch_results)
+        st.session_state.comparables_batch = batch_id
+    return get_frame(st.session_state, 'comparables_index')
+
+def render_comparables(data, score):
+    """Projets du dernier portefeuille analysé les plus proches de la saisie"""
+    batch_results = get_frame(st.session_state, 'batch_results')
+    if batch_results is None or len(batch_results) < 2:
+        return
+    index = load_comparables(batch_results)
+    st.markdown('<div class="section-header">🏘️ Projets comparables du portefeuille</div>', unsafe_allow_html=True)
+    meilleurs = st.checkbox("Seulement les projets mieux notés", key="comparables_meilleurs")
+    comparables = index.query(flatten_project(data), k=5, score_min=score if meilleurs else None)
+    if not comparables:
+        st.info("Aucun projet comparable mieux noté dans le portefeuille")
+        return
+    st.dataframe([{'Projet': c['nom'], 'Score': c['score'], 'Écart': round(c['score'] - score, 1),
+                   'Distance': c['distance']} for c in comparables],
+                 use_container_width=True, hide_index=True)
+
+@st.cache_resource
+def load_example_data():
+    """Exemple de fichier CSV de la documentation, partagé par toutes les sessions"""
+    import pandas as pd
+    return pd.DataFrame([
+        {
+            'nom_projet': 'Résidence Palmiers',
+            'type_bien': 'appartement',
+            'etat': 'neuf',
+            'surface': 120,
+            'zone': 'premium',
+            'roi_projete': 12,
+            'rendement_locatif': 6,
+            'ticket_minimum': 75000,
+            'plus_value_estimee': 25
+        },
+        {
+            'nom_projet': 'Villa Océan',
+            'type_bien': 'villa',
+            'etat': 'ready',
+            'surface': 250,
+            'zone': 'prime',
+            'roi_projete': 15,
+            'rendement_locatif': 7,
+            'ticket_minimum': 150000,
+            'plus_value_estimee': 30
+        }
+    ])
+
+def form_data():
+    """Données du projet à partir des champs du formulaire"""
+    etat = st.session_state
+    return {
+        'nom_projet': etat.nom,
+        'type_bien': etat.type,
+        'etat': etat.etat,
+        'surface': etat.surface,
+        'qualite_construction': etat.qualite,
+        'zone': etat.zone,
+        'commodites': {
+            'ecoles': etat.ecoles,
+            'commerces': etat.commerces,
+            'transport': etat.transport,
+            'hopitaux': etat.hopitaux
+        },
+        'developpement_futur': etat.dev,
+        'ticket_minimum': etat.ticket,
+        'roi_projete': etat.roi,
+        'rendement_locatif': etat.rendement,
+        'plus_value_estimee': etat.plus_value,
+        'reputation_promoteur': etat.promoteur,
+        'liquidite': etat.liquidite,
+        'garanties': etat.garanties
+    }
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def result_preview(data):
+    """Score et tableau détaillé d'une saisie, mémorisés par valeurs d'entrée"""
+    import pandas as pd
+    scores = score_project(data)
+    # Libellés des critères produits une seule fois pour l'affichage
+    categories = scores['scores']
+    details_data = []
+    for categorie, info in categories.items():
+        for critere, valeur in info['details'].items():
+            details_data.append({
+                'Catégorie': categorie,
+                'Critère': critere,
+                'Évaluation': valeur,
+                'Score': f"{info['score']}/100",
+                'Poids': info['poids']
+            })
+    return scores, pd.DataFrame(details_data)
+
+def live_charts(scores):
+    """Jauge et radar de la session : créés une fois puis mis à jour en place"""
+    score = scores['score_global']
+    categories = scores['scores']
+    graphiques = st.session_state.get('graphiques_direct')
+    if graphiques is None:
+        graphiques = st.session_state.graphiques_direct = (create_gauge_chart(score),
+                                                           create_spider_chart(categories))
+        return graphiques
+    # Reconstruire les figures coûte ~25 ms chacune, les modifier moins d'une ms
+    jauge, radar = graphiques[0].data[0], graphiques[1].data[0]
+    jauge.value = score
+    jauge.gauge.bar.color = next(couleur for seuil, _, couleur, _ in NIVEAUX if score >= seuil)
+    jauge.gauge.threshold.value = score
+    radar.r = [info['score'] for info in categories.values()]
+    return graphiques
+
+def save_analysis():
+    """Enregistrement de la saisie courante dans l'historique, distinct du calcul"""
+    record_trace('calcul', {champ: st.session_state[champ] for champ in CHAMPS_FORMULAIRE})
+    data = form_data()
+    scores = score_project(data)
+    # Un projet réenregistré remplace son classement précédent
+    restore_frame(st.session_state, 'ranking').add(scores['score_global'], data['nom_projet'], data['zone'],
+                                                   data['type_bien'], lot=('analyse', data['nom_projet']))
+    MONITEUR.observe_result(scores, data['zone'], data['type_bien'])
+    MONITEUR.maybe_save(worker_file())
+    HISTORIQUE.record_result(data['nom_projet'], scores)
+    HISTORIQUE.maybe_save(timeline_file())
+    st.session_state.current_id = uuid.uuid4().hex
+    st.session_state.current_scores = scores
+    st.session_state.current_data = data
+    st.session_state.projects.append({
+        'id': st.session_state.current_id,
+        'nom': data['nom_projet'],
+        'date': scores['timestamp'],
+        'score': scores['score_global'],
+        'niveau': scores['niveau'],
+        'data': data,
+        'scores': scores
+    })
+    track_session()
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def level_paths(data):
+    """Chemins vers les niveaux supérieurs d'une saisie, mémorisés par valeurs d'entrée"""
+    from dary_recommend import recommend_project
+    return recommend_project(data)
+
+def render_level_paths(data):
+    """Plus petits changements qui font passer le projet au niveau supérieur"""
+    chemins = level_paths(data)
+    if not chemins:
+        return
+    st.markdown('<div class="section-header">🪜 Chemin vers le niveau supérieur</div>', unsafe_allow_html=True)
+    colonnes = st.columns(len(chemins))
+    for col, (niveau, (changements, score)) in zip(colonnes, chemins.items()):
+        with col:
+            if changements is None:
+                st.markdown(f"**{niveau}** — hors d'atteinte avec les leviers du promoteur")
+            else:
+                st.markdown(f"**{niveau}** ({score}/100) : " + ", ".join(changements))
+
+def render_result(data):
+    """Zone de résultat : jauge, score global, radar et détails par catégorie"""
+    scores, df_details = result_preview(data)
+    fig_gauge, fig_spider = live_charts(scores)
+    # Positionnement par rapport au portefeuille déjà analysé
+    ranking = get_frame(st.session_state, 'ranking')
+    zone = data['zone']
+    percentile_global = ranking.percentile(scores['score_global'])
+    percentile_zone = ranking.percentile(scores['score_global'], zone=zone)
+    
+    # Score principal avec gauge
+    st.markdown('<div class="section-header">🎯 Résultats de l\'Analyse</div>', unsafe_allow_html=True)
+    
+    col_score1, col_score2 = st.columns([2, 1])
     
+    with col_score1:
+        st.plotly_chart(fig_gauge, use_container_width=True)
+    
+    with col_score2:
+        st.markdown(f"""
+        <div class="metric-card" style="text-align: center; padding: 2rem;">
+            <h2 style="color: #0B2239;">Score Global</h2>
+            <div style="font-size: 4rem; font-weight: bold; color: {scores['couleur']};">
+                {scores['score_global']}/100
+            </div>
+            <div class="score-badge score-{scores['niveau'].lower()}" style="margin-top: 1rem;">
+                {scores['niveau']}
+            </div>
+            {format_percentile(percentile_global, percentile_zone, zone)}
+            <p style="margin-top: 1rem; color: #555;">
+                {scores['recommendation']}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Graphique radar
+    st.markdown('<div class="section-header">📊 Analyse Multi-Critères</div>', unsafe_allow_html=True)
+    st.plotly_chart(fig_spider, use_container_width=True)
+    
+    # Tableau détaillé
+    st.markdown('<div class="section-header">📋 Détails par Catégorie</div>', unsafe_allow_html=True)
+    st.dataframe(df_details, use_container_width=True, hide_index=True)
+
+# Onglets de l'interface : chaque onglet est un fragment, ses interactions
+# ne réexécutent que lui
+@st.fragment
+def render_formulaire():
+    """Saisie du projet et résultat en direct : seul ce fragment est réexécuté à chaque saisie"""
+    debut = time.perf_counter()
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown('<div class="metric-card"><h3>🏢 Informations du Projet</h3>', unsafe_allow_html=True)
-        nom_projet = st.text_input("Nom du projet", "Résidence Les Jardins", key="nom")
-        type_bien = st.selectbox("Type de bien", ['appartement', 'villa', 'riad', 'studio', 'terrain'], key="type")
-        etat = st.selectbox("État du bien", ['neuf', 'ready', 'off-plan', 'renovation'], key="etat")
-        surface = st.number_input("Surface (m²)", 10, 1000, 80, key="surface")
-        qualite_construction = st.selectbox("Qualité de construction", ['standard', 'premium', 'luxe'], key="qualite")
+        st.text_input("Nom du projet", key="nom")
+        st.selectbox("Type de bien", ['appartement', 'villa', 'riad', 'studio', 'terrain'], key="type")
+        st.selectbox("État du bien", ['neuf', 'ready', 'off-plan', 'renovation'], key="etat")
+        st.number_input("Surface (m²)", 10, 1000, step=1, key="surface")
+        st.selectbox("Qualité de construction", ['standard', 'premium', 'luxe'], key="qualite")
         st.markdown('</div>', unsafe_allow_html=True)
         
         st.markdown('<div class="metric-card"><h3>📍 Localisation</h3>', unsafe_allow_html=True)
-        zone = st.selectbox("Zone", ['standard', 'emergente', 'prime', 'premium'], key="zone")
+        st.selectbox("Zone", ['standard', 'emergente', 'prime', 'premium'], key="zone")
         
         st.markdown("**Proximité des commodités (km):**")
         col_a, col_b = st.columns(2)
         with col_a:
-            dist_ecoles = st.number_input("Écoles", 0.0, 20.0, 2.0, 0.5, key="ecoles")
-            dist_commerces = st.number_input("Commerces", 0.0, 20.0, 1.0, 0.5, key="commerces")
+            st.number_input("Écoles", 0.0, 20.0, step=0.5, key="ecoles")
+            st.number_input("Commerces", 0.0, 20.0, step=0.5, key="commerces")
         with col_b:
-            dist_transport = st.number_input("Transport", 0.0, 20.0, 0.5, 0.5, key="transport")
-            dist_hopitaux = st.number_input("Hôpitaux", 0.0, 20.0, 3.0, 0.5, key="hopitaux")
+            st.number_input("Transport", 0.0, 20.0, step=0.5, key="transport")
+            st.number_input("Hôpitaux", 0.0, 20.0, step=0.5, key="hopitaux")
         
-        developpement_futur = st.selectbox("Potentiel de développement", ['faible', 'moyen', 'fort'], key="dev")
+        st.selectbox("Potentiel de développement", ['faible', 'moyen', 'fort'], key="dev")
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="metric-card"><h3>💰 Données Financières</h3>', unsafe_allow_html=True)
-        ticket_minimum = st.number_input("Ticket minimum (MAD)", 1000, 10000000, 50000, 1000, key="ticket")
-        roi_projete = st.slider("ROI projeté (%)", 0.0, 30.0, 10.0, 0.5, key="roi")
-        rendement_locatif = st.slider("Rendement locatif (%)", 0.0, 15.0, 5.0, 0.5, key="rendement")
-        plus_value_estimee = st.slider("Plus-value estimée (%)", 0.0, 50.0, 15.0, 1.0, key="plus_value")
+        st.number_input("Ticket minimum (MAD)", 1000, 10000000, step=1000, key="ticket")
+        st.slider("ROI projeté (%)", 0.0, 30.0, step=0.5, key="roi")
+        st.slider("Rendement locatif (%)", 0.0, 15.0, step=0.5, key="rendement")
+        st.slider("Plus-value estimée (%)", 0.0, 50.0, step=1.0, key="plus_value")
         st.markdown('</div>', unsafe_allow_html=True)
         
         st.markdown('<div class="metric-card"><h3>⚠️ Gestion des Risques</h3>', unsafe_allow_html=True)
-        reputation_promoteur = st.selectbox("Réputation du promoteur", ['faible', 'moyenne', 'bonne', 'excellente'], key="promoteur")
-        liquidite = st.selectbox("Liquidité du marché", ['faible', 'moyenne', 'elevee'], key="liquidite")
-        garanties = st.checkbox("Garanties disponibles", key="garanties")
+        st.selectbox("Réputation du promoteur", ['faible', 'moyenne', 'bonne', 'excellente'], key="promoteur")
+        st.selectbox("Liquidité du marché", ['faible', 'moyenne', 'elevee'], key="liquidite")
+        st.checkbox("Garanties disponibles", key="garanties")
         st.markdown('</div>', unsafe_allow_html=True)
     
-    # Bouton de calcul
+    # En direct, chaque saisie validée (curseur relâché, champ quitté) met à
+    # jour le résultat ; sinon le calcul attend le bouton
+    if st.session_state.calcul_direct:
+        calculer = True
+    else:
+        with st.columns([1, 2, 1])[1]:
+            calculer = st.button("🚀 Calculer le Score DARY", type="primary", use_container_width=True)
+    
+    if calculer:
+        wait_warmup()
+        render_result(form_data())
+        st.caption(f"⚡ Calcul et rendu en {(time.perf_counter() - debut) * 1000:.0f} ms")
+
+@st.fragment
+def render_nouveau_calcul():
+    """Onglet de calcul du score d'un projet"""
+    st.markdown('<div class="section-header">📊 Calcul du Score DARY</div>', unsafe_allow_html=True)
+    st.toggle("⚡ Calcul en direct", key="calcul_direct",
+              help="Met à jour le résultat à chaque saisie, sans l'enregistrer dans l'historique")
+    
+    render_formulaire()
+    
+    # Enregistrement dans l'historique, action distincte du calcul
     col_button = st.columns([1, 2, 1])[1]
     with col_button:
-        if st.button("🚀 Calculer le Score DARY", type="primary", use_container_width=True):
-            # Préparation des données
-            data = {
-                'nom_projet': nom_projet,
-                'type_bien': type_bien,
-                'etat': etat,
-                'surface': surface,
-                'qualite_construction': qualite_construction,
-                'zone': zone,
-                'commodites': {
-                    'ecoles': dist_ecoles,
-                    'commerces': dist_commerces,
-                    'transport': dist_transport,
-                    'hopitaux': dist_hopitaux
-                },
-                'developpement_futur': developpement_futur,
-                'ticket_minimum': ticket_minimum,
-                'roi_projete': roi_projete,
-                'rendement_locatif': rendement_locatif,
-                'plus_value_estimee': plus_value_estimee,
-                'reputation_promoteur': reputation_promoteur,
-                'liquidite': liquidite,
-                'garanties': garanties
-            }
-            
-            # Calcul du score
-            with st.spinner('Analyse en cours...'):
-                scores = DARYScoring.calculate_global_score(data)
-                st.session_state.current_scores = scores
-                st.session_state.projects.append({
-                    'nom': nom_projet,
-                    'date': scores['timestamp'],
-                    'score': scores['score_global'],
-                    'niveau': scores['niveau'],
-                    'data': data,
-                    'scores': scores
-                })
-            
-            # Affichage des résultats
-            st.success("✅ Analyse terminée!")
-            
-            # Score principal avec gauge
-            st.markdown('<div class="section-header">🎯 Résultats de l\'Analyse</div>', unsafe_allow_html=True)
-            
-            col_score1, col_score2 = st.columns([2, 1])
-            
-            with col_score1:
-                fig_gauge = create_gauge_chart(scores['score_global'])
-                st.plotly_chart(fig_gauge, use_container_width=True)
-            
-            with col_score2:
-                st.markdown(f"""
-                <div class="metric-card" style="text-align: center; padding: 2rem;">
-                    <h2 style="color: #0B2239;">Score Global</h2>
-                    <div style="font-size: 4rem; font-weight: bold; color: {scores['couleur']};">
-                        {scores['score_global']}/100
-                    </div>
-                    <div class="score-badge score-{scores['niveau'].lower()}" style="margin-top: 1rem;">
-                        {scores['niveau']}
-                    </div>
-                    <p style="margin-top: 1rem; color: #555;">
-                        {scores['recommendation']}
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Graphique radar
-            st.markdown('<div class="section-header">📊 Analyse Multi-Critères</div>', unsafe_allow_html=True)
-            fig_spider = create_spider_chart(scores['scores'])
-            st.plotly_chart(fig_spider, use_container_width=True)
-            
-            # Tableau détaillé
-            st.markdown('<div class="section-header">📋 Détails par Catégorie</div>', unsafe_allow_html=True)
-            
-            details_data = []
-            for categorie, info in scores['scores'].items():
-                for critere, valeur in info['details'].items():
-                    details_data.append({
-                        'Catégorie': categorie,
-                        'Critère': critere,
-                        'Évaluation': valeur,
-                        'Score': f"{info['score']}/100",
-                        'Poids': info['poids']
-                    })
-            
-            df_details = pd.DataFrame(details_data)
-            st.dataframe(df_details, use_container_width=True, hide_index=True)
-            
-            # Export des résultats
-            st.markdown('<div class="section-header">💾 Export des Résultats</div>', unsafe_allow_html=True)
-            
-            col_export1, col_export2, col_export3 = st.columns(3)
-            
-            with col_export1:
-                # Export JSON
-                json_data = json.dumps(scores, indent=2)
-                b64_json = base64.b64encode(json_data.encode()).decode()
-                st.markdown(
-                    f'<a href="data:application/json;base64,{b64_json}" '
-                    f'download="dary_score_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json" '
-                    f'style="display: inline-block; padding: 0.75rem 2rem; background: #3CE58E; '
-                    f'color: #0B2239; text-decoration: none; border-radius: 25px; font-weight: bold;">📄 Télécharger JSON</a>',
-                    unsafe_allow_html=True
-                )
-            
-            with col_export2:
-                # Export HTML (rapport)
-                html_report = generate_pdf_report(data, scores)
-                st.markdown(
-                    download_button(html_report, 
-                                  f"rapport_dary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html",
-                                  "📊 Télécharger Rapport"),
-                    unsafe_allow_html=True
-                )
-            
-            with col_export3:
-                # Export CSV
-                csv_data = pd.DataFrame([{
-                    'Projet': nom_projet,
-                    'Date': scores['timestamp'],
-                    'Score Global': scores['score_global'],
-                    'Niveau': scores['niveau'],
-                    'Score Financier': scores['scores']['Financier']['score'],
-                    'Score Localisation': scores['scores']['Localisation']['score'],
-                    'Score Propriété': scores['scores']['Propriété']['score'],
-                    'Score Risque': scores['scores']['Risque']['score']
-                }]).to_csv(index=False)
-                
-                b64_csv = base64.b64encode(csv_data.encode()).decode()
-                st.markdown(
-                    f'<a href="data:text/csv;base64,{b64_csv}" '
-                    f'download="export_dary_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv" '
-                    f'style="display: inline-block; padding: 0.75rem 2rem; background: #3CE58E; '
-                    f'color: #0B2239; text-decoration: none; border-radius: 25px; font-weight: bold;">📑 Télécharger CSV</a>',
-                    unsafe_allow_html=True
-                )
-
-with tab2:
+        if st.button("💾 Enregistrer l'analyse", type="primary", use_container_width=True, key="enregistrer",
+                     on_click=save_analysis):
+            st.success("✅ Analyse enregistrée dans l'historique")
+
+    # Exports, chemin vers le niveau supérieur, comparables, simulation Monte Carlo
+    # et sensibilité du dernier projet enregistré : hors du fragment de saisie,
+    # ils ne ralentissent pas le résultat en direct et ne suivent pas la saisie
+    data, scores = st.session_state.current_data, st.session_state.current_scores
+    if data is None:
+        st.caption("Exports, chemins vers le niveau supérieur, comparables, simulation et sensibilité "
+                   "s'affichent ici pour l'analyse enregistrée.")
+        return
+    st.markdown('<div class="section-header">📌 Analyse enregistrée</div>', unsafe_allow_html=True)
+    st.caption(f"{data['nom_projet']} : {scores['score_global']}/100 ({scores['niveau']}). Les sections suivantes "
+               "portent sur cette analyse, pas sur la saisie en cours : enregistrez pour les mettre à jour.")
+    render_exports(st.session_state.current_id, data, scores)
+    render_level_paths(data)
+    render_comparables(data, scores['score_global'])
+    render_simulation(data)
+    render_sweep(data)
+
+# Historique : projets proposés par la recherche et séries tracées au plus
+MAX_PROPOSITIONS = 50
+MAX_SERIES_AFFICHEES = 20
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_other_timelines():
+    """Historiques sauvegardés par les autres workers, relus au plus une fois par minute
+
+    Retourne (identifiant de la lecture, historique fusionné).
+    """
+    return uuid.uuid4().hex, load_timelines(exclure=timeline_file())
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def merged_timeline(_autres, lecture, version):
+    """Historiques des autres workers et du processus fusionnés et triés une seule fois
+
+    Recalculé quand les autres workers sont relus (lecture) ou que
+    l'historique du processus change (version).
+    """
+    from dary_timeline import TimelineStore
+    return TimelineStore().merge(_autres).merge(HISTORIQUE)
+
+def render_timeline(noms_session):
+    """Évolution des scores : projets choisis (séries réduites par LTTB) ou distribution du portefeuille"""
+    import plotly.graph_objects as go
+    
+    lecture, autres = load_other_timelines()
+    historique = merged_timeline(autres, lecture, HISTORIQUE.version) if autres.projets else HISTORIQUE
+    if not historique.projets:
+        return
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        mesure = st.selectbox("Mesure", ('score_global',) + historique.categories, key="historique_mesure",
+                              format_func=lambda m: "Score global" if m == 'score_global' else m)
+    with col2:
+        recherche = st.text_input("Rechercher un projet", key="historique_recherche",
+                                  placeholder="Nom ou partie du nom")
+    # Sélection gardée hors du widget : ses options changent avec la recherche
+    choisis = [nom for nom in st.session_state.setdefault(
+        'historique_choisis', [nom for nom in dict.fromkeys(reversed(noms_session)) if nom in historique][:5])
+        if nom in historique]
+    trouves = []
+    if recherche:
+        cherche = recherche.lower()
+        trouves = [nom for nom in historique.projets if cherche in str(nom).lower()][:MAX_PROPOSITIONS]
+    choisis = st.multiselect("Projets affichés (vide : distribution de tout le portefeuille)",
+                             list(dict.fromkeys(choisis + trouves)), default=choisis,
+                             max_selections=MAX_SERIES_AFFICHEES)
+    st.session_state.historique_choisis = choisis
+    libelle = 'Score' if mesure == 'score_global' else mesure
+    
+    debut = time.perf_counter()
+    fig = go.Figure()
+    if choisis:
+        series = historique.downsampled(choisis, mesure, POINTS_SERIE)
+        for nom, dates, valeurs in series:
+            fig.add_trace(go.Scatter(x=[datetime.fromtimestamp(d) for d in dates], y=valeurs, name=nom,
+                                     mode='lines+markers'))
+        resume = (f"{len(series)} série(s), {sum(len(dates) for _, dates, _ in series)} point(s) affichés "
+                  f"sur {len(historique)}")
+    else:
+        # Tout le portefeuille : médiane et bande p10 - p90 par période, taille fixe quel que soit le volume
+        bandes = historique.bands(mesure, POINTS_SERIE)
+        dates = [datetime.fromtimestamp(d) for d in bandes['date']]
+        mode = 'lines' if len(dates) > 1 else 'markers'
+        fig.add_trace(go.Scatter(x=dates, y=bandes[0.9], name='p90', mode=mode, line=dict(color='#3CE58E', width=1)))
+        fig.add_trace(go.Scatter(x=dates, y=bandes[0.1], name='p10', mode=mode, fill='tonexty',
+                                 fillcolor='rgba(60, 229, 142, 0.2)', line=dict(color='#3CE58E', width=1)))
+        fig.add_trace(go.Scatter(x=dates, y=bandes[0.5], name='médiane', mode=mode,
+                                 line=dict(color='#3CE58E', width=3)))
+        resume = (f"{len(historique.projets)} projet(s), {len(historique)} point(s) résumés "
+                  f"en {len(dates)} période(s)")
+    duree = time.perf_counter() - debut
+    fig.update_layout(
+        title='Évolution des Scores DARY',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        xaxis_title='Date',
+        yaxis_title=libelle,
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{resume} (calcul en {duree * 1000:.0f} ms)")
+
+@st.fragment
+def render_historique():
+    """Onglet de l'historique des analyses de la session"""
+    wait_warmup()
+    
     st.markdown('<div class="section-header">📈 Historique des Analyses</div>', unsafe_allow_html=True)
     
-    if st.session_state.projects:
-        # Graphique d'évolution
-        df_history = pd.DataFrame(st.session_state.projects)
-        
-        fig_history = px.line(df_history, x='date', y='score', 
-                              title='Évolution des Scores DARY',
-                              markers=True, hover_data=['nom', 'niveau'])
-        fig_history.update_traces(line_color='#3CE58E', marker_size=10)
-        fig_history.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            xaxis_title='Date',
-            yaxis_title='Score',
-            height=400
-        )
-        st.plotly_chart(fig_history, use_container_width=True)
+    projets = load_history(st.session_state, REGISTRE.session_dir(current_session_id()))
+    # Évolution de chaque projet scoré (saisies, analyses batch, dossier surveillé)
+    render_timeline([projet['nom'] for projet in projets or []])
+    if projets:
+        if st.session_state.get('projects_archives'):
+            st.caption(f"💾 {st.session_state.projects_archives} analyses anciennes archivées sur disque "
+                       f"(budget mémoire de session : {BUDGET_SESSION_MO:g} Mo)")
         
         # Tableau historique
         st.markdown('<div class="section-header">📊 Projets Analysés</div>', unsafe_allow_html=True)
         
-        for idx, projet in enumerate(reversed(st.session_state.projects)):
+        for idx, projet in enumerate(reversed(projets)):
             with st.expander(f"🏢 {projet['nom']} - Score: {projet['score']} ({projet['niveau']})"):
                 col1, col2 = st.columns(2)
                 with col1:
@@ -784,7 +1046,14 @@ with tab2:
     else:
         st.info("📝 Aucune analyse effectuée pour le moment. Commencez par calculer un score dans l'onglet 'Nouveau Calcul'.")
 
-with tab3:
+@st.fragment
+def render_import_csv():
+    """Onglet d'import et d'analyse batch d'un fichier CSV"""
+    wait_warmup()
+    import pandas as pd
+    from dary_cube import ScoreCube
+    from dary_ingestion import COLONNE_SOURCE, prepare_projects
+    
     st.markdown('<div class="section-header">📁 Import de Données CSV</div>', unsafe_allow_html=True)
     
     st.markdown("""
@@ -795,74 +1064,131 @@ with tab3:
     </div>
     """, unsafe_allow_html=True)
     
-    uploaded_file = st.file_uploader("Choisir un fichier CSV", type="csv")
+    uploaded_files = st.file_uploader("Choisir un ou plusieurs fichiers CSV (ou archives ZIP de CSV)",
+                                      type=["csv", "zip"], accept_multiple_files=True)
     
-    if uploaded_file is not None:
+    if uploaded_files:
         try:
-            df = pd.read_csv(uploaded_file)
-            st.success(f"✅ {len(df)} projets chargés avec succès!")
+            df, geolocalises, zones_deduites, lecture = load_uploaded_csv(uploaded_files)
+            fichiers = lecture['fichiers']
+            lus = sum(1 for rapport in fichiers if not rapport['erreur'])
+            st.success(f"✅ {len(df)} projets chargés avec succès depuis {lus} fichier(s)!")
+            for rapport in fichiers:
+                if rapport['erreur']:
+                    st.warning(f"⚠️ Fichier ignoré — {rapport['erreur']}")
+            if lecture['colonnes_partielles']:
+                st.info("ℹ️ Colonnes absentes de certains fichiers (valeurs par défaut) : " + ", ".join(
+                    f"{c} ({n})" for c, n in lecture['colonnes_partielles'].items()))
+            if len(fichiers) > 1:
+                with st.expander("⏱️ Lecture par fichier"):
+                    st.dataframe([{'Fichier': r['fichier'], 'Lignes': r['lignes'], 'Mo': round(r['octets'] / 1e6, 2),
+                                   'Durée (s)': round(r['duree_s'], 3), 'Lignes/s': int(r['lignes_par_s']),
+                                   'Mo/s': round(r['mo_par_s'], 1)} for r in fichiers],
+                                 use_container_width=True)
+            if geolocalises:
+                st.info(f"📍 Distances aux commodités calculées depuis les coordonnées de "
+                        f"{geolocalises} projets")
+            if zones_deduites:
+                st.info(f"🗺️ Zone déduite de l'adresse pour {zones_deduites} projets "
+                        f"(colonne zone_source)")
+            if lecture['projets_marche']:
+                st.info(f"🏘️ Données de marché du quartier jointes pour {lecture['projets_marche']} projets "
+                        f"(plus-value, liquidité et développement déduits selon les règles)")
             
             st.dataframe(df, use_container_width=True)
             
+            # Choix du moteur seulement si plusieurs sont disponibles (cahier des charges présent)
+            moteurs = available_backends()
+            nom_moteur = MOTEUR_DEFAUT
+            if len(moteurs) > 1:
+                nom_moteur = st.selectbox("Moteur de scoring", moteurs, key="moteur",
+                                          index=moteurs.index(MOTEUR_DEFAUT) if MOTEUR_DEFAUT in moteurs else 0,
+                                          format_func=lambda nom: load_backend(nom).libelle)
+            
+            dedoublonner = st.checkbox("🧹 Regrouper les projets en double (noms voisins, même bloc zone / type / "
+                                       "surface / ticket)", value=False, key="dedoublonner")
+            # Recherche exacte : environ 8 s par million de projets, seulement sur demande
+            avec_chemins = st.checkbox("🎯 Chemin vers le niveau supérieur (colonnes Niveau visé, Chemin, "
+                                       "Score visé ; plus lent sur les gros fichiers)", value=False,
+                                       key="chemins_batch")
+            
             if st.button("🔄 Analyser tous les projets", type="primary"):
-                results = []
-                progress_bar = st.progress(0)
+                record_trace('analyse_batch')
+                # Un projet importé plusieurs fois sous des noms voisins n'est scoré qu'une fois
+                a_scorer = df
+                if dedoublonner:
+                    from dary_dedup import deduplicate
+                    doublons = deduplicate(df)
+                    a_scorer = doublons['projets']
+                    if doublons['regroupes']:
+                        st.info(f"🧹 {doublons['regroupes']} doublon(s) regroupé(s) : "
+                                f"{len(a_scorer)} projets uniques analysés")
+                        with st.expander("Groupes de doublons"):
+                            st.dataframe(doublons['groupes'], use_container_width=True)
+                # Calcul vectorisé : seuls les sous-scores numériques sont produits
+                moteur = load_backend(nom_moteur)
+                projets = prepare_projects(a_scorer, moteur)
+                resultat = moteur.score(projets)
+                df_results = pd.DataFrame({
+                    'Projet': projets['nom_projet'],
+                    'Score': resultat['score_global'],
+                    'Niveau': resultat['niveau'],
+                })
+                if COLONNE_SOURCE in projets.columns and projets[COLONNE_SOURCE].nunique() > 1:
+                    df_results.insert(1, 'Fichier', projets[COLONNE_SOURCE].to_numpy())
                 
-                for idx, row in df.iterrows():
-                    # Conversion des données CSV en format attendu
-                    data = {
-                        'nom_projet': row.get('nom_projet', f'Projet {idx+1}'),
-                        'type_bien': row.get('type_bien', 'appartement'),
-                        'etat': row.get('etat', 'ready'),
-                        'surface': row.get('surface', 80),
-                        'qualite_construction': row.get('qualite_construction', 'standard'),
-                        'zone': row.get('zone', 'standard'),
-                        'commodites': {
-                            'ecoles': row.get('dist_ecoles', 2),
-                            'commerces': row.get('dist_commerces', 1),
-                            'transport': row.get('dist_transport', 0.5),
-                            'hopitaux': row.get('dist_hopitaux', 3)
-                        },
-                        'developpement_futur': row.get('developpement_futur', 'moyen'),
-                        'ticket_minimum': row.get('ticket_minimum', 50000),
-                        'roi_projete': row.get('roi_projete', 10),
-                        'rendement_locatif': row.get('rendement_locatif', 5),
-                        'plus_value_estimee': row.get('plus_value_estimee', 15),
-                        'reputation_promoteur': row.get('reputation_promoteur', 'moyenne'),
-                        'liquidite': row.get('liquidite', 'moyenne'),
-                        'garanties': row.get('garanties', False)
-                    }
-                    
-                    scores = DARYScoring.calculate_global_score(data)
-                    results.append({
-                        'Projet': data['nom_projet'],
-                        'Score': scores['score_global'],
-                        'Niveau': scores['niveau'],
-                        'Recommandation': scores['recommendation']
-                    })
-                    
-                    progress_bar.progress((idx + 1) / len(df))
+                # Niveaux DARY : classement, suivi et optimisation de portefeuille
+                if 'niveau_code' in resultat:
+                    df_results['Recommandation'] = [NIVEAUX[code][3] for code in resultat['niveau_code']]
+                    # Changements minimaux pour passer au niveau supérieur
+                    if avec_chemins:
+                        from dary_recommend import recommend
+                        chemins = recommend(projets, actuel=resultat)
+                        df_results['Niveau visé'] = chemins['cible']
+                        df_results['Chemin'] = chemins['changements']
+                        df_results['Score visé'] = chemins['score_vise']
+                    # Un import réanalysé remplace ses projets dans le classement
+                    restore_frame(st.session_state, 'ranking').add_many(
+                        df_results['Score'], noms=df_results['Projet'],
+                        zones=projets['zone'], types_bien=projets['type_bien'],
+                        lot=('import', st.session_state.upload_id)
+                    )
+                    MONITEUR.observe(resultat, projets['zone'], projets['type_bien'])
+                    MONITEUR.maybe_save(worker_file())
+                    HISTORIQUE.record(projets['nom_projet'], resultat)
+                    HISTORIQUE.maybe_save(timeline_file())
+                    st.session_state.batch_results = projets.assign(
+                        score_global=resultat['score_global'], niveau=resultat['niveau']
+                    )
+                    # Identifiant de l'analyse : l'index des comparables est reconstruit à chaque analyse
+                    st.session_state.batch_id = uuid.uuid4().hex
+                st.session_state.batch_cube = ScoreCube.for_backend(moteur).add(resultat, projets)
+                track_session()
                 
                 # Affichage des résultats
-                df_results = pd.DataFrame(results)
                 st.markdown('<div class="section-header">📊 Résultats de l\'Analyse Batch</div>', unsafe_allow_html=True)
                 st.dataframe(df_results, use_container_width=True)
                 
                 # Export des résultats
-                csv_export = df_results.to_csv(index=False)
-                b64 = base64.b64encode(csv_export.encode()).decode()
-                st.markdown(
-                    f'<a href="data:text/csv;base64,{b64}" '
-                    f'download="resultats_batch_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv" '
-                    f'style="display: inline-block; padding: 0.75rem 2rem; background: #3CE58E; '
-                    f'color: #0B2239; text-decoration: none; border-radius: 25px; font-weight: bold; margin-top: 1rem;">💾 Exporter les résultats</a>',
-                    unsafe_allow_html=True
-                )
+                st.download_button("💾 Exporter les résultats", df_results.to_csv(index=False),
+                                   file_name=f"resultats_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                                   mime="text/csv", key="exporter_batch")
+            
+            if st.session_state.get('batch_cube') is not None:
+                render_cube(st.session_state.batch_cube)
+            
+            # Optimisation de portefeuille sur les derniers résultats batch
+            batch_results = get_frame(st.session_state, 'batch_results')
+            if batch_results is not None:
+                render_portfolio_optimizer(batch_results)
+                render_portfolio_simulation(batch_results)
                 
         except Exception as e:
             st.error(f"❌ Erreur lors du chargement du fichier: {str(e)}")
 
-with tab4:
+@st.fragment
+def render_documentation():
+    """Onglet du guide d'utilisation"""
     st.markdown('<div class="section-header">📖 Guide d\'Utilisation</div>', unsafe_allow_html=True)
     
     st.markdown("""
@@ -931,43 +1257,107 @@ with tab4:
     </div>
     """, unsafe_allow_html=True)
     
-    example_data = pd.DataFrame([
-        {
-            'nom_projet': 'Résidence Palmiers',
-            'type_bien': 'appartement',
-            'etat': 'neuf',
-            'surface': 120,
-            'zone': 'premium',
-            'roi_projete': 12,
-            'rendement_locatif': 6,
-            'ticket_minimum': 75000,
-            'plus_value_estimee': 25
-        },
-        {
-            'nom_projet': 'Villa Océan',
-            'type_bien': 'villa',
-            'etat': 'ready',
-            'surface': 250,
-            'zone': 'prime',
-            'roi_projete': 15,
-            'rendement_locatif': 7,
-            'ticket_minimum': 150000,
-            'plus_value_estimee': 30
-        }
-    ])
+    example_data = load_example_data()
     
     st.dataframe(example_data, use_container_width=True)
     
     # Télécharger l'exemple
-    csv_example = example_data.to_csv(index=False)
-    b64 = base64.b64encode(csv_example.encode()).decode()
-    st.markdown(
-        f'<a href="data:text/csv;base64,{b64}" '
-        f'download="exemple_dary_score.csv" '
-        f'style="display: inline-block; padding: 0.75rem 2rem; background: #3CE58E; '
-        f'color: #0B2239; text-decoration: none; border-radius: 25px; font-weight: bold; margin-top: 1rem;">📥 Télécharger l\'exemple CSV</a>',
-        unsafe_allow_html=True
-    )
+    st.download_button("📥 Télécharger l'exemple CSV", example_data.to_csv(index=False),
+                       file_name="exemple_dary_score.csv", mime="text/csv", key="exemple_csv")
+
+@st.fragment
+def render_administration():
+    """Vue d'administration : mémoire du processus et de chaque session"""
+    import pandas as pd
+    
+    st.markdown('<div class="section-header">🛠️ Mémoire des Sessions</div>', unsafe_allow_html=True)
+    
+    sessions = REGISTRE.snapshot()
+    charges, octets_charges = loaded_usage()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Mémoire du processus", f"{process_rss() / 1024**2:.0f} Mo")
+    col2.metric("Sessions suivies", len(sessions))
+    col3.metric("Budget par session", f"{BUDGET_SESSION_MO:g} Mo")
+    col4.metric("Tableaux rechargés", f"{octets_charges / 1024**2:.0f} Mo", f"{charges} tableau(x)",
+                delta_color="off")
+    
+    if sessions:
+        st.dataframe(pd.DataFrame([{
+            'Session': s['session'][:8],
+            'Mémoire (Mo)': round(s['octets'] / 1024**2, 2),
+            'Principales clés': ', '.join(f"{cle} ({taille / 1024:.0f} Ko)" for cle, taille in s['principales']),
+            'Analyses en mémoire': s['historique'],
+            'Analyses archivées': s['archives'],
+            'Déversements': s['deversements'],
+            'Dernière activité': datetime.fromtimestamp(s['maj']).strftime('%H:%M:%S'),
+        } for s in sessions]), use_container_width=True, hide_index=True)
+    
+    if st.button("🧹 Purger les sessions fermées", key="purger_sessions"):
+        st.success(f"✅ {REGISTRE.purge(est_ouverte=session_is_open)} session(s) fermée(s) retirée(s)")
+    
+    render_monitoring()
+
+def render_monitoring():
+    """Distribution des scores dans le temps et alertes de dérive, tous workers confondus"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    
+    st.markdown('<div class="section-header">📉 Distribution des Scores</div>', unsafe_allow_html=True)
+    
+    # Sauvegardes des autres workers + état courant de ce processus
+    moniteur = load_directory(exclure=worker_file()).merge(MONITEUR)
+    periodes = moniteur.periods()
+    if not periodes:
+        st.info("Aucun score observé pour le moment.")
+        return
+    
+    alertes = drift_alerts(moniteur)
+    for alerte in alertes:
+        st.warning(f"⚠️ {alerte['message']}")
+    if not alertes:
+        st.success(f"✅ Aucune dérive détectée sur la période {periodes[-1]}")
+    
+    segments = moniteur.segments()
+    segment = st.selectbox("Segment", segments, format_func=lambda s: segment_label(*s), key="segment_suivi")
+    sketches = [moniteur.get(p, *segment) for p in periodes]
+    lignes = [{'Période': p, 'Projets': s.n, 'p10': s.quantile(0.1), 'p50': s.quantile(0.5),
+               'p90': s.quantile(0.9), **s.niveau_mix()} for p, s in zip(periodes, sketches) if s.n]
+    tableau = pd.DataFrame(lignes)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=tableau['Période'], y=tableau['p90'], name='p90',
+                                 line=dict(color='#3CE58E', width=1)))
+        fig.add_trace(go.Scatter(x=tableau['Période'], y=tableau['p10'], name='p10', fill='tonexty',
+                                 fillcolor='rgba(60, 229, 142, 0.2)', line=dict(color='#3CE58E', width=1)))
+        fig.add_trace(go.Scatter(x=tableau['Période'], y=tableau['p50'], name='médiane',
+                                 line=dict(color='#3CE58E', width=3)))
+        fig.update_layout(title="Score global (p10 - p50 - p90)", yaxis=dict(range=[0, 100]), height=350)
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = go.Figure()
+        for _, niveau, couleur, _ in NIVEAUX:
+            fig.add_trace(go.Bar(x=tableau['Période'], y=tableau[niveau], name=niveau, marker_color=couleur))
+        fig.update_layout(title="Répartition des niveaux", barmode='stack', yaxis=dict(tickformat='.0%'),
+                          height=350)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(tableau, use_container_width=True, hide_index=True)
+
+# Interface principale : seul l'onglet affiché est exécuté à chaque rerun
+ONGLETS = {
+    "📊 Nouveau Calcul": render_nouveau_calcul,
+    "📈 Historique": render_historique,
+    "📁 Import CSV": render_import_csv,
+    "📖 Documentation": render_documentation,
+}
+if os.environ.get('DARY_ADMIN') == '1':
+    ONGLETS["🛠️ Administration"] = render_administration
+onglet = st.radio("Onglet", list(ONGLETS), horizontal=True, label_visibility="collapsed", key="onglet",
+                  on_change=record_tab)
+ONGLETS[onglet]()
+track_session()
 
 # Footer
 st.markdown("""
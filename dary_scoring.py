@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Moteur de scoring DARY
+Calcul projet par projet (DARYScoring) et calcul vectorisé sur des lots
+de projets à partir des mêmes barèmes (score_batch)
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+import numpy as np
+
+
+class DARYScoring:
+    """Système de scoring immobilier DARY
+
+    Interface historique projet par projet ; les barèmes sont ceux des
+    tables PALIERS et BAREMES, partagées avec score_batch.
+    """
+    
+    @staticmethod
+    def calculate_financial_score(data):
+        """Calcul du score financier (40% du score total)"""
+        return category_score(data, 'Financier')
+    
+    @staticmethod
+    def calculate_location_score(data):
+        """Calcul du score de localisation (30% du score total)"""
+        return category_score(data, 'Localisation')
+    
+    @staticmethod
+    def calculate_property_score(data):
+        """Calcul du score du bien (20% du score total)"""
+        return category_score(data, 'Propriété')
+    
+    @staticmethod
+    def calculate_risk_score(data):
+        """Calcul du score de risque (10% du score total)"""
+        return category_score(data, 'Risque')
+    
+    @staticmethod
+    def calculate_global_score(data):
+        """Calcul du score global DARY (dict complet, libellés compris)"""
+        return score_project(data).to_dict()
+
+
+# Paliers numériques : colonne -> (seuils croissants, points par intervalle, côté)
+# 'right' : palier atteint dès que valeur >= seuil ; 'left' : dès que valeur <= seuil
+PALIERS = {
+    'roi_projete': ((5, 10, 15), (5, 10, 20, 30), 'right'),
+    'ticket_minimum': ((10000, 50000, 100000), (20, 15, 10, 5), 'left'),
+    'rendement_locatif': ((3, 5, 7), (5, 10, 20, 30), 'right'),
+    'plus_value_estimee': ((10, 20, 30), (5, 10, 15, 20), 'right'),
+    'dist_ecoles': ((2,), (10, 0), 'left'),
+    'dist_commerces': ((1,), (10, 0), 'left'),
+    'dist_transport': ((0.5,), (10, 0), 'left'),
+    'dist_hopitaux': ((5,), (10, 0), 'left'),
+    'surface': ((80, 150), (10, 15, 20), 'right'),
+}
+
+# Barèmes catégoriels : colonne -> (points par modalité, points d'une modalité inconnue)
+BAREMES = {
+    'zone': ({'premium': 40, 'prime': 30, 'emergente': 20, 'standard': 10}, 10),
+    'developpement_futur': ({'fort': 20, 'moyen': 10, 'faible': 5}, 10),
+    'type_bien': ({'villa': 30, 'riad': 25, 'appartement': 20, 'studio': 15, 'terrain': 10}, 20),
+    'etat': ({'neuf': 30, 'ready': 25, 'off-plan': 20, 'renovation': 15}, 20),
+    'qualite_construction': ({'luxe': 20, 'premium': 15, 'standard': 10}, 10),
+    'reputation_promoteur': ({'excellente': 0, 'bonne': -10, 'moyenne': -25}, -50),
+    'liquidite': ({'elevee': 0, 'moyenne': -15}, -30),
+    'garanties': ({True: 0}, -20),
+}
+
+# Critères de chaque catégorie, points de départ et pondération
+CATEGORIES = {
+    'Financier': ('roi_projete', 'ticket_minimum', 'rendement_locatif', 'plus_value_estimee'),
+    'Localisation': ('zone', 'dist_ecoles', 'dist_commerces', 'dist_transport',
+                     'dist_hopitaux', 'developpement_futur'),
+    'Propriété': ('type_bien', 'etat', 'surface', 'qualite_construction'),
+    'Risque': ('reputation_promoteur', 'liquidite', 'garanties'),
+}
+POINTS_DEPART = {'Financier': 0, 'Localisation': 0, 'Propriété': 0, 'Risque': 100}
+PONDERATIONS = {'Financier': 0.40, 'Localisation': 0.30, 'Propriété': 0.20, 'Risque': 0.10}
+
+# Valeur d'un critère absent des données (mêmes défauts que DARYScoring)
+VALEURS_DEFAUT = {
+    'roi_projete': 0, 'ticket_minimum': 0, 'rendement_locatif': 0, 'plus_value_estimee': 0,
+    'zone': 'standard', 'dist_ecoles': 0, 'dist_commerces': 0, 'dist_transport': 0,
+    'dist_hopitaux': 0, 'developpement_futur': 'moyen', 'type_bien': 'appartement',
+    'etat': 'ready', 'surface': 0, 'qualite_construction': 'standard',
+    'reputation_promoteur': 'moyenne', 'liquidite': 'moyenne', 'garanties': False,
+}
+
+# Valeurs appliquées aux colonnes absentes d'un fichier importé
+DEFAUTS_IMPORT = {
+    'type_bien': 'appartement', 'etat': 'ready', 'surface': 80,
+    'qualite_construction': 'standard', 'zone': 'standard',
+    'dist_ecoles': 2, 'dist_commerces': 1, 'dist_transport': 0.5, 'dist_hopitaux': 3,
+    'developpement_futur': 'moyen', 'ticket_minimum': 50000, 'roi_projete': 10,
+    'rendement_locatif': 5, 'plus_value_estimee': 15, 'reputation_promoteur': 'moyenne',
+    'liquidite': 'moyenne', 'garanties': False,
+}
+
+# Niveaux du score global : (seuil, niveau, couleur, recommandation)
+NIVEAUX = (
+    (80, 'Excellent', '#3CE58E', 'Investissement hautement recommandé'),
+    (60, 'Bon', '#4CAF50', 'Investissement recommandé'),
+    (40, 'Moyen', '#FFC107', 'Investissement à étudier avec précaution'),
+    (0, 'Faible', '#FF5722', 'Investissement déconseillé'),
+)
+
+# Ensemble des règles utilisées par score_batch
+REGLES = {
+    'paliers': PALIERS,
+    'baremes': BAREMES,
+    'categories': CATEGORIES,
+    'points_depart': POINTS_DEPART,
+    'ponderations': PONDERATIONS,
+}
+
+COMMODITES = {'ecoles': 'dist_ecoles', 'commerces': 'dist_commerces',
+              'transport': 'dist_transport', 'hopitaux': 'dist_hopitaux'}
+
+
+# Libellés des critères, produits seulement à l'affichage ou à l'export
+# Paliers : colonne -> (libellé, texte de chaque palier du plus bas au plus haut), {v} = valeur saisie
+LIBELLES_PALIERS = {
+    'roi_projete': ('ROI', ("Faible ({v}%)", "Moyen ({v}%)", "Bon ({v}%)", "Excellent (≥15%)")),
+    'ticket_minimum': ('Accessibilité', ("Très accessible", "Accessible", "Moyen", "Premium")),
+    'rendement_locatif': ('Rendement locatif',
+                          ("Faible ({v}%)", "Moyen ({v}%)", "Bon ({v}%)", "Excellent ({v}%)")),
+    'plus_value_estimee': ('Plus-value',
+                           ("Faible ({v}%)", "Modérée ({v}%)", "Élevée ({v}%)", "Très élevée ({v}%)")),
+    'surface': ('Surface', ("Petite ({v}m²)", "Moyenne ({v}m²)", "Grande ({v}m²)")),
+}
+# Barèmes : colonne -> (libellé, texte par modalité, texte d'une modalité inconnue) ;
+# sans table, la modalité est affichée avec une majuscule
+LIBELLES_BAREMES = {
+    'zone': ('Zone', None, None),
+    'developpement_futur': ('Potentiel développement', None, None),
+    'type_bien': ('Type', None, None),
+    'etat': ('État', None, None),
+    'qualite_construction': ('Qualité', None, None),
+    'reputation_promoteur': ('Promoteur', {'excellente': "Très fiable", 'bonne': "Fiable",
+                                           'moyenne': "Standard"}, "Risqué"),
+    'liquidite': ('Liquidité', {'elevee': "Très liquide", 'moyenne': "Moyenne"}, "Faible"),
+    'garanties': ('Garanties', {True: "Présentes"}, "Absentes"),
+}
+# Les distances aux commodités sont regroupées en un seul détail
+CRITERES_COMMODITES = ('dist_ecoles', 'dist_commerces', 'dist_transport', 'dist_hopitaux')
+CLES_COMMODITES = {'dist_ecoles': 'ecoles', 'dist_commerces': 'commerces',
+                   'dist_transport': 'transport', 'dist_hopitaux': 'hopitaux'}
+
+CRITERES = tuple(c for criteres in CATEGORIES.values() for c in criteres)
+POIDS_AFFICHES = {categorie: f"{poids:.0%}" for categorie, poids in PONDERATIONS.items()}
+
+
+def flatten_project(data):
+    """Données d'un projet au format plat des colonnes CSV"""
+    plat = {k: v for k, v in data.items() if k != 'commodites'}
+    for cle, colonne in COMMODITES.items():
+        if cle in data.get('commodites', {}):
+            plat[colonne] = data['commodites'][cle]
+    return plat
+
+
+def fill_defaults(df):
+    """Ajout des colonnes absentes d'un fichier importé avec leurs valeurs par défaut"""
+    df = df.copy()
+    if 'nom_projet' not in df.columns:
+        df['nom_projet'] = [f'Projet {i+1}' for i in range(len(df))]
+    for colonne, defaut in DEFAUTS_IMPORT.items():
+        if colonne not in df.columns:
+            df[colonne] = defaut
+    return df
+
+
+def points_palier(valeurs, seuils, points, cote):
+    """Points obtenus sur un palier numérique (tableaux de toute forme)"""
+    valeurs = np.asarray(valeurs, dtype=float)
+    idx = np.searchsorted(seuils, valeurs, side=cote)
+    # Une valeur manquante ne satisfait aucune comparaison
+    manquantes = np.isnan(valeurs)
+    if manquantes.any():
+        idx = np.where(manquantes, 0 if cote == 'right' else len(seuils), idx)
+    return np.asarray(points)[idx]
+
+
+def points_bareme(valeurs, bareme, inconnu):
+    """Points obtenus sur un barème catégoriel (tableaux de toute forme)"""
+    booleen = all(isinstance(k, bool) for k in bareme)
+    if np.ndim(valeurs) == 0:
+        valeur = bool(valeurs) if booleen else valeurs
+        return np.asarray(bareme.get(valeur, inconnu))
+    # pandas n'est chargé que pour les lots, pas au démarrage de l'application
+    import pandas as pd
+
+    valeurs = np.asarray(valeurs)
+    serie = pd.Series(valeurs.ravel())
+    if booleen:
+        serie = serie.astype(bool)
+    points = serie.map(bareme).fillna(inconnu).to_numpy(dtype=float)
+    return points.reshape(valeurs.shape)
+
+
+def niveau_codes(score_global):
+    """Indice du niveau (0 = Excellent ... 3 = Faible) de chaque score brut"""
+    seuils = np.array([seuil for seuil, *_ in NIVEAUX[:-1]][::-1])
+    return len(seuils) - np.searchsorted(seuils, score_global, side='right')
+
+
+def score_batch(colonnes, regles=None):
+    """Calcul vectorisé des sous-scores et du score global DARY
+
+    colonnes : DataFrame ou dict colonne -> scalaire / tableau (format CSV plat).
+    Les tableaux sont combinés par broadcasting numpy, ce qui permet de
+    balayer une grille de valeurs en un seul appel.
+    Retourne un dict de tableaux : un par catégorie, 'score_global'
+    (arrondi comme DARYScoring), 'niveau_code' et 'niveau'.
+    """
+    regles = REGLES if regles is None else regles
+    resultat = {}
+    for categorie, criteres in regles['categories'].items():
+        total = regles['points_depart'][categorie]
+        for critere in criteres:
+            valeurs = colonnes[critere] if critere in colonnes else VALEURS_DEFAUT[critere]
+            if hasattr(valeurs, 'to_numpy'):
+                valeurs = valeurs.to_numpy()
+            if critere in regles['paliers']:
+                total = total + points_palier(valeurs, *regles['paliers'][critere])
+            else:
+                total = total + points_bareme(valeurs, *regles['baremes'][critere])
+        resultat[categorie] = np.clip(total, 0, 100)
+
+    brut = sum(resultat[categorie] * poids for categorie, poids in regles['ponderations'].items())
+    forme = np.broadcast(*[np.asarray(v) for v in resultat.values()]).shape
+    for categorie in resultat:
+        resultat[categorie] = np.broadcast_to(resultat[categorie], forme).astype(int)
+    brut = np.broadcast_to(brut, forme)
+    resultat['score_brut'] = brut
+    resultat['score_global'] = np.round(brut, 1)
+    resultat['niveau_code'] = niveau_codes(brut)
+    resultat['niveau'] = np.array([n for _, n, *_ in NIVEAUX], dtype=object)[resultat['niveau_code']]
+    return resultat
+
+
+def niveau_code(score_brut):
+    """Indice du niveau d'un score brut (version scalaire de niveau_codes)"""
+    for code, (seuil, *_) in enumerate(NIVEAUX):
+        if score_brut >= seuil:
+            return code
+    return len(NIVEAUX) - 1
+
+
+class ScoreResult:
+    """Résultat compact du scoring d'un projet
+
+    Ne conserve que les sous-scores, le score brut, les points et le palier
+    obtenus sur chaque critère (None pour un barème) et une référence aux
+    valeurs saisies ; les libellés
+    (détails, niveau, recommandation, date) sont produits à la lecture.
+    Se lit aussi comme le dict historique de DARYScoring.calculate_global_score.
+    """
+
+    __slots__ = ('sous_scores', 'score_brut', 'points', 'paliers', 'entrees', 'horodatage')
+
+    CLES = ('score_global', 'niveau', 'couleur', 'recommendation', 'scores', 'timestamp')
+
+    def __init__(self, sous_scores, score_brut, points, paliers, entrees, horodatage):
+        self.sous_scores = sous_scores
+        self.score_brut = score_brut
+        self.points = points
+        self.paliers = paliers
+        self.entrees = entrees
+        self.horodatage = horodatage
+
+    @property
+    def score_global(self):
+        return round(self.score_brut, 1)
+
+    @property
+    def niveau_code(self):
+        return niveau_code(self.score_brut)
+
+    @property
+    def niveau(self):
+        return NIVEAUX[self.niveau_code][1]
+
+    @property
+    def couleur(self):
+        return NIVEAUX[self.niveau_code][2]
+
+    @property
+    def recommendation(self):
+        return NIVEAUX[self.niveau_code][3]
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.horodatage).strftime('%Y-%m-%d %H:%M:%S')
+
+    def details(self, categorie):
+        """Libellés des critères d'une catégorie"""
+        details = {}
+        for critere in CATEGORIES[categorie]:
+            i = CRITERES.index(critere)
+            valeur = self.entrees[i]
+            if critere in CRITERES_COMMODITES:
+                if 'Commodités' not in details:
+                    total = sum(self.points[CRITERES.index(c)] for c in CRITERES_COMMODITES)
+                    details['Commodités'] = f"{total}/40 points"
+            elif critere in LIBELLES_PALIERS:
+                libelle, textes = LIBELLES_PALIERS[critere]
+                details[libelle] = textes[self.paliers[i]].format(v=valeur)
+            else:
+                libelle, textes, inconnu = LIBELLES_BAREMES[critere]
+                if textes is None:
+                    details[libelle] = str(valeur).capitalize()
+                else:
+                    cle = bool(valeur) if critere == 'garanties' else valeur
+                    details[libelle] = textes.get(cle, inconnu)
+        return details
+
+    @property
+    def scores(self):
+        return {
+            categorie: {'score': score, 'details': self.details(categorie),
+                        'poids': POIDS_AFFICHES[categorie]}
+            for categorie, score in zip(CATEGORIES, self.sous_scores)
+        }
+
+    def keys(self):
+        return self.CLES
+
+    def __getitem__(self, cle):
+        if cle not in self.CLES:
+            raise KeyError(cle)
+        return getattr(self, cle)
+
+    def to_dict(self):
+        """Résultat complet au format de DARYScoring.calculate_global_score"""
+        return {cle: self[cle] for cle in self.CLES}
+
+    def __repr__(self):
+        return f"ScoreResult(score_global={self.score_global}, niveau={self.niveau!r})"
+
+
+def _compile_rules():
+    """Règles de chaque critère dans l'ordre de CRITERES, pour le calcul projet par projet"""
+    regles = []
+    for critere in CRITERES:
+        if critere in PALIERS:
+            seuils, points, cote = PALIERS[critere]
+            manquante = 0 if cote == 'right' else len(seuils)
+            regles.append((critere, seuils, points, bisect_right if cote == 'right' else bisect_left,
+                           manquante))
+        else:
+            bareme, inconnu = BAREMES[critere]
+            regles.append((critere, None, bareme, critere == 'garanties', inconnu))
+    tranches, i = [], 0
+    for categorie, criteres in CATEGORIES.items():
+        tranches.append((i, i + len(criteres), POINTS_DEPART[categorie], PONDERATIONS[categorie]))
+        i += len(criteres)
+    return tuple(regles), tuple(tranches)
+
+
+_REGLES_PROJET, _TRANCHES = _compile_rules()
+
+
+def score_project(data):
+    """Scoring d'un projet sans construire de libellés (format application ou CSV plat)"""
+    commodites = data.get('commodites', {})
+    entrees, points, paliers = [], [], []
+    for critere, seuils, bareme, mode, defaut in _REGLES_PROJET:
+        if critere in CLES_COMMODITES and CLES_COMMODITES[critere] in commodites:
+            valeur = commodites[CLES_COMMODITES[critere]]
+        elif critere in data:
+            valeur = data[critere]
+        else:
+            valeur = VALEURS_DEFAUT[critere]
+        entrees.append(valeur)
+        if seuils is not None:
+            # Une valeur manquante ne satisfait aucune comparaison
+            palier = defaut if valeur != valeur else mode(seuils, valeur)
+            paliers.append(palier)
+            points.append(bareme[palier])
+        else:
+            paliers.append(None)
+            points.append(bareme.get(bool(valeur) if mode else valeur, defaut))
+
+    sous_scores, brut = [], 0.0
+    for debut, fin, depart, poids in _TRANCHES:
+        total = min(max(depart + sum(points[debut:fin]), 0), 100)
+        sous_scores.append(total)
+        brut += total * poids
+    return ScoreResult(tuple(sous_scores), brut, tuple(points), tuple(paliers), tuple(entrees),
+                       time.time())
+
+
+def category_score(data, categorie):
+    """Score et libellés d'une catégorie pour un projet"""
+    resultat = score_project(data)
+    return resultat.sous_scores[list(CATEGORIES).index(categorie)], resultat.details(categorie)
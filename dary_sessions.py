@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Budget mémoire par session pour les déploiements multi-utilisateurs
+Estimation de la taille de l'état de chaque session (sans parcourir le
+contenu des tableaux), déversement sur disque de l'historique ancien, des
+gros tableaux et des index au-delà du budget, et registre des sessions
+partagé par le processus pour la vue d'administration.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Budget mémoire d'une session (Mo)
+BUDGET_SESSION_MO = float(os.environ.get('DARY_SESSION_BUDGET_MB', '25'))
+# Dossier des données déversées, un sous-dossier par session
+DOSSIER_DEVERSEMENT = os.environ.get('DARY_SPILL_DIR',
+                                     os.path.join(tempfile.gettempdir(), 'dary_sessions'))
+# Analyses les plus récentes toujours conservées en mémoire
+HISTORIQUE_EN_MEMOIRE = 10
+# Tableaux et index déversables, le plus volumineux déversé en premier
+TABLEAUX_DEVERSABLES = ('upload_df', 'batch_results', 'comparables_index', 'ranking')
+# Sessions sans activité retirées du registre au-delà de ce délai (s)
+DUREE_INACTIVITE = 3600
+# Tableaux déversés gardés chargés entre deux réexécutions, toutes sessions confondues
+TABLEAUX_CHARGES = 4
+# Mémoire de ces tableaux (Mo) ; le dernier rechargé est toujours gardé
+BUDGET_CHARGES_MO = float(os.environ.get('DARY_LOADED_BUDGET_MB', '100'))
+# Taille comptée par valeur objet d'un tableau (chaîne courte, entier Python)
+OCTETS_PAR_OBJET = 64
+# Éléments mesurés au plus dans une liste ou un dictionnaire, le reste extrapolé
+ECHANTILLON = 64
+
+FICHIER_HISTORIQUE = 'historique.jsonl'
+
+
+def estimate_size(obj, _vus=None):
+    """Taille estimée en octets d'un objet et de son contenu
+
+    Coût indépendant du nombre de lignes : nbytes pour les tableaux,
+    OCTETS_PAR_OBJET par valeur objet (chaînes), extrapolation d'un
+    échantillon de ECHANTILLON éléments pour les listes et dictionnaires.
+    """
+    if _vus is None:
+        _vus = set()
+    if id(obj) in _vus:
+        return 0
+    _vus.add(id(obj))
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        objets = sum(len(obj) for dtype in obj.dtypes if dtype == object)
+        return int(obj.memory_usage(deep=False).sum()) + OCTETS_PAR_OBJET * objets
+    if hasattr(obj, 'nbytes') and hasattr(obj, 'dtype'):
+        return int(obj.nbytes) + (OCTETS_PAR_OBJET * obj.size if obj.dtype == object else 0)
+    taille = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        elements = [e for paire in _sample(obj.items()) for e in paire]
+        taille += _extrapolate(elements, len(obj) * 2, _vus)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        taille += _extrapolate(_sample(obj), len(obj), _vus)
+    elif hasattr(obj, '__dict__'):
+        taille += estimate_size(vars(obj), _vus)
+    elif hasattr(obj, '__slots__'):
+        taille += sum(estimate_size(getattr(obj, s), _vus) for s in obj.__slots__ if hasattr(obj, s))
+    return taille
+
+
+def _sample(elements):
+    """ECHANTILLON éléments régulièrement espacés d'une collection"""
+    elements = list(elements) if not isinstance(elements, (list, tuple)) else elements
+    pas = max(len(elements) // ECHANTILLON, 1)
+    return elements[::pas][:ECHANTILLON]
+
+
+def _extrapolate(echantillon, total, _vus):
+    """Taille de l'échantillon ramenée au nombre total d'éléments"""
+    if not echantillon:
+        return 0
+    return sum(estimate_size(e, _vus) for e in echantillon) * total // len(echantillon)
+
+
+def session_usage(etat):
+    """Taille en octets de chaque clé de l'état de session"""
+    return {cle: estimate_size(etat[cle]) for cle in list(etat.keys())}
+
+
+class SpilledFrame:
+    """Tableau ou index déversé sur disque, rechargé à la demande"""
+
+    __slots__ = ('chemin', 'lignes')
+
+    def __init__(self, chemin, lignes):
+        self.chemin = chemin
+        self.lignes = lignes
+
+    def load(self):
+        with open(self.chemin, 'rb') as f:
+            return pickle.load(f)
+
+
+# Derniers tableaux rechargés, par chemin du fichier déversé (LRU) : (tableau, taille estimée)
+_CHARGES = OrderedDict()
+_VERROU_CHARGES = threading.Lock()
+
+
+def get_frame(etat, cle):
+    """Tableau de l'état de session, rechargé depuis le disque s'il a été déversé
+
+    Les TABLEAUX_CHARGES derniers tableaux rechargés restent en mémoire,
+    dans la limite de BUDGET_CHARGES_MO : les réexécutions suivantes de la
+    session ne relisent pas le fichier.
+    """
+    valeur = etat.get(cle)
+    if not isinstance(valeur, SpilledFrame):
+        return valeur
+    with _VERROU_CHARGES:
+        if valeur.chemin in _CHARGES:
+            _CHARGES.move_to_end(valeur.chemin)
+            return _CHARGES[valeur.chemin][0]
+    charge = valeur.load()
+    taille = estimate_size(charge)
+    with _VERROU_CHARGES:
+        _CHARGES[valeur.chemin] = (charge, taille)
+        budget = BUDGET_CHARGES_MO * 1024 * 1024
+        while len(_CHARGES) > 1 and (len(_CHARGES) > TABLEAUX_CHARGES
+                                     or sum(t for _, t in _CHARGES.values()) > budget):
+            _CHARGES.popitem(last=False)
+    return charge
+
+
+def restore_frame(etat, cle):
+    """Tableau ou index remis dans l'état de session avant d'être modifié
+
+    Une modification du seul exemplaire rechargé serait perdue à son
+    éviction ; le prochain budget le déversera de nouveau si besoin.
+    """
+    valeur = get_frame(etat, cle)
+    etat[cle] = valeur
+    return valeur
+
+
+def loaded_usage():
+    """Nombre et taille estimée (octets) des tableaux rechargés gardés en mémoire"""
+    with _VERROU_CHARGES:
+        return len(_CHARGES), sum(t for _, t in _CHARGES.values())
+
+
+def _forget_frames(dossier):
+    """Oubli des tableaux chargés depuis un dossier de session"""
+    prefixe = os.path.join(dossier, '')
+    with _VERROU_CHARGES:
+        for chemin in [c for c in _CHARGES if c.startswith(prefixe)]:
+            del _CHARGES[chemin]
+
+
+def private_dir(dossier):
+    """Création du dossier en accès réservé à l'utilisateur du processus (0o700)
+
+    Les parents manquants sont créés de la même façon. Un dossier existant
+    appartenant à un autre utilisateur est refusé (PermissionError).
+    """
+    parent = os.path.dirname(os.path.abspath(dossier))
+    for chemin in (parent, dossier):
+        os.makedirs(chemin, mode=0o700, exist_ok=True)
+        if os.stat(chemin).st_uid != os.getuid():
+            raise PermissionError(f"{chemin} appartient à un autre utilisateur")
+    if os.stat(dossier).st_mode & 0o077:
+        os.chmod(dossier, 0o700)
+
+
+def spill_frame(etat, cle, dossier):
+    """Déversement d'un tableau de l'état de session ; retourne les octets libérés"""
+    valeur = etat.get(cle)
+    if valeur is None or isinstance(valeur, SpilledFrame):
+        return 0
+    private_dir(dossier)
+    chemin = os.path.join(dossier, f'{cle}.pkl')
+    with _VERROU_CHARGES:
+        _CHARGES.pop(chemin, None)
+    with open(chemin, 'wb') as f:
+        pickle.dump(valeur, f, protocol=pickle.HIGHEST_PROTOCOL)
+    libere = estimate_size(valeur)
+    etat[cle] = SpilledFrame(chemin, len(valeur))
+    return libere
+
+
+def _to_json(obj):
+    """Sérialisation des résultats compacts (ScoreResult) et des types non JSON"""
+    return obj.to_dict() if hasattr(obj, 'to_dict') else str(obj)
+
+
+def spill_history(etat, dossier, garder=HISTORIQUE_EN_MEMOIRE):
+    """Déversement des analyses les plus anciennes ; retourne le nombre déversé"""
+    projets = etat.get('projects') or []
+    coupure = max(len(projets) - garder, 0)
+    anciens, recents = projets[:coupure], projets[coupure:]
+    if not anciens:
+        return 0
+    private_dir(dossier)
+    with open(os.path.join(dossier, FICHIER_HISTORIQUE), 'a', encoding='utf-8') as f:
+        for projet in anciens:
+            f.write(json.dumps(projet, ensure_ascii=False, default=_to_json) + '\n')
+    etat['projects'] = list(recents)
+    etat['projects_archives'] = etat.get('projects_archives', 0) + len(anciens)
+    return len(anciens)
+
+
+def load_history(etat, dossier):
+    """Historique complet de la session : analyses déversées puis en mémoire"""
+    archives = []
+    chemin = os.path.join(dossier, FICHIER_HISTORIQUE)
+    if etat.get('projects_archives') and os.path.exists(chemin):
+        with open(chemin, encoding='utf-8') as f:
+            archives = [json.loads(ligne) for ligne in f if ligne.strip()]
+    return archives + list(etat.get('projects') or [])
+
+
+def enforce_budget(etat, dossier, budget_mo=BUDGET_SESSION_MO):
+    """Libération de mémoire tant que la session dépasse son budget
+
+    Les gros tableaux (import CSV, résultats batch) et les index
+    (comparables, classement) sont déversés en premier, puis l'historique au-delà des HISTORIQUE_EN_MEMOIRE dernières
+    analyses. Retourne la liste des actions effectuées.
+    """
+    budget = budget_mo * 1024 * 1024
+    usage = session_usage(etat)
+    total = sum(usage.values())
+    actions = []
+    candidats = sorted((c for c in TABLEAUX_DEVERSABLES if usage.get(c)), key=usage.get, reverse=True)
+    for cle in candidats:
+        if total <= budget:
+            return actions
+        libere = spill_frame(etat, cle, dossier)
+        if libere:
+            total -= libere
+            actions.append(f"{cle} déversé sur disque")
+    if total > budget:
+        n = spill_history(etat, dossier)
+        if n:
+            actions.append(f"{n} analyse(s) archivée(s) sur disque")
+    return actions
+
+
+def process_rss(pid='self'):
+    """Mémoire résidente d'un processus (octets), le processus courant par défaut"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for ligne in f:
+                if ligne.startswith('VmRSS:'):
+                    return int(ligne.split()[1]) * 1024
+    except OSError:
+        if pid != 'self':
+            return None
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SessionRegistry:
+    """Registre des sessions du processus, partagé par toutes les sessions"""
+
+    def __init__(self, dossier=DOSSIER_DEVERSEMENT):
+        self.dossier = dossier
+        self._verrou = threading.Lock()
+        self._sessions = {}
+
+    def session_dir(self, session_id):
+        return os.path.join(self.dossier, session_id)
+
+    def track(self, etat, session_id, budget_mo=BUDGET_SESSION_MO):
+        """Application du budget puis mise à jour de l'entrée de la session"""
+        actions = enforce_budget(etat, self.session_dir(session_id), budget_mo)
+        usage = session_usage(etat)
+        entree = {
+            'session': session_id,
+            'octets': sum(usage.values()),
+            'principales': sorted(usage.items(), key=lambda kv: kv[1], reverse=True)[:3],
+            'historique': len(etat.get('projects') or []),
+            'archives': etat.get('projects_archives', 0),
+            'maj': time.time(),
+        }
+        with self._verrou:
+            ancien = self._sessions.get(session_id, {})
+            entree['deversements'] = ancien.get('deversements', 0) + len(actions)
+            self._sessions[session_id] = entree
+        return actions
+
+    def snapshot(self):
+        """Sessions connues, de la plus volumineuse à la plus petite"""
+        with self._verrou:
+            sessions = [dict(s) for s in self._sessions.values()]
+        return sorted(sessions, key=lambda s: s['octets'], reverse=True)
+
+    def purge(self, duree_inactivite=DUREE_INACTIVITE, est_ouverte=None):
+        """Retrait des sessions fermées et inactives, et de leurs données déversées
+
+        est_ouverte(session_id) indique si l'exécution considère encore la
+        session comme ouverte ; une session ouverte n'est jamais retirée,
+        même sans activité. Sans fonction, toutes les sessions sont fermées.
+        """
+        limite = time.time() - duree_inactivite
+        with self._verrou:
+            inactives = [sid for sid, s in self._sessions.items() if s['maj'] < limite]
+        fermees = [sid for sid in inactives if est_ouverte is None or not est_ouverte(sid)]
+        with self._verrou:
+            for sid in fermees:
+                self._sessions.pop(sid, None)
+        for sid in fermees:
+            _forget_frames(self.session_dir(sid))
+            shutil.rmtree(self.session_dir(sid), ignore_errors=True)
+        return len(fermees)
+
+
+# Registre unique du processus
+REGISTRE = SessionRegistry()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulation Monte Carlo du score DARY
+Distribution du score et probabilité de chaque niveau lorsque les
+entrées numériques (ROI, rendement, plus-value...) sont incertaines
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dary_scoring import NIVEAUX, VALEURS_DEFAUT, flatten_project, score_batch
+
+# Lois disponibles et nombre de paramètres attendus
+#   ('uniforme', min, max)              bornes absolues
+#   ('normale', moyenne, ecart_type)     loi normale absolue
+#   ('triangulaire', min, mode, max)     estimation basse / probable / haute
+#   ('relative', p)                      uniforme à ±p (ex: 0.1 = ±10 %) autour de la valeur du projet
+#   ('ecart_type', sigma)                normale centrée sur la valeur du projet
+LOIS = {'uniforme': 2, 'normale': 2, 'triangulaire': 3, 'relative': 1, 'ecart_type': 1}
+
+# Nombre maximal de tirages évalués en un seul appel vectorisé
+TAILLE_LOT = 200000
+
+QUANTILES = (5, 25, 50, 75, 95)
+
+
+def check_incertitudes(incertitudes):
+    """Validation des lois déclarées pour chaque entrée"""
+    for colonne, loi in incertitudes.items():
+        if not loi or loi[0] not in LOIS:
+            raise ValueError(f"Loi inconnue pour {colonne}: {loi!r}")
+        if len(loi) - 1 != LOIS[loi[0]]:
+            raise ValueError(f"{colonne}: la loi '{loi[0]}' attend {LOIS[loi[0]]} paramètre(s)")
+
+
+def draw(loi, valeur, taille, rng):
+    """Tirages d'une entrée ; valeur est la valeur ponctuelle (scalaire ou colonne)"""
+    nom, *params = loi
+    if nom == 'uniforme':
+        tirages = rng.uniform(params[0], params[1], taille)
+    elif nom == 'normale':
+        tirages = rng.normal(params[0], params[1], taille)
+    elif nom == 'triangulaire':
+        tirages = rng.triangular(params[0], params[1], params[2], taille)
+    elif nom == 'relative':
+        tirages = valeur * rng.uniform(1 - params[0], 1 + params[0], taille)
+    else:
+        tirages = rng.normal(valeur, params[0], taille)
+    # Les entrées du scoring (taux, montants, distances) sont positives
+    return np.maximum(tirages, 0)
+
+
+def summarize(scores, niveau_codes):
+    """Statistiques d'une distribution de scores simulés"""
+    probabilites = np.bincount(niveau_codes.ravel(), minlength=len(NIVEAUX)) / niveau_codes.size
+    return {
+        'moyenne': round(float(scores.mean()), 1),
+        'ecart_type': round(float(scores.std()), 2),
+        'quantiles': {q: round(float(v), 1) for q, v in zip(QUANTILES, np.percentile(scores, QUANTILES))},
+        'probabilites': {niveau: float(p) for (_, niveau, *_), p in zip(NIVEAUX, probabilites)},
+    }
+
+
+def simulate_project(data, incertitudes, n_samples=10000, seed=None):
+    """Distribution du score d'un projet sous incertitude de ses entrées
+
+    data         : données du projet (format de l'application ou CSV plat)
+    incertitudes : dict colonne -> loi, voir LOIS
+    """
+    check_incertitudes(incertitudes)
+    projet = flatten_project(data)
+    rng = np.random.default_rng(seed)
+    scores, codes = [], []
+    for debut in range(0, n_samples, TAILLE_LOT):
+        taille = min(TAILLE_LOT, n_samples - debut)
+        colonnes = dict(projet)
+        for colonne, loi in incertitudes.items():
+            valeur = float(projet.get(colonne, VALEURS_DEFAUT.get(colonne, 0)))
+            colonnes[colonne] = draw(loi, valeur, taille, rng)
+        resultat = score_batch(colonnes)
+        scores.append(np.broadcast_to(resultat['score_brut'], taille))
+        codes.append(np.broadcast_to(resultat['niveau_code'], taille))
+    scores = np.concatenate(scores)
+    resume = summarize(scores, np.concatenate(codes))
+    resume['scores'] = np.round(scores, 1)
+    return resume
+
+
+def _simulate_chunk(args):
+    """Simulation d'un bloc de projets : tirages de forme (projets, échantillons)"""
+    chunk, incertitudes, n_samples, seed = args
+    rng = np.random.default_rng(seed)
+    colonnes = {c: chunk[c].to_numpy()[:, None] for c in chunk.columns}
+    for colonne, loi in incertitudes.items():
+        valeur = colonnes[colonne].astype(float) if colonne in colonnes else 0.0
+        colonnes[colonne] = draw(loi, valeur, (len(chunk), n_samples), rng)
+    resultat = score_batch(colonnes)
+    scores = np.broadcast_to(resultat['score_brut'], (len(chunk), n_samples))
+    codes = np.broadcast_to(resultat['niveau_code'], (len(chunk), n_samples))
+    lignes = {
+        'score_moyen': scores.mean(axis=1).round(1),
+        'ecart_type': scores.std(axis=1).round(2),
+    }
+    for q, valeurs in zip(QUANTILES, np.percentile(scores, QUANTILES, axis=1)):
+        lignes[f'p{q}'] = valeurs.round(1)
+    for code, (_, niveau, *_) in enumerate(NIVEAUX):
+        lignes[f'proba_{niveau}'] = (codes == code).mean(axis=1)
+    return pd.DataFrame(lignes, index=chunk.index)
+
+
+def simulate_portfolio(projets, incertitudes, n_samples=2000, seed=None, n_jobs=1,
+                       taille_bloc=None):
+    """Distribution du score de chaque projet d'un portefeuille
+
+    Les projets sont découpés en blocs simulés de façon vectorisée ;
+    n_jobs > 1 répartit les blocs sur plusieurs processus (-1 = tous les cœurs).
+    Les résultats ne dépendent pas de n_jobs pour une graine donnée.
+    """
+    check_incertitudes(incertitudes)
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if taille_bloc is None:
+        taille_bloc = max(1, TAILLE_LOT // n_samples)
+    blocs = [projets.iloc[i:i + taille_bloc] for i in range(0, len(projets), taille_bloc)]
+    graines = np.random.SeedSequence(seed).spawn(len(blocs))
+    taches = [(bloc, incertitudes, n_samples, graine) for bloc, graine in zip(blocs, graines)]
+
+    if n_jobs > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            resultats = list(executor.map(_simulate_chunk, taches))
+    else:
+        resultats = [_simulate_chunk(tache) for tache in taches]
+    if not resultats:
+        return pd.DataFrame()
+    return pd.concat(resultats)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Démarrage rapide de l'application DARY Score
+Préchauffage en arrière-plan des modules lourds (pandas, plotly), des
+tables de scoring et du cahier des charges, et point de contrôle de
+disponibilité HTTP pour les déploiements autoscalés.
+
+Usage :
+    python dary_startup.py [script.py] [--readiness-port 8599] [-- options streamlit]
+"""
+
+import argparse
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Modules dont l'import est différé dans l'application et préchargé ici
+MODULES_DIFFERES = (
+    'pandas',
+    'plotly.graph_objects',
+    'plotly.express',
+    'dary_comparables',
+    'dary_cube',
+    'dary_dedup',
+    'dary_gazetteer',
+    'dary_geo',
+    'dary_ingestion',
+    'dary_market',
+    'dary_optimizer',
+    'dary_recommend',
+    'dary_simulation',
+    'dary_sweep',
+)
+
+CAHIER_DES_CHARGES = 'DARY_Scoring_Cahier_des_Charges.csv'
+# Classeur Excel livré avec le dépôt, lu si le CSV est absent (openpyxl requis)
+CAHIER_DES_CHARGES_XLSX = CAHIER_DES_CHARGES + '.xlsx'
+PORT_DISPONIBILITE = int(os.environ.get('DARY_READINESS_PORT', '8599'))
+
+_verrou = threading.Lock()
+_etat = {
+    'pret': False,
+    'debut': time.time(),
+    'duree_prechauffage': None,
+    'erreur': None,
+}
+_prechauffage = None
+_serveur = None
+
+
+def cahier_path():
+    """Cahier des charges lisible ici : le CSV, sinon le classeur Excel ; None si aucun"""
+    if os.path.exists(CAHIER_DES_CHARGES):
+        return CAHIER_DES_CHARGES
+    if os.path.exists(CAHIER_DES_CHARGES_XLSX) and importlib.util.find_spec('openpyxl'):
+        return CAHIER_DES_CHARGES_XLSX
+    return None
+
+
+def cahier_signature(path=None):
+    """(chemin, date de modification, taille) du cahier des charges, None s'il est absent"""
+    path = path or cahier_path()
+    if path is None or not os.path.exists(path):
+        return None
+    etat = os.stat(path)
+    return (path, etat.st_mtime_ns, etat.st_size)
+
+
+def load_cahier(path=None):
+    """Cahier des charges (CSV ou Excel), lu une seule fois par version du fichier"""
+    signature = cahier_signature(path)
+    if signature is None:
+        raise FileNotFoundError(f"Cahier des charges introuvable : {path or CAHIER_DES_CHARGES}")
+    return _read_cahier(signature)
+
+
+@lru_cache(maxsize=4)
+def _read_cahier(signature):
+    import pandas as pd
+    chemin = signature[0]
+    if chemin.endswith('.xlsx'):
+        return pd.read_excel(chemin)
+    return pd.read_csv(chemin)
+
+
+def warm_up():
+    """Imports différés et premiers calculs, une seule fois par processus"""
+    debut = time.time()
+    try:
+        for module in MODULES_DIFFERES:
+            importlib.import_module(module)
+
+        import pandas as pd
+        import plotly.graph_objects as go
+        from dary_scoring import score_batch
+
+        # Tables de scoring : premier passage des chemins vectorisés
+        score_batch(pd.DataFrame({'zone': ['premium', 'standard'], 'roi_projete': [15.0, 4.0]}))
+        # Validateurs plotly chargés à la première construction de figure
+        go.Figure(go.Indicator(mode="gauge+number", value=50)).to_dict()
+        go.Figure(go.Scatterpolar(r=[1, 2], theta=['a', 'b'])).to_dict()
+        if cahier_path():
+            load_cahier()
+    except Exception as e:
+        _etat['erreur'] = str(e)
+    finally:
+        _etat['duree_prechauffage'] = round(time.time() - debut, 3)
+        _etat['pret'] = True
+
+
+def start_background_warmup():
+    """Lancement du préchauffage dans un thread (idempotent)"""
+    global _prechauffage
+    with _verrou:
+        if _prechauffage is None:
+            _prechauffage = threading.Thread(target=warm_up, name='dary-prechauffage', daemon=True)
+            _prechauffage.start()
+    return _prechauffage
+
+
+def wait_warmup(timeout=None):
+    """Attente de la fin du préchauffage avant d'utiliser les modules différés
+
+    Plotly inspecte sys.modules sans verrou : construire une figure pendant
+    que le thread de préchauffage importe pandas échouerait.
+    """
+    if _prechauffage is not None:
+        _prechauffage.join(timeout)
+
+
+def readiness():
+    """État de disponibilité de l'instance"""
+    return {
+        'pret': _etat['pret'],
+        'uptime': round(time.time() - _etat['debut'], 3),
+        'duree_prechauffage': _etat['duree_prechauffage'],
+        'erreur': _etat['erreur'],
+    }
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    """GET /ready : 200 une fois préchauffé, 503 sinon ; GET /health : 200"""
+
+    def do_GET(self):
+        etat = readiness()
+        if self.path.startswith('/ready'):
+            code = 200 if etat['pret'] else 503
+        elif self.path.startswith('/health'):
+            code = 200
+        else:
+            code = 404
+        corps = json.dumps(etat).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_readiness_server(port=PORT_DISPONIBILITE, host='0.0.0.0'):
+    """Serveur HTTP de disponibilité dans un thread (idempotent)"""
+    global _serveur
+    with _verrou:
+        if _serveur is None:
+            _serveur = ThreadingHTTPServer((host, port), ReadinessHandler)
+            threading.Thread(target=_serveur.serve_forever, name='dary-disponibilite',
+                             daemon=True).start()
+    return _serveur
+
+
+def boot():
+    """Appelé par l'application à chaque exécution : préchauffage et disponibilité"""
+    start_background_warmup()
+    if os.environ.get('DARY_READINESS_PORT'):
+        try:
+            start_readiness_server()
+        except OSError:
+            # Port déjà pris par une autre instance sur la même machine
+            pass
+
+
+def main(argv=None):
+    """Préchauffage au démarrage du processus, puis lancement de Streamlit"""
+    parser = argparse.ArgumentParser(description="Démarrage de DARY Score avec préchauffage")
+    parser.add_argument('script', nargs='?', default='dary_score_app2.py')
+    parser.add_argument('--readiness-port', type=int, default=PORT_DISPONIBILITE)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Les options après '--' sont transmises telles quelles à Streamlit
+    options_streamlit = []
+    if '--' in argv:
+        coupure = argv.index('--')
+        argv, options_streamlit = argv[:coupure], argv[coupure + 1:]
+    args = parser.parse_args(argv)
+
+    # Streamlit importe plotly : à faire avant le thread de préchauffage
+    from streamlit.web import cli
+
+    start_readiness_server(args.readiness_port)
+    start_background_warmup()
+    # Streamlit lance un gc.collect(2) après chaque exécution du script : les
+    # objets des modules préchauffés passent dans la génération permanente pour
+    # que ce ramassage ne parcoure plus que les objets récents. Gel fait ici,
+    # avant que le serveur n'accepte des connexions : aucun objet de session
+    # n'est encore créé (/ready attend de toute façon la fin du préchauffage)
+    wait_warmup()
+    gc.freeze()
+    sys.argv = ['streamlit', 'run', args.script] + options_streamlit
+    return cli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
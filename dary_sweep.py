@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analyse de sensibilité du score DARY
+Balayage d'une ou deux entrées d'un projet sur une grille, calculé en
+un seul appel vectorisé du moteur de scoring
+"""
+
+import numpy as np
+
+from dary_scoring import NIVEAUX, PALIERS, VALEURS_DEFAUT, flatten_project, score_batch
+
+# Entrées balayables : colonne -> (libellé, minimum, maximum)
+AXES = {
+    'roi_projete': ('ROI projeté (%)', 0.0, 25.0),
+    'rendement_locatif': ('Rendement locatif (%)', 0.0, 10.0),
+    'plus_value_estimee': ('Plus-value estimée (%)', 0.0, 50.0),
+    'ticket_minimum': ('Ticket minimum (MAD)', 1000.0, 200000.0),
+    'surface': ('Surface (m²)', 10.0, 300.0),
+    'dist_ecoles': ('Distance écoles (km)', 0.0, 10.0),
+    'dist_commerces': ('Distance commerces (km)', 0.0, 10.0),
+    'dist_transport': ('Distance transport (km)', 0.0, 5.0),
+    'dist_hopitaux': ('Distance hôpitaux (km)', 0.0, 20.0),
+}
+
+
+def grid(colonne, points=100, minimum=None, maximum=None):
+    """Valeurs régulièrement espacées sur la plage d'un axe"""
+    _, borne_min, borne_max = AXES[colonne]
+    return np.linspace(borne_min if minimum is None else minimum,
+                       borne_max if maximum is None else maximum, points)
+
+
+def sweep(data, colonne, valeurs):
+    """Score du projet pour chaque valeur d'une entrée, les autres restant fixes"""
+    colonnes = flatten_project(data)
+    colonnes[colonne] = np.asarray(valeurs, dtype=float)
+    resultat = score_batch(colonnes)
+    return {
+        'x': colonnes[colonne],
+        'score': resultat['score_global'],
+        'niveau_code': resultat['niveau_code'],
+    }
+
+
+def score_surface(data, colonne_x, valeurs_x, colonne_y, valeurs_y):
+    """Surface de score sur la grille (valeurs_y × valeurs_x)"""
+    if colonne_x == colonne_y:
+        raise ValueError("Les deux axes doivent porter sur des entrées différentes")
+    colonnes = flatten_project(data)
+    colonnes[colonne_x] = np.asarray(valeurs_x, dtype=float)[None, :]
+    colonnes[colonne_y] = np.asarray(valeurs_y, dtype=float)[:, None]
+    resultat = score_batch(colonnes)
+    return {
+        'x': np.asarray(valeurs_x, dtype=float),
+        'y': np.asarray(valeurs_y, dtype=float),
+        'score': resultat['score_global'],
+        'niveau_code': resultat['niveau_code'],
+    }
+
+
+def required_values(data, colonne, valeurs):
+    """Valeur de l'entrée la plus proche de l'actuelle permettant d'atteindre chaque niveau
+
+    Retourne un dict niveau -> valeur : la valeur actuelle si le niveau est
+    déjà atteint, None s'il est hors d'atteinte sur la grille en ne
+    modifiant que cette entrée.
+    """
+    actuelle = float(flatten_project(data).get(colonne, VALEURS_DEFAUT[colonne]))
+    # Les seuils exacts du barème et la valeur actuelle complètent la grille
+    valeurs = np.asarray(valeurs, dtype=float)
+    seuils = np.asarray(PALIERS[colonne][0], dtype=float) if colonne in PALIERS else np.array([])
+    seuils = seuils[(seuils >= valeurs.min()) & (seuils <= valeurs.max())]
+    courbe = sweep(data, colonne, np.union1d(valeurs, np.append(seuils, actuelle)))
+    distances = np.abs(courbe['x'] - actuelle)
+    besoins = {}
+    for code, (_, niveau, *_) in enumerate(NIVEAUX):
+        atteint = courbe['niveau_code'] <= code
+        besoins[niveau] = float(courbe['x'][atteint][np.argmin(distances[atteint])]) if atteint.any() else None
+    return besoins
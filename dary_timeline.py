@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Historique des scores de chaque projet
+Chaque scoring d'un projet (saisie, analyse batch, dossier surveillé) est
+ajouté à une série temporelle par projet : date, score global et
+sous-scores. Les points sont stockés en colonnes, triés par projet et par
+date à la lecture. Pour l'affichage, les longues séries sont réduites à un
+nombre fixe de points par LTTB (Largest-Triangle-Three-Buckets), calculé
+pour toutes les séries à la fois.
+
+Usage :
+    python dary_timeline.py historique/ [--projet "Résidence Anfa"] [--points 200]
+"""
+
+import argparse
+import glob
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from dary_scoring import CATEGORIES
+
+DOSSIER_HISTORIQUE = os.environ.get('DARY_TIMELINE_DIR', 'historique')
+# Points affichés par série après réduction
+POINTS_SERIE = 200
+# Intervalle minimal entre deux sauvegardes automatiques (s)
+INTERVALLE_SAUVEGARDE = 60
+# Points conservés : les plus récents de chaque projet, puis les plus récents au total
+MAX_POINTS_PROJET = 1000
+MAX_POINTS = 2_000_000
+
+
+def lttb(x, y, debuts, points=POINTS_SERIE):
+    """Indices des points gardés par LTTB pour des séries concaténées
+
+    x, y : séries mises bout à bout, x croissant dans chaque série ;
+    debuts : début de chaque série (plus la longueur totale à la fin).
+    Les séries d'au plus points points sont gardées entières ; pour les
+    autres, premier et dernier points puis, dans chacun des points - 2
+    intervalles, le point formant le plus grand triangle avec le point
+    retenu précédent et la moyenne de l'intervalle suivant. Une itération
+    par intervalle, vectorisée sur toutes les séries.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    debuts = np.asarray(debuts, dtype=np.int64)
+    longueurs = np.diff(debuts)
+    courtes = longueurs <= max(points, 2)
+    garder = [np.arange(d, f) for d, f in zip(debuts[:-1][courtes], debuts[1:][courtes])]
+    longues = np.flatnonzero(~courtes)
+    if len(longues) == 0:
+        return np.concatenate(garder) if garder else np.zeros(0, dtype=np.int64)
+
+    debut, longueur = debuts[longues], longueurs[longues]
+    pas = (longueur - 2) / (points - 2)
+    # Sommes cumulées : moyenne d'un intervalle en deux lectures
+    cumul_x = np.r_[0, np.cumsum(x)]
+    cumul_y = np.r_[0, np.cumsum(y)]
+    retenus = np.empty((len(longues), points), dtype=np.int64)
+    retenus[:, 0] = debut
+    retenus[:, -1] = debut + longueur - 1
+    precedent = debut
+    for b in range(points - 2):
+        bas = debut + np.floor(b * pas).astype(np.int64) + 1
+        haut = debut + np.floor((b + 1) * pas).astype(np.int64) + 1
+        if b < points - 3:
+            suivant_haut = np.minimum(debut + np.floor((b + 2) * pas).astype(np.int64) + 1, debut + longueur - 1)
+            suivant_bas = haut
+        else:
+            suivant_bas, suivant_haut = debut + longueur - 1, debut + longueur
+        effectif = suivant_haut - suivant_bas
+        moyenne_x = (cumul_x[suivant_haut] - cumul_x[suivant_bas]) / effectif
+        moyenne_y = (cumul_y[suivant_haut] - cumul_y[suivant_bas]) / effectif
+        # Candidats de l'intervalle de chaque série, mis bout à bout
+        tailles = haut - bas
+        serie = np.repeat(np.arange(len(longues)), tailles)
+        candidats = np.arange(tailles.sum()) - np.repeat(np.cumsum(tailles) - tailles, tailles) + bas[serie]
+        ax, ay = x[precedent][serie], y[precedent][serie]
+        aires = np.abs((ax - moyenne_x[serie]) * (y[candidats] - ay) - (ax - x[candidats]) * (moyenne_y[serie] - ay))
+        # Plus grande aire de chaque série (la première en cas d'égalité)
+        ordre = np.lexsort((-aires, serie))
+        premiers = ordre[np.r_[True, serie[ordre][1:] != serie[ordre][:-1]]]
+        precedent = candidats[premiers]
+        retenus[:, b + 1] = precedent
+    return np.sort(np.concatenate(garder + [retenus.ravel()]))
+
+
+class TimelineStore:
+    """Séries temporelles des scores par projet (colonnes en mémoire, sauvegarde npz)
+
+    Au tri, seuls les max_points_projet derniers points de chaque projet et
+    les max_points plus récents au total sont gardés ; un projet sans point
+    est oublié.
+    """
+
+    def __init__(self, categories=tuple(CATEGORIES), max_points_projet=MAX_POINTS_PROJET, max_points=MAX_POINTS):
+        self.categories = tuple(categories)
+        self.max_points_projet = max_points_projet
+        self.max_points = max_points
+        self.projets = []
+        self._codes = {}
+        # Lots ajoutés depuis le dernier tri : (codes, dates, scores, sous-scores)
+        self._lots = []
+        self._points = 0
+        self._tri = None
+        # Incrémentée à chaque ajout : clé des vues fusionnées et des bandes mises en cache
+        self.version = 0
+        self._bandes = {}
+        self._verrou = threading.Lock()
+        self._verrou_sauvegarde = threading.Lock()
+        self._sauvegarde = None
+        self._derniere_sauvegarde = time.time()
+
+    def __len__(self):
+        return self._points
+
+    def __contains__(self, nom):
+        return nom in self._codes
+
+    def _code(self, nom):
+        code = self._codes.get(nom)
+        if code is None:
+            code = self._codes[nom] = len(self.projets)
+            self.projets.append(nom)
+        return code
+
+    def record(self, noms, resultat, horodatage=None):
+        """Ajout d'un lot de résultats (dict de tableaux : score_global et une colonne par catégorie)"""
+        noms = np.atleast_1d(np.asarray(noms, dtype=object))
+        n = len(noms)
+        dates = np.broadcast_to(np.asarray(time.time() if horodatage is None else horodatage, dtype=float), (n,))
+        scores = np.atleast_1d(np.asarray(resultat['score_global'], dtype=np.float32))
+        sous_scores = np.column_stack([np.atleast_1d(np.asarray(resultat[c], dtype=np.float32))
+                                       for c in self.categories]) if self.categories else np.zeros((n, 0))
+        with self._verrou:
+            uniques, inverse = np.unique(noms.astype(str), return_inverse=True)
+            codes = np.array([self._code(nom) for nom in uniques], dtype=np.int32)[inverse.ravel()]
+            self._lots.append((codes, dates.copy(), scores, sous_scores.astype(np.float32)))
+            self._points += n
+            self._tri = None
+            self.version += 1
+        # Mémoire bornée même si l'historique n'est jamais lu
+        if self._points > 2 * self.max_points:
+            self._sorted()
+
+    def record_result(self, nom, resultat):
+        """Ajout du résultat d'un projet (ScoreResult)"""
+        lot = {'score_global': resultat.score_global}
+        lot.update(zip(CATEGORIES, resultat.sous_scores))
+        self.record([nom], lot, horodatage=resultat.horodatage)
+
+    def _sorted(self):
+        """Points triés par projet puis par date, et début de chaque projet"""
+        with self._verrou:
+            return self._sort()
+
+    def _snapshot(self):
+        """Points triés et noms des projets, lus sous le même verrou (un tri peut renuméroter)"""
+        with self._verrou:
+            codes, dates, scores, sous_scores, _ = self._sort()
+            return codes, dates, scores, sous_scores, list(self.projets)
+
+    def _sort(self):
+        """Tri des lots en attente (verrou tenu)"""
+        if self._tri is None:
+            if self._lots:
+                codes, dates, scores, sous_scores = (np.concatenate(c) for c in zip(*self._lots))
+            else:
+                codes, dates = np.zeros(0, dtype=np.int32), np.zeros(0)
+                scores, sous_scores = np.zeros(0, dtype=np.float32), np.zeros((0, len(self.categories)))
+            ordre = np.lexsort((dates, codes))
+            ordre = ordre[self._retained(codes[ordre], dates[ordre])]
+            codes, dates, scores, sous_scores = codes[ordre], dates[ordre], scores[ordre], sous_scores[ordre]
+            # Projets dont tous les points ont été oubliés : codes renumérotés
+            presents = np.zeros(len(self.projets), dtype=bool)
+            presents[codes] = True
+            if not presents.all():
+                codes = (np.cumsum(presents) - 1)[codes].astype(np.int32)
+                self.projets = [nom for nom, garde in zip(self.projets, presents) if garde]
+                self._codes = {nom: i for i, nom in enumerate(self.projets)}
+            self._points = len(codes)
+            # Un seul lot consolidé : les prochains ajouts ne retrient que ce qui est nouveau
+            self._lots = [(codes, dates, scores, sous_scores)] if len(codes) else []
+            debuts = np.searchsorted(codes, np.arange(len(self.projets) + 1))
+            self._tri = (codes, dates, scores, sous_scores, debuts)
+        return self._tri
+
+    def _retained(self, codes, dates):
+        """Masque des points gardés (points triés par projet puis par date)"""
+        n = len(codes)
+        garder = np.arange(n) >= np.searchsorted(codes, codes, side='right') - self.max_points_projet
+        en_trop = int(garder.sum()) - self.max_points
+        if en_trop > 0:
+            candidats = np.flatnonzero(garder)
+            garder[candidats[np.argpartition(dates[candidats], en_trop - 1)[:en_trop]]] = False
+        return garder
+
+    def series(self, nom):
+        """Historique d'un projet : dict de tableaux date, score_global et catégories"""
+        _, dates, scores, sous_scores, debuts = self._sorted()
+        code = self._codes.get(nom)
+        debut, fin = (0, 0) if code is None else (debuts[code], debuts[code + 1])
+        serie = {'date': dates[debut:fin], 'score_global': scores[debut:fin]}
+        serie.update({c: sous_scores[debut:fin, j] for j, c in enumerate(self.categories)})
+        return serie
+
+    def downsampled(self, noms=None, mesure='score_global', points=POINTS_SERIE):
+        """Séries réduites par LTTB : liste de (nom, dates, valeurs)
+
+        noms : projets voulus (tous par défaut) ; mesure : score_global ou une catégorie.
+        """
+        _, dates, scores, sous_scores, debuts = self._sorted()
+        valeurs = scores if mesure == 'score_global' else sous_scores[:, self.categories.index(mesure)]
+        codes = np.arange(len(self.projets)) if noms is None else \
+            np.array([self._codes[n] for n in noms if n in self._codes], dtype=np.int64)
+        codes = codes[debuts[codes + 1] > debuts[codes]]
+        # Séries voulues mises bout à bout pour une seule réduction
+        longueurs = debuts[codes + 1] - debuts[codes]
+        positions = np.repeat(debuts[codes] - np.r_[0, np.cumsum(longueurs)[:-1]], longueurs) + \
+            np.arange(longueurs.sum())
+        nouveaux_debuts = np.r_[0, np.cumsum(longueurs)]
+        gardes = lttb(dates[positions], valeurs[positions], nouveaux_debuts, points)
+        coupes = np.searchsorted(gardes, nouveaux_debuts)
+        return [(self.projets[code], dates[positions[gardes[d:f]]], valeurs[positions[gardes[d:f]]])
+                for code, d, f in zip(codes, coupes[:-1], coupes[1:])]
+
+    def bands(self, mesure='score_global', cases=POINTS_SERIE, quantiles=(0.1, 0.5, 0.9)):
+        """Distribution d'une mesure par intervalle de dates, tous projets confondus
+
+        Retourne un dict de tableaux : 'date' (milieu de chaque intervalle non
+        vide), 'n' et un quantile (bas) par valeur de quantiles. Le résultat
+        est gardé jusqu'au prochain ajout : les réexécutions ne retrient pas.
+        """
+        cle = (self.version, mesure, cases, tuple(quantiles))
+        bandes = self._bandes.get(cle)
+        if bandes is None:
+            bandes = self._bands(mesure, cases, quantiles)
+            self._bandes = {c: b for c, b in self._bandes.items() if c[0] == cle[0]}
+            self._bandes[cle] = bandes
+        return bandes
+
+    def _bands(self, mesure, cases, quantiles):
+        _, dates, scores, sous_scores, _ = self._sorted()
+        valeurs = scores if mesure == 'score_global' else sous_scores[:, self.categories.index(mesure)]
+        if not len(dates):
+            return {'date': dates, 'n': np.zeros(0, dtype=np.int64), **{q: valeurs for q in quantiles}}
+        premiere = dates.min()
+        largeur = (dates.max() - premiere) / cases or 1.0
+        case = np.minimum(((dates - premiere) / largeur).astype(np.int64), cases - 1)
+        ordre = np.lexsort((valeurs, case))
+        occupees, debuts, effectifs = np.unique(case[ordre], return_index=True, return_counts=True)
+        bandes = {'date': premiere + (occupees + 0.5) * largeur, 'n': effectifs}
+        for q in quantiles:
+            bandes[q] = valeurs[ordre][debuts + np.floor(q * (effectifs - 1)).astype(np.int64)]
+        return bandes
+
+    def merge(self, autre):
+        """Ajout des points d'un autre historique (autre worker)"""
+        codes, dates, scores, sous_scores, projets = autre._snapshot()
+        if autre.categories != self.categories:
+            raise ValueError("Historiques de catégories différentes")
+        with self._verrou:
+            correspondance = np.array([self._code(nom) for nom in projets], dtype=np.int32)
+            if len(codes):
+                self._lots.append((correspondance[codes], dates, scores, sous_scores))
+                self._points += len(codes)
+                self._tri = None
+                self.version += 1
+        return self
+
+    def save(self, chemin):
+        """Sauvegarde atomique au format npz (attend la fin d'une sauvegarde en arrière-plan)"""
+        with self._verrou_sauvegarde:
+            codes, dates, scores, sous_scores, projets = self._snapshot()
+            os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+            temporaire = f'{chemin}.{os.getpid()}.tmp'
+            with open(temporaire, 'wb') as f:
+                np.savez_compressed(f, entete=np.array(json.dumps({'categories': self.categories,
+                                                                   'projets': projets}, ensure_ascii=False)),
+                                    codes=codes, dates=dates, scores=scores, sous_scores=sous_scores)
+            os.replace(temporaire, chemin)
+            self._derniere_sauvegarde = time.time()
+
+    @classmethod
+    def load(cls, chemin):
+        with np.load(chemin) as donnees:
+            entete = json.loads(str(donnees['entete']))
+            historique = cls(entete['categories'])
+            for nom in entete['projets']:
+                historique._code(nom)
+            if len(donnees['codes']):
+                historique._lots.append((donnees['codes'], donnees['dates'], donnees['scores'],
+                                         donnees['sous_scores']))
+                historique._points = len(donnees['codes'])
+        return historique
+
+    def maybe_save(self, chemin, intervalle=INTERVALLE_SAUVEGARDE):
+        """Sauvegarde dans un thread si la précédente date de plus de intervalle secondes
+
+        La compression prend plus d'une seconde par million de points :
+        l'appelant (clic dans l'application, boucle du watcher) ne l'attend pas.
+        """
+        with self._verrou:
+            if time.time() - self._derniere_sauvegarde < intervalle or \
+                    (self._sauvegarde is not None and self._sauvegarde.is_alive()):
+                return False
+            self._derniere_sauvegarde = time.time()
+            self._sauvegarde = threading.Thread(target=self.save, args=(chemin,), name='dary-historique',
+                                                daemon=True)
+        self._sauvegarde.start()
+        return True
+
+
+def worker_file(dossier=DOSSIER_HISTORIQUE):
+    """Fichier de sauvegarde propre à ce processus (un par worker)"""
+    return os.path.join(dossier, f'historique-{socket.gethostname()}-{os.getpid()}.npz')
+
+
+def load_directory(dossier=DOSSIER_HISTORIQUE, exclure=None):
+    """Fusion de toutes les sauvegardes d'un dossier"""
+    historique = TimelineStore()
+    for chemin in sorted(glob.glob(os.path.join(dossier, '*.npz'))):
+        if exclure is None or os.path.abspath(chemin) != os.path.abspath(exclure):
+            historique.merge(TimelineStore.load(chemin))
+    return historique
+
+
+# Historique du processus, partagé par les sessions
+HISTORIQUE = TimelineStore()
+
+
+def main(argv=None):
+    """Résumé des historiques sauvegardés"""
+    parser = argparse.ArgumentParser(description="Historique des scores par projet")
+    parser.add_argument('dossier', nargs='?', default=DOSSIER_HISTORIQUE)
+    parser.add_argument('--projet', help="points d'un projet")
+    parser.add_argument('--points', type=int, default=POINTS_SERIE, help="points par série après réduction")
+    args = parser.parse_args(argv)
+
+    historique = load_directory(args.dossier)
+    debut = time.perf_counter()
+    series = historique.downsampled(points=args.points)
+    duree = time.perf_counter() - debut
+    print(f"✅ {len(historique.projets)} projet(s), {len(historique)} point(s) ; "
+          f"{sum(len(d) for _, d, _ in series)} point(s) après réduction en {duree:.2f}s")
+    if args.projet:
+        serie = historique.series(args.projet)
+        for date, score in zip(serie['date'], serie['score_global']):
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(date))}  {score:6.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
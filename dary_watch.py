@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Surveillance d'un dossier de fichiers CSV de projets
+Chaque fichier nouveau ou modifié est pris en compte une fois sa taille
+stable, scoré par lots avec le moteur choisi (règles DARY par défaut) et
+ses résultats écrits de façon atomique dans resultats/, avec le cube
+d'agrégation des scores (dary_cube). Les fichiers illisibles partent dans rejets/
+avec la cause de l'erreur ; un fichier d'état donne débit et latences.
+
+Usage :
+    python dary_watch.py dossier/ [--sortie resultats/] [--moteur regles] [--travaux 2] [--intervalle 2] [--une-fois]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dary_backends import MOTEUR_DEFAUT, available_backends, get_backend
+from dary_cube import ScoreCube
+from dary_gazetteer import FICHIER_REFERENTIEL, load_gazetteer
+from dary_geo import load_poi
+from dary_market import FICHIER_MARCHE, load_market, load_rules
+from dary_ingestion import InvalidFile, read_projects
+from dary_monitoring import MONITEUR, worker_file
+from dary_timeline import HISTORIQUE
+from dary_timeline import worker_file as timeline_file
+
+# Secondes entre deux parcours du dossier
+INTERVALLE_SCRUTATION = 2.0
+# Durée pendant laquelle taille et date doivent rester identiques avant lecture
+DELAI_STABILITE = 1.0
+# Fichiers scorés en parallèle
+MAX_TRAVAUX = 2
+# Lignes lues et scorées par lot
+TAILLE_LOT = 50_000
+
+DOSSIER_RESULTATS = 'resultats'
+DOSSIER_REJETS = 'rejets'
+FICHIER_ETAT = 'dary_watch_status.json'
+# Fichiers déjà traités (signature), pour ne pas les rescorer au redémarrage
+FICHIER_REGISTRE = '.dary_watch.json'
+# Fichiers en cours d'écriture par les outils de copie
+SUFFIXES_IGNORES = ('.tmp', '.part', '.crdownload', '~')
+
+LATENCES_CONSERVEES = 1000
+
+
+def atomic_write(chemin, contenu):
+    """Écriture d'un fichier texte via un fichier temporaire renommé"""
+    temporaire = f'{chemin}.{os.getpid()}.tmp'
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        f.write(contenu)
+    os.replace(temporaire, chemin)
+
+
+def score_file(source, destination, moteur, index_poi=None, taille_lot=TAILLE_LOT, fichier_cube=None,
+               gazetteer=None, marche=None):
+    """Scoring d'un fichier par lots, résultats écrits de façon atomique ; retourne le nombre de lignes
+
+    Si fichier_cube est donné, le cube d'agrégation des scores y est sauvegardé.
+    """
+    temporaire = f'{destination}.{os.getpid()}.tmp'
+    cube = ScoreCube.for_backend(moteur) if fichier_cube else None
+    lignes = 0
+    try:
+        with open(temporaire, 'w', encoding='utf-8', newline='') as sortie:
+            for projets in read_projects(source, moteur, taille_lot, index_poi, gazetteer, marche):
+                resultat = moteur.score(projets)
+                if 'niveau_code' in resultat:
+                    MONITEUR.observe(resultat, projets['zone'], projets['type_bien'])
+                    HISTORIQUE.record(projets['nom_projet'], resultat)
+                if cube is not None:
+                    cube.add(resultat, projets)
+                scores = projets.assign(score_global=resultat['score_global'], niveau=resultat['niveau'],
+                                        **{f'score_{c.lower()}': resultat[c] for c in moteur.categories})
+                scores.to_csv(sortie, index=False, header=lignes == 0)
+                lignes += len(projets)
+        os.replace(temporaire, destination)
+        if cube is not None:
+            cube.save(fichier_cube)
+    finally:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+    return lignes
+
+
+class FolderWatcher:
+    """Surveillance d'un dossier : détection, scoring en parallèle borné, rejets et état"""
+
+    def __init__(self, dossier, sortie=None, travaux=MAX_TRAVAUX, delai_stabilite=DELAI_STABILITE,
+                 fichier_poi=None, moteur=None, fichier_quartiers=None, fichier_marche=None):
+        self.dossier = dossier
+        self.moteur = get_backend(moteur)
+        self.sortie = sortie or os.path.join(dossier, DOSSIER_RESULTATS)
+        self.rejets = os.path.join(dossier, DOSSIER_REJETS)
+        self.delai_stabilite = delai_stabilite
+        self.index_poi = None
+        if fichier_poi and os.path.exists(fichier_poi):
+            self.index_poi = load_poi(fichier_poi)
+        self.gazetteer = None
+        if fichier_quartiers and os.path.exists(fichier_quartiers):
+            self.gazetteer = load_gazetteer(fichier_quartiers)
+        # Référentiel de marché relu à chaque fichier s'il a changé sur disque
+        self.fichier_marche = fichier_marche
+        self.regles_marche = load_rules()
+        os.makedirs(self.sortie, exist_ok=True)
+        os.makedirs(self.rejets, exist_ok=True)
+
+        self._executeur = ThreadPoolExecutor(max_workers=travaux, thread_name_prefix='dary-watch')
+        self._verrou = threading.Lock()
+        # chemin -> (signature, instant où elle a été vue pour la première fois)
+        self._candidats = {}
+        self._en_cours = {}
+        self._registre = self._load_registry()
+        self._etat = {
+            'dossier': os.path.abspath(dossier), 'moteur': self.moteur.nom, 'debut': time.time(),
+            'travaux': travaux,
+            'fichiers': 0, 'lignes': 0, 'rejets': 0, 'derniere_erreur': None,
+        }
+        self._latences = []
+        self._duree_scoring = 0.0
+
+    def _load_registry(self):
+        chemin = os.path.join(self.dossier, FICHIER_REGISTRE)
+        if os.path.exists(chemin):
+            with open(chemin, encoding='utf-8') as f:
+                return {k: tuple(v) for k, v in json.load(f).items()}
+        return {}
+
+    def _save_registry(self):
+        atomic_write(os.path.join(self.dossier, FICHIER_REGISTRE), json.dumps(self._registre))
+
+    def poll(self):
+        """Parcours du dossier ; retourne les fichiers stables soumis au scoring"""
+        maintenant = time.monotonic()
+        presents = set()
+        prets = []
+        with os.scandir(self.dossier) as entrees:
+            for entree in entrees:
+                nom = entree.name
+                if (not entree.is_file() or nom.startswith('.') or nom.endswith(SUFFIXES_IGNORES)
+                        or not nom.lower().endswith('.csv')):
+                    continue
+                infos = entree.stat()
+                signature = (infos.st_size, infos.st_mtime_ns)
+                presents.add(nom)
+                with self._verrou:
+                    if nom in self._en_cours or self._registre.get(nom) == signature:
+                        continue
+                    vue = self._candidats.get(nom)
+                    if vue is None or vue[0] != signature:
+                        # Nouveau fichier ou encore en cours d'écriture : on attend qu'il se stabilise
+                        self._candidats[nom] = (signature, maintenant)
+                    elif maintenant - vue[1] >= self.delai_stabilite:
+                        prets.append((nom, signature, vue[1]))
+        with self._verrou:
+            for nom in set(self._candidats) - presents:
+                del self._candidats[nom]
+            for nom, signature, detection in prets:
+                del self._candidats[nom]
+                self._en_cours[nom] = self._executeur.submit(self._process, nom, signature, detection)
+        return [nom for nom, _, _ in prets]
+
+    def _market(self):
+        """(référentiel de marché à jour, règles) ou None sans fichier de marché"""
+        marche = load_market(self.fichier_marche) if self.fichier_marche else None
+        return (marche, self.regles_marche) if marche is not None else None
+
+    def _process(self, nom, signature, detection):
+        """Scoring d'un fichier ; en cas d'échec, déplacement dans les rejets"""
+        source = os.path.join(self.dossier, nom)
+        debut = time.perf_counter()
+        try:
+            base = os.path.join(self.sortie, os.path.splitext(nom)[0])
+            lignes = score_file(source, f'{base}_scores.csv', self.moteur, self.index_poi,
+                                fichier_cube=f'{base}_cube.npz', gazetteer=self.gazetteer,
+                                marche=self._market())
+        except Exception as e:
+            self._reject(nom, str(e) if isinstance(e, InvalidFile) else f"{nom} : {e!r}")
+            return
+        with self._verrou:
+            # Signature enregistrée avant la fin du travail : pas de second scoring du même fichier
+            self._registre[nom] = signature
+            try:
+                self._save_registry()
+            except Exception as e:
+                # Disque plein par exemple : sans registre, le fichier serait rescoré au redémarrage
+                del self._registre[nom]
+                erreur = f"{nom} : scores écrits mais registre non enregistré ({e!r})"
+            else:
+                erreur = None
+        if erreur is not None:
+            self._reject(nom, erreur)
+            return
+        with self._verrou:
+            del self._en_cours[nom]
+            self._etat['fichiers'] += 1
+            self._etat['lignes'] += lignes
+            self._duree_scoring += time.perf_counter() - debut
+            self._latences = (self._latences + [time.monotonic() - detection])[-LATENCES_CONSERVEES:]
+        MONITEUR.maybe_save(worker_file())
+        HISTORIQUE.maybe_save(timeline_file())
+        self.write_status()
+
+    def _reject(self, nom, message):
+        """Fichier déplacé dans rejets/ avec la cause de l'erreur"""
+        horodatage = time.strftime('%Y%m%d-%H%M%S')
+        cible = os.path.join(self.rejets, f'{horodatage}_{nom}')
+        try:
+            try:
+                shutil.move(os.path.join(self.dossier, nom), cible)
+            except OSError:
+                pass
+            atomic_write(f'{cible}.erreur.txt', message + '\n')
+        finally:
+            # Entrée retirée même si la cause ne peut pas être écrite (disque plein)
+            with self._verrou:
+                del self._en_cours[nom]
+                self._etat['rejets'] += 1
+                self._etat['derniere_erreur'] = message
+        self.write_status()
+
+    def status(self):
+        """Débit, latences détection -> résultats et activité en cours"""
+        with self._verrou:
+            etat = dict(self._etat)
+            latences = list(self._latences)
+            etat['en_cours'] = sorted(self._en_cours)
+            etat['en_attente'] = sorted(self._candidats)
+            duree = self._duree_scoring
+        etat['maj'] = time.time()
+        etat['debit_lignes_s'] = round(etat['lignes'] / duree, 1) if duree else None
+        if latences:
+            p50, p95, p99 = np.percentile(latences, [50, 95, 99])
+            etat['latence_s'] = {'p50': round(p50, 3), 'p95': round(p95, 3), 'p99': round(p99, 3)}
+        return etat
+
+    def write_status(self):
+        atomic_write(os.path.join(self.sortie, FICHIER_ETAT),
+                     json.dumps(self.status(), indent=2, ensure_ascii=False))
+
+    def drain(self):
+        """Attente de la fin des scorings en cours"""
+        with self._verrou:
+            travaux = list(self._en_cours.values())
+        for travail in travaux:
+            travail.result()
+
+    def run(self, intervalle=INTERVALLE_SCRUTATION, une_fois=False, arret=None):
+        """Boucle de surveillance jusqu'à l'arrêt (ou un seul passage complet)"""
+        arret = arret or threading.Event()
+        try:
+            while not arret.is_set():
+                self.poll()
+                with self._verrou:
+                    termine = une_fois and not self._candidats
+                if termine:
+                    break
+                self.write_status()
+                arret.wait(self.delai_stabilite if une_fois else intervalle)
+        finally:
+            self.drain()
+            self._executeur.shutdown(wait=True)
+            MONITEUR.save(worker_file())
+            HISTORIQUE.save(timeline_file())
+            self.write_status()
+
+
+def main(argv=None):
+    """Lancement du démon de surveillance"""
+    parser = argparse.ArgumentParser(description="Scoring continu des CSV déposés dans un dossier")
+    parser.add_argument('dossier')
+    parser.add_argument('--sortie', help=f"dossier des résultats (défaut : dossier/{DOSSIER_RESULTATS})")
+    parser.add_argument('--travaux', type=int, default=MAX_TRAVAUX, help="fichiers scorés en parallèle")
+    parser.add_argument('--intervalle', type=float, default=INTERVALLE_SCRUTATION)
+    parser.add_argument('--stabilite', type=float, default=DELAI_STABILITE,
+                        help="secondes sans changement de taille avant lecture")
+    parser.add_argument('--moteur', default=MOTEUR_DEFAUT, choices=available_backends())
+    parser.add_argument('--poi', default=os.environ.get('DARY_POI_FILE', 'points_interet.csv'))
+    parser.add_argument('--quartiers', default=FICHIER_REFERENTIEL,
+                        help="référentiel des quartiers pour déduire les zones absentes")
+    parser.add_argument('--marche', default=FICHIER_MARCHE,
+                        help="données de marché par quartier (rechargées quand le fichier change)")
+    parser.add_argument('--une-fois', action='store_true', help="traiter les fichiers présents puis quitter")
+    args = parser.parse_args(argv)
+
+    watcher = FolderWatcher(args.dossier, args.sortie, args.travaux, args.stabilite, args.poi, args.moteur,
+                           args.quartiers, args.marche)
+    arret = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: arret.set())
+    print(f"👀 Surveillance de {os.path.abspath(args.dossier)} (résultats : {watcher.sortie})")
+    try:
+        watcher.run(args.intervalle, args.une_fois, arret)
+    except KeyboardInterrupt:
+        pass
+    etat = watcher.status()
+    print(f"✅ {etat['fichiers']} fichier(s), {etat['lignes']} projet(s) scorés, {etat['rejets']} rejet(s)")
+    return 1 if etat['rejets'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests des moteurs de scoring interchangeables
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dary_backends import CahierBackend, get_backend
+from dary_scoring import CRITERES, fill_defaults, score_batch
+
+CAHIER = pd.DataFrame({
+    'Critère': ['Ancienneté du promoteur', 'Nombre de projets livrés', 'Solvabilité financière',
+                'Qualité des constructions et des finitions', 'Rentabilité'],
+    'Pondération (%)': [15, 15, 10, 10, 15],
+    'Catégorie': ['Fiabilité', 'Fiabilité', 'Financier', 'Qualité', 'Rentabilité'],
+})
+
+
+def weighted_loop(notes, cahier):
+    """Calcul historique de dary_score_app, critère par critère"""
+    total = cahier['Pondération (%)'].sum()
+    somme = 0
+    for _, ligne in cahier.iterrows():
+        valeur = notes.get(ligne['Critère'], np.nan)
+        if pd.notnull(valeur):
+            somme += valeur * ligne['Pondération (%)'] / total
+    return round(somme, 2)
+
+
+def test_moteur_regles_identique_a_score_batch():
+    """Le moteur 'regles' déclare tous les critères et reproduit score_batch"""
+    moteur = get_backend('regles')
+    assert set(moteur.colonnes) == set(CRITERES)
+    projets = pd.read_csv('projets_immobiliers_maroc.csv')
+    attendu = score_batch(fill_defaults(projets))
+    resultat = moteur.score(moteur.prepare(projets))
+    assert np.array_equal(resultat['score_global'], attendu['score_global'])
+    with pytest.raises(KeyError):
+        get_backend('inconnu')
+
+
+def test_moteur_cahier_par_lots():
+    """Le moteur 'cahier' score un lot comme la boucle du simulateur, notes manquantes comprises"""
+    moteur = CahierBackend(CAHIER)
+    rng = np.random.default_rng(0)
+    notes = pd.DataFrame(np.round(rng.uniform(0, 10, (200, 4)), 1), columns=moteur.criteres[:4])
+    notes.iloc[::7, 1] = np.nan
+    resultat = moteur.score(notes)
+    attendu = [weighted_loop(ligne.to_dict(), CAHIER) for _, ligne in notes.iterrows()]
+    assert np.allclose(resultat['score_global'], attendu)
+    assert set(moteur.categories) == {'Fiabilité', 'Financier', 'Qualité', 'Rentabilité'}
+    assert np.all(resultat['Rentabilité'] == 0)
+    assert float(moteur.score({'Rentabilité': 10.0})['score_global']) == round(10 * 15 / 65, 2)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la recherche de projets comparables
+"""
+
+import numpy as np
+
+from dary_comparables import ComparablesIndex
+from dary_scoring import score_batch
+
+
+def _scores(projets):
+    return projets.assign(score_global=score_batch(projets)['score_global'])
+
+
+def test_recherche_exacte_et_filtre_score(portefeuille):
+    """Mêmes voisins qu'un calcul brut, filtre « mieux notés » respecté"""
+    projets = _scores(portefeuille(500, 3))
+    index = ComparablesIndex(projets)
+    assert not index.approche
+    projet = projets.iloc[7].to_dict()
+
+    trouves = index.query(projet, k=10)
+    brut = np.sqrt(((index.vecteurs - index.encodeur.transform(projet)[0]) ** 2).sum(axis=1))
+    assert trouves[0]['ligne'] == 7 and trouves[0]['distance'] == 0
+    assert [r['ligne'] for r in trouves] == list(np.argsort(brut, kind='stable')[:10])
+
+    mieux = index.query(projet, k=5, score_min=projet['score_global'])
+    assert len(mieux) == 5 and all(r['score'] > projet['score_global'] for r in mieux)
+    assert index.query(projet, k=5, score_min=100) == []
+
+
+def test_index_approche_rappel(portefeuille):
+    """Index à listes inversées : quasiment les mêmes voisins que la recherche exacte"""
+    projets = _scores(portefeuille(20_000, 3))
+    approche = ComparablesIndex(projets, seuil_approche=10_000)
+    exact = ComparablesIndex(projets, seuil_approche=len(projets) + 1)
+    assert approche.approche and not exact.approche
+
+    rappels = []
+    for ligne in np.random.default_rng(0).integers(len(projets), size=50):
+        projet = projets.iloc[ligne].to_dict()
+        attendus = {r['ligne'] for r in exact.query(projet, k=10)}
+        rappels.append(len(attendus & {r['ligne'] for r in approche.query(projet, k=10)}) / 10)
+    assert np.mean(rappels) >= 0.9
+
+    projet = projets.iloc[0].to_dict()
+    mieux = approche.query(projet, k=5, score_min=projet['score_global'])
+    assert all(r['score'] > projet['score_global'] for r in mieux)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du cube d'agrégation des scores
+"""
+
+import numpy as np
+import pandas as pd
+
+from dary_backends import CahierBackend
+from dary_cube import AUTRE, ScoreCube
+from dary_scoring import score_batch
+from dary_watch import score_file
+
+
+def _scores(projets):
+    """Zone hors des modalités du cube pour un projet sur neuf, puis scoring"""
+    projets.loc[::9, 'zone'] = 'casablanca-nord'
+    return projets, score_batch(projets)
+
+
+def test_cube_par_lots_egal_calcul_direct(portefeuille):
+    """Cube alimenté par lots : effectifs, moyennes et quantiles identiques au calcul sur les projets"""
+    projets, resultat = _scores(portefeuille(30_000, 5))
+    cube = ScoreCube()
+    for debut in range(0, len(projets), 7_000):
+        lot = slice(debut, debut + 7_000)
+        cube.add({c: v[lot] for c, v in resultat.items()}, projets.iloc[lot])
+    assert cube.n == len(projets)
+
+    table = projets.assign(niveau=resultat['niveau'], score_global=resultat['score_global'],
+                           Financier=resultat['Financier'])
+    table.loc[~table['zone'].isin(cube.modalites['zone']), 'zone'] = 'autre'
+    selection = table[(table['etat'] == 'off-plan') & table['type_bien'].isin(['studio', 'appartement'])]
+    lignes = cube.stats('Financier', {'etat': 'off-plan', 'type_bien': ['studio', 'appartement']}, par=['zone'])
+    attendu = selection.groupby('zone')['Financier']
+    assert {l['zone']: l['n'] for l in lignes} == attendu.size().to_dict()
+    for ligne in lignes:
+        valeurs = attendu.get_group(ligne['zone'])
+        assert abs(ligne['moyenne'] - valeurs.mean()) < 0.01
+        assert ligne['mediane'] == np.quantile(valeurs, 0.5, method='inverted_cdf')
+
+    globales = cube.stats(par=['niveau', 'zone'])
+    attendu = table.groupby(['niveau', 'zone'])['score_global'].agg(
+        lambda v: np.quantile(v, 0.5, method='inverted_cdf'))
+    assert all(l['mediane'] == attendu[(l['niveau'], l['zone'])] for l in globales)
+
+
+def test_sauvegarde_et_fusion(tmp_path, portefeuille):
+    """Cube sauvegardé puis rechargé à l'identique ; deux cubes fusionnés = un seul cube"""
+    projets, resultat = _scores(portefeuille(2_000, 5))
+    moitie = len(projets) // 2
+    premier = ScoreCube().add({c: v[:moitie] for c, v in resultat.items()}, projets.iloc[:moitie])
+    second = ScoreCube().add({c: v[moitie:] for c, v in resultat.items()}, projets.iloc[moitie:])
+    chemin = tmp_path / 'cube.npz'
+    premier.save(chemin)
+
+    fusion = ScoreCube.load(chemin).merge(second)
+    complet = ScoreCube().add(resultat, projets)
+    assert fusion.stats('Risque', par=['etat', 'niveau']) == complet.stats('Risque', par=['etat', 'niveau'])
+    assert fusion.stats(filtres={'zone': 'autre'})[0]['n'] == (projets['zone'] == 'casablanca-nord').sum()
+
+
+def test_moteur_cahier_sans_dimensions(tmp_path):
+    """Moteur 'cahier' : projets sans zone, type ni état comptés en AUTRE, y compris par dary_watch"""
+    moteur = CahierBackend(pd.DataFrame({'Critère': ['Rentabilité', 'Solvabilité'],
+                                         'Pondération (%)': [60, 40], 'Catégorie': ['Finance', 'Finance']}))
+    projets = pd.DataFrame({'nom_projet': ['A', 'B', 'C'], 'Rentabilité': [8, 4, 9], 'Solvabilité': [7, 5, 2]})
+    cube = ScoreCube.for_backend(moteur).add(moteur.score(projets), projets)
+    assert cube.stats(filtres={'zone': AUTRE, 'etat': AUTRE})[0]['n'] == 3
+
+    projets.to_csv(tmp_path / 'cahier.csv', index=False)
+    lignes = score_file(str(tmp_path / 'cahier.csv'), str(tmp_path / 'scores.csv'), moteur,
+                        fichier_cube=str(tmp_path / 'cube.npz'))
+    assert lignes == 3 and ScoreCube.load(tmp_path / 'cube.npz').n == 3
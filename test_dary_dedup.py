@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du regroupement des projets en double
+"""
+
+import numpy as np
+import pandas as pd
+
+from dary_dedup import deduplicate, find_duplicates, normalize_project_names
+
+
+def test_groupes_et_projet_canonique():
+    """Noms voisins d'un même bloc regroupés, projet le plus renseigné gardé"""
+    projets = pd.DataFrame({
+        'nom_projet': ['Résidence Anfa Place', 'Residence Anfa-Place', 'ANFA PLACE', 'Anfa Place',
+                       'Les Jardins de Californie', 'Jardins Californie', 'Jardins Californie',
+                       None, None, 'Tour Atlas'],
+        'zone': ['premium'] * 4 + ['prime', 'prime', 'standard'] + ['standard'] * 2 + ['premium'],
+        'type_bien': 'appartement',
+        'surface': [100, 105, 98, 300, 80, 80, 80, 70, 70, 100],
+        'ticket_minimum': [1e6, 1e6, 1.1e6, 1e6, 5e5, 5e5, 5e5, 3e5, 3e5, 1e6],
+        'roi_projete': [8, np.nan, 8, 8, 7, 7, 7, 5, 5, 9],
+    })
+    assert list(normalize_project_names(projets['nom_projet'][:3])) == ['anfa place'] * 3
+
+    # Surface éloignée (300 m²), autre zone, projets sans nom : jamais regroupés
+    groupes = find_duplicates(projets)
+    assert groupes.tolist() == [2, 2, 2, 3, 5, 5, 6, 7, 8, 9]
+
+    resultat = deduplicate(projets)
+    assert resultat['regroupes'] == 3
+    assert resultat['projets']['nom_projet'].tolist()[:2] == ['ANFA PLACE', 'Anfa Place']
+    assert resultat['projets']['doublons'].tolist() == [2, 0, 1, 0, 0, 0, 0]
+    assert resultat['groupes']['nom_projet'].tolist() == [
+        'ANFA PLACE', 'Résidence Anfa Place', 'Residence Anfa-Place', 'Jardins Californie',
+        'Les Jardins de Californie']
+    assert resultat['groupes']['canonique'].tolist() == [True, False, False, True, False]
+
+
+def test_doublons_d_un_grand_portefeuille():
+    """Tous les doublons injectés retrouvés, aux limites de classes de surface comprises"""
+    rng = np.random.default_rng(0)
+    n = 20_000
+    syllabes = np.array(['ma', 'ri', 'ad', 'an', 'fa', 'gau', 'thi', 'er', 'sou', 'issi', 'dal', 'bou',
+                         'zi', 'lo', 'mi', 'tou', 'be', 'no', 'cha', 'sel', 'wa', 'ku'])
+    noms = ['Residence ' + ''.join(s).capitalize() for s in syllabes[rng.integers(len(syllabes), size=(n, 4))]]
+    projets = pd.DataFrame({
+        'nom_projet': noms,
+        'zone': rng.choice(['premium', 'prime', 'emergente', 'standard'], n),
+        'type_bien': rng.choice(['appartement', 'villa', 'bureau'], n),
+        'surface': rng.uniform(30, 400, n).round(),
+        'ticket_minimum': rng.integers(50, 5000, n) * 1000.0,
+    })
+    copies = projets.sample(1000, random_state=1)
+    copies = copies.assign(nom_projet=[nom.upper().replace(' ', '-') if i % 2 else nom[:-1] + 'x'
+                                       for i, nom in enumerate(copies['nom_projet'])],
+                           surface=copies['surface'] * 1.04)
+    tous = pd.concat([projets, copies], ignore_index=True)
+
+    groupes = find_duplicates(tous)
+    assert (groupes[n:] == groupes[copies.index]).all()
+    # Le projet le plus récent (la copie) est canonique à égalité de renseignement
+    assert (groupes[n:] >= n).all()
+
+
+def test_phases_distinctes_jamais_regroupees():
+    """Noms qui ne diffèrent que par un numéro ou une lettre de phase : projets distincts"""
+    noms = ['Tranche 1', 'Tranche 2', 'Villa Souissi A', 'Villa Souissi B', 'Anfa Park 3', 'Anfa Park 4',
+            'Anfa Park 03', 'Villa Souisi A']
+    projets = pd.DataFrame({'nom_projet': noms, 'zone': 'premium', 'type_bien': 'villa',
+                            'surface': 200, 'ticket_minimum': 2e6})
+    # Zéro de tête et faute de frappe hors marqueur : toujours des doublons
+    assert find_duplicates(projets).tolist() == [0, 1, 7, 3, 6, 5, 6, 7]
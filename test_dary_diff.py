@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la comparaison de deux scorings
+"""
+
+import os
+
+import pandas as pd
+
+from dary_diff import diff_snapshots
+from dary_scoring import CATEGORIES, fill_defaults, score_batch
+
+
+def _scores(projets):
+    resultat = score_batch(projets)
+    return projets.assign(score_global=resultat['score_global'], niveau=resultat['niveau'],
+                          **{f'score_{c.lower()}': resultat[c] for c in CATEGORIES})
+
+
+def _portefeuille():
+    return fill_defaults(pd.read_csv(os.path.join(os.path.dirname(__file__), 'projets_immobiliers_maroc.csv')))
+
+
+def test_transitions_et_categorie_motrice():
+    """Changement de niveau détecté, expliqué par la catégorie et la colonne modifiées"""
+    avant = _portefeuille()
+    apres = avant.copy()
+    apres.loc[0, 'roi_projete'] = 2
+    apres.loc[1, 'zone'] = 'standard'
+    apres = apres.drop(index=2).iloc[::-1]
+    apres = pd.concat([apres, avant.iloc[[3]].assign(nom_projet='Nouveau projet')])
+
+    diff = diff_snapshots(_scores(avant), _scores(apres))
+    detail = diff['detail'].set_index('nom_projet')
+    assert len(detail) == len(avant) - 1
+    assert diff['ajoutes'] == ['Nouveau projet'] and diff['retires'] == [avant.loc[2, 'nom_projet']]
+
+    premier, second = avant.loc[0, 'nom_projet'], avant.loc[1, 'nom_projet']
+    assert detail.loc[premier, 'categorie_motrice'] == 'Financier'
+    assert detail.loc[premier, 'colonnes_modifiees'] == 'roi_projete'
+    assert detail.loc[premier, 'ecart'] < 0 and detail.loc[premier, 'ecart_financier'] < 0
+    assert detail.loc[second, 'categorie_motrice'] == 'Localisation'
+    assert (detail.drop([premier, second])['ecart'] == 0).all()
+    assert (detail.drop([premier, second])['colonnes_modifiees'] == '').all()
+
+    changes = (detail['niveau_avant'] != detail['niveau_apres']).sum()
+    assert diff['changements_niveau'] == changes
+    assert diff['transitions'].to_numpy().sum() == len(detail)
+    assert diff['baisses'].iloc[0]['nom_projet'] in (premier, second)
+    # Seulement des baisses ici : aucune hausse listée
+    assert len(diff['hausses']) == 0 and (diff['baisses']['ecart'] < 0).all()
+
+
+def test_noms_repetes():
+    """Projets de même nom appariés dans l'ordre d'apparition"""
+    avant = pd.concat([_portefeuille().iloc[:2].assign(nom_projet='Résidence')] * 2, ignore_index=True)
+    apres = avant.copy()
+    apres.loc[3, 'surface'] = 500
+    diff = diff_snapshots(_scores(avant), _scores(apres))
+    assert len(diff['detail']) == 4 and not diff['ajoutes'] and not diff['retires']
+    assert list(diff['detail']['colonnes_modifiees']) == ['', '', '', 'surface']
+
+
+def test_plus_de_64_colonnes():
+    """Colonne modifiée retrouvée au-delà de 64 colonnes d'entrée"""
+    avant = _portefeuille().iloc[:3].assign(**{f'x{i}': float(i) for i in range(70)})
+    apres = avant.copy()
+    apres.loc[1, 'x65'] = -1.0
+    apres.loc[2, ['x3', 'x69']] = -1.0
+    diff = diff_snapshots(_scores(avant), _scores(apres))
+    assert list(diff['detail']['colonnes_modifiees']) == ['', 'x65', 'x3, x69']
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests des exports d'un résultat DARY
+"""
+
+import json
+from io import StringIO
+
+import pandas as pd
+
+from dary_exports import build_export, export_filename
+from dary_scoring import score_project
+
+PROJET = {
+    'nom_projet': 'Résidence, Les Jardins', 'type_bien': 'villa', 'zone': 'premium',
+    'roi_projete': 12.5, 'rendement_locatif': 6.0, 'ticket_minimum': 40000,
+    'commodites': {'ecoles': 1.0, 'commerces': 0.5, 'transport': 0.3, 'hopitaux': 2.0},
+}
+
+
+def test_exports_contenu():
+    """JSON, CSV et rapport HTML reprennent le résultat complet"""
+    scores = score_project(PROJET)
+    assert json.loads(build_export('json', PROJET, scores)) == scores.to_dict()
+
+    ligne = pd.read_csv(StringIO(build_export('csv', PROJET, scores).decode('utf-8')))
+    assert ligne.loc[0, 'Projet'] == PROJET['nom_projet']
+    assert ligne.loc[0, 'Score Global'] == scores['score_global']
+    assert ligne.loc[0, 'Score Risque'] == scores['scores']['Risque']['score']
+
+    rapport = build_export('html', PROJET, scores).decode('utf-8')
+    assert f"{scores['score_global']}/100" in rapport
+    assert scores['scores']['Financier']['details']['ROI'] in rapport
+
+
+def test_export_filename():
+    """Nom de fichier horodaté avec la date du résultat"""
+    assert export_filename('csv', 86400 * 365).startswith('export_dary_1971')
+    assert export_filename('html').endswith('.html')
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la classification des zones par le référentiel des quartiers
+"""
+
+import pandas as pd
+
+from dary_backends import get_backend
+from dary_gazetteer import Gazetteer, fill_zones, load_gazetteer
+from dary_ingestion import read_projects
+
+QUARTIERS = pd.DataFrame({
+    'nom': ['Anfa', 'Maârif', 'Hay Riad', 'Gauthier', 'Agdal', 'Agdal', 'Sidi Moumen'],
+    'ville': ['Casablanca', 'Casablanca', 'Rabat', 'Casablanca', 'Rabat', 'Marrakech', 'Casablanca'],
+    'zone': ['premium', 'prime', 'prime', 'premium', 'prime', 'emergente', 'standard'],
+})
+
+
+def test_resolution_des_adresses():
+    """Nom exact, abrégé, mal orthographié, homonyme départagé par la ville, inconnu"""
+    gazetteer = Gazetteer(QUARTIERS)
+    assert gazetteer.resolve("12 bd d'Anfa, ANFA, Casablanca") == ('premium', 'exacte')
+    assert gazetteer.resolve("Résidence Les Jardins, Maarif") == ('prime', 'exacte')
+    assert gazetteer.resolve("Hay Riad") == ('prime', 'exacte')
+    assert gazetteer.resolve("Sidi Moum.") == ('standard', 'prefixe')
+    assert gazetteer.resolve("Gauthiier, Casablanca") == ('premium', 'approchee')
+    assert gazetteer.resolve("Agdal, Marrakech") == ('emergente', 'exacte')
+    assert gazetteer.resolve("Agdal") == (None, 'ambigue')
+    assert gazetteer.resolve("Route de l'aéroport, Casablanca") == (None, 'inconnue')
+    assert gazetteer.resolve("") == (None, 'inconnue')
+
+
+def test_zones_saisies_conservees(tmp_path):
+    """Zones saisies gardées sauf ecraser=True ; lecture des CSV avec référentiel"""
+    projets = pd.DataFrame({
+        'nom_projet': ['A', 'B', 'C', 'D'],
+        'zone': [None, 'standard', None, 'standard'],
+        'quartier': ['Anfa', 'Gauthier', 'Inconnu', 'Nulle part'],
+        'ville': ['Casablanca'] * 4,
+    })
+    gazetteer = Gazetteer(QUARTIERS)
+    resultat = fill_zones(projets, gazetteer)
+    assert resultat['zone'].tolist() == ['premium', 'standard', None, 'standard']
+    assert resultat['zone_source'].tolist() == ['exacte', 'saisie', 'inconnue', 'saisie']
+    assert projets['zone'].tolist() == [None, 'standard', None, 'standard']
+
+    resultat = fill_zones(projets, gazetteer, ecraser=True)
+    assert resultat['zone'].tolist() == ['premium', 'premium', None, 'standard']
+    assert resultat['zone_source'].tolist() == ['exacte', 'exacte', 'inconnue', 'saisie']
+    assert 'zone_source' not in fill_zones(projets[['nom_projet', 'zone']], gazetteer).columns
+
+    QUARTIERS.to_csv(tmp_path / 'quartiers.csv', index=False)
+    projets.to_csv(tmp_path / 'projets.csv', index=False)
+    lus = read_projects(str(tmp_path / 'projets.csv'), get_backend('regles'),
+                        gazetteer=load_gazetteer(tmp_path / 'quartiers.csv'))
+    assert lus['zone'].tolist()[:2] == ['premium', 'standard']
+    assert lus['zone_source'].tolist() == ['exacte', 'saisie', 'inconnue', 'saisie']
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de l'index spatial des points d'intérêt DARY
+"""
+
+import numpy as np
+import pandas as pd
+
+from dary_geo import PoiIndex, fill_distances, haversine_km, load_poi
+
+
+def brute_force(qlat, qlon, plat, plon):
+    """Distance au point le plus proche par calcul exhaustif"""
+    return np.array([haversine_km(a, b, plat, plon).min() for a, b in zip(qlat, qlon)])
+
+
+def test_nearest_matches_brute_force():
+    """Résultats exacts sur des points uniformes et des points regroupés"""
+    rng = np.random.default_rng(0)
+    plat, plon = rng.uniform(30, 35, 20000), rng.uniform(-9, -2, 20000)
+    qlat, qlon = rng.uniform(30, 35, 300), rng.uniform(-9, -2, 300)
+    distances, indices = PoiIndex(plat, plon).nearest(qlat, qlon)
+    np.testing.assert_allclose(distances, brute_force(qlat, qlon, plat, plon))
+    np.testing.assert_allclose(haversine_km(qlat, qlon, plat[indices], plon[indices]), distances)
+
+    # Deux grappes (Casablanca, Marrakech) : grandes zones sans point
+    plat = np.r_[rng.normal(33.57, 0.03, 40), rng.normal(31.63, 0.03, 40)]
+    plon = np.r_[rng.normal(-7.60, 0.03, 40), rng.normal(-8.00, 0.03, 40)]
+    index = PoiIndex(plat, plon)
+    attendu = brute_force(qlat, qlon, plat, plon)
+    distances, _ = index.nearest(qlat, qlon, distance_max_km=1000)
+    np.testing.assert_allclose(distances, attendu)
+    distances, indices = index.nearest(qlat, qlon, distance_max_km=30)
+    assert np.array_equal(np.isnan(distances), attendu > 30)
+    assert (indices[np.isnan(distances)] == -1).all()
+
+
+def test_nearest_dense_clusters_and_duplicates():
+    """Grappes très denses, points isolés éloignés et doublons exacts : résultats exacts"""
+    rng = np.random.default_rng(1)
+    plat = np.r_[rng.normal(33.57, 0.02, 30000), rng.normal(30.42, 0.05, 5000), [35.78, 27.15], [33.57] * 20]
+    plon = np.r_[rng.normal(-7.60, 0.02, 30000), rng.normal(-9.60, 0.05, 5000), [-5.81, -13.20], [-7.60] * 20]
+    qlat = np.r_[rng.normal(33.57, 0.2, 200), rng.uniform(27, 36, 100), [np.nan]]
+    qlon = np.r_[rng.normal(-7.60, 0.2, 200), rng.uniform(-13, -2, 100), [-7.6]]
+    index = PoiIndex(plat, plon)
+    assert len(index) == len(plat)
+    distances, indices = index.nearest(qlat, qlon, distance_max_km=2000)
+    np.testing.assert_allclose(distances[:-1], brute_force(qlat[:-1], qlon[:-1], plat, plon))
+    np.testing.assert_allclose(haversine_km(qlat[:-1], qlon[:-1], plat[indices[:-1]], plon[indices[:-1]]),
+                               distances[:-1])
+    assert np.isnan(distances[-1]) and indices[-1] == -1
+
+    # Moins de points qu'une feuille
+    distances, indices = PoiIndex([33.0], [-7.0]).nearest([33.0, 34.0], [-7.0, -7.0], distance_max_km=100)
+    assert distances[0] == 0.0 and indices.tolist() == [0, -1]
+
+
+def test_fill_distances(tmp_path):
+    """Seules les distances absentes des projets géolocalisés sont complétées"""
+    fichier = tmp_path / 'points_interet.csv'
+    pd.DataFrame({
+        'type': ['École', 'ecoles', 'Hôpital', 'commerce'],
+        'latitude': [33.590, 33.600, 33.580, 33.595],
+        'longitude': [-7.630, -7.600, -7.620, -7.615],
+    }).to_csv(fichier, index=False)
+    index_poi = load_poi(fichier)
+    assert sorted(index_poi) == ['commerce', 'ecole', 'hopital']
+
+    projets = pd.DataFrame({
+        'nom_projet': ['A', 'B', 'C'],
+        'latitude': [33.591, np.nan, 33.600],
+        'longitude': [-7.631, np.nan, -7.600],
+        'dist_ecoles': [np.nan, 2.0, 9.9],
+    })
+    resultat = fill_distances(projets, index_poi)
+    assert resultat.loc[0, 'dist_ecoles'] == round(haversine_km(33.591, -7.631, 33.590, -7.630), 2)
+    assert resultat.loc[1, 'dist_ecoles'] == 2.0
+    assert resultat.loc[2, 'dist_ecoles'] == 9.9
+    assert np.isnan(resultat.loc[1, 'dist_hopitaux'])
+    assert 'dist_transport' not in resultat.columns
+    assert fill_distances(projets, index_poi, ecraser=True).loc[2, 'dist_ecoles'] == 0.0
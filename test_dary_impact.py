@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de l'analyse d'impact d'un changement de règles
+"""
+
+import numpy as np
+import pytest
+
+from dary_impact import SignatureStore, edit_rules
+from dary_scoring import NIVEAUX, score_batch
+
+
+def _incomplet(projets):
+    """Zone hors barème et valeurs manquantes sur une partie des projets"""
+    projets.loc[::11, 'zone'] = 'agadir'
+    projets.loc[::13, 'roi_projete'] = np.nan
+    projets.loc[::7, 'ticket_minimum'] = np.nan
+    return projets
+
+
+MODIFICATIONS = (
+    {'seuils': {'roi_projete': (5, 10, 14)}},
+    {'baremes': {'zone': {'emergente': 25, 'agadir': 30}}},
+    {'ponderations': {'Financier': 0.35, 'Risque': 0.15}},
+    {'seuils': {'ticket_minimum': (20000, 60000)}, 'points': {'ticket_minimum': (20, 12, 5)}},
+    {'seuils': {'surface': (70, 150), 'rendement_locatif': (3, 6, 7)}, 'baremes': {'etat': {'off-plan': 25}}},
+)
+
+
+def test_impact_egal_rescoring_complet(portefeuille):
+    """Transitions de niveau identiques à un rescoring complet du portefeuille"""
+    projets = _incomplet(portefeuille(20_000, 2))
+    store = SignatureStore(projets)
+    assert len(store.signatures) < len(projets)
+    actuels = score_batch(projets)['niveau_code']
+    assert (store.niveaux[store.signature_projet] == actuels).all()
+    zones = projets['zone'].to_numpy()
+
+    for modifications in MODIFICATIONS:
+        regles = edit_rules(**modifications)
+        rapport = store.impact(regles)
+        proposes = score_batch(projets, regles)['niveau_code']
+        attendu = np.zeros((len(NIVEAUX), len(NIVEAUX)), dtype=np.int64)
+        np.add.at(attendu, (actuels, proposes), 1)
+        assert (rapport['transitions'] == attendu).all(), modifications
+        assert rapport['changements'] == (actuels != proposes).sum()
+        for ligne in rapport['par_zone']:
+            dans_zone = zones == ligne['zone']
+            assert ligne['projets'] == dans_zone.sum()
+            assert ligne['hausses'] == (proposes < actuels)[dans_zone].sum()
+            assert ligne['baisses'] == (proposes > actuels)[dans_zone].sum()
+
+
+def test_regles_inchangees_et_validation(portefeuille):
+    """Sans modification, aucun changement ; un palier incohérent est refusé"""
+    store = SignatureStore(_incomplet(portefeuille(2_000, 2)))
+    rapport = store.impact(edit_rules())
+    assert rapport['changements'] == 0 and rapport['projets_deplaces'] == 0
+    assert sum(l['projets'] for l in rapport['par_type_bien']) == len(store)
+    with pytest.raises(ValueError):
+        edit_rules(seuils={'roi_projete': (5, 10)})
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la lecture des fichiers de projets selon le schéma d'un moteur
+"""
+
+import io
+import zipfile
+
+import pytest
+
+from dary_backends import get_backend
+from dary_ingestion import COLONNE_SOURCE, InvalidFile, check_columns, read_many, read_projects
+
+CSV = (
+    "nom_projet,zone,roi_projete,commentaire,photo_url\n"
+    "A,prime,12.5,très bien,http://x\n"
+    ",standard,4,,\n"
+    "C,premium,20,,\n"
+)
+
+
+def test_colonnes_du_moteur_seulement():
+    """Seules les colonnes du schéma sont lues, les autres complétées par défaut"""
+    moteur = get_backend('regles')
+    projets = read_projects(io.StringIO(CSV), moteur)
+    assert 'commentaire' not in projets.columns and 'photo_url' not in projets.columns
+    assert set(moteur.colonnes) <= set(projets.columns)
+    assert projets['surface'].eq(80).all()
+
+    sans_nom = "zone,roi_projete\nprime,12.5\nstandard,4\npremium,20\n"
+    lots = list(read_projects(io.StringIO(sans_nom), moteur, taille_lot=2))
+    assert [list(lot['nom_projet']) for lot in lots] == [['Projet 1', 'Projet 2'], ['Projet 3']]
+
+
+def test_fichier_invalide():
+    """Valeur non numérique et fichier sans colonne utile refusés avec un message clair"""
+    with pytest.raises(InvalidFile, match="roi_projete.*ligne 3"):
+        read_projects(io.StringIO(CSV.replace(",4,", ",quatre,")), 'regles')
+    with pytest.raises(InvalidFile, match="aucune colonne"):
+        read_projects(io.StringIO("a,b\n1,2\n"), 'regles')
+
+
+def test_lecture_de_plusieurs_fichiers(tmp_path):
+    """CSV et archive ZIP lus ensemble : en-têtes harmonisés, types réconciliés, fichier d'origine"""
+    (tmp_path / 'nord.csv').write_text("nom_projet,Zone,ROI Projete\nA,prime,12.5\nB,standard,4\n")
+    with zipfile.ZipFile(tmp_path / 'sud.zip', 'w') as archive:
+        archive.writestr('sud/casa.csv', "nom_projet,zone,roi_projete,surface\nC,premium,nc,90\n")
+        archive.writestr('sud/rabat.csv', "nom_projet,zone,roi_projete\nD,prime,7\n")
+        archive.writestr('lisez-moi.txt', "pas un CSV")
+        archive.writestr('sud/vide.csv', "")
+    lecture = read_many([str(tmp_path / 'nord.csv'), io.BytesIO((tmp_path / 'sud.zip').read_bytes())])
+    # Un objet fichier sans nom n'est pas reconnu comme archive
+    assert [r['fichier'] for r in lecture['fichiers']][0] == 'nord.csv'
+    assert lecture['fichiers'][1]['erreur'] and 'CSV illisible' in lecture['fichiers'][1]['erreur']
+
+    archive = io.BytesIO((tmp_path / 'sud.zip').read_bytes())
+    archive.name = 'sud.zip'
+    lecture = read_many([str(tmp_path / 'nord.csv'), archive], travaux=3)
+    projets = lecture['projets']
+    assert projets['nom_projet'].tolist() == ['A', 'B', 'C', 'D']
+    assert projets[COLONNE_SOURCE].tolist() == ['nord.csv', 'nord.csv', 'sud.zip/sud/casa.csv',
+                                                'sud.zip/sud/rabat.csv']
+    assert projets['zone'].tolist() == ['prime', 'standard', 'premium', 'prime']
+    # « nc » empêche la conversion : la colonne reste du texte, contrôlée ensuite par le moteur
+    assert projets['roi_projete'].tolist() == [12.5, 4, 'nc', 7]
+    assert lecture['colonnes_partielles'] == {'surface': 2}
+    assert [r['lignes'] for r in lecture['fichiers']] == [2, 1, 1, 0]
+    assert lecture['fichiers'][3]['erreur']
+
+    with pytest.raises(InvalidFile, match="Aucun fichier CSV"):
+        read_many([])
+
+
+def test_archive_corrompue_et_valeur_invalide_du_portefeuille(tmp_path):
+    """Archive ZIP corrompue signalée puis ignorée ; valeur invalide rapportée à son fichier"""
+    (tmp_path / 'nord.csv').write_text("nom_projet,roi_projete\nA,12.5\nB,4\n")
+    (tmp_path / 'sud.csv').write_text("nom_projet,roi_projete\nC,7\nD,nc\n")
+    (tmp_path / 'abime.zip').write_bytes(b'PK\x03\x04 pas une archive')
+    lecture = read_many([str(tmp_path / 'nord.csv'), str(tmp_path / 'abime.zip'), str(tmp_path / 'sud.csv')])
+    assert [r['fichier'] for r in lecture['fichiers']] == ['nord.csv', 'abime.zip', 'sud.csv']
+    assert 'archive ZIP illisible' in lecture['fichiers'][1]['erreur']
+    assert len(lecture['projets']) == 4
+
+    with pytest.raises(InvalidFile, match=r"sud\.csv : valeur non numérique 'nc'.*ligne 3"):
+        check_columns(lecture['projets'], get_backend('regles'))
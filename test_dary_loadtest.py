@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests des outils du test de charge (sans serveur)
+"""
+
+import json
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from dary_loadtest import Mesures, load_trace, make_csv
+
+
+def test_mesures_percentiles():
+    """Débit et percentiles de latence par action"""
+    mesures = Mesures()
+    for i in range(100):
+        mesures.add('calcul', 0.0, (i + 1) / 1000)
+    mesures.add('import', 0.0, 0.5, ok=False, message="Erreur")
+    rapport = mesures.report(duree_totale=10)
+    assert rapport['calcul']['n'] == 100 and rapport['calcul']['debit'] == 10
+    assert rapport['calcul']['p50'] == 50.5 and rapport['calcul']['p99'] == 99.0
+    assert rapport['import']['erreurs'] == 1
+    assert mesures.erreurs['import'] == ["Erreur"]
+
+
+def test_trace_et_fichier_csv(tmp_path):
+    """Trace regroupée par session dans l'ordre chronologique ; CSV au format de référence"""
+    chemin = tmp_path / 'trace.jsonl'
+    evenements = [
+        {'t': 3.0, 'session': 'a', 'action': 'calcul', 'params': {'roi': 12.0}},
+        {'t': 1.0, 'session': 'a', 'action': 'onglet', 'params': {'onglet': '📊 Nouveau Calcul'}},
+        {'t': 2.0, 'session': 'b', 'action': 'import', 'params': {'lignes': 5}},
+    ]
+    chemin.write_text('\n'.join(json.dumps(e) for e in evenements) + '\n', encoding='utf-8')
+    sessions = load_trace(chemin)
+    assert [e['action'] for e in sessions['a']] == ['onglet', 'calcul']
+    assert len(sessions['b']) == 1
+
+    df = pd.read_csv(BytesIO(make_csv(25, np.random.default_rng(0))))
+    reference = pd.read_csv('projets_immobiliers_maroc.csv')
+    assert len(df) == 25 and list(df.columns) == list(reference.columns)
+    assert df['nom_projet'].is_unique
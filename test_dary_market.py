@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la jointure des données de marché
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dary_backends import get_backend
+from dary_ingestion import read_projects
+from dary_market import MarketIndex, join_market, load_market, load_rules
+
+MARCHE = pd.DataFrame({
+    'quartier': ['Anfa', 'Maârif', 'Agdal', 'Agdal', None],
+    'ville': ['Casablanca', 'Casablanca', 'Rabat', 'Marrakech', 'Tanger'],
+    'prix_m2': [25000, 18000, 16000, 9000, 8000],
+    'evolution_prix': [4, 2.5, 9, 6, 1],
+    'transactions': [300, 150, 80, 20, 40],
+})
+
+
+def test_jointure_et_regles(tmp_path):
+    """Quartier, quartier homonyme départagé par la ville, repli sur la ville ; compléter ou remplacer"""
+    projets = pd.DataFrame({
+        'quartier': ['ANFA', 'Agdal', 'Agdal', 'Agdal', 'Inconnu', None],
+        'ville': ['casablanca', 'Rabat', 'Marrakech', None, 'Tanger', 'Fès'],
+        'plus_value_estimee': [np.nan, 40, np.nan, np.nan, np.nan, 25],
+        'liquidite': [None, 'moyenne', None, None, None, None],
+    })
+    index = MarketIndex(MARCHE)
+    resultat = join_market(projets, index)
+    assert resultat['marche_niveau'].tolist() == ['quartier', 'quartier', 'quartier', '', 'ville', '']
+    assert resultat['marche_prix_m2'].tolist()[:3] == [25000, 16000, 9000]
+    assert resultat['plus_value_estimee'].tolist()[:3] == [12, 40, 18]
+    assert resultat['liquidite'].tolist() == ['elevee', 'moyenne', 'faible', None, 'faible', None]
+    # Colonne absente du fichier : défaut d'import pour les projets sans donnée de marché
+    assert resultat['developpement_futur'].tolist() == ['moyen', 'fort', 'moyen', 'moyen', 'faible', 'moyen']
+    assert projets['plus_value_estimee'].isna().sum() == 4
+
+    # Quartier d'une autre ville : référence de la ville du projet
+    lignes, niveau = index.lookup(['Anfa', 'Anfa'], ['Tanger', None])
+    assert lignes.tolist() == [4, 0] and niveau.tolist() == ['ville', 'quartier']
+
+    (tmp_path / 'regles.json').write_text(json.dumps({
+        'plus_value_estimee': {'facteur': 5},
+        'developpement_futur': None,
+    }))
+    regles = load_rules(str(tmp_path / 'regles.json'), mode='remplacer')
+    resultat = join_market(projets, index, regles)
+    assert resultat['plus_value_estimee'].tolist()[:3] == [20, 45, 30]
+    assert resultat['liquidite'].tolist()[:3] == ['elevee', 'moyenne', 'faible']
+    assert 'developpement_futur' not in resultat.columns
+    assert resultat['plus_value_estimee'].tolist()[5] == 25
+
+
+def test_rechargement_et_lecture_des_projets(tmp_path):
+    """Référentiel relu seulement quand le fichier change ; jointure avant les valeurs par défaut"""
+    chemin = str(tmp_path / 'marche.csv')
+    MARCHE.to_csv(chemin, index=False)
+    index = load_market(chemin)
+    assert load_market(chemin) is index and len(index) == 5
+    assert load_market(str(tmp_path / 'absent.csv')) is None
+
+    MARCHE.assign(evolution_prix=MARCHE['evolution_prix'] * 2).to_csv(chemin, index=False)
+    os.utime(chemin, ns=(0, os.stat(chemin).st_mtime_ns + 10**9))
+    recharge = load_market(chemin)
+    assert recharge is not index and recharge.valeurs[0, 1] == 8
+
+    (tmp_path / 'projets.csv').write_text(
+        "nom_projet,quartier,ville,zone,plus_value_estimee\nA,Anfa,Casablanca,premium,\nB,Nulle part,Oujda,prime,30\n")
+    projets = read_projects(str(tmp_path / 'projets.csv'), get_backend('regles'),
+                            marche=(recharge, load_rules(None)))
+    assert projets['plus_value_estimee'].tolist() == [24, 30]
+    # Liquidité sans donnée de marché : valeur par défaut du moteur
+    assert projets['liquidite'].tolist() == ['elevee', 'moyenne']
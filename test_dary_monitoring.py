@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la surveillance de la distribution des scores
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from dary_monitoring import ScoreMonitor, coarsen_period, drift_alerts, merge_files
+from dary_scoring import CATEGORIES, niveau_codes
+
+JOUR = 86400
+
+
+def random_batch(n, rng, centre=65.0):
+    """Lot de résultats au format de score_batch"""
+    brut = np.clip(rng.normal(centre, 12, n), 0, 100)
+    lot = {c: rng.integers(0, 101, n) for c in CATEGORIES}
+    lot.update(score_global=np.round(brut, 1), niveau_code=niveau_codes(brut))
+    return lot
+
+
+def test_quantiles_exacts_et_fusion(tmp_path):
+    """Quantiles identiques à numpy et fusion de workers équivalente à un seul moniteur"""
+    rng = np.random.default_rng(1)
+    lots = [random_batch(500, rng) for _ in range(3)]
+    zones = [rng.choice(['prime', 'standard'], 500) for _ in range(3)]
+    chemins = []
+    for i, (lot, zone) in enumerate(zip(lots, zones)):
+        worker = ScoreMonitor()
+        worker.observe(lot, zones=zone, horodatage=10 * JOUR)
+        chemins.append(str(tmp_path / f'worker{i}.npz'))
+        worker.save(chemins[-1])
+    unique = ScoreMonitor()
+    for lot, zone in zip(lots, zones):
+        unique.observe(lot, zones=zone, horodatage=10 * JOUR)
+
+    fusion = merge_files(chemins)
+    periode = unique.periods()[0]
+    tous = np.concatenate([lot['score_global'] for lot in lots])
+    sketch = fusion.get(periode)
+    assert sketch.n == 1500
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert sketch.quantile(q) == np.percentile(tous, q * 100, method='inverted_cdf')
+    for segment in unique.segments():
+        assert np.array_equal(fusion.get(periode, *segment).sous_scores,
+                              unique.get(periode, *segment).sous_scores)
+
+
+def test_alerte_derive_niveau():
+    """Un afflux de projets faibles déclenche une alerte, une période stable non"""
+    rng = np.random.default_rng(2)
+    moniteur = ScoreMonitor()
+    for jour in range(8):
+        moniteur.observe(random_batch(300, rng), horodatage=(10 + jour) * JOUR)
+    assert drift_alerts(moniteur) == []
+
+    moniteur.observe(random_batch(300, rng, centre=30.0), horodatage=20 * JOUR)
+    alertes = drift_alerts(moniteur)
+    indicateurs = {a['indicateur'] for a in alertes}
+    assert 'part Faible' in indicateurs
+    assert 'score global' in indicateurs
+
+
+def test_sauvegarde_differee_et_granularites(tmp_path):
+    """Dernier intervalle écrit sans nouvelle observation ; fusion heures + jours en jours"""
+    rng = np.random.default_rng(3)
+    chemin = str(tmp_path / 'worker.npz')
+    moniteur = ScoreMonitor('heure')
+    moniteur.observe(random_batch(100, rng), horodatage=10 * JOUR)
+    assert moniteur.maybe_save(chemin, intervalle=0.3)
+    moniteur._programmee.join()
+    moniteur.observe(random_batch(50, rng), horodatage=10 * JOUR + 3600)
+    # Sauvegarde trop récente : programmée à la fin de l'intervalle, pas perdue
+    assert not moniteur.maybe_save(chemin, intervalle=0.3)
+    moniteur._programmee.join(5)
+    assert sum(ScoreMonitor.load(chemin).get(p).n for p in moniteur.periods()) == 150
+
+    moniteur.observe(random_batch(20, rng), horodatage=11 * JOUR)
+    moniteur.flush()
+    assert ScoreMonitor.load(chemin).get(moniteur.periods()[-1]).n == 20
+    modifie = os.path.getmtime(chemin)
+    time.sleep(0.01)
+    moniteur.flush()
+    assert os.path.getmtime(chemin) == modifie
+
+    jours = ScoreMonitor('jour')
+    jours.observe(random_batch(30, rng), horodatage=10 * JOUR)
+    jours.save(str(tmp_path / 'jours.npz'))
+    fusion = merge_files([chemin, str(tmp_path / 'jours.npz')])
+    assert fusion.granularite == 'jour'
+    assert [fusion.get(p).n for p in fusion.periods()] == [180, 20]
+    assert merge_files([chemin]).granularite == 'heure'
+    with pytest.raises(ValueError):
+        coarsen_period('2024-05', 'mois', 'jour')
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de l'optimiseur de portefeuille DARY
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from dary_optimizer import optimize_portfolio
+
+
+def random_portfolio(n, seed):
+    """Portefeuille aléatoire de n projets"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'nom_projet': [f'Projet {i}' for i in range(n)],
+        'zone': rng.choice(['premium', 'prime', 'emergente'], n),
+        'type_bien': rng.choice(['villa', 'studio'], n),
+        'ticket_minimum': rng.integers(1, 50, n) * 10000,
+        'score_global': rng.uniform(20, 95, n).round(1)
+    })
+
+
+def brute_force(df, budget, max_par_zone=None):
+    """Meilleure valeur par énumération exhaustive"""
+    meilleure = 0
+    for r in range(len(df) + 1):
+        for combinaison in itertools.combinations(df.index, r):
+            sous = df.loc[list(combinaison)]
+            if sous['ticket_minimum'].sum() > budget:
+                continue
+            if max_par_zone is not None and (sous['zone'].value_counts() > max_par_zone).any():
+                continue
+            meilleure = max(meilleure, sous['score_global'].sum())
+    return round(meilleure, 2)
+
+
+def test_exact_solvers_match_brute_force():
+    """Programmation dynamique et branch-and-bound sont exacts"""
+    for seed in range(10):
+        df = random_portfolio(9, seed)
+        budget = 1000000
+        resultat = optimize_portfolio(df, budget)
+        assert resultat['methode'] == 'dp' and resultat['optimal']
+        assert resultat['valeur'] == brute_force(df, budget)
+
+        resultat = optimize_portfolio(df, budget, max_par_zone=1)
+        assert resultat['methode'] == 'bnb' and resultat['optimal']
+        assert resultat['valeur'] == brute_force(df, budget, max_par_zone=1)
+
+
+def test_budget_and_limits_respected():
+    """Les sélections restent dans le budget et les limites"""
+    df = random_portfolio(3000, 42)
+    for methode in ('auto', 'greedy'):
+        resultat = optimize_portfolio(df, 2000000, max_par_zone=5,
+                                      max_par_type={'villa': 2}, methode=methode)
+        selection = df.loc[resultat['index']]
+        assert selection['ticket_minimum'].sum() <= 2000000
+        assert (selection['zone'].value_counts() <= 5).all()
+        assert (selection['type_bien'] == 'villa').sum() <= 2
+
+    # Score pondéré par le montant investi
+    resultat = optimize_portfolio(df, 2000000, poids='ticket_minimum')
+    assert df.loc[resultat['index'], 'ticket_minimum'].sum() == resultat['cout'] <= 2000000
+
+
+def test_auto_never_below_greedy():
+    """Tickets non ronds : la DP sur grille grossière ne l'emporte que si elle bat le glouton"""
+    df = random_portfolio(5000, 3)
+    df['ticket_minimum'] = df['ticket_minimum'] + np.random.default_rng(3).integers(1, 999, len(df))
+    glouton = optimize_portfolio(df, 5000000, methode='greedy')
+    resultat = optimize_portfolio(df, 5000000)
+    assert resultat['valeur'] >= glouton['valeur'] and not resultat['optimal']
+    assert resultat['cout'] <= 5000000
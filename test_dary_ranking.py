@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de l'index de classement DARY
+"""
+
+from dary_ranking import RankingIndex
+
+
+def build_index(df):
+    """Index construit à partir du portefeuille exemple"""
+    index = RankingIndex()
+    # Score fictif : le ROI projeté suffit pour vérifier le classement
+    index.add_many(df['roi_projete'], noms=df['nom_projet'],
+                   zones=df['zone'], types_bien=df['type_bien'])
+    return df, index
+
+
+def test_top_k_matches_nlargest(reference):
+    """Le top-k de l'index correspond à un tri complet"""
+    df, index = build_index(reference)
+    attendu = df.nlargest(3, 'roi_projete')['roi_projete'].tolist()
+    assert [score for _, score in index.top_k(3)] == attendu
+
+    premium = df[df['zone'] == 'premium'].nlargest(2, 'roi_projete')
+    assert [nom for nom, _ in index.top_k(2, zone='premium')] == premium['nom_projet'].tolist()
+    assert index.top_k(100, type_bien='villa') == [
+        (row['nom_projet'], row['roi_projete'])
+        for _, row in df[df['type_bien'] == 'villa'].sort_values('roi_projete', ascending=False).iterrows()
+    ]
+
+
+def test_percentile():
+    """Percentile avec ex-aequo comptés pour moitié"""
+    index = RankingIndex()
+    index.add_many([10, 20, 20, 30], zones=['prime', 'prime', 'premium', 'premium'])
+    assert index.percentile(20) == 50.0
+    assert index.percentile(35) == 100.0
+    assert index.percentile(5) == 0.0
+    assert index.percentile(30, zone='premium') == 75.0
+    assert index.percentile(50, zone='standard') is None
+    assert len(index) == 4
+    assert index.count(zone='prime') == 2
+
+
+def test_lot_replaced_and_merge_order(portefeuille):
+    """Un lot ajouté deux fois remplace le premier ; ex-aequo dans l'ordre d'arrivée"""
+    index = RankingIndex()
+    index.add(20, 'seul', zone='prime')
+    index.add_many([20, 10, 20], noms=['a', 'b', 'c'], zones=['prime', 'premium', 'prime'], lot='import')
+    index.add_many([20, 5], noms=['d', 'e'], zones=['premium', None], lot='import')
+    assert len(index) == 3
+    assert index.top_k(5) == [('d', 20.0), ('seul', 20.0), ('e', 5.0)]
+    assert index.count(zone='prime') == 1 and index.count(zone='premium') == 1
+
+    # Même classement qu'un tri complet sur un grand import réanalysé
+    projets = portefeuille(20_000, 4)
+    for _ in range(2):
+        index.add_many(projets['roi_projete'], noms=projets['nom_projet'], zones=projets['zone'],
+                       types_bien=projets['type_bien'], lot='grand')
+    assert len(index) == 3 + len(projets)
+    villas = projets[projets['type_bien'] == 'villa']
+    attendu = villas['roi_projete'].sort_values(ascending=False, kind='stable').head(50).tolist()
+    assert [score for _, score in index.top_k(50, type_bien='villa')] == attendu
+    assert index.percentile(villas['roi_projete'].median(), type_bien='villa') == 50.0
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests des chemins vers le niveau supérieur
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from dary_recommend import HORS_ATTEINTE, LEVIERS, ladder, recommend, recommend_project
+from dary_scoring import flatten_project, score_batch
+
+PROJET = {
+    'nom_projet': 'Résidence Test', 'type_bien': 'appartement', 'etat': 'ready', 'surface': 100,
+    'qualite_construction': 'standard', 'zone': 'prime',
+    'commodites': {'ecoles': 1, 'commerces': 0.5, 'transport': 1, 'hopitaux': 3},
+    'developpement_futur': 'moyen', 'ticket_minimum': 60000, 'roi_projete': 8, 'rendement_locatif': 4,
+    'plus_value_estimee': 15, 'reputation_promoteur': 'bonne', 'liquidite': 'moyenne', 'garanties': False,
+}
+
+
+def test_chemins_d_un_projet():
+    """Projet Moyen (56,5) : un seul palier de ROI suffit pour Bon ; leviers limités"""
+    chemins = recommend_project(PROJET)
+    assert list(chemins) == ['Bon', 'Excellent']
+    assert chemins['Bon'] == (['ROI projeté ≥ 10%'], 60.5)
+    assert chemins['Excellent'][1] >= 80
+
+    colonnes = {c: np.atleast_1d(v) for c, v in flatten_project(PROJET).items()}
+    # Garanties (+2) et état neuf (+1) ne suffisent pas : qualité luxe (+2) plutôt que trois leviers
+    resultat = recommend(colonnes, cible='Bon', leviers=('garanties', 'etat', 'qualite_construction'))
+    assert resultat['changements'][0] == 'Garanties : oui ; Qualité de construction : luxe'
+    assert resultat['nb_changements'][0] == 2 and resultat['echelons'][0] == 3
+    resultat = recommend(colonnes, cible='Excellent', leviers=('garanties',))
+    assert not resultat['atteint'][0] and resultat['changements'][0] == HORS_ATTEINTE
+    # Niveau déjà atteint : rien à changer
+    assert recommend(colonnes, cible='Faible')['changements'][0] == ''
+
+
+def test_portefeuille_egal_a_la_recherche_exhaustive():
+    """Nombre minimal de changements identique à l'essai de toutes les combinaisons de leviers"""
+    rng = np.random.default_rng(0)
+    n = 40
+    projets = pd.DataFrame({
+        'roi_projete': rng.uniform(0, 20, n).round(1), 'ticket_minimum': rng.integers(5, 200, n) * 1000.0,
+        'rendement_locatif': rng.uniform(0, 9, n).round(1), 'plus_value_estimee': rng.uniform(0, 40, n).round(),
+        'zone': rng.choice(['premium', 'prime', 'emergente', 'standard'], n),
+        'etat': rng.choice(['neuf', 'ready', 'off-plan', 'renovation'], n),
+        'qualite_construction': rng.choice(['luxe', 'premium', 'standard'], n),
+        'garanties': rng.choice([True, False], n), 'surface': rng.uniform(30, 300, n).round(),
+        'reputation_promoteur': rng.choice(['excellente', 'bonne', 'moyenne', 'inconnue'], n),
+        'liquidite': rng.choice(['elevee', 'moyenne', 'faible'], n),
+    })
+    resultat = recommend(projets)
+    actuel = score_batch(projets)
+    assert (resultat['cible'] == '').tolist() == (actuel['niveau_code'] == 0).tolist()
+
+    options = [[None] + [v for v in ladder(c)[1] if v is not None] for c in LEVIERS]
+    combinaisons = np.array(list(itertools.product(*[range(len(o)) for o in options])))
+    for i in np.flatnonzero(actuel['niveau_code'] > 0):
+        colonnes = {c: np.repeat(projets[c].to_numpy()[i:i + 1], len(combinaisons)) for c in projets.columns}
+        for j, critere in enumerate(LEVIERS):
+            valeurs = np.array(options[j], dtype=object)[combinaisons[:, j]]
+            colonnes[critere] = np.where(combinaisons[:, j] > 0, valeurs, colonnes[critere]).astype(
+                colonnes[critere].dtype)
+        franchis = score_batch(colonnes)['niveau_code'] < actuel['niveau_code'][i]
+        attendu = (combinaisons[franchis] > 0).sum(axis=1).min() if franchis.any() else None
+        obtenu = resultat['nb_changements'][i] if resultat['atteint'][i] else None
+        assert obtenu == attendu
+        if obtenu:
+            assert resultat['score_vise'][i] >= [80, 60, 40][actuel['niveau_code'][i] - 1]
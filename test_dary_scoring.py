@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du moteur de scoring DARY
+Le calcul vectorisé doit reproduire exactement DARYScoring, et les tables
+les règles d'origine écrites catégorie par catégorie
+"""
+
+import numpy as np
+import pandas as pd
+
+import dary_scoring
+from dary_scoring import (CATEGORIES, COMMODITES, PALIERS, DARYScoring, fill_defaults,
+                          score_batch, score_project)
+
+
+class ReglesOrigine:
+    """Règles d'origine de DARYScoring, référence des tables PALIERS et BAREMES"""
+
+    @staticmethod
+    def calculate_financial_score(data):
+        """Calcul du score financier (40% du score total)"""
+        score = 0
+        details = {}
+        
+        # ROI projeté (30 points max)
+        roi = data.get('roi_projete', 0)
+        if roi >= 15:
+            score += 30
+            details['ROI'] = "Excellent (≥15%)"
+        elif roi >= 10:
+            score += 20
+            details['ROI'] = f"Bon ({roi}%)"
+        elif roi >= 5:
+            score += 10
+            details['ROI'] = f"Moyen ({roi}%)"
+        else:
+            score += 5
+            details['ROI'] = f"Faible ({roi}%)"
+        
+        # Ticket d'entrée (20 points max)
+        ticket = data.get('ticket_minimum', 0)
+        if ticket <= 10000:
+            score += 20
+            details['Accessibilité'] = "Très accessible"
+        elif ticket <= 50000:
+            score += 15
+            details['Accessibilité'] = "Accessible"
+        elif ticket <= 100000:
+            score += 10
+            details['Accessibilité'] = "Moyen"
+        else:
+            score += 5
+            details['Accessibilité'] = "Premium"
+        
+        # Rendement locatif (30 points max)
+        rendement = data.get('rendement_locatif', 0)
+        if rendement >= 7:
+            score += 30
+            details['Rendement locatif'] = f"Excellent ({rendement}%)"
+        elif rendement >= 5:
+            score += 20
+            details['Rendement locatif'] = f"Bon ({rendement}%)"
+        elif rendement >= 3:
+            score += 10
+            details['Rendement locatif'] = f"Moyen ({rendement}%)"
+        else:
+            score += 5
+            details['Rendement locatif'] = f"Faible ({rendement}%)"
+        
+        # Plus-value potentielle (20 points max)
+        plus_value = data.get('plus_value_estimee', 0)
+        if plus_value >= 30:
+            score += 20
+            details['Plus-value'] = f"Très élevée ({plus_value}%)"
+        elif plus_value >= 20:
+            score += 15
+            details['Plus-value'] = f"Élevée ({plus_value}%)"
+        elif plus_value >= 10:
+            score += 10
+            details['Plus-value'] = f"Modérée ({plus_value}%)"
+        else:
+            score += 5
+            details['Plus-value'] = f"Faible ({plus_value}%)"
+        
+        return min(score, 100), details
+    
+    @staticmethod
+    def calculate_location_score(data):
+        """Calcul du score de localisation (30% du score total)"""
+        score = 0
+        details = {}
+        
+        # Zone géographique
+        zone = data.get('zone', 'standard')
+        zones_scores = {
+            'premium': 40,
+            'prime': 30,
+            'emergente': 20,
+            'standard': 10
+        }
+        score += zones_scores.get(zone, 10)
+        details['Zone'] = zone.capitalize()
+        
+        # Proximité commodités
+        commodites = data.get('commodites', {})
+        score_commodites = 0
+        if commodites.get('ecoles', 0) <= 2:
+            score_commodites += 10
+        if commodites.get('commerces', 0) <= 1:
+            score_commodites += 10
+        if commodites.get('transport', 0) <= 0.5:
+            score_commodites += 10
+        if commodites.get('hopitaux', 0) <= 5:
+            score_commodites += 10
+        
+        score += score_commodites
+        details['Commodités'] = f"{score_commodites}/40 points"
+        
+        # Développement futur
+        developpement = data.get('developpement_futur', 'moyen')
+        dev_scores = {'fort': 20, 'moyen': 10, 'faible': 5}
+        score += dev_scores.get(developpement, 10)
+        details['Potentiel développement'] = developpement.capitalize()
+        
+        return min(score, 100), details
+    
+    @staticmethod
+    def calculate_property_score(data):
+        """Calcul du score du bien (20% du score total)"""
+        score = 0
+        details = {}
+        
+        # Type de bien
+        type_bien = data.get('type_bien', 'appartement')
+        type_scores = {
+            'villa': 30,
+            'riad': 25,
+            'appartement': 20,
+            'studio': 15,
+            'terrain': 10
+        }
+        score += type_scores.get(type_bien, 20)
+        details['Type'] = type_bien.capitalize()
+        
+        # État du bien
+        etat = data.get('etat', 'ready')
+        etat_scores = {
+            'neuf': 30,
+            'ready': 25,
+            'off-plan': 20,
+            'renovation': 15
+        }
+        score += etat_scores.get(etat, 20)
+        details['État'] = etat.capitalize()
+        
+        # Surface
+        surface = data.get('surface', 0)
+        if surface >= 150:
+            score += 20
+            details['Surface'] = f"Grande ({surface}m²)"
+        elif surface >= 80:
+            score += 15
+            details['Surface'] = f"Moyenne ({surface}m²)"
+        else:
+            score += 10
+            details['Surface'] = f"Petite ({surface}m²)"
+        
+        # Qualité de construction
+        qualite = data.get('qualite_construction', 'standard')
+        qualite_scores = {'luxe': 20, 'premium': 15, 'standard': 10}
+        score += qualite_scores.get(qualite, 10)
+        details['Qualité'] = qualite.capitalize()
+        
+        return min(score, 100), details
+    
+    @staticmethod
+    def calculate_risk_score(data):
+        """Calcul du score de risque (10% du score total)"""
+        score = 100  # On part de 100 et on déduit
+        details = {}
+        
+        # Risque promoteur
+        promoteur = data.get('reputation_promoteur', 'moyenne')
+        if promoteur == 'excellente':
+            score -= 0
+            details['Promoteur'] = "Très fiable"
+        elif promoteur == 'bonne':
+            score -= 10
+            details['Promoteur'] = "Fiable"
+        elif promoteur == 'moyenne':
+            score -= 25
+            details['Promoteur'] = "Standard"
+        else:
+            score -= 50
+            details['Promoteur'] = "Risqué"
+        
+        # Liquidité
+        liquidite = data.get('liquidite', 'moyenne')
+        if liquidite == 'elevee':
+            score -= 0
+            details['Liquidité'] = "Très liquide"
+        elif liquidite == 'moyenne':
+            score -= 15
+            details['Liquidité'] = "Moyenne"
+        else:
+            score -= 30
+            details['Liquidité'] = "Faible"
+        
+        # Garanties
+        garanties = data.get('garanties', False)
+        if garanties:
+            score -= 0
+            details['Garanties'] = "Présentes"
+        else:
+            score -= 20
+            details['Garanties'] = "Absentes"
+        
+        return max(score, 0), details
+
+
+
+def random_projects(n, seed):
+    """Projets aléatoires couvrant tous les paliers et modalités"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'type_bien': rng.choice(['appartement', 'villa', 'riad', 'studio', 'terrain', 'loft'], n),
+        'etat': rng.choice(['neuf', 'ready', 'off-plan', 'renovation'], n),
+        'surface': rng.choice([40, 79, 80, 120, 150, 300], n),
+        'qualite_construction': rng.choice(['standard', 'premium', 'luxe'], n),
+        'zone': rng.choice(['standard', 'emergente', 'prime', 'premium'], n),
+        'dist_ecoles': rng.choice([0.5, 2.0, 2.5], n),
+        'dist_commerces': rng.choice([0.5, 1.0, 1.5], n),
+        'dist_transport': rng.choice([0.2, 0.5, 1.0], n),
+        'dist_hopitaux': rng.choice([1.0, 5.0, 8.0], n),
+        'developpement_futur': rng.choice(['faible', 'moyen', 'fort'], n),
+        'ticket_minimum': rng.choice([5000, 10000, 30000, 50000, 80000, 100000, 200000], n),
+        'roi_projete': rng.choice([2.0, 5.0, 7.5, 10.0, 14.9, 15.0, 20.0], n),
+        'rendement_locatif': rng.choice([1.0, 3.0, 4.5, 5.0, 7.0, 9.0], n),
+        'plus_value_estimee': rng.choice([5, 10, 15, 20, 30, 40], n),
+        'reputation_promoteur': rng.choice(['faible', 'moyenne', 'bonne', 'excellente'], n),
+        'liquidite': rng.choice(['faible', 'moyenne', 'elevee'], n),
+        'garanties': rng.choice([True, False], n),
+    })
+
+
+def to_app_format(row):
+    """Ligne CSV convertie au format de données de l'application"""
+    data = row.to_dict()
+    data['commodites'] = {cle: data.pop(colonne) for cle, colonne in COMMODITES.items()}
+    return data
+
+
+def test_score_batch_matches_daryscoring():
+    """Sous-scores, score global et niveau identiques au calcul projet par projet"""
+    df = random_projects(500, 0)
+    batch = score_batch(df)
+    for i, row in df.iterrows():
+        scores = DARYScoring.calculate_global_score(to_app_format(row))
+        assert batch['score_global'][i] == scores['score_global']
+        assert batch['niveau'][i] == scores['niveau']
+        for categorie in CATEGORIES:
+            assert batch[categorie][i] == scores['scores'][categorie]['score']
+
+
+def test_score_result_matches_category_scores():
+    """Résultat compact : mêmes sous-scores et libellés que les règles d'origine par catégorie"""
+    calculs = {
+        'Financier': (ReglesOrigine.calculate_financial_score, DARYScoring.calculate_financial_score),
+        'Localisation': (ReglesOrigine.calculate_location_score, DARYScoring.calculate_location_score),
+        'Propriété': (ReglesOrigine.calculate_property_score, DARYScoring.calculate_property_score),
+        'Risque': (ReglesOrigine.calculate_risk_score, DARYScoring.calculate_risk_score),
+    }
+    df = random_projects(500, 1)
+    for _, row in df.iterrows():
+        data = to_app_format(row)
+        resultat = score_project(data)
+        assert score_project(row.to_dict()).sous_scores == resultat.sous_scores
+        for categorie, (origine, calcul) in calculs.items():
+            score, details = origine(data)
+            assert resultat['scores'][categorie]['score'] == score
+            assert resultat['scores'][categorie]['details'] == details
+            assert calcul(data) == (score, details)
+
+
+def test_libelle_du_palier_a_points_egaux(monkeypatch):
+    """Deux paliers de mêmes points gardent chacun leur libellé"""
+    monkeypatch.setitem(PALIERS, 'roi_projete', ((5, 10, 15), (5, 10, 10, 30), 'right'))
+    monkeypatch.setattr(dary_scoring, '_REGLES_PROJET', dary_scoring._compile_rules()[0])
+    moyen, bon = score_project({'roi_projete': 7}), score_project({'roi_projete': 12})
+    assert moyen.sous_scores == bon.sous_scores
+    assert moyen.details('Financier')['ROI'] == "Moyen (7%)"
+    assert bon.details('Financier')['ROI'] == "Bon (12%)"
+
+
+def test_score_batch_broadcasts_grids():
+    """Un balayage 2D se calcule en un seul appel"""
+    roi = np.linspace(0, 25, 6)
+    rendement = np.linspace(0, 10, 4)
+    grille = score_batch({'roi_projete': roi[None, :], 'rendement_locatif': rendement[:, None]})
+    assert grille['score_global'].shape == (4, 6)
+    for j, r in enumerate(rendement):
+        for k, x in enumerate(roi):
+            attendu = DARYScoring.calculate_global_score({'roi_projete': x, 'rendement_locatif': r})
+            assert grille['score_global'][j, k] == attendu['score_global']
+
+
+def test_fill_defaults_matches_csv_import():
+    """Colonnes absentes d'un import complétées avec les valeurs de l'onglet CSV"""
+    df = fill_defaults(pd.DataFrame({'roi_projete': [12.0]}))
+    assert df.loc[0, 'nom_projet'] == 'Projet 1'
+    assert df.loc[0, 'ticket_minimum'] == 50000
+    assert df.loc[0, 'zone'] == 'standard'
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du budget mémoire par session
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import dary_sessions
+from dary_ranking import RankingIndex
+from dary_sessions import (SessionRegistry, enforce_budget, get_frame, load_history, loaded_usage, restore_frame,
+                           session_usage)
+
+
+def build_state(n_projets=30):
+    """État de session avec un historique et un gros import"""
+    return {
+        'projects': [{'nom': f'Projet {i}', 'score': float(i), 'scores': {'details': 'x' * 2000}}
+                     for i in range(n_projets)],
+        'upload_df': pd.DataFrame({'nom_projet': [f'P{i}' for i in range(20000)], 'roi_projete': 10.0}),
+        'batch_results': None,
+    }
+
+
+def test_budget_deverse_puis_recharge(tmp_path):
+    """Au-delà du budget, l'import puis l'historique ancien passent sur disque sans perte"""
+    etat = build_state()
+    upload = etat['upload_df'].copy()
+    historique = list(etat['projects'])
+    assert enforce_budget(etat, str(tmp_path), budget_mo=100) == []
+
+    actions = enforce_budget(etat, str(tmp_path), budget_mo=0.01)
+    assert len(actions) == 2
+    assert len(etat['projects']) == 10 and etat['projects_archives'] == 20
+    assert sum(session_usage(etat).values()) < 200 * 1024
+    pd.testing.assert_frame_equal(get_frame(etat, 'upload_df'), upload)
+    assert load_history(etat, str(tmp_path)) == historique
+
+
+def test_registre_sessions(tmp_path):
+    """Le registre classe les sessions par taille et purge les inactives fermées"""
+    registre = SessionRegistry(str(tmp_path))
+    registre.track(build_state(5), 'petite', budget_mo=100)
+    registre.track(build_state(50), 'grande', budget_mo=100)
+    assert [s['session'] for s in registre.snapshot()] == ['grande', 'petite']
+    assert registre.purge(duree_inactivite=-1) == 2
+    assert registre.snapshot() == []
+
+
+def test_rechargement_unique_et_purge_des_sessions_fermees(tmp_path):
+    """Tableau déversé relu une seule fois ; session ouverte jamais purgée ; dossier privé"""
+    registre = SessionRegistry(str(tmp_path / 'deversement'))
+    etat = build_state()
+    registre.track(etat, 'ouverte', budget_mo=0.01)
+    registre.track(build_state(5), 'fermee', budget_mo=100)
+    assert get_frame(etat, 'upload_df') is get_frame(etat, 'upload_df')
+    assert os.stat(registre.dossier).st_mode & 0o777 == 0o700
+    assert os.stat(registre.session_dir('ouverte')).st_mode & 0o777 == 0o700
+
+    assert registre.purge(duree_inactivite=-1, est_ouverte=lambda sid: sid == 'ouverte') == 1
+    assert [s['session'] for s in registre.snapshot()] == ['ouverte']
+    assert os.path.exists(registre.session_dir('ouverte'))
+
+
+def test_index_deverse_et_tableaux_recharges_bornes(tmp_path, monkeypatch):
+    """Index de classement déversé puis remis en état avant modification ; rechargements bornés en octets"""
+    classement = RankingIndex()
+    classement.add_many(np.arange(50000.0), noms=[f'P{i}' for i in range(50000)], lot='import')
+    etat = {'ranking': classement, 'projects': []}
+    assert session_usage(etat)['ranking'] > 50000 * 8
+    assert enforce_budget(etat, str(tmp_path), budget_mo=0.01) == ['ranking déversé sur disque']
+    assert get_frame(etat, 'ranking').top_k(1) == [('P49999', 49999.0)]
+
+    restore_frame(etat, 'ranking').add(1e6, 'nouveau')
+    assert isinstance(etat['ranking'], RankingIndex) and len(etat['ranking']) == 50001
+
+    # Budget des tableaux rechargés : seul le dernier reste au-delà
+    monkeypatch.setattr(dary_sessions, 'BUDGET_CHARGES_MO', 0.5)
+    for n in range(3):
+        autre = {'upload_df': pd.DataFrame({'roi_projete': np.arange(40000.0)})}
+        enforce_budget(autre, str(tmp_path / str(n)), budget_mo=0.01)
+        get_frame(autre, 'upload_df')
+    charges, octets = loaded_usage()
+    assert charges == 1 and 40000 * 8 <= octets < 0.5 * 1024 ** 2
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la simulation Monte Carlo DARY
+"""
+
+import pandas as pd
+import pytest
+
+from dary_scoring import DARYScoring
+from dary_simulation import simulate_portfolio, simulate_project
+
+
+def test_simulation_without_uncertainty_is_point_score():
+    """Sans incertitude la distribution se réduit au score ponctuel"""
+    projet = {'roi_projete': 12, 'rendement_locatif': 6, 'zone': 'prime'}
+    point = DARYScoring.calculate_global_score(projet)
+    simulation = simulate_project(projet, {}, n_samples=100, seed=0)
+    assert simulation['quantiles'][5] == simulation['quantiles'][95] == point['score_global']
+    assert simulation['probabilites'][point['niveau']] == 1.0
+
+
+def test_simulation_straddling_threshold():
+    """Un ROI incertain autour de 15 % partage les tirages entre deux paliers"""
+    projet = {'roi_projete': 15, 'rendement_locatif': 7, 'plus_value_estimee': 30,
+              'ticket_minimum': 5000, 'zone': 'premium', 'developpement_futur': 'fort',
+              'reputation_promoteur': 'excellente', 'liquidite': 'elevee', 'garanties': True,
+              'type_bien': 'villa', 'etat': 'neuf', 'surface': 200, 'qualite_construction': 'luxe'}
+    simulation = simulate_project(projet, {'roi_projete': ('uniforme', 14, 16)}, n_samples=20000, seed=1)
+    assert sum(simulation['probabilites'].values()) == pytest.approx(1.0)
+    assert 0.4 < simulation['probabilites']['Excellent'] <= 1.0
+    assert len(set(simulation['scores'])) == 2
+
+    with pytest.raises(ValueError):
+        simulate_project(projet, {'roi_projete': ('beta', 1)})
+
+
+def test_portfolio_simulation_reproducible_across_jobs(reference):
+    """Même graine, mêmes résultats quel que soit le nombre de processus"""
+    df = reference
+    incertitudes = {'roi_projete': ('relative', 0.2), 'rendement_locatif': ('ecart_type', 1.0)}
+    sequentiel = simulate_portfolio(df, incertitudes, n_samples=500, seed=7, taille_bloc=3)
+    parallele = simulate_portfolio(df, incertitudes, n_samples=500, seed=7, taille_bloc=3, n_jobs=2)
+    pd.testing.assert_frame_equal(sequentiel, parallele)
+    assert len(sequentiel) == len(df)
+    probas = sequentiel.filter(like='proba_').sum(axis=1)
+    assert probas.round(6).eq(1.0).all()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du démarrage rapide et du point de contrôle de disponibilité
+"""
+
+import gc
+import json
+import sys
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+from streamlit.web import cli
+
+import dary_startup
+from dary_backends import available_backends
+
+
+def fetch(url):
+    """Code HTTP et corps JSON d'une requête GET"""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as reponse:
+            return reponse.status, json.loads(reponse.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_readiness_apres_prechauffage():
+    """/ready passe de 503 à 200 une fois le préchauffage terminé"""
+    serveur = dary_startup.start_readiness_server(port=0, host='127.0.0.1')
+    url = f'http://127.0.0.1:{serveur.server_address[1]}'
+    if not dary_startup.readiness()['pret']:
+        assert fetch(url + '/ready')[0] == 503
+    assert fetch(url + '/health')[0] == 200
+
+    dary_startup.start_background_warmup()
+    dary_startup.wait_warmup(timeout=120)
+    code, etat = fetch(url + '/ready')
+    assert code == 200
+    assert etat['pret'] and etat['erreur'] is None
+
+
+def test_gel_avant_le_serveur(monkeypatch):
+    """Objets gelés au lancement avant Streamlit, jamais par le préchauffage pendant les sessions"""
+    gel = []
+    monkeypatch.setattr(cli, 'main', lambda: gel.append(gc.get_freeze_count()) or 0)
+    monkeypatch.setattr(sys, 'argv', list(sys.argv))
+    gc.unfreeze()
+    dary_startup.warm_up()
+    assert gc.get_freeze_count() == 0
+    try:
+        assert dary_startup.main(['app.py', '--readiness-port', '0']) == 0
+        assert gel[0] > 0 and dary_startup.readiness()['pret']
+    finally:
+        gc.unfreeze()
+
+
+def test_cahier_excel_et_relecture(tmp_path):
+    """Classeur Excel du dépôt lu sans CSV ; cahier relu quand le fichier change"""
+    pytest.importorskip('openpyxl')
+    assert dary_startup.cahier_path() == dary_startup.CAHIER_DES_CHARGES_XLSX
+    cahier = dary_startup.load_cahier()
+    assert cahier['Pondération (%)'].sum() == 100 and 'Catégorie' in cahier.columns
+    assert 'cahier' in available_backends()
+
+    chemin = str(tmp_path / 'cahier.csv')
+    pd.DataFrame({'Critère': ['A'], 'Pondération (%)': [10]}).to_csv(chemin, index=False)
+    assert dary_startup.load_cahier(chemin) is dary_startup.load_cahier(chemin)
+    pd.DataFrame({'Critère': ['A', 'B'], 'Pondération (%)': [10, 20]}).to_csv(chemin, index=False)
+    assert list(dary_startup.load_cahier(chemin)['Critère']) == ['A', 'B']
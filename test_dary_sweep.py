@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de l'analyse de sensibilité DARY
+"""
+
+import numpy as np
+
+from dary_scoring import DARYScoring
+from dary_sweep import grid, required_values, score_surface
+
+# Projet « Bon » (78/100) qui passe « Excellent » avec un ROI de 15 %
+PROJET = {'nom_projet': 'Test', 'roi_projete': 10, 'rendement_locatif': 7, 'plus_value_estimee': 30,
+          'ticket_minimum': 80000, 'zone': 'emergente', 'developpement_futur': 'moyen',
+          'garanties': True, 'reputation_promoteur': 'bonne', 'liquidite': 'elevee',
+          'type_bien': 'villa', 'etat': 'neuf', 'surface': 60, 'qualite_construction': 'standard'}
+
+
+def test_surface_matches_point_scores():
+    """Chaque point de la surface correspond au calcul projet par projet"""
+    surface = score_surface(PROJET, 'roi_projete', grid('roi_projete', 300),
+                            'rendement_locatif', grid('rendement_locatif', 400))
+    assert surface['score'].shape == (400, 300)
+    rng = np.random.default_rng(0)
+    for j, k in zip(rng.integers(0, 400, 20), rng.integers(0, 300, 20)):
+        projet = dict(PROJET, roi_projete=surface['x'][k], rendement_locatif=surface['y'][j])
+        assert surface['score'][j, k] == DARYScoring.calculate_global_score(projet)['score_global']
+
+
+def test_required_values_hit_exact_thresholds():
+    """Le ROI nécessaire tombe sur le seuil exact du barème"""
+    assert DARYScoring.calculate_global_score(PROJET)['niveau'] == 'Bon'
+    besoins = required_values(PROJET, 'roi_projete', grid('roi_projete', 7))
+    assert besoins == {'Excellent': 15.0, 'Bon': 10.0, 'Moyen': 10.0, 'Faible': 10.0}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de l'historique des scores par projet
+"""
+
+import numpy as np
+
+from dary_scoring import CATEGORIES
+from dary_timeline import TimelineStore, load_directory, lttb
+
+
+def _lttb_reference(x, y, points):
+    """LTTB d'une seule série, point par point"""
+    n = len(x)
+    pas = (n - 2) / (points - 2)
+    gardes, a = [0], 0
+    for b in range(points - 2):
+        bas, haut = int(np.floor(b * pas)) + 1, int(np.floor((b + 1) * pas)) + 1
+        suivant_bas, suivant_haut = haut, min(int(np.floor((b + 2) * pas)) + 1, n - 1)
+        if b == points - 3:
+            suivant_bas, suivant_haut = n - 1, n
+        mx, my = x[suivant_bas:suivant_haut].mean(), y[suivant_bas:suivant_haut].mean()
+        aires = [abs((x[a] - mx) * (y[i] - y[a]) - (x[a] - x[i]) * (my - y[a])) for i in range(bas, haut)]
+        a = bas + int(np.argmax(aires))
+        gardes.append(a)
+    return gardes + [n - 1]
+
+
+def test_lttb_identique_a_la_reference():
+    """Réduction vectorisée de plusieurs séries égale à LTTB série par série ; séries courtes gardées"""
+    rng = np.random.default_rng(0)
+    longueurs = [1000, 5, 337, 30]
+    x = np.concatenate([np.sort(rng.uniform(0, 100, n)) for n in longueurs])
+    y = rng.normal(50, 10, len(x))
+    debuts = np.r_[0, np.cumsum(longueurs)]
+    gardes = lttb(x, y, debuts, points=30)
+    attendus = []
+    for d, f in zip(debuts[:-1], debuts[1:]):
+        attendus += list(range(d, f)) if f - d <= 30 else [d + i for i in _lttb_reference(x[d:f], y[d:f], 30)]
+    assert gardes.tolist() == sorted(attendus)
+    assert len(lttb(x[:0], y[:0], [0], points=30)) == 0
+
+
+def test_enregistrement_fusion_et_sauvegarde(tmp_path):
+    """Points triés par date par projet, fusion de deux workers, relecture npz"""
+    historique = TimelineStore()
+    lot = {'score_global': [70, 40], **{c: [60, 30] for c in CATEGORIES}}
+    historique.record(['Anfa', 'Agdal'], lot, horodatage=200.0)
+    historique.record(['Anfa'], {'score_global': 65, **{c: 55 for c in CATEGORIES}}, horodatage=100.0)
+    assert 'Anfa' in historique and 'Gauthier' not in historique
+    assert historique.series('Anfa')['date'].tolist() == [100.0, 200.0]
+    assert historique.series('Anfa')['score_global'].tolist() == [65, 70]
+    assert len(historique.series('Gauthier')['date']) == 0
+
+    autre = TimelineStore()
+    n = 1000
+    autre.record(['Gauthier'] * n, {'score_global': np.linspace(0, 100, n),
+                                    **{c: np.zeros(n) for c in CATEGORIES}}, horodatage=np.arange(n, dtype=float))
+    autre.record(['Anfa'], {'score_global': 80, **{c: 75 for c in CATEGORIES}}, horodatage=300.0)
+    historique.save(str(tmp_path / 'a.npz'))
+    autre.save(str(tmp_path / 'b.npz'))
+
+    fusion = load_directory(str(tmp_path))
+    assert len(fusion) == n + 4
+    assert fusion.series('Anfa')['score_global'].tolist() == [65, 70, 80]
+    assert fusion.series('Anfa')['Financier'].tolist() == [55, 60, 75]
+    series = dict((nom, valeurs) for nom, _, valeurs in fusion.downsampled(points=50))
+    assert len(series['Gauthier']) == 50 and len(series['Agdal']) == 1
+    # Exclusion du fichier du worker courant
+    assert len(load_directory(str(tmp_path), exclure=str(tmp_path / 'b.npz'))) == 3
+
+
+def test_retention_bandes_et_sauvegarde_en_arriere_plan(tmp_path):
+    """Derniers points par projet puis au total ; quantiles par période ; sauvegarde dans un thread"""
+    historique = TimelineStore(max_points_projet=3, max_points=5)
+    zeros = {c: 0 for c in CATEGORIES}
+    for date in range(5):
+        historique.record(['Anfa'], {'score_global': date, **zeros}, horodatage=float(date))
+    historique.record(['Agdal', 'Maârif'], {'score_global': [50, 60], **{c: [0, 0] for c in CATEGORIES}},
+                      horodatage=0.5)
+    historique.record(['Gauthier'], {'score_global': 70, **zeros}, horodatage=10.0)
+    assert historique.series('Anfa')['date'].tolist() == [2.0, 3.0, 4.0]
+    # Un point de trop au total : le plus ancien est oublié avec son projet
+    assert len(historique) == 5 and len(historique.projets) == 3
+    assert historique.series('Gauthier')['score_global'].tolist() == [70]
+
+    bandes = historique.bands(cases=2, quantiles=(0.5,))
+    assert bandes['n'].tolist() == [4, 1] and bandes[0.5].tolist() == [3, 70]
+    # Bandes gardées jusqu'au prochain ajout, version suivie par les vues fusionnées
+    assert historique.bands(cases=2, quantiles=(0.5,)) is bandes
+    version = historique.version
+    historique.record(['Gauthier'], {'score_global': 80, **zeros}, horodatage=11.0)
+    assert historique.version == version + 1
+    assert historique.bands(cases=2, quantiles=(0.5,))['n'].tolist() == [3, 2]
+
+    assert historique.maybe_save(str(tmp_path / 'h.npz'), intervalle=0)
+    historique._sauvegarde.join()
+    charge = TimelineStore.load(str(tmp_path / 'h.npz'))
+    assert len(charge) == 5 and sorted(charge.projets) == sorted(historique.projets)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la surveillance d'un dossier de CSV
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dary_cube import ScoreCube
+from dary_scoring import fill_defaults, score_batch
+from dary_watch import DOSSIER_REJETS, DOSSIER_RESULTATS, FICHIER_ETAT, FolderWatcher
+
+
+def test_scoring_rejets_et_etat(tmp_path, monkeypatch):
+    """Fichier valide scoré par lots, fichier invalide en rejet, état écrit"""
+    monkeypatch.chdir(tmp_path)
+    reference = pd.read_csv(os.path.join(os.path.dirname(__file__), 'projets_immobiliers_maroc.csv'))
+    reference.to_csv(tmp_path / 'lot1.csv', index=False)
+    (tmp_path / 'casse.csv').write_text("nom_projet,roi_projete\nA,douze\n", encoding='utf-8')
+    (tmp_path / 'copie.csv.part').write_text("en cours", encoding='utf-8')
+
+    FolderWatcher(str(tmp_path), delai_stabilite=0.05).run(une_fois=True)
+
+    resultats = pd.read_csv(tmp_path / DOSSIER_RESULTATS / 'lot1_scores.csv')
+    attendu = score_batch(fill_defaults(reference))
+    assert np.allclose(resultats['score_global'], attendu['score_global'])
+    assert list(resultats['nom_projet']) == list(reference['nom_projet'])
+    assert ScoreCube.load(tmp_path / DOSSIER_RESULTATS / 'lot1_cube.npz').n == len(reference)
+
+    rejets = sorted(os.listdir(tmp_path / DOSSIER_REJETS))
+    assert len(rejets) == 2 and rejets[1].endswith('casse.csv.erreur.txt')
+    assert 'douze' in (tmp_path / DOSSIER_REJETS / rejets[1]).read_text(encoding='utf-8')
+    assert (tmp_path / 'copie.csv.part').exists()
+
+    etat = json.loads((tmp_path / DOSSIER_RESULTATS / FICHIER_ETAT).read_text(encoding='utf-8'))
+    assert etat['fichiers'] == 1 and etat['rejets'] == 1 and etat['lignes'] == len(reference)
+    assert etat['latence_s']['p50'] > 0
+
+
+def test_fichier_stable_puis_modifie(tmp_path, monkeypatch):
+    """Un fichier n'est lu qu'une fois stable, rescoré seulement s'il change"""
+    monkeypatch.chdir(tmp_path)
+    chemin = tmp_path / 'projets.csv'
+    chemin.write_text("nom_projet,roi_projete\nA,5\n", encoding='utf-8')
+    watcher = FolderWatcher(str(tmp_path), delai_stabilite=3600)
+    assert watcher.poll() == [] and watcher.poll() == []
+
+    watcher.delai_stabilite = 0
+    assert watcher.poll() == ['projets.csv']
+    watcher.drain()
+    assert watcher.poll() == []
+
+    chemin.write_text("nom_projet,roi_projete\nA,5\nB,20\n", encoding='utf-8')
+    watcher.poll()
+    assert watcher.poll() == ['projets.csv']
+    watcher.run(une_fois=True)
+    assert len(pd.read_csv(tmp_path / DOSSIER_RESULTATS / 'projets_scores.csv')) == 2
+
+
+def test_registre_non_enregistre(tmp_path, monkeypatch):
+    """Registre impossible à écrire : fichier en rejet, travail retiré des fichiers en cours"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'projets.csv').write_text("nom_projet,roi_projete\nA,5\n", encoding='utf-8')
+    watcher = FolderWatcher(str(tmp_path), delai_stabilite=0)
+
+    def disque_plein():
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(watcher, '_save_registry', disque_plein)
+    watcher.poll()
+    assert watcher.poll() == ['projets.csv']
+    watcher.drain()
+
+    assert watcher._en_cours == {} and watcher._registre == {}
+    assert not (tmp_path / 'projets.csv').exists()
+    erreur, = [f for f in os.listdir(tmp_path / DOSSIER_REJETS) if f.endswith('.erreur.txt')]
+    assert 'registre non enregistré' in (tmp_path / DOSSIER_REJETS / erreur).read_text(encoding='utf-8')
+    assert watcher.poll() == []